@@ -0,0 +1,139 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from api.weather_data_flaskapi.business.pagination import encode_cursor, keyset_query
+from api.weather_data_flaskapi.business.weather_data import get_readings
+from database import db, create_database
+from database.locations import get_location_id
+from database.models import Humidity, Location, Pressure, Temperature
+
+
+class TestCaseDatabaseIndex(unittest.TestCase):
+    def setUp(self):
+        '''
+        The query plans are checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.models = [Humidity, Pressure, Temperature]
+        self.start = datetime(2017, 1, 1)
+        self.end = datetime(2017, 2, 1)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def query_plan(self, query) -> str:
+        '''Return the EXPLAIN QUERY PLAN output of a query as one string.'''
+        compiled = query.statement.compile(dialect=db.engine.dialect)
+        parameters = [compiled.params[name] for name in compiled.positiontup]
+
+        cursor = db.engine.raw_connection().cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + str(compiled), parameters)
+
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_step_00_collection_query_uses_location_index(self):
+        '''The ordered collection query seeks the (location_id, timestamp) index.'''
+        log = logging.getLogger('TestCase.test_step_00_collection_query_uses_location_index')
+        log.info('Start')
+
+        create_database(app=self.app)
+
+        with self.app.app_context():
+            get_location_id('Edmonton', 'AB', 'CA')
+
+            for model in self.models:
+                query = get_readings(model, self.start, self.end, 'Edmonton', 'AB', 'CA').order_by(model.timestamp,
+                                                                                                   model.id)
+                plan = self.query_plan(query)
+
+                log.debug('plan= {plan}'.format(plan=plan))
+
+                index_name = '{table}_location_timestamp_index'.format(table=model.__tablename__)
+                assert index_name in plan, 'Expected the query to use ' + index_name
+                assert 'TEMP B-TREE' not in plan, 'Expected the index to provide the order'
+
+        log.info('End')
+
+    def test_step_01_keyset_page_uses_location_index(self):
+        '''A keyset page past a cursor seeks the (location_id, timestamp) index.'''
+        log = logging.getLogger('TestCase.test_step_01_keyset_page_uses_location_index')
+        log.info('Start')
+
+        create_database(app=self.app)
+
+        with self.app.app_context():
+            get_location_id('Edmonton', 'AB', 'CA')
+
+            for model in self.models:
+                query = keyset_query(get_readings(model, self.start, self.end, 'Edmonton', 'AB', 'CA'),
+                                     model,
+                                     encode_cursor(datetime(2017, 1, 15), 42),
+                                     100)
+                plan = self.query_plan(query)
+
+                log.debug('plan= {plan}'.format(plan=plan))
+
+                index_name = '{table}_location_timestamp_index'.format(table=model.__tablename__)
+                assert index_name in plan, 'Expected the query to use ' + index_name
+
+        log.info('End')
+
+    def test_step_02_existing_database_is_upgraded(self):
+        '''Declared indexes are added to, and legacy indexes dropped from, existing tables.'''
+        log = logging.getLogger('TestCase.test_step_02_existing_database_is_upgraded')
+        log.info('Start')
+
+        with self.app.app_context():
+            Location.__table__.create(bind=db.engine)
+
+            for model in self.models:
+                model.__table__.create(bind=db.engine)
+
+                for index in model.__table__.indexes:
+                    db.engine.execute(text('DROP INDEX {name}'.format(name=index.name)))
+
+                db.engine.execute(text('CREATE INDEX {table}_city_index ON {table} (location_id)'.format(
+                    table=model.__tablename__)))
+
+        create_database(app=self.app)
+
+        with self.app.app_context():
+            inspector = inspect(db.engine)
+
+            for model in self.models:
+                index_names = {index['name'] for index in inspector.get_indexes(model.__tablename__)}
+
+                log.debug('indexes= {index_names}'.format(index_names=index_names))
+
+                self.assertEqual(index_names, {index.name for index in model.__table__.indexes})
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_collection_query_uses_location_index').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_keyset_page_uses_location_index').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_existing_database_is_upgraded').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,91 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime
+
+from flask import Flask
+
+from database import db, create_database
+from database.locations import clear_locations, find_location_id, get_location, get_location_id
+from database.models import Humidity, Location
+
+
+class TestCaseDatabaseLocation(unittest.TestCase):
+    def setUp(self):
+        '''
+        The location table is checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_step_00_location_is_stored_once(self):
+        '''Readings at the same location share one location row.'''
+        log = logging.getLogger('TestCase.test_step_00_location_is_stored_once')
+        log.info('Start')
+
+        with self.app.app_context():
+            assert find_location_id('Edmonton', 'AB', 'CA') is None, 'Expected an unknown location'
+
+            for hour in range(3):
+                db.session.add(Humidity(value=50.0,
+                                        value_units='RH',
+                                        value_error_range=0.0,
+                                        latitude=53.5,
+                                        longitude=-113.5,
+                                        city='Edmonton',
+                                        province='AB',
+                                        country='CA',
+                                        elevation=645.0,
+                                        elevation_units='m',
+                                        timestamp=datetime(2017, 1, 1, hour)))
+            db.session.commit()
+
+            location_id = find_location_id('Edmonton', 'AB', 'CA')
+
+            log.debug('location_id= {location_id}'.format(location_id=location_id))
+
+            self.assertEqual(Location.query.count(), 1)
+            self.assertEqual(get_location_id('Edmonton', 'AB', 'CA'), location_id)
+            self.assertEqual({humidity.location_id for humidity in Humidity.query.all()}, {location_id})
+
+        log.info('End')
+
+    def test_step_01_location_is_resolved_from_id(self):
+        '''A reading resolves its city, province and country from a cold cache.'''
+        log = logging.getLogger('TestCase.test_step_01_location_is_resolved_from_id')
+        log.info('Start')
+
+        with self.app.app_context():
+            location_id = get_location_id('Calgary', 'AB', 'CA')
+
+            clear_locations()
+
+            self.assertEqual(get_location(location_id), ('Calgary', 'AB', 'CA'))
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_location_is_stored_once').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_location_is_resolved_from_id').setLevel(logging.DEBUG)
+    unittest.main()
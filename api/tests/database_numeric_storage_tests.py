@@ -0,0 +1,117 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import func
+
+from database import db, create_database
+from database.models import Humidity
+from database.types import NUMERIC_STORAGE_MODES, real_value, set_numeric_storage
+
+
+class TestCaseDatabaseNumericStorage(unittest.TestCase):
+    def setUp(self):
+        '''
+        Each storage mode is checked against its own scratch SQLite database.
+        '''
+        self.values = [12.3456, 78.9012, 45.0001]
+
+    def tearDown(self):
+        set_numeric_storage('decimal')
+
+    def create_app(self, mode: str) -> Flask:
+        set_numeric_storage(mode)
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(app)
+        create_database(app=app)
+
+        with app.app_context():
+            for hour, value in enumerate(self.values):
+                db.session.add(Humidity(value=value,
+                                        value_units='RH',
+                                        value_error_range=0.000125,
+                                        latitude=53.546124,
+                                        longitude=-113.493823,
+                                        city='Edmonton',
+                                        province='AB',
+                                        country='CA',
+                                        elevation=645.0,
+                                        elevation_units='m',
+                                        timestamp=datetime(2017, 1, 1, hour)))
+            db.session.commit()
+
+        return app
+
+    def test_step_00_values_round_trip(self):
+        '''Reading numbers load back unchanged in every storage mode.'''
+        log = logging.getLogger('TestCase.test_step_00_values_round_trip')
+        log.info('Start')
+
+        for mode in NUMERIC_STORAGE_MODES:
+            app = self.create_app(mode)
+
+            with app.app_context():
+                humidity = Humidity.query.order_by(Humidity.id).first()
+
+                log.debug('{mode}: {value!r} {latitude!r}'.format(mode=mode,
+                                                                  value=humidity.value,
+                                                                  latitude=humidity.latitude))
+
+                self.assertAlmostEqual(float(humidity.value), self.values[0], places=4)
+                self.assertAlmostEqual(float(humidity.value_error_range), 0.000125, places=6)
+                self.assertAlmostEqual(float(humidity.latitude), 53.546124, places=6)
+                self.assertAlmostEqual(float(humidity.longitude), -113.493823, places=6)
+
+                db.drop_all()
+
+        log.info('End')
+
+    def test_step_01_sql_aggregates_use_real_units(self):
+        '''SQL aggregates over real_value() are in real units in every storage mode.'''
+        log = logging.getLogger('TestCase.test_step_01_sql_aggregates_use_real_units')
+        log.info('Start')
+
+        for mode in NUMERIC_STORAGE_MODES:
+            app = self.create_app(mode)
+
+            with app.app_context():
+                value = real_value(Humidity.value)
+                minimum, total, squares = db.session.query(func.min(value),
+                                                           func.sum(value),
+                                                           func.sum(value * value)).one()
+
+                log.debug('{mode}: {minimum} {total} {squares}'.format(mode=mode,
+                                                                       minimum=minimum,
+                                                                       total=total,
+                                                                       squares=squares))
+
+                self.assertAlmostEqual(float(minimum), min(self.values), places=4)
+                self.assertAlmostEqual(float(total), sum(self.values), places=4)
+                self.assertAlmostEqual(float(squares), sum(value * value for value in self.values), places=3)
+
+                db.drop_all()
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_values_round_trip').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_sql_aggregates_use_real_units').setLevel(logging.DEBUG)
+    unittest.main()
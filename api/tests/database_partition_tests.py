@@ -0,0 +1,184 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import event, inspect
+
+from api.weather_data_flaskapi.business.weather_data import create_humidity, create_humidity_batch, \
+    delete_humidity, get_readings, update_humidity
+from database import db, create_database
+from database.models import Humidity, HumidityDaily
+from database.partitions import detach_partition, drop_partition, get_reading, list_partitions
+
+
+class TestCaseDatabasePartition(unittest.TestCase):
+    def setUp(self):
+        '''
+        The month table router is checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['PARTITION_READINGS'] = True
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        with self.app.app_context():
+            create_humidity_batch([self.reading(datetime(2017, month, 15), float(month)) for month in (1, 2, 3)])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            for table_name in inspect(db.engine).get_table_names():
+                if table_name.startswith('humidity_2017'):
+                    db.engine.execute('DROP TABLE {table_name}'.format(table_name=table_name))
+            db.drop_all()
+
+    @staticmethod
+    def reading(timestamp: datetime, value: float) -> dict:
+        return {'value': value,
+                'value_units': 'RH',
+                'value_error_range': 0.0,
+                'latitude': 53.5,
+                'longitude': -113.5,
+                'city': 'Edmonton',
+                'province': 'AB',
+                'country': 'CA',
+                'elevation': 645.0,
+                'elevation_units': 'm',
+                'timestamp': timestamp.isoformat()}
+
+    def test_step_00_readings_are_routed_by_month(self):
+        '''Readings land in the month table of their timestamp and queries read only overlapping months.'''
+        log = logging.getLogger('TestCase.test_step_00_readings_are_routed_by_month')
+        log.info('Start')
+
+        with self.app.app_context():
+            self.assertEqual(list_partitions(Humidity), [datetime(2017, 1, 1),
+                                                         datetime(2017, 2, 1),
+                                                         datetime(2017, 3, 1)])
+            self.assertEqual(db.session.query(Humidity).count(), 0)
+
+            query = get_readings(Humidity, datetime(2017, 2, 1), datetime(2017, 2, 28), 'Edmonton', 'AB', 'CA')
+            sql = str(query.statement.compile(dialect=db.engine.dialect))
+
+            log.debug('sql= {sql}'.format(sql=sql))
+
+            assert 'humidity_201702' in sql, 'Expected the query to read the February table'
+            assert 'humidity_201701' not in sql and 'humidity_201703' not in sql, 'Expected the other months pruned'
+            self.assertEqual([float(humidity.value) for humidity in query.all()], [2.0])
+
+            everything = get_readings(Humidity, datetime(2016, 1, 1), datetime(2018, 1, 1), 'Edmonton', 'AB', 'CA')
+            self.assertEqual(sorted(float(humidity.value) for humidity in everything.all()), [1.0, 2.0, 3.0])
+
+        log.info('End')
+
+    def test_step_01_reading_is_created_updated_and_deleted(self):
+        '''A reading can be loaded by id, moved to another month and deleted.'''
+        log = logging.getLogger('TestCase.test_step_01_reading_is_created_updated_and_deleted')
+        log.info('Start')
+
+        with self.app.app_context():
+            humidity = create_humidity(self.reading(datetime(2017, 1, 20), 10.0))
+            humidity_id = humidity.id
+
+            log.debug('humidity_id= {humidity_id}'.format(humidity_id=humidity_id))
+
+            self.assertEqual(humidity_id, 4)
+            self.assertEqual(float(get_reading(Humidity, humidity_id).value), 10.0)
+
+            update_humidity(humidity_id, self.reading(datetime(2017, 4, 2), 11.0))
+
+            self.assertEqual(list_partitions(Humidity)[-1], datetime(2017, 4, 1))
+            moved = get_reading(Humidity, humidity_id)
+            self.assertEqual((float(moved.value), moved.timestamp), (11.0, datetime(2017, 4, 2)))
+            self.assertEqual(get_readings(Humidity, datetime(2017, 1, 1), datetime(2017, 1, 31),
+                                          'Edmonton', 'AB', 'CA').count(), 1)
+
+            delete_humidity(humidity_id)
+
+            self.assertEqual(get_readings(Humidity, datetime(2017, 4, 1), datetime(2017, 4, 30),
+                                          'Edmonton', 'AB', 'CA').count(), 0)
+
+        log.info('End')
+
+    def test_step_02_old_months_are_dropped_and_detached(self):
+        '''Dropping or detaching a month removes its readings but keeps its rollups.'''
+        log = logging.getLogger('TestCase.test_step_02_old_months_are_dropped_and_detached')
+        log.info('Start')
+
+        with self.app.app_context():
+            drop_partition(Humidity, datetime(2017, 1, 1))
+            archive = detach_partition(Humidity, datetime(2017, 2, 1))
+
+            log.debug('archive= {archive}'.format(archive=archive))
+
+            self.assertEqual(archive, 'humidity_201702_archive')
+            self.assertIn(archive, inspect(db.engine).get_table_names())
+            self.assertEqual(list_partitions(Humidity), [datetime(2017, 3, 1)])
+
+            everything = get_readings(Humidity, datetime(2016, 1, 1), datetime(2018, 1, 1), 'Edmonton', 'AB', 'CA')
+            self.assertEqual([float(humidity.value) for humidity in everything.all()], [3.0])
+            self.assertEqual(HumidityDaily.query.count(), 3)
+
+            db.engine.execute('DROP TABLE {archive}'.format(archive=archive))
+
+        log.info('End')
+
+    def test_step_03_partition_list_is_cached(self):
+        '''Routed reads and writes reuse the cached month list until a partition is created or dropped.'''
+        log = logging.getLogger('TestCase.test_step_03_partition_list_is_cached')
+        log.info('Start')
+
+        with self.app.app_context():
+            catalog = []
+
+            def count_catalog(conn, cursor, statement, parameters, context, executemany):
+                if 'sqlite_master' in statement or statement.startswith('PRAGMA'):
+                    catalog.append(statement)
+
+            event.listen(db.engine, 'before_cursor_execute', count_catalog)
+
+            try:
+                list_partitions(Humidity)
+                del catalog[:]
+
+                for month in (1, 2, 3):
+                    create_humidity(self.reading(datetime(2017, month, 20), float(month)))
+                get_readings(Humidity, datetime(2017, 1, 1), datetime(2017, 3, 31), 'Edmonton', 'AB', 'CA').all()
+
+                log.debug('catalog= {catalog}'.format(catalog=catalog))
+
+                self.assertEqual(catalog, [])
+
+                create_humidity(self.reading(datetime(2017, 4, 20), 4.0))
+                self.assertEqual(list_partitions(Humidity)[-1], datetime(2017, 4, 1))
+
+                drop_partition(Humidity, datetime(2017, 4, 1))
+                self.assertEqual(list_partitions(Humidity)[-1], datetime(2017, 3, 1))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', count_catalog)
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_readings_are_routed_by_month').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_reading_is_created_updated_and_deleted').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_old_months_are_dropped_and_detached').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_partition_list_is_cached').setLevel(logging.DEBUG)
+    unittest.main()
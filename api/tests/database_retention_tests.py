@@ -0,0 +1,151 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from api.weather_data_flaskapi.business.response_cache import clear_response_cache, get_response_cache, \
+    response_cache_key
+from api.weather_data_flaskapi.business.retention import compact_readings, get_checkpoint, set_checkpoint
+from api.weather_data_flaskapi.business.weather_data import create_temperature_batch
+from database import db, create_database
+from database.models import Temperature, TemperatureDaily, TemperatureHourly
+
+
+class TestCaseDatabaseRetention(unittest.TestCase):
+    def setUp(self):
+        '''
+        The retention job is checked against a scratch SQLite database holding three days of readings.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        self.start = datetime(2017, 1, 1)
+
+        with self.app.app_context():
+            create_temperature_batch([{'value': float(minute % 7),
+                                       'value_units': 'C',
+                                       'value_error_range': 0.0,
+                                       'latitude': 53.5,
+                                       'longitude': -113.5,
+                                       'city': 'Edmonton',
+                                       'province': 'AB',
+                                       'country': 'CA',
+                                       'elevation': 645.0,
+                                       'elevation_units': 'm',
+                                       'timestamp': (self.start + timedelta(minutes=minute * 20)).isoformat()}
+                                      for minute in range(3 * 72)])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    @staticmethod
+    def rollups() -> list:
+        return [(rollup.bucket, rollup.value_count, rollup.value_min, rollup.value_max, rollup.value_sum)
+                for model in (TemperatureHourly, TemperatureDaily)
+                for rollup in model.query.order_by(model.bucket).all()]
+
+    def test_step_00_old_readings_are_compacted(self):
+        '''Readings before the cut-off are deleted in batches and their rollups are kept.'''
+        log = logging.getLogger('TestCase.test_step_00_old_readings_are_compacted')
+        log.info('Start')
+
+        with self.app.app_context():
+            rollups = self.rollups()
+
+            stats = compact_readings(Temperature, self.start + timedelta(days=2, hours=6), batch_size=25)
+
+            log.debug('stats= {stats}'.format(stats=stats))
+
+            self.assertEqual(stats['days'], 2)
+            self.assertEqual(stats['deleted'], 2 * 72)
+            self.assertEqual(Temperature.query.count(), 72)
+            self.assertEqual(Temperature.query.order_by(Temperature.timestamp).first().timestamp,
+                             self.start + timedelta(days=2))
+            self.assertEqual(get_checkpoint(Temperature), self.start + timedelta(days=2))
+            self.assertEqual(self.rollups(), rollups)
+
+            stats = compact_readings(Temperature, self.start + timedelta(days=2, hours=6), batch_size=25)
+
+            self.assertEqual((stats['days'], stats['deleted']), (0, 0))
+
+        log.info('End')
+
+    def test_step_01_interrupted_run_resumes(self):
+        '''A run interrupted while deleting a compacted day resumes without rebuilding that day.'''
+        log = logging.getLogger('TestCase.test_step_01_interrupted_run_resumes')
+        log.info('Start')
+
+        with self.app.app_context():
+            rollups = self.rollups()
+
+            # The first day was folded into the rollups and partly deleted
+            set_checkpoint(Temperature, self.start + timedelta(days=1))
+            Temperature.query.filter(Temperature.timestamp < self.start + timedelta(hours=12)) \
+                .delete(synchronize_session=False)
+            db.session.commit()
+
+            stats = compact_readings(Temperature, self.start + timedelta(days=1), batch_size=10)
+
+            log.debug('stats= {stats}'.format(stats=stats))
+
+            self.assertEqual((stats['days'], stats['deleted']), (0, 36))
+            self.assertEqual(Temperature.query.count(), 2 * 72)
+            self.assertEqual(self.rollups(), rollups)
+
+        log.info('End')
+
+    def test_step_02_compaction_evicts_cached_responses(self):
+        '''Deleting compacted readings evicts the cached responses over their days.'''
+        log = logging.getLogger('TestCase.test_step_02_compaction_evicts_cached_responses')
+        log.info('Start')
+
+        self.app.config['RESPONSE_CACHE_BACKEND'] = 'memory'
+        clear_response_cache()
+
+        with self.app.app_context():
+            cache = get_response_cache()
+            keys = {}
+
+            for day in range(3):
+                start = self.start + timedelta(days=day)
+                end = start + timedelta(hours=23)
+                keys[day] = response_cache_key('temperature', 'Edmonton', 'AB', 'CA', start, end, None, None, None)
+                cache.set(keys[day], b'[]', {}, 'temperature', 'Edmonton', 'AB', 'CA', start, end, cache.generation)
+
+            compact_readings(Temperature, self.start + timedelta(days=2), batch_size=25)
+
+            log.debug('stats= {stats}'.format(stats=cache.stats()))
+
+            self.assertIsNone(cache.get(keys[0]))
+            self.assertIsNone(cache.get(keys[1]))
+            self.assertIsNotNone(cache.get(keys[2]))
+
+        clear_response_cache()
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_old_readings_are_compacted').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_interrupted_run_resumes').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_compaction_evicts_cached_responses').setLevel(logging.DEBUG)
+    unittest.main()
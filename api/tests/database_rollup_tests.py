@@ -0,0 +1,92 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from api.weather_data_flaskapi.business.rollups import rebuild_rollups
+from api.weather_data_flaskapi.business.weather_data import create_temperature, create_temperature_batch, \
+    delete_temperature, update_temperature
+from database import db, create_database
+from database.models import Temperature, TemperatureDaily, TemperatureHourly
+
+
+def reading(timestamp: datetime, value: float) -> dict:
+    return {'value': value, 'value_units': 'C', 'value_error_range': 0.0, 'latitude': 53.5, 'longitude': -113.5,
+            'city': 'Edmonton', 'province': 'AB', 'country': 'CA', 'elevation': 645.0, 'elevation_units': 'm',
+            'timestamp': timestamp.isoformat()}
+
+
+class TestCaseDatabaseRollup(unittest.TestCase):
+    def setUp(self):
+        '''
+        The rollups are checked against a scratch SQLite database holding two days of readings.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        self.start = datetime(2017, 1, 1)
+
+        with self.app.app_context():
+            create_temperature_batch([reading(self.start + timedelta(minutes=minute * 30), float(minute % 5))
+                                      for minute in range(2 * 48)])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    @staticmethod
+    def rollups() -> list:
+        return [(rollup.bucket, rollup.value_count, rollup.value_min, rollup.value_max, round(rollup.value_sum, 6),
+                 round(rollup.value_sum_squares, 6))
+                for model in (TemperatureHourly, TemperatureDaily)
+                for rollup in model.query.order_by(model.bucket).all()]
+
+    def test_step_00_writes_match_a_rebuild(self):
+        '''Rollups kept up by creates, updates and deletes equal the rollups rebuilt from the readings.'''
+        log = logging.getLogger('TestCase.test_step_00_writes_match_a_rebuild')
+        log.info('Start')
+
+        with self.app.app_context():
+            readings = Temperature.query.order_by(Temperature.timestamp).all()
+
+            # A bucket's minimum and maximum are removed, its only reading is moved, and a new bucket is added
+            update_temperature(readings[0].id, reading(readings[0].timestamp, 2.5))
+            delete_temperature(readings[4].id)
+            update_temperature(readings[7].id, reading(self.start + timedelta(days=1, minutes=5), -3.0))
+            delete_temperature(readings[10].id)
+            delete_temperature(readings[11].id)
+            create_temperature(reading(self.start + timedelta(hours=30, minutes=10), 9.0))
+
+            rollups = self.rollups()
+
+            log.debug('rollups= {count}'.format(count=len(rollups)))
+
+            rebuild_rollups(Temperature, self.start, self.start + timedelta(days=2))
+
+            self.assertEqual(rollups, self.rollups())
+            self.assertNotIn(self.start + timedelta(hours=5), [bucket for bucket, *_ in rollups])
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_writes_match_a_rebuild').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,126 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import MetaData, Table, event, inspect, select
+
+from database import SCHEMA_VERSION, db, check_schema_version, create_database, get_schema_version, reset_database
+
+
+class TestCaseDatabaseSchema(unittest.TestCase):
+    def setUp(self):
+        '''
+        The schema bootstrap is checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_step_00_version_check_is_one_query(self):
+        '''The startup check fails on an empty database and passes with one query once the schema is created.'''
+        log = logging.getLogger('TestCase.test_step_00_version_check_is_one_query')
+        log.info('Start')
+
+        self.assertIsNone(get_schema_version(self.app))
+        self.assertFalse(check_schema_version(self.app))
+
+        create_database(self.app)
+
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        self.assertTrue(check_schema_version(self.app))
+
+        with self.app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        log.debug('statements= {statements}'.format(statements=statements))
+
+        self.assertEqual(len(statements), 1)
+
+        log.info('End')
+
+    def test_step_01_create_database_is_idempotent(self):
+        '''Creating the schema again, or resetting it, leaves one current schema version.'''
+        log = logging.getLogger('TestCase.test_step_01_create_database_is_idempotent')
+        log.info('Start')
+
+        create_database(self.app)
+        create_database(self.app)
+        reset_database(self.app)
+
+        with self.app.app_context():
+            from database.models import SchemaVersion
+
+            versions = [row.version for row in SchemaVersion.query.all()]
+
+        log.debug('versions= {versions}'.format(versions=versions))
+
+        self.assertEqual(versions, [SCHEMA_VERSION])
+
+        log.info('End')
+
+    def test_step_02_added_columns_are_nullable_until_backfilled(self):
+        '''Columns missing from an existing table are added, nullable unless they have a server default.'''
+        log = logging.getLogger('TestCase.test_step_02_added_columns_are_nullable_until_backfilled')
+        log.info('Start')
+
+        from database.models import Humidity
+
+        # The humidity table as created before location_id and revision were added
+        legacy = Table(Humidity.__tablename__, MetaData(), *[column.copy() for column in Humidity.__table__.columns
+                                                             if column.name not in ('location_id', 'revision')])
+
+        with self.app.app_context():
+            legacy.create(bind=db.engine)
+            db.engine.execute(legacy.insert().values(id=1, value=50.0, value_units='%', value_error_range=0.5,
+                                                     latitude=53.5461, latitude_public=53.55,
+                                                     longitude=-113.4938, longitude_public=-113.49,
+                                                     elevation=645.0, elevation_units='m',
+                                                     timestamp=datetime(2017, 1, 1)))
+
+        create_database(self.app)
+
+        with self.app.app_context():
+            columns = {column['name']: column for column in inspect(db.engine).get_columns(Humidity.__tablename__)}
+
+            log.debug('columns= {columns}'.format(columns=columns))
+
+            self.assertTrue(columns['location_id']['nullable'])
+            self.assertFalse(columns['revision']['nullable'])
+            self.assertEqual(db.engine.execute(select([Humidity.location_id, Humidity.revision])).fetchall(),
+                             [(None, 0)])
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_version_check_is_one_query').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_create_database_is_idempotent').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_added_columns_are_nullable_until_backfilled').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,191 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import math
+import random
+import sys
+import unittest
+
+from flask import Flask
+
+from api.weather_data_flaskapi.business.spatial import spatial_filter
+from api.weather_data_flaskapi.business.weather_data import create_humidity_batch
+from api.weather_data_flaskapi.spatial_arguments import distance
+from backfill_weather_data_geohash import backfill
+from database import db, create_database
+from database.geohash import KM_PER_DEGREE, cover, encode
+from database.models import Humidity
+
+
+class TestCaseDatabaseSpatial(unittest.TestCase):
+    def setUp(self):
+        '''
+        The area filters are checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        random.seed(7)
+        self.positions = [(random.uniform(52.0, 55.0), random.uniform(-116.0, -111.0)) for _ in range(2000)]
+
+        with self.app.app_context():
+            create_humidity_batch([{'value': 50.0, 'value_units': 'RH', 'value_error_range': 0.1,
+                                    'latitude': latitude, 'longitude': longitude,
+                                    'city': 'Edmonton', 'province': 'AB', 'country': 'CA',
+                                    'elevation': 650.0, 'elevation_units': 'm', 'timestamp': '2017-01-01T00:00:00'}
+                                   for latitude, longitude in self.positions])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    @staticmethod
+    def public(value: float) -> float:
+        return float(int(value * 1000)) / 1000
+
+    def matching_ids(self, **area) -> set:
+        return {reading.id for reading in Humidity.query.filter(spatial_filter(Humidity, **area))}
+
+    def test_step_00_geohash(self):
+        '''Geohashes match the reference encoding, and a cover contains every position in its box.'''
+        log = logging.getLogger('TestCase.test_step_00_geohash')
+        log.info('Start')
+
+        self.assertEqual(encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+
+        prefixes = cover(53.4, -113.7, 53.7, -113.3)
+
+        log.debug('prefixes= {prefixes}'.format(prefixes=prefixes))
+
+        self.assertLessEqual(len(prefixes), 32)
+
+        for latitude, longitude in self.positions:
+            if 53.4 <= latitude <= 53.7 and -113.7 <= longitude <= -113.3:
+                self.assertTrue(any(encode(latitude, longitude).startswith(prefix) for prefix in prefixes))
+
+        log.info('End')
+
+    def test_step_01_area_filters_match_a_scan(self):
+        '''bbox and near select the same readings as testing every position.'''
+        log = logging.getLogger('TestCase.test_step_01_area_filters_match_a_scan')
+        log.info('Start')
+
+        ids = range(1, len(self.positions) + 1)
+
+        def inside(latitude: float, longitude: float) -> bool:
+            return 53.0 <= latitude <= 54.0 and -114.5 <= longitude <= -113.0
+
+        def near(latitude: float, longitude: float) -> bool:
+            latitude_distance = latitude - 53.55
+            longitude_distance = (longitude + 113.49) * math.cos(math.radians(53.55))
+            return math.hypot(latitude_distance, longitude_distance) * KM_PER_DEGREE <= 40.0
+
+        with self.app.app_context():
+            for public in (True, False):
+                expected = {reading_id for reading_id, (latitude, longitude) in zip(ids, self.positions)
+                            if inside(*((self.public(latitude), self.public(longitude)) if public else
+                                        (latitude, longitude)))}
+
+                log.debug('bbox public={public}: {count} readings'.format(public=public, count=len(expected)))
+
+                self.assertEqual(self.matching_ids(bbox=(-114.5, 53.0, -113.0, 54.0), public=public), expected)
+
+                expected = {reading_id for reading_id, (latitude, longitude) in zip(ids, self.positions)
+                            if near(*((self.public(latitude), self.public(longitude)) if public else
+                                      (latitude, longitude)))}
+
+                log.debug('near public={public}: {count} readings'.format(public=public, count=len(expected)))
+
+                self.assertEqual(self.matching_ids(near=(53.55, -113.49), radius_km=40.0, public=public), expected)
+
+        log.info('End')
+
+    def test_step_02_backfill(self):
+        '''Readings stored without a geohash are found again once backfilled.'''
+        log = logging.getLogger('TestCase.test_step_02_backfill')
+        log.info('Start')
+
+        area = {'bbox': (-114.5, 53.0, -113.0, 54.0)}
+
+        with self.app.app_context():
+            expected = self.matching_ids(**area)
+
+            db.session.execute(Humidity.__table__.update().values(geohash=None))
+            db.session.commit()
+
+            self.assertEqual(self.matching_ids(**area), set())
+
+            updated = backfill(Humidity, batch_size=300)
+
+            log.debug('updated= {updated}'.format(updated=updated))
+
+            self.assertEqual(updated, len(self.positions))
+            self.assertEqual(self.matching_ids(**area), expected)
+
+        log.info('End')
+
+    def test_step_03_areas_crossing_the_antimeridian(self):
+        '''bbox and near find readings on both sides of the antimeridian, and radius_km must be finite.'''
+        log = logging.getLogger('TestCase.test_step_03_areas_crossing_the_antimeridian')
+        log.info('Start')
+
+        positions = [(random.uniform(-18.0, -16.0), random.uniform(178.0, 182.0)) for _ in range(500)]
+        positions = [(latitude, longitude - 360.0 if longitude > 180.0 else longitude)
+                     for latitude, longitude in positions]
+
+        def near(latitude: float, longitude: float) -> bool:
+            longitude_distance = (longitude - 179.8 + 180.0) % 360.0 - 180.0
+            return math.hypot(latitude + 17.0, longitude_distance * math.cos(math.radians(-17.0))) * \
+                KM_PER_DEGREE <= 50.0
+
+        with self.app.app_context():
+            create_humidity_batch([{'value': 50.0, 'value_units': 'RH', 'value_error_range': 0.1,
+                                    'latitude': latitude, 'longitude': longitude,
+                                    'city': 'Suva', 'province': 'CE', 'country': 'FJ',
+                                    'elevation': 5.0, 'elevation_units': 'm', 'timestamp': '2017-01-01T00:00:00'}
+                                   for latitude, longitude in positions])
+
+            ids = range(len(self.positions) + 1, len(self.positions) + len(positions) + 1)
+
+            expected = {reading_id for reading_id, (latitude, longitude) in zip(ids, positions)
+                        if -17.5 <= latitude <= -16.5 and (longitude >= 179.5 or longitude <= -179.5)}
+
+            log.debug('bbox: {count} readings'.format(count=len(expected)))
+
+            self.assertEqual(self.matching_ids(bbox=(179.5, -17.5, -179.5, -16.5), public=False), expected)
+
+            expected = {reading_id for reading_id, position in zip(ids, positions) if near(*position)}
+
+            log.debug('near: {count} readings'.format(count=len(expected)))
+
+            self.assertTrue(any(longitude < 0.0 for reading_id, (_, longitude) in zip(ids, positions)
+                                if reading_id in expected))
+            self.assertEqual(self.matching_ids(near=(-17.0, 179.8), radius_km=50.0, public=False), expected)
+
+        for value in ('inf', 'nan', '0', '-5'):
+            with self.assertRaises(ValueError):
+                distance(value)
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_geohash').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_area_filters_match_a_scan').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_backfill').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_areas_crossing_the_antimeridian').setLevel(logging.DEBUG)
+    unittest.main()
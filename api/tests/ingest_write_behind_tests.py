@@ -0,0 +1,217 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from api.weather_data_flaskapi.business.ingest import IngestQueueFull, enqueue_reading, flush_ingest_queue, \
+    ingest_queue_stats
+from database import db, create_database
+from database.models import Humidity, Temperature
+
+
+class TestCaseIngestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        '''
+        The write-behind queue is checked against a scratch SQLite database file, which the writer
+        thread and the test share.
+        '''
+        handle, self.database_path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///{path}'.format(path=self.database_path)
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['INGEST_QUEUE_SIZE'] = 100
+        self.app.config['INGEST_FLUSH_ROWS'] = 10
+        self.app.config['INGEST_FLUSH_INTERVAL'] = 0.05
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        self.start = datetime(2017, 1, 1)
+
+    def tearDown(self):
+        flush_ingest_queue()
+
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.get_engine().dispose()
+
+        os.remove(self.database_path)
+
+    def reading(self, index: int) -> dict:
+        return {'value': 20.0 + index / 10, 'value_units': 'C', 'value_error_range': 0.5,
+                'latitude': 53.5461, 'longitude': -113.4938,
+                'city': 'Edmonton', 'province': 'AB', 'country': 'CA',
+                'elevation': 645.0, 'elevation_units': 'm',
+                'timestamp': (self.start + timedelta(minutes=index)).isoformat()}
+
+    def test_step_00_group_commits(self):
+        '''Queued readings are committed in groups of INGEST_FLUSH_ROWS, and the rest when flushed.'''
+        log = logging.getLogger('TestCase.test_step_00_group_commits')
+        log.info('Start')
+
+        self.app.config['INGEST_FLUSH_INTERVAL'] = 60
+
+        with self.app.app_context():
+            before = ingest_queue_stats()
+
+            for index in range(25):
+                enqueue_reading(Humidity if index % 2 else Temperature, self.reading(index))
+
+            flush_ingest_queue()
+
+            stats = ingest_queue_stats()
+
+            log.debug('stats= {stats}'.format(stats=stats))
+
+            self.assertEqual(Humidity.query.count() + Temperature.query.count(), 25)
+            self.assertEqual(Humidity.query.count(), 12)
+            self.assertEqual(stats['accepted'] - before['accepted'], 25)
+            self.assertEqual(stats['written'] - before['written'], 25)
+            self.assertEqual(stats['commits'] - before['commits'], 3)
+            self.assertEqual(stats['max_batch_size'], 10)
+            self.assertEqual(stats['last_batch_size'], 5)
+            self.assertEqual(stats['depth'], 0)
+
+        log.info('End')
+
+    def test_step_01_interval_commits(self):
+        '''A partial group is committed INGEST_FLUSH_INTERVAL seconds after its first reading.'''
+        log = logging.getLogger('TestCase.test_step_01_interval_commits')
+        log.info('Start')
+
+        with self.app.app_context():
+            for index in range(3):
+                enqueue_reading(Humidity, self.reading(index))
+
+            deadline = time.monotonic() + 5
+
+            while Humidity.query.count() < 3 and time.monotonic() < deadline:
+                db.session.remove()
+                time.sleep(0.01)
+
+            log.debug('stats= {stats}'.format(stats=ingest_queue_stats()))
+
+            self.assertEqual(Humidity.query.count(), 3)
+
+        log.info('End')
+
+    def test_step_02_invalid_readings_are_not_queued(self):
+        '''Readings are validated before they are queued.'''
+        log = logging.getLogger('TestCase.test_step_02_invalid_readings_are_not_queued')
+        log.info('Start')
+
+        with self.app.app_context():
+            accepted = ingest_queue_stats()['accepted']
+
+            for data in (dict(self.reading(0), latitude=91.0), dict(self.reading(0), value=None)):
+                with self.assertRaises(ValueError):
+                    enqueue_reading(Humidity, data)
+
+            self.assertEqual(ingest_queue_stats()['accepted'], accepted)
+
+        log.info('End')
+
+    def test_step_03_full_queue_is_rejected(self):
+        '''Readings are rejected while INGEST_QUEUE_SIZE readings wait for a blocked writer.'''
+        log = logging.getLogger('TestCase.test_step_03_full_queue_is_rejected')
+        log.info('Start')
+
+        self.app.config['INGEST_QUEUE_SIZE'] = 2
+        self.app.config['INGEST_FLUSH_ROWS'] = 1
+
+        with self.app.app_context():
+            # The location is added before the database is locked
+            enqueue_reading(Humidity, self.reading(0))
+            flush_ingest_queue()
+
+            rejected = ingest_queue_stats()['rejected']
+
+            lock = sqlite3.connect(self.database_path)
+            lock.execute('BEGIN EXCLUSIVE')
+
+            try:
+                enqueue_reading(Humidity, self.reading(1))
+
+                while ingest_queue_stats()['depth'] > 0:
+                    time.sleep(0.001)
+
+                # The writer holds reading 1 and waits for the lock; readings 2 and 3 fill the queue
+                enqueue_reading(Humidity, self.reading(2))
+                enqueue_reading(Humidity, self.reading(3))
+
+                with self.assertRaises(IngestQueueFull):
+                    enqueue_reading(Humidity, self.reading(4))
+
+                self.assertEqual(ingest_queue_stats()['depth'], 2)
+            finally:
+                lock.rollback()
+                lock.close()
+
+            flush_ingest_queue()
+
+            log.debug('stats= {stats}'.format(stats=ingest_queue_stats()))
+
+            self.assertEqual(ingest_queue_stats()['rejected'] - rejected, 1)
+            self.assertEqual(Humidity.query.count(), 4)
+
+        log.info('End')
+
+    def test_step_04_failed_group_is_retried_row_by_row(self):
+        '''When a group fails, only the readings that fail on their own are dropped and counted.'''
+        log = logging.getLogger('TestCase.test_step_04_failed_group_is_retried_row_by_row')
+        log.info('Start')
+
+        self.app.config['INGEST_FLUSH_INTERVAL'] = 60
+
+        with self.app.app_context():
+            before = ingest_queue_stats()
+
+            # The database rejects one reading, which passes validation
+            db.session.execute("CREATE TRIGGER humidity_reject BEFORE INSERT ON humidity WHEN NEW.value = 99 "
+                               "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+            db.session.commit()
+
+            for index in range(5):
+                enqueue_reading(Humidity, dict(self.reading(index), value=99.0) if index == 2 else self.reading(index))
+
+            flush_ingest_queue()
+
+            stats = ingest_queue_stats()
+
+            log.debug('stats= {stats}'.format(stats=stats))
+
+            self.assertEqual(Humidity.query.count(), 4)
+            self.assertEqual(stats['written'] - before['written'], 4)
+            self.assertEqual(stats['failed'] - before['failed'], 1)
+            self.assertEqual(stats['retried'] - before['retried'], 5)
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_group_commits').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_interval_commits').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_invalid_readings_are_not_queued').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_full_queue_is_rejected').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_04_failed_group_is_retried_row_by_row').setLevel(logging.DEBUG)
+    unittest.main()
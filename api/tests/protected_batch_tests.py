@@ -0,0 +1,234 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import random
+import sys
+import unittest
+from datetime import datetime
+
+import requests
+
+
+def get_random_record_data():
+    '''Generate a random reading data record'''
+    latitude = float('{:.6f}'.format(random.uniform(-90.0, 90.0)))
+    longitude = float('{:.6f}'.format(random.uniform(-180.0, 180.0)))
+
+    return {
+        'value': float('{:.4f}'.format(random.uniform(0, 100.0))),
+        'value_units': 'RH',
+        'value_error_range': float('{:.6f}'.format(random.uniform(0.0, 1.0))),
+        'latitude': latitude,
+        'latitude_public': float(int(latitude * 1000)) / 1000,
+        'longitude': longitude,
+        'longitude_public': float(int(longitude * 1000)) / 1000,
+        'elevation': float('{:.4f}'.format(random.uniform(-90.0, 999.0))),
+        'elevation_units': 'm',
+        'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S'),
+        'city': 'Edmonton',
+        'province': 'AB',
+        'country': 'CA'
+    }
+
+
+class TestCaseProtectedBatch(unittest.TestCase):
+    @property
+    def token(self):
+        return self._token
+
+    @token.setter
+    def token(self, value):
+        self._token = value
+
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.resources = ['protected/humidity', 'protected/pressure', 'protected/temperature']
+        self.username = 'admin'
+        self.password = 'secret'
+
+    def tearDown(self):
+        pass
+
+    def test_step_00_login(self):
+        '''Login and setup for the next set of calls'''
+        log = logging.getLogger('TestCase.test_step_00_login')
+        log.info('Start')
+
+        auth_url = '{base_url}/auth'.format(base_url=self.base_url)
+
+        payload = json.dumps({'username': self.username, 'password': self.password})
+
+        headers = {
+            'content-type': 'application/json',
+            'cache-control': 'no-cache'
+        }
+
+        response = requests.request('POST', auth_url, data=payload, headers=headers)
+
+        assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+        TestCaseProtectedBatch.token = json.loads(response.text)['access_token']
+
+        log.info('End')
+
+    def test_step_01_create_batch_without_auth(self):
+        '''Create a batch of records without JWT token.'''
+        log = logging.getLogger('TestCase.test_step_01_create_batch_without_auth')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/batch'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            log.debug('app_url= {url}'.format(url=app_url))
+
+            payload = json.dumps([get_random_record_data() for _ in range(10)])
+
+            headers = {
+                'content-type': 'application/json',
+                'cache-control': 'no-cache'
+            }
+
+            response = requests.request('POST', app_url, data=payload, headers=headers)
+
+            assert response.status_code == 401, 'Expected a HTTP status code 401'
+
+        log.info('End')
+
+    def test_step_02_create_batch_with_auth(self):
+        '''Create a batch of records with JWT token, including rejected rows.'''
+        log = logging.getLogger('TestCase.test_step_02_create_batch_with_auth')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/batch'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            log.debug('app_url= {url}'.format(url=app_url))
+
+            records = [get_random_record_data() for _ in range(100)]
+            records[10]['latitude'] = -91
+            records[20]['longitude'] = 181
+            del records[30]['value']
+
+            headers = {
+                'content-type': 'application/json',
+                'authorization': 'JWT {token}'.format(token=TestCaseProtectedBatch.token),
+                'cache-control': 'no-cache'
+            }
+
+            response = requests.request('POST', app_url, data=json.dumps(records), headers=headers)
+
+            assert response.status_code == 201, 'Expected a HTTP status code 201'
+
+            json_data = json.loads(response.text)
+
+            self.assertEqual(json_data['created'], 97), 'Expected 97 created records'
+            self.assertEqual(json_data['rejected'], 3), 'Expected 3 rejected records'
+            self.assertEqual(len(json_data['rows']), 100), 'Expected a status for every record'
+            self.assertEqual(json_data['rows'][10]['status'], 400), 'Expected the latitude to be rejected'
+            self.assertEqual(json_data['rows'][20]['status'], 400), 'Expected the longitude to be rejected'
+            self.assertEqual(json_data['rows'][30]['status'], 400), 'Expected the missing value to be rejected'
+
+        log.info('End')
+
+    def test_step_03_create_batch_not_an_array(self):
+        '''Create a batch with a body that is not a JSON array.'''
+        log = logging.getLogger('TestCase.test_step_03_create_batch_not_an_array')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/batch'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            headers = {
+                'content-type': 'application/json',
+                'authorization': 'JWT {token}'.format(token=TestCaseProtectedBatch.token),
+                'cache-control': 'no-cache'
+            }
+
+            response = requests.request('POST', app_url, data=json.dumps(get_random_record_data()), headers=headers)
+
+            assert response.status_code == 400, 'Expected a HTTP status code 400'
+
+        log.info('End')
+
+    def test_step_04_create_batch_with_invalid_types_and_lengths(self):
+        '''Records with text longer than its column or values of the wrong type are rejected up front.'''
+        log = logging.getLogger('TestCase.test_step_04_create_batch_with_invalid_types_and_lengths')
+        log.info('Start')
+
+        invalid = {1: ('city', 'C' * 65),
+                   2: ('province', 'ABC'),
+                   3: ('country', 'CAN'),
+                   4: ('value_units', 'U' * 17),
+                   5: ('elevation_units', 12),
+                   6: ('value', '12.5'),
+                   7: ('latitude', True),
+                   8: ('timestamp', 'not a timestamp')}
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/batch'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            records = [get_random_record_data() for _ in range(10)]
+            for index, (name, value) in invalid.items():
+                records[index][name] = value
+
+            headers = {
+                'content-type': 'application/json',
+                'authorization': 'JWT {token}'.format(token=TestCaseProtectedBatch.token),
+                'cache-control': 'no-cache'
+            }
+
+            response = requests.request('POST', app_url, data=json.dumps(records), headers=headers)
+
+            assert response.status_code == 201, 'Expected a HTTP status code 201'
+
+            json_data = json.loads(response.text)
+
+            log.debug('{resource}: {rows}'.format(resource=resource, rows=json_data['rows']))
+
+            self.assertEqual(json_data['created'], 10 - len(invalid))
+            self.assertEqual([row['index'] for row in json_data['rows'] if row['status'] == 400], sorted(invalid))
+
+            for index, (name, _) in invalid.items():
+                self.assertIn(name, json_data['rows'][index]['message'])
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_login').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_create_batch_without_auth').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_create_batch_with_auth').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_create_batch_not_an_array').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_04_create_batch_with_invalid_types_and_lengths').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,148 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+
+class TestCasePublicAggregate(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.resources = ['public/humidity', 'public/pressure', 'public/temperature']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_step_00_aggregate_matches_raw_records(self):
+        '''Compare daily aggregates with the raw records.'''
+        log = logging.getLogger('TestCase.test_step_00_aggregate_matches_raw_records')
+        log.info('Start')
+
+        for resource in self.resources:
+            collection_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+            aggregate_url = collection_url + 'aggregate'
+
+            log.debug('aggregate_url= {url}'.format(url=aggregate_url))
+
+            response = requests.request('GET', collection_url, params=self.querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            records = json.loads(response.text)
+
+            querystring = dict(self.querystring, bucket='1d', agg='count,min,max')
+
+            response = requests.request('GET', aggregate_url, params=querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            buckets = json.loads(response.text)
+
+            self.assertEqual(sum(bucket['count'] for bucket in buckets),
+                             len(records)), 'Expected every record to be counted once'
+
+            if records:
+                self.assertEqual(min(bucket['min'] for bucket in buckets),
+                                 min(record['value'] for record in records)), 'Expected the same minimum'
+                self.assertEqual(max(bucket['max'] for bucket in buckets),
+                                 max(record['value'] for record in records)), 'Expected the same maximum'
+
+            for bucket in buckets:
+                assert 'avg' not in bucket, 'Expected only the requested aggregates'
+
+        log.info('End')
+
+    def test_step_01_aggregate_invalid_bucket(self):
+        '''Request aggregates with an unsupported bucket width.'''
+        log = logging.getLogger('TestCase.test_step_01_aggregate_invalid_bucket')
+        log.info('Start')
+
+        for resource in self.resources:
+            aggregate_url = '{base_url}/{context}/{resource}/aggregate'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            querystring = dict(self.querystring, bucket='2h')
+
+            response = requests.request('GET', aggregate_url, params=querystring)
+
+            assert response.status_code == 400, 'Expected a HTTP status code 400'
+
+        log.info('End')
+
+    def test_step_02_hourly_aggregate_matches_raw_records(self):
+        '''Compare hourly aggregates, read from the rollup tables, with the raw records.'''
+        log = logging.getLogger('TestCase.test_step_02_hourly_aggregate_matches_raw_records')
+        log.info('Start')
+
+        for resource in self.resources:
+            collection_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+            aggregate_url = collection_url + 'aggregate'
+
+            log.debug('aggregate_url= {url}'.format(url=aggregate_url))
+
+            response = requests.request('GET', collection_url, params=self.querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            records = json.loads(response.text)
+
+            querystring = dict(self.querystring, bucket='1h', agg='count,min,max')
+
+            response = requests.request('GET', aggregate_url, params=querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            buckets = json.loads(response.text)
+
+            self.assertEqual(sum(bucket['count'] for bucket in buckets),
+                             len(records)), 'Expected every record to be counted once'
+
+            if records:
+                self.assertEqual(min(bucket['min'] for bucket in buckets),
+                                 min(record['value'] for record in records)), 'Expected the same minimum'
+                self.assertEqual(max(bucket['max'] for bucket in buckets),
+                                 max(record['value'] for record in records)), 'Expected the same maximum'
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_aggregate_matches_raw_records').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_aggregate_invalid_bucket').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_hourly_aggregate_matches_raw_records').setLevel(logging.DEBUG)
+    unittest.main()
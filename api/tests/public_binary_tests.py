@@ -0,0 +1,193 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import csv
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class TestCasePublicBinary(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+
+        The server must have msgpack and pyarrow installed to offer these formats.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.measurements = ['humidity', 'pressure', 'temperature']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+
+    def tearDown(self):
+        pass
+
+    def url(self, measurement: str) -> str:
+        return '{base_url}/{context}/public/{measurement}/'.format(base_url=self.base_url,
+                                                                   context=self.context,
+                                                                   measurement=measurement)
+
+    def records(self, measurement: str, **params) -> list:
+        return json.loads(requests.request('GET', self.url(measurement), params=dict(self.querystring, **params)).text)
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_step_00_msgpack(self):
+        '''A MessagePack collection is a stream of maps holding the same records as JSON.'''
+        log = logging.getLogger('TestCase.test_step_00_msgpack')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            for params in ({}, {'fields': 'timestamp,value', 'limit': 3}):
+                response = requests.request('GET',
+                                            self.url(measurement),
+                                            params=dict(self.querystring, **params),
+                                            headers={'Accept': 'application/msgpack'})
+
+                log.debug('{measurement} {params}: got {response_code} - expected {expected_code}'.format(
+                    measurement=measurement,
+                    params=params,
+                    response_code=response.status_code,
+                    expected_code=200)
+                )
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                self.assertEqual(response.headers['Content-Type'], 'application/msgpack')
+                self.assertEqual(self.unpack(response.content), self.records(measurement, **params))
+
+        log.info('End')
+
+    @staticmethod
+    def unpack(content: bytes) -> list:
+        unpacker = msgpack.Unpacker(raw=False)
+        unpacker.feed(content)
+
+        return list(unpacker)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_step_01_arrow(self):
+        '''An Arrow stream holds the same records as JSON, with typed columns.'''
+        log = logging.getLogger('TestCase.test_step_01_arrow')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            for params in ({}, {'fields': 'timestamp,value,city', 'limit': 3}):
+                response = requests.request('GET',
+                                            self.url(measurement),
+                                            params=dict(self.querystring, **params),
+                                            headers={'Accept': 'application/vnd.apache.arrow.stream'})
+
+                log.debug('{measurement} {params}: got {response_code} - expected {expected_code}'.format(
+                    measurement=measurement,
+                    params=params,
+                    response_code=response.status_code,
+                    expected_code=200)
+                )
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                table = pyarrow.ipc.open_stream(response.content).read_all()
+
+                self.assertEqual(str(table.schema.field('timestamp').type), 'timestamp[us]')
+                self.assertEqual(str(table.schema.field('value').type), 'double')
+
+                records = self.records(measurement, **params)
+
+                self.assertEqual(table.column_names, list(records[0]) if records else table.column_names)
+                self.assertEqual([dict(row, timestamp=row['timestamp'].isoformat()) for row in table.to_pylist()],
+                                 records)
+
+        log.info('End')
+
+    def test_step_02_json_stays_the_default(self):
+        '''Clients accepting anything still get JSON.'''
+        log = logging.getLogger('TestCase.test_step_02_json_stays_the_default')
+        log.info('Start')
+
+        for accept in ('*/*', 'application/json, application/msgpack', 'application/vnd.apache.arrow.stream;q=0.5, '
+                                                                       'application/json'):
+            response = requests.request('GET', self.url('humidity'), params=self.querystring,
+                                        headers={'Accept': accept})
+
+            log.debug('{accept}: got {content_type}'.format(accept=accept,
+                                                            content_type=response.headers['Content-Type']))
+
+            self.assertTrue(response.headers['Content-Type'].startswith('application/json'))
+            self.assertIn('Accept', [value.strip() for value in response.headers['Vary'].split(',')])
+
+        log.info('End')
+
+    @unittest.skipIf(msgpack is None or pyarrow is None, 'msgpack or pyarrow is not installed')
+    def test_step_03_fields_mask(self):
+        '''The X-Fields mask header selects the fields of every format, as it does for JSON.'''
+        log = logging.getLogger('TestCase.test_step_03_fields_mask')
+        log.info('Start')
+
+        mask = {'X-Fields': 'timestamp,value'}
+
+        for measurement in self.measurements:
+            expected = json.loads(requests.request('GET', self.url(measurement), params=self.querystring,
+                                                   headers=mask).text)
+
+            self.assertEqual([sorted(record) for record in expected], [['timestamp', 'value']] * len(expected))
+
+            decoders = {'application/x-ndjson': lambda content: [json.loads(line) for line in content.splitlines()],
+                        'text/csv': lambda content: [dict(record, value=float(record['value']))
+                                                     for record in csv.DictReader(content.decode().splitlines())],
+                        'application/msgpack': self.unpack,
+                        'application/vnd.apache.arrow.stream': lambda content: [
+                            dict(row, timestamp=row['timestamp'].isoformat())
+                            for row in pyarrow.ipc.open_stream(content).read_all().to_pylist()]}
+
+            for accept, decode in decoders.items():
+                response = requests.request('GET', self.url(measurement), params=self.querystring,
+                                            headers=dict(mask, Accept=accept))
+
+                log.debug('{measurement} {accept}: got {response_code} - expected {expected_code}'.format(
+                    measurement=measurement,
+                    accept=accept,
+                    response_code=response.status_code,
+                    expected_code=200)
+                )
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                self.assertEqual(decode(response.content), expected)
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_msgpack').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_arrow').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_json_stays_the_default').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_fields_mask').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,135 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+
+class TestCasePublicColumnar(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.measurements = ['humidity', 'pressure', 'temperature']
+        self.hoisted = ['value_units', 'city', 'province', 'country']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+
+    def tearDown(self):
+        pass
+
+    def url(self, measurement: str) -> str:
+        return '{base_url}/{context}/public/{measurement}/'.format(base_url=self.base_url,
+                                                                   context=self.context,
+                                                                   measurement=measurement)
+
+    def columns(self, records: list) -> dict:
+        '''Transpose records the way format=columnar is expected to.'''
+        columns = {name: [record[name] for record in records] for name in records[0]}
+
+        for name in self.hoisted:
+            if name in columns and len(set(columns[name])) == 1:
+                columns[name] = columns[name][0]
+
+        return columns
+
+    def test_step_00_columnar_collection(self):
+        '''A columnar collection holds the same values as the rows, with constant fields given once.'''
+        log = logging.getLogger('TestCase.test_step_00_columnar_collection')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            records = json.loads(requests.request('GET', self.url(measurement), params=self.querystring).text)
+
+            if not records:
+                log.debug('{measurement}: no records to test'.format(measurement=measurement))
+                continue
+
+            response = requests.request('GET',
+                                        self.url(measurement),
+                                        params=dict(self.querystring, format='columnar'),
+                                        headers={'Accept': 'text/csv'})
+
+            log.debug('{measurement}: got {response_code} - expected {expected_code}'.format(
+                measurement=measurement,
+                response_code=response.status_code,
+                expected_code=200)
+            )
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            self.assertTrue(response.headers['Content-Type'].startswith('application/json'))
+
+            columns = json.loads(response.text)
+
+            self.assertEqual(columns, self.columns(records))
+            self.assertEqual(columns['city'], 'Edmonton')
+            self.assertEqual(len(columns['timestamp']), len(records))
+
+        log.info('End')
+
+    def test_step_01_columnar_pages_and_fields(self):
+        '''Columnar pages follow the cursor, and fields selects the arrays returned.'''
+        log = logging.getLogger('TestCase.test_step_01_columnar_pages_and_fields')
+        log.info('Start')
+
+        records = json.loads(requests.request('GET', self.url('temperature'), params=self.querystring).text)
+
+        timestamps = []
+        values = []
+        params = dict(self.querystring, format='columnar', fields='timestamp,value', limit=3)
+        while True:
+            response = requests.request('GET', self.url('temperature'), params=params)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            columns = json.loads(response.text)
+
+            self.assertEqual(sorted(columns), ['timestamp', 'value'])
+
+            timestamps.extend(columns['timestamp'])
+            values.extend(columns['value'])
+
+            if 'X-Next-Cursor' not in response.headers:
+                break
+            params['cursor'] = response.headers['X-Next-Cursor']
+
+        self.assertEqual(timestamps, [record['timestamp'] for record in records])
+        self.assertEqual(values, [record['value'] for record in records])
+
+        response = requests.request('GET', self.url('temperature'), params=dict(self.querystring, format='table'))
+
+        log.debug('format=table: got {response_code} - expected {expected_code}'.format(
+            response_code=response.status_code,
+            expected_code=400)
+        )
+
+        assert response.status_code == 400, 'Expected a HTTP status code 400'
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_columnar_collection').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_columnar_pages_and_fields').setLevel(logging.DEBUG)
+    unittest.main()
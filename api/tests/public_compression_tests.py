@@ -0,0 +1,201 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import sys
+import unittest
+import zlib
+
+import requests
+
+
+class TestCasePublicCompression(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+
+        The server must use the default COMPRESSION_ENCODINGS and COMPRESSION_MIN_SIZE settings.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.measurements = ['humidity', 'pressure', 'temperature']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+        self.window_bits = {'gzip': zlib.MAX_WBITS | 16, 'deflate': zlib.MAX_WBITS}
+
+    def tearDown(self):
+        pass
+
+    def url(self, measurement: str) -> str:
+        return '{base_url}/{context}/public/{measurement}/'.format(base_url=self.base_url,
+                                                                   context=self.context,
+                                                                   measurement=measurement)
+
+    def get(self, measurement: str, headers: dict, **params):
+        '''
+        Return the response and its body as sent, without the content coding removed.
+        '''
+        response = requests.request('GET', self.url(measurement), params=dict(self.querystring, **params),
+                                    headers=headers, stream=True)
+
+        return response, response.raw.read(decode_content=False)
+
+    def decompress(self, response, body: bytes) -> bytes:
+        coding = response.headers.get('Content-Encoding')
+
+        return zlib.decompress(body, self.window_bits[coding]) if coding else body
+
+    def test_step_00_negotiated_coding(self):
+        '''The coding the client accepts is used, and the body decompresses to the uncompressed one.'''
+        log = logging.getLogger('TestCase.test_step_00_negotiated_coding')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            identity, expected = self.get(measurement, {'Accept-Encoding': 'identity'})
+
+            self.assertNotIn('Content-Encoding', identity.headers)
+            self.assertIn('Accept-Encoding', identity.headers['Vary'])
+
+            for accept_encoding, coding in (('gzip', 'gzip'),
+                                            ('deflate', 'deflate'),
+                                            ('gzip;q=0.5, deflate', 'deflate'),
+                                            ('gzip;q=0, deflate;q=0', None)):
+                response, body = self.get(measurement, {'Accept-Encoding': accept_encoding})
+
+                log.debug('{measurement} {accept_encoding}: got {coding} ({size} of {expected} bytes)'.format(
+                    measurement=measurement,
+                    accept_encoding=accept_encoding,
+                    coding=response.headers.get('Content-Encoding'),
+                    size=len(body),
+                    expected=len(expected)))
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                self.assertEqual(response.headers.get('Content-Encoding'), coding)
+                self.assertEqual(json.loads(self.decompress(response, body)), json.loads(expected))
+
+                if coding is not None:
+                    self.assertLess(len(body), len(expected))
+                    self.assertEqual(response.headers['ETag'], 'W/' + identity.headers['ETag'])
+
+        log.info('End')
+
+    def test_step_01_small_bodies_stay_uncompressed(self):
+        '''Bodies shorter than the minimum size are sent uncompressed.'''
+        log = logging.getLogger('TestCase.test_step_01_small_bodies_stay_uncompressed')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            response, body = self.get(measurement, {'Accept-Encoding': 'gzip'}, limit=1)
+
+            log.debug('{measurement}: {size} bytes'.format(measurement=measurement, size=len(body)))
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            self.assertLess(len(body), 1024)
+            self.assertNotIn('Content-Encoding', response.headers)
+            self.assertEqual(len(json.loads(body)), 1)
+
+        log.info('End')
+
+    def test_step_02_streamed_bodies(self):
+        '''NDJSON and CSV streams are compressed as they are written.'''
+        log = logging.getLogger('TestCase.test_step_02_streamed_bodies')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            for accept in ('application/x-ndjson', 'text/csv'):
+                _, expected = self.get(measurement, {'Accept': accept, 'Accept-Encoding': 'identity'})
+                response, body = self.get(measurement, {'Accept': accept, 'Accept-Encoding': 'gzip'})
+
+                log.debug('{measurement} {accept}: got {coding}'.format(
+                    measurement=measurement,
+                    accept=accept,
+                    coding=response.headers.get('Content-Encoding')))
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+                self.assertNotIn('Content-Length', response.headers)
+                self.assertEqual(self.decompress(response, body), expected)
+
+        log.info('End')
+
+    def test_step_03_not_modified(self):
+        '''The weak ETag of a compressed response is answered with 304 and the same tag.'''
+        log = logging.getLogger('TestCase.test_step_03_not_modified')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            response, _ = self.get(measurement, {'Accept-Encoding': 'gzip'})
+
+            for accept_encoding in ('gzip', 'identity'):
+                conditional, body = self.get(measurement, {'Accept-Encoding': accept_encoding,
+                                                           'If-None-Match': response.headers['ETag']})
+
+                log.debug('{measurement} {accept_encoding}: got {response_code} - expected {expected_code}'.format(
+                    measurement=measurement,
+                    accept_encoding=accept_encoding,
+                    response_code=conditional.status_code,
+                    expected_code=304))
+
+                assert conditional.status_code == 304, 'Expected a HTTP status code 304'
+
+                self.assertEqual(body, b'')
+                self.assertNotIn('Content-Encoding', conditional.headers)
+                self.assertEqual(conditional.headers['ETag'],
+                                 response.headers['ETag'] if accept_encoding == 'gzip' else
+                                 response.headers['ETag'][len('W/'):])
+
+        log.info('End')
+
+    def test_step_04_cached_bodies(self):
+        '''Cached responses are served precompressed, once per content coding.'''
+        log = logging.getLogger('TestCase.test_step_04_cached_bodies')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            bodies = {}
+
+            for coding in ('gzip', 'deflate', 'gzip'):
+                response, body = self.get(measurement, {'Accept-Encoding': coding})
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                self.assertEqual(response.headers['Content-Encoding'], coding)
+                self.assertEqual(int(response.headers['Content-Length']), len(body))
+
+                bodies.setdefault(coding, []).append(self.decompress(response, body))
+
+            log.debug('{measurement}: {sizes}'.format(measurement=measurement,
+                                                      sizes={coding: [len(body) for body in decompressed]
+                                                             for coding, decompressed in bodies.items()}))
+
+            self.assertEqual(bodies['gzip'][0], bodies['gzip'][1])
+            self.assertEqual(bodies['gzip'][0], bodies['deflate'][0])
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_negotiated_coding').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_small_bodies_stay_uncompressed').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_streamed_bodies').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_not_modified').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_04_cached_bodies').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,214 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+
+class TestCasePublicConditional(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.resources = ['public/humidity', 'public/pressure', 'public/temperature']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_step_00_unchanged_collection_is_not_modified(self):
+        '''A collection request with the ETag of the current data gets 304 without a body.'''
+        log = logging.getLogger('TestCase.test_step_00_unchanged_collection_is_not_modified')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            log.debug('app_url= {url}'.format(url=app_url))
+
+            response = requests.request('GET', app_url, params=self.querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+            assert 'ETag' in response.headers, 'Expected an ETag header'
+            assert response.headers['Cache-Control'].startswith('public'), 'Expected a public Cache-Control header'
+
+            headers = {'if-none-match': response.headers['ETag']}
+
+            conditional = requests.request('GET', app_url, headers=headers, params=self.querystring)
+
+            log.debug('Got {response_code} - expected {expected_code}'.format(
+                response_code=conditional.status_code,
+                expected_code=304)
+            )
+
+            assert conditional.status_code == 304, 'Expected a HTTP status code 304'
+            assert conditional.text == '', 'Expected no body'
+            self.assertEqual(conditional.headers['ETag'], response.headers['ETag'])
+
+            headers = {'if-none-match': response.headers['ETag'], 'accept': 'text/csv'}
+
+            other_representation = requests.request('GET', app_url, headers=headers, params=self.querystring)
+
+            assert other_representation.status_code == 200, 'Expected the CSV representation to have another ETag'
+
+        log.info('End')
+
+    def test_step_01_unchanged_record_is_not_modified(self):
+        '''A record request with the ETag of the current record gets 304.'''
+        log = logging.getLogger('TestCase.test_step_01_unchanged_record_is_not_modified')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            records = json.loads(requests.request('GET', app_url, params=self.querystring).text)
+
+            if not records:
+                continue
+
+            item_url = '{app_url}{id}'.format(app_url=app_url, id=records[0]['id'])
+
+            log.debug('item_url= {url}'.format(url=item_url))
+
+            response = requests.request('GET', item_url)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            conditional = requests.request('GET', item_url, headers={'if-none-match': response.headers['ETag']})
+
+            assert conditional.status_code == 304, 'Expected a HTTP status code 304'
+
+            changed = requests.request('GET', item_url, headers={'if-none-match': '"stale"'})
+
+            assert changed.status_code == 200, 'Expected a HTTP status code 200'
+
+        log.info('End')
+
+    def test_step_02_updated_record_changes_the_collection(self):
+        '''Updating a value without changing the timestamp gives collections and pages a new ETag.'''
+        log = logging.getLogger('TestCase.test_step_02_updated_record_changes_the_collection')
+        log.info('Start')
+
+        auth_url = '{base_url}/auth'.format(base_url=self.base_url)
+        token = json.loads(requests.request('POST', auth_url, data='{"username": "admin","password": "secret"}',
+                                            headers={'content-type': 'application/json'}).text)['access_token']
+        authorization = {'authorization': 'JWT {token}'.format(token=token)}
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            records = json.loads(requests.request('GET', app_url, params=self.querystring).text)
+
+            if not records:
+                continue
+
+            record_url = '{base_url}/{context}/{resource}/{id}'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource.replace('public', 'protected'),
+                id=records[0]['id'])
+            record = json.loads(requests.request('GET', record_url, headers=authorization).text)
+
+            etags = {}
+            for params in ({}, {'limit': 2}):
+                etags[str(params)] = requests.request('GET', app_url,
+                                                      params=dict(self.querystring, **params)).headers['ETag']
+
+            for value in (record['value'] + 1, record['value']):
+                response = requests.request('PUT', record_url, data=json.dumps(dict(record, value=value)),
+                                            headers=dict(authorization, **{'content-type': 'application/json'}))
+
+                assert response.status_code == 204, 'Expected a HTTP status code 204'
+
+                for params in ({}, {'limit': 2}):
+                    conditional = requests.request('GET', app_url, params=dict(self.querystring, **params),
+                                                   headers={'if-none-match': etags[str(params)]})
+
+                    log.debug('{resource} {params} value={value}: got {response_code} - expected {expected_code}'
+                              .format(resource=resource,
+                                      params=params,
+                                      value=value,
+                                      response_code=conditional.status_code,
+                                      expected_code=200))
+
+                    assert conditional.status_code == 200, 'Expected a HTTP status code 200'
+
+                    self.assertNotEqual(conditional.headers['ETag'], etags[str(params)])
+                    etags[str(params)] = conditional.headers['ETag']
+
+        log.info('End')
+
+    def test_step_03_unmodified_since_collection_is_not_modified(self):
+        '''A whole range request with its Last-Modified date in If-Modified-Since gets 304.'''
+        log = logging.getLogger('TestCase.test_step_03_unmodified_since_collection_is_not_modified')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            response = requests.request('GET', app_url, params=self.querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+            assert 'Last-Modified' in response.headers, 'Expected a Last-Modified header'
+
+            for accept in ('application/json', 'text/csv'):
+                conditional = requests.request('GET', app_url, params=self.querystring,
+                                               headers={'accept': accept,
+                                                        'if-modified-since': response.headers['Last-Modified']})
+
+                log.debug('{resource} {accept}: got {response_code} - expected {expected_code}'.format(
+                    resource=resource,
+                    accept=accept,
+                    response_code=conditional.status_code,
+                    expected_code=304))
+
+                assert conditional.status_code == 304, 'Expected a HTTP status code 304'
+
+                self.assertEqual(conditional.text, '')
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_unchanged_collection_is_not_modified').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_unchanged_record_is_not_modified').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_updated_record_changes_the_collection').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_unmodified_since_collection_is_not_modified').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,162 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+
+class TestCasePublicFields(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.measurements = ['humidity', 'pressure', 'temperature']
+        self.fields = ['timestamp', 'value']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+
+    def tearDown(self):
+        pass
+
+    def url(self, resource: str) -> str:
+        return '{base_url}/{context}/public/{resource}'.format(base_url=self.base_url,
+                                                               context=self.context,
+                                                               resource=resource)
+
+    def project(self, records: list) -> list:
+        return [{name: record[name] for name in self.fields} for record in records]
+
+    def test_step_00_collection_fields(self):
+        '''A collection returns only the requested fields, on every page.'''
+        log = logging.getLogger('TestCase.test_step_00_collection_fields')
+        log.info('Start')
+
+        for measurement in self.measurements:
+            app_url = self.url(measurement + '/')
+
+            expected = self.project(json.loads(requests.request('GET', app_url, params=self.querystring).text))
+
+            response = requests.request('GET', app_url, params=dict(self.querystring, fields=','.join(self.fields)))
+
+            log.debug('{measurement}: got {response_code} - expected {expected_code}'.format(
+                measurement=measurement,
+                response_code=response.status_code,
+                expected_code=200)
+            )
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            self.assertEqual(json.loads(response.text), expected)
+
+            records = []
+            params = dict(self.querystring, fields='value,timestamp', limit=2)
+            while True:
+                response = requests.request('GET', app_url, params=params)
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                records.extend(json.loads(response.text))
+
+                if 'X-Next-Cursor' not in response.headers:
+                    break
+                params['cursor'] = response.headers['X-Next-Cursor']
+
+            self.assertEqual(records, expected)
+
+        log.info('End')
+
+    def test_step_01_item_latest_and_query_fields(self):
+        '''Items, latest readings and multi-location queries return only the requested fields.'''
+        log = logging.getLogger('TestCase.test_step_01_item_latest_and_query_fields')
+        log.info('Start')
+
+        params = {'fields': ','.join(self.fields)}
+
+        for measurement in self.measurements:
+            records = json.loads(requests.request('GET', self.url(measurement + '/'), params=self.querystring).text)
+
+            if not records:
+                log.debug('{measurement}: no records to test'.format(measurement=measurement))
+                continue
+
+            response = requests.request('GET',
+                                        self.url('{measurement}/{id}'.format(measurement=measurement,
+                                                                             id=records[0]['id'])),
+                                        params=params)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            self.assertEqual(json.loads(response.text), self.project(records[:1])[0])
+
+            response = requests.request('GET',
+                                        self.url(measurement + '/latest'),
+                                        params=dict(params,
+                                                    city=self.querystring['city'],
+                                                    province=self.querystring['province'],
+                                                    country=self.querystring['country']))
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            self.assertEqual(sorted(json.loads(response.text)), self.fields)
+
+        response = requests.request('GET',
+                                    self.url('query'),
+                                    params=dict(params,
+                                                start=self.querystring['start'],
+                                                end=self.querystring['end'],
+                                                location='Edmonton,AB,CA'))
+
+        assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+        result = json.loads(response.text)[0]
+
+        for measurement in self.measurements:
+            for record in result[measurement]:
+                self.assertEqual(sorted(record), self.fields)
+
+        log.info('End')
+
+    def test_step_02_unknown_fields(self):
+        '''Unknown or private fields are rejected.'''
+        log = logging.getLogger('TestCase.test_step_02_unknown_fields')
+        log.info('Start')
+
+        for fields in ('value,rainfall', 'latitude', ','):
+            response = requests.request('GET', self.url('humidity/'), params=dict(self.querystring, fields=fields))
+
+            log.debug('{fields}: got {response_code} - expected {expected_code}'.format(
+                fields=fields,
+                response_code=response.status_code,
+                expected_code=400)
+            )
+
+            assert response.status_code == 400, 'Expected a HTTP status code 400'
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_collection_fields').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_item_latest_and_query_fields').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_unknown_fields').setLevel(logging.DEBUG)
+    unittest.main()
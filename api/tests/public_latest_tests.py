@@ -0,0 +1,156 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+
+from flask import Flask
+from sqlalchemy import event, inspect
+
+from api.weather_data_flaskapi.business.latest import clear_latest_readings, latest_readings, load_latest_readings
+from api.weather_data_flaskapi.business.weather_data import commit_readings, create_humidity, \
+    create_humidity_batch, delete_humidity, reading_mapping, update_humidity
+from database import db, create_database
+from database.models import Humidity
+
+
+def reading(timestamp: str, value: float, city: str = 'Edmonton') -> dict:
+    return {'value': value, 'value_units': 'RH', 'value_error_range': 0.1, 'latitude': 53.5, 'longitude': -113.5,
+            'city': city, 'province': 'AB', 'country': 'CA', 'elevation': 650.0, 'elevation_units': 'm',
+            'timestamp': timestamp}
+
+
+class TestCasePublicLatest(unittest.TestCase):
+    partition_readings = False
+
+    def setUp(self):
+        '''
+        The last readings are checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['PARTITION_READINGS'] = self.partition_readings
+        self.app.config['LATEST_READINGS_TTL'] = 60
+        db.init_app(self.app)
+        create_database(app=self.app)
+        clear_latest_readings()
+
+        with self.app.app_context():
+            create_humidity_batch([reading('2017-01-15T00:00:00', 1.0),
+                                   reading('2017-03-15T00:00:00', 3.0),
+                                   reading('2017-02-15T00:00:00', 2.0),
+                                   reading('2017-02-01T00:00:00', 20.0, city='Calgary')])
+
+        load_latest_readings(self.app)
+
+    def tearDown(self):
+        clear_latest_readings()
+
+        with self.app.app_context():
+            db.session.remove()
+            for table_name in inspect(db.engine).get_table_names():
+                if table_name.startswith('humidity_2017'):
+                    db.engine.execute('DROP TABLE {table_name}'.format(table_name=table_name))
+            db.drop_all()
+
+    def latest_values(self, city: str = None) -> list:
+        '''Return the values of the last readings, checking that the lookup does not query the database.'''
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            readings = latest_readings(Humidity, city=city, province='AB', country='CA' if city else None)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        self.assertEqual(statements, [])
+
+        return [values['value'] for values in readings]
+
+    def test_step_00_lookup_needs_no_query(self):
+        '''The last reading of every location is loaded at startup and looked up without a query.'''
+        log = logging.getLogger('TestCase.test_step_00_lookup_needs_no_query')
+        log.info('Start')
+
+        with self.app.app_context():
+            log.debug('latest= {latest}'.format(latest=latest_readings(Humidity)))
+
+            self.assertEqual(self.latest_values(), [20.0, 3.0])
+            self.assertEqual(self.latest_values('Edmonton'), [3.0])
+            self.assertEqual(self.latest_values('Toronto'), [])
+
+        log.info('End')
+
+    def test_step_01_writes_update_latest(self):
+        '''Creating, updating and deleting readings keeps the last reading of each location current.'''
+        log = logging.getLogger('TestCase.test_step_01_writes_update_latest')
+        log.info('Start')
+
+        with self.app.app_context():
+            newest = create_humidity(reading('2017-04-15T00:00:00', 4.0))
+            self.assertEqual(self.latest_values('Edmonton'), [4.0])
+
+            create_humidity(reading('2017-01-20T00:00:00', 0.5))
+            self.assertEqual(self.latest_values('Edmonton'), [4.0])
+
+            update_humidity(newest.id, reading('2017-04-16T00:00:00', 5.0))
+            self.assertEqual(self.latest_values('Edmonton'), [5.0])
+
+            update_humidity(newest.id, reading('2016-12-01T00:00:00', 5.0))
+            self.assertEqual(self.latest_values('Edmonton'), [3.0])
+
+            update_humidity(newest.id, reading('2017-05-01T00:00:00', 6.0, city='Calgary'))
+            self.assertEqual(self.latest_values(), [6.0, 3.0])
+
+            delete_humidity(newest.id)
+            self.assertEqual(self.latest_values(), [20.0, 3.0])
+
+            create_humidity_batch([reading('2017-06-01T00:00:00', 7.0, city='Red Deer')])
+            self.assertEqual(self.latest_values(), [20.0, 3.0, 7.0])
+
+        log.info('End')
+
+    def test_step_02_other_writes_are_read_after_ttl(self):
+        '''Readings written by another process are served once LATEST_READINGS_TTL has passed.'''
+        log = logging.getLogger('TestCase.test_step_02_other_writes_are_read_after_ttl')
+        log.info('Start')
+
+        with self.app.app_context():
+            # Committed without updating this process's map, as another process would
+            commit_readings({Humidity: [reading_mapping(reading('2017-04-15T00:00:00', 4.0))]})
+            self.assertEqual(self.latest_values('Edmonton'), [3.0])
+
+            self.app.config['LATEST_READINGS_TTL'] = 0
+            latest = latest_readings(Humidity, city='Edmonton', province='AB', country='CA')
+
+            log.debug('latest= {latest}'.format(latest=latest))
+
+            self.assertEqual([values['value'] for values in latest], [4.0])
+
+        log.info('End')
+
+
+class TestCasePublicLatestPartitioned(TestCasePublicLatest):
+    '''The same checks with readings split into month tables.'''
+    partition_readings = True
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_lookup_needs_no_query').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_writes_update_latest').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_other_writes_are_read_after_ttl').setLevel(logging.DEBUG)
+    unittest.main()
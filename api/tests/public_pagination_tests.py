@@ -0,0 +1,111 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+
+class TestCasePublicPagination(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.resources = ['public/humidity', 'public/pressure', 'public/temperature']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_step_00_walk_pages(self):
+        '''Walk every page with the cursor and compare with the unpaginated collection.'''
+        log = logging.getLogger('TestCase.test_step_00_walk_pages')
+        log.info('Start')
+
+        headers = {
+            'cache-control': 'no-cache'
+        }
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            log.debug('app_url= {url}'.format(url=app_url))
+
+            response = requests.request('GET', app_url, headers=headers, params=self.querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+            expected_ids = [record['id'] for record in json.loads(response.text)]
+
+            paged_ids = []
+            querystring = dict(self.querystring, limit=7)
+
+            while True:
+                response = requests.request('GET', app_url, headers=headers, params=querystring)
+
+                assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+                page = json.loads(response.text)
+
+                assert len(page) <= 7, 'Expected at most 7 records per page'
+
+                paged_ids.extend(record['id'] for record in page)
+
+                if 'X-Next-Cursor' not in response.headers:
+                    break
+
+                querystring['cursor'] = response.headers['X-Next-Cursor']
+
+            self.assertEqual(paged_ids, expected_ids), 'Expected the pages to cover the collection in order'
+
+        log.info('End')
+
+    def test_step_01_invalid_cursor(self):
+        '''Request a page with a malformed cursor.'''
+        log = logging.getLogger('TestCase.test_step_01_invalid_cursor')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            querystring = dict(self.querystring, limit=7, cursor='not-a-cursor')
+
+            response = requests.request('GET', app_url, params=querystring)
+
+            assert response.status_code == 400, 'Expected a HTTP status code 400'
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_walk_pages').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_invalid_cursor').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,120 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+
+class TestCasePublicQuery(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.resource = 'public/query'
+        self.measurements = ['humidity', 'pressure', 'temperature']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'location': ['Edmonton,AB,CA', 'Nowhere,AB,CA']
+        }
+
+    def tearDown(self):
+        pass
+
+    def test_step_00_query_groups_by_location(self):
+        '''One request returns the records of every location and measurement, grouped by location.'''
+        log = logging.getLogger('TestCase.test_step_00_query_groups_by_location')
+        log.info('Start')
+
+        app_url = '{base_url}/{context}/{resource}'.format(
+            base_url=self.base_url,
+            context=self.context,
+            resource=self.resource
+        )
+
+        log.debug('app_url= {url}'.format(url=app_url))
+
+        response = requests.request('GET', app_url, params=self.querystring)
+
+        log.debug('Got {response_code} - expected {expected_code}'.format(
+            response_code=response.status_code,
+            expected_code=200)
+        )
+
+        assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+        results = json.loads(response.text)
+
+        self.assertEqual([(result['city'], result['province'], result['country']) for result in results],
+                         [('Edmonton', 'AB', 'CA'), ('Nowhere', 'AB', 'CA')])
+
+        for measurement in self.measurements:
+            collection = requests.request('GET',
+                                          '{base_url}/{context}/public/{measurement}/'.format(
+                                              base_url=self.base_url,
+                                              context=self.context,
+                                              measurement=measurement),
+                                          params={'start': self.querystring['start'],
+                                                  'end': self.querystring['end'],
+                                                  'city': 'Edmonton',
+                                                  'province': 'AB',
+                                                  'country': 'CA'})
+
+            self.assertEqual(results[0][measurement], json.loads(collection.text))
+            self.assertEqual(results[1][measurement], [])
+
+        log.info('End')
+
+    def test_step_01_query_selects_measurements(self):
+        '''Only the requested measurements are returned, and invalid arguments are rejected.'''
+        log = logging.getLogger('TestCase.test_step_01_query_selects_measurements')
+        log.info('Start')
+
+        app_url = '{base_url}/{context}/{resource}'.format(
+            base_url=self.base_url,
+            context=self.context,
+            resource=self.resource
+        )
+
+        querystring = dict(self.querystring, measurement=['temperature', 'humidity'])
+
+        response = requests.request('GET', app_url, params=querystring)
+
+        assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+        for result in json.loads(response.text):
+            self.assertEqual(sorted(result), ['city', 'country', 'humidity', 'province', 'temperature'])
+
+        for invalid in ({'measurement': 'rainfall'}, {'location': 'Edmonton'}):
+            response = requests.request('GET', app_url, params=dict(self.querystring, **invalid))
+
+            log.debug('{invalid}: got {response_code} - expected {expected_code}'.format(
+                invalid=invalid,
+                response_code=response.status_code,
+                expected_code=400)
+            )
+
+            assert response.status_code == 400, 'Expected a HTTP status code 400'
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_query_groups_by_location').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_query_selects_measurements').setLevel(logging.DEBUG)
+    unittest.main()
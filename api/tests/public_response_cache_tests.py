@@ -0,0 +1,191 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+from datetime import datetime
+
+from flask import Flask
+
+from api.weather_data_flaskapi.business.response_cache import MemoryCacheBackend, clear_response_cache, \
+    get_response_cache, response_cache_key, response_cache_stats
+from api.weather_data_flaskapi.business.weather_data import create_humidity, delete_humidity, update_humidity
+from database import db, create_database
+
+
+def reading(timestamp: str, city: str = 'Edmonton') -> dict:
+    return {'value': 50.0, 'value_units': 'RH', 'value_error_range': 0.1, 'latitude': 53.5, 'longitude': -113.5,
+            'city': city, 'province': 'AB', 'country': 'CA', 'elevation': 650.0, 'elevation_units': 'm',
+            'timestamp': timestamp}
+
+
+class TestCasePublicResponseCache(unittest.TestCase):
+    def setUp(self):
+        '''
+        The response cache is checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['RESPONSE_CACHE_BACKEND'] = 'memory'
+        db.init_app(self.app)
+        create_database(app=self.app)
+        clear_response_cache()
+
+    def tearDown(self):
+        clear_response_cache()
+
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def cache_range(self, cache, start: datetime, end: datetime, city: str = 'Edmonton') -> str:
+        '''Cache a response for a humidity query over [start, end] and return its key.'''
+        key = response_cache_key('humidity', city, 'AB', 'CA', start, end, None, None, None)
+        cache.set(key, b'[]', {'ETag': '"etag"'}, 'humidity', city, 'AB', 'CA', start, end, cache.generation)
+
+        return key
+
+    def check_targeted_invalidation(self):
+        with self.app.app_context():
+            cache = get_response_cache()
+
+            january = self.cache_range(cache, datetime(2017, 1, 1), datetime(2017, 1, 31))
+            february = self.cache_range(cache, datetime(2017, 2, 1), datetime(2017, 2, 28))
+            calgary = self.cache_range(cache, datetime(2017, 1, 1), datetime(2017, 1, 31), city='Calgary')
+
+            self.assertEqual(cache.get(january), (b'[]', {'ETag': '"etag"'}))
+
+            humidity = create_humidity(reading('2017-01-15T12:00:00'))
+
+            self.assertIsNone(cache.get(january))
+            self.assertIsNotNone(cache.get(february))
+            self.assertIsNotNone(cache.get(calgary))
+
+            january = self.cache_range(cache, datetime(2017, 1, 1), datetime(2017, 1, 31))
+            update_humidity(humidity.id, reading('2017-02-15T12:00:00'))
+
+            self.assertIsNone(cache.get(january))
+            self.assertIsNone(cache.get(february))
+            self.assertIsNotNone(cache.get(calgary))
+
+            february = self.cache_range(cache, datetime(2017, 2, 1), datetime(2017, 2, 28))
+            delete_humidity(humidity.id)
+
+            self.assertIsNone(cache.get(february))
+            self.assertIsNotNone(cache.get(calgary))
+
+            return response_cache_stats()
+
+    def test_step_00_writes_evict_overlapping_entries(self):
+        '''Creating, updating and deleting a reading evicts only the entries of its location and range.'''
+        log = logging.getLogger('TestCase.test_step_00_writes_evict_overlapping_entries')
+        log.info('Start')
+
+        stats = self.check_targeted_invalidation()
+
+        log.debug('stats= {stats}'.format(stats=stats))
+
+        self.assertEqual(stats['invalidated'], 4)
+        self.assertEqual(stats['bytes_saved'], 2 * 5)
+
+        log.info('End')
+
+    def test_step_01_local_redis_backend(self):
+        '''The external backend, with its local stand-in, invalidates the same entries.'''
+        log = logging.getLogger('TestCase.test_step_01_local_redis_backend')
+        log.info('Start')
+
+        self.app.config['RESPONSE_CACHE_BACKEND'] = 'local-redis'
+
+        stats = self.check_targeted_invalidation()
+
+        log.debug('stats= {stats}'.format(stats=stats))
+
+        self.assertEqual(stats['invalidated'], 4)
+
+        log.info('End')
+
+    def test_step_02_memory_backend_is_bounded(self):
+        '''The in-process backend evicts its least recently used entries beyond its entry and byte limits.'''
+        log = logging.getLogger('TestCase.test_step_02_memory_backend_is_bounded')
+        log.info('Start')
+
+        backend = MemoryCacheBackend(max_entries=2, max_bytes=10)
+
+        backend.set('a', b'1234', 60)
+        backend.set('b', b'1234', 60)
+        backend.get('a')
+        backend.set('c', b'1234', 60)
+
+        self.assertEqual(list(backend.entries), ['a', 'c'])
+
+        backend.set('d', b'12345678', 60)
+
+        log.debug('entries= {entries}'.format(entries=list(backend.entries)))
+
+        self.assertEqual(list(backend.entries), ['d'])
+        self.assertEqual(backend.size, 8)
+
+        backend.set('e', b'1', 0)
+
+        self.assertIsNone(backend.get('e'))
+
+        log.info('End')
+
+    def test_step_03_evicted_entries_leave_their_index(self):
+        '''Entries evicted by the LRU or expired by their TTL are removed from their index.'''
+        log = logging.getLogger('TestCase.test_step_03_evicted_entries_leave_their_index')
+        log.info('Start')
+
+        backend = MemoryCacheBackend(max_entries=2, max_bytes=100)
+
+        for key in ('a', 'b', 'c'):
+            backend.set(key, b'1234', 60)
+            backend.add_to_index('index', key, key, 60)
+
+        self.assertEqual(sorted(backend.index_members('index')), ['b', 'c'])
+
+        backend.set('d', b'1234', 0)
+        backend.add_to_index('other', 'd', 'd', 0)
+
+        log.debug('indexes= {indexes}'.format(indexes=backend.indexes))
+
+        self.assertEqual(backend.index_members('other'), [])
+        self.assertEqual(sorted(backend.index_members('index')), ['c'])
+        self.assertEqual(backend.indexes, {'index': {'c'}})
+
+        with self.app.app_context():
+            self.app.config['RESPONSE_CACHE_BACKEND'] = 'local-redis'
+            self.app.config['RESPONSE_CACHE_TTL'] = 0
+            cache = get_response_cache()
+
+            self.cache_range(cache, datetime(2017, 1, 1), datetime(2017, 1, 31))
+            self.cache_range(cache, datetime(2017, 2, 1), datetime(2017, 2, 28))
+
+            index = cache.index_name('humidity', 'Edmonton', 'AB', 'CA')
+
+            log.debug('sorted_sets= {sorted_sets}'.format(sorted_sets=cache.backend.client.sorted_sets))
+
+            self.assertEqual(cache.backend.index_members(index), [])
+            self.assertEqual(cache.backend.client.zrangebyscore(index, '-inf', '+inf'), [])
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_writes_evict_overlapping_entries').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_local_redis_backend').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_memory_backend_is_bounded').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_evicted_entries_leave_their_index').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,123 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import csv
+import io
+import json
+import logging
+import sys
+import unittest
+
+import requests
+
+
+class TestCasePublicStreaming(unittest.TestCase):
+    def setUp(self):
+        '''
+        Configure these to target the environment being tested. Sample values provided.
+        '''
+        self.base_url = 'http://localhost.localdomain:5000'
+        self.context = 'weather'
+        self.resources = ['public/humidity', 'public/pressure', 'public/temperature']
+        self.querystring = {
+            'start': '0001-01-01',
+            'end': '9999-12-31',
+            'city': 'Edmonton',
+            'province': 'AB',
+            'country': 'CA'
+        }
+
+    def tearDown(self):
+        pass
+
+    def get_json_records(self, app_url):
+        response = requests.request('GET', app_url, params=self.querystring)
+
+        assert response.status_code == 200, 'Expected a HTTP status code 200'
+
+        return json.loads(response.text)
+
+    def test_step_00_get_all_records_as_ndjson(self):
+        '''Get all records as newline delimited JSON.'''
+        log = logging.getLogger('TestCase.test_step_00_get_all_records_as_ndjson')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            log.debug('app_url= {url}'.format(url=app_url))
+
+            expected = self.get_json_records(app_url)
+
+            headers = {
+                'accept': 'application/x-ndjson',
+                'cache-control': 'no-cache'
+            }
+
+            response = requests.request('GET', app_url, headers=headers, params=self.querystring, stream=True)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+            assert response.headers['content-type'].startswith('application/x-ndjson'), 'Expected NDJSON'
+
+            records = [json.loads(line) for line in response.iter_lines() if line]
+
+            self.assertEqual(records, expected), 'Expected the same records as the JSON response'
+
+            for record in records:
+                assert 'latitude' not in record, 'Expected the public projection'
+                assert 'longitude' not in record, 'Expected the public projection'
+
+        log.info('End')
+
+    def test_step_01_get_all_records_as_csv(self):
+        '''Get all records as CSV.'''
+        log = logging.getLogger('TestCase.test_step_01_get_all_records_as_csv')
+        log.info('Start')
+
+        for resource in self.resources:
+            app_url = '{base_url}/{context}/{resource}/'.format(
+                base_url=self.base_url,
+                context=self.context,
+                resource=resource
+            )
+
+            log.debug('app_url= {url}'.format(url=app_url))
+
+            expected = self.get_json_records(app_url)
+
+            headers = {
+                'accept': 'text/csv',
+                'cache-control': 'no-cache'
+            }
+
+            response = requests.request('GET', app_url, headers=headers, params=self.querystring)
+
+            assert response.status_code == 200, 'Expected a HTTP status code 200'
+            assert response.headers['content-type'].startswith('text/csv'), 'Expected CSV'
+
+            rows = list(csv.DictReader(io.StringIO(response.text)))
+
+            self.assertEqual(len(rows), len(expected)), 'Expected the same number of records'
+            self.assertEqual([int(row['id']) for row in rows],
+                             [record['id'] for record in expected]), 'Expected the same records in order'
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_get_all_records_as_ndjson').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_get_all_records_as_csv').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,177 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import threading
+import time
+import unittest
+
+from flask import Flask
+from flask_jwt import JWTError
+
+from api.weather_data_flaskapi.business.security import PasswordHashingUnavailable, _hash_password, _hash_pool, \
+    authenticate, create_user, password_hashing_stats, run_password_hashing, shutdown_password_hashing, \
+    update_password
+from database import db, create_database
+from database.models import User
+
+
+class TestCaseSecurityHashPool(unittest.TestCase):
+    def setUp(self):
+        '''
+        The password hashing pool is checked against a scratch SQLite database, with one worker.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['PASSWORD_HASH_SETTINGS'] = {'sha512_crypt__default_rounds': 1000}
+        self.app.config['PASSWORD_HASH_WORKERS'] = 1
+        self.app.config['PASSWORD_HASH_MAX_PENDING'] = 1
+        self.app.config['LAST_LOGIN_FLUSH_INTERVAL'] = 0
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        with self.app.app_context():
+            create_user({'username': 'station1', 'password': 'secret', 'enabled': True})
+
+    def tearDown(self):
+        shutdown_password_hashing()
+
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_step_00_hashing_runs_in_the_pool(self):
+        '''Logins and password changes are hashed by the pool workers.'''
+        log = logging.getLogger('TestCase.test_step_00_hashing_runs_in_the_pool')
+        log.info('Start')
+
+        with self.app.app_context():
+            completed = password_hashing_stats()['completed']
+
+            self.assertIsNotNone(authenticate('station1', 'secret'))
+
+            salt = User.query.filter(User.username == 'station1').one().salt
+            update_password('station1', 'secret', 'changed', salt)
+
+            self.assertIsNone(authenticate('station1', 'secret'))
+            self.assertIsNotNone(authenticate('station1', 'changed'))
+
+            stats = password_hashing_stats()
+
+            log.debug('stats= {stats}'.format(stats=stats))
+
+            self.assertEqual(stats['workers'], 1)
+            self.assertEqual(stats['pending'], 0)
+            self.assertEqual(stats['completed'] - completed, 5)
+            self.assertGreater(stats['utilization'], 0.0)
+
+        log.info('End')
+
+    def test_step_01_saturated_pool_answers_503(self):
+        '''A login is rejected with 503 while PASSWORD_HASH_MAX_PENDING hashes are queued or running.'''
+        log = logging.getLogger('TestCase.test_step_01_saturated_pool_answers_503')
+        log.info('Start')
+
+        def slow_hash():
+            with self.app.app_context():
+                run_password_hashing(_hash_password,
+                                     ('sha512_crypt',),
+                                     (('sha512_crypt__default_rounds', 1000000),),
+                                     'secret')
+
+        with self.app.app_context():
+            rejected = password_hashing_stats()['rejected']
+
+            thread = threading.Thread(target=slow_hash)
+            thread.start()
+
+            while password_hashing_stats()['pending'] == 0:
+                time.sleep(0.001)
+
+            with self.assertRaises(JWTError) as context:
+                authenticate('station1', 'secret')
+
+            thread.join()
+
+            log.debug('stats= {stats}'.format(stats=password_hashing_stats()))
+
+            self.assertEqual(context.exception.status_code, 503)
+            self.assertEqual(password_hashing_stats()['rejected'] - rejected, 1)
+
+        log.info('End')
+
+    def test_step_02_broken_pool_is_replaced(self):
+        '''A login that finds a pool worker dead is hashed in the calling thread, and the pool is replaced.'''
+        log = logging.getLogger('TestCase.test_step_02_broken_pool_is_replaced')
+        log.info('Start')
+
+        with self.app.app_context():
+            self.assertIsNotNone(authenticate('station1', 'secret'))
+
+            restarts = password_hashing_stats()['restarts']
+            executor = _hash_pool['executor']
+
+            for process in list(executor._processes.values()):
+                process.kill()
+                process.join()
+
+            self.assertIsNotNone(authenticate('station1', 'secret'))
+            self.assertIsNone(authenticate('station1', 'wrong'))
+
+            log.debug('stats= {stats}'.format(stats=password_hashing_stats()))
+
+            self.assertEqual(password_hashing_stats()['restarts'] - restarts, 1)
+            self.assertIsNot(_hash_pool['executor'], executor)
+
+        log.info('End')
+
+    def test_step_03_slow_hash_times_out(self):
+        '''A hash not done within PASSWORD_HASH_TIMEOUT seconds is abandoned, but stays pending until it is done.'''
+        log = logging.getLogger('TestCase.test_step_03_slow_hash_times_out')
+        log.info('Start')
+
+        self.app.config['PASSWORD_HASH_TIMEOUT'] = 0.01
+
+        with self.app.app_context():
+            before = password_hashing_stats()
+
+            with self.assertRaises(PasswordHashingUnavailable):
+                run_password_hashing(_hash_password,
+                                     ('sha512_crypt',),
+                                     (('sha512_crypt__default_rounds', 1000000),),
+                                     'secret')
+
+            log.debug('stats= {stats}'.format(stats=password_hashing_stats()))
+
+            self.assertEqual(password_hashing_stats()['timeouts'] - before['timeouts'], 1)
+            self.assertEqual(password_hashing_stats()['completed'], before['completed'])
+            self.assertEqual(password_hashing_stats()['pending'], 1)
+
+            # The abandoned hash still occupies the only pending slot
+            with self.assertRaises(PasswordHashingUnavailable):
+                run_password_hashing(_hash_password, ('sha512_crypt',), (), 'secret')
+
+            shutdown_password_hashing()
+
+            self.assertEqual(password_hashing_stats()['pending'], 0)
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_hashing_runs_in_the_pool').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_saturated_pool_answers_503').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_broken_pool_is_replaced').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_03_slow_hash_times_out').setLevel(logging.DEBUG)
+    unittest.main()
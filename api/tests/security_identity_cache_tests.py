@@ -0,0 +1,140 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.orm.exc import NoResultFound
+
+from api.weather_data_flaskapi.business.security import clear_identities, create_user, delete_user, disable_user, \
+    identity, identity_cache_stats
+from database import db, create_database
+
+
+class TestCaseSecurityIdentityCache(unittest.TestCase):
+    def setUp(self):
+        '''
+        The identity cache is checked against a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['IDENTITY_CACHE_SIZE'] = 2
+        self.app.config['PASSWORD_HASH_SETTINGS'] = {'sha512_crypt__default_rounds': 1000}
+        db.init_app(self.app)
+        create_database(app=self.app)
+        clear_identities()
+
+        with self.app.app_context():
+            self.user_ids = [create_user({'username': username, 'password': 'secret', 'enabled': True}).id
+                             for username in ('station1', 'station2', 'station3')]
+
+    def tearDown(self):
+        clear_identities()
+
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def count_queries(self, function) -> int:
+        '''Return the number of SQL statements executed by function().'''
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            function()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        return len(statements)
+
+    def test_step_00_cached_identity_needs_no_query(self):
+        '''A repeated identity lookup is a cache hit without a database query.'''
+        log = logging.getLogger('TestCase.test_step_00_cached_identity_needs_no_query')
+        log.info('Start')
+
+        with self.app.app_context():
+            payload = {'identity': self.user_ids[0]}
+
+            self.assertEqual(self.count_queries(lambda: identity(payload)), 1)
+            self.assertEqual(self.count_queries(lambda: identity(payload)), 0)
+
+            user = identity(payload)
+            db.session.commit()
+
+            log.debug('stats= {stats}'.format(stats=identity_cache_stats()))
+
+            self.assertEqual(user.username, 'station1')
+            self.assertEqual(identity_cache_stats()['hits'], 2)
+            self.assertEqual(identity_cache_stats()['misses'], 1)
+
+        log.info('End')
+
+    def test_step_01_changed_user_is_reloaded(self):
+        '''Disabling or deleting a user drops it from the cache.'''
+        log = logging.getLogger('TestCase.test_step_01_changed_user_is_reloaded')
+        log.info('Start')
+
+        with self.app.app_context():
+            payload = {'identity': self.user_ids[0]}
+
+            self.assertTrue(identity(payload).enabled)
+
+            disable_user('station1')
+
+            self.assertFalse(identity(payload).enabled)
+            self.assertEqual(identity_cache_stats()['misses'], 2)
+
+            payload = {'identity': self.user_ids[1]}
+
+            self.assertIsNotNone(identity(payload))
+
+            delete_user('station2')
+
+            with self.assertRaises(NoResultFound):
+                identity(payload)
+
+        log.info('End')
+
+    def test_step_02_cache_is_bounded(self):
+        '''The least recently used user is evicted past IDENTITY_CACHE_SIZE, and expired users are reloaded.'''
+        log = logging.getLogger('TestCase.test_step_02_cache_is_bounded')
+        log.info('Start')
+
+        with self.app.app_context():
+            for user_id in self.user_ids:
+                identity({'identity': user_id})
+
+            log.debug('stats= {stats}'.format(stats=identity_cache_stats()))
+
+            self.assertEqual(identity_cache_stats()['size'], 2)
+            self.assertEqual(self.count_queries(lambda: identity({'identity': self.user_ids[0]})), 1)
+
+            self.app.config['IDENTITY_CACHE_TTL'] = 0
+            identity({'identity': self.user_ids[1]})
+
+            self.assertEqual(self.count_queries(lambda: identity({'identity': self.user_ids[1]})), 1)
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_cached_identity_needs_no_query').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_changed_user_is_reloaded').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_cache_is_bounded').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,121 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import sys
+import unittest
+
+from flask import Flask
+from sqlalchemy import event
+
+from api.weather_data_flaskapi.business.security import authenticate, create_user, flush_last_login_dates
+from database import db, create_database
+from database.models import User
+
+
+class TestCaseSecurityLogin(unittest.TestCase):
+    def setUp(self):
+        '''
+        Logins are checked against a scratch SQLite database, with cheap hashes.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['PASSWORD_HASH_SCHEMES'] = ['sha512_crypt']
+        self.app.config['PASSWORD_HASH_SETTINGS'] = {'sha512_crypt__default_rounds': 1000}
+        self.app.config['LAST_LOGIN_FLUSH_INTERVAL'] = 3600
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        with self.app.app_context():
+            for username in ('station1', 'station2'):
+                create_user({'username': username, 'password': 'secret', 'enabled': True})
+
+    def tearDown(self):
+        with self.app.app_context():
+            flush_last_login_dates()
+            db.session.remove()
+            db.drop_all()
+
+    def statements(self, function) -> list:
+        '''Return the SQL statements executed by function().'''
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            function()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        return statements
+
+    def test_step_00_login_is_a_single_query(self):
+        '''A login runs one SELECT; the last login dates are written later with one batched UPDATE.'''
+        log = logging.getLogger('TestCase.test_step_00_login_is_a_single_query')
+        log.info('Start')
+
+        with self.app.app_context():
+            for username in ('station1', 'station2'):
+                statements = self.statements(lambda: authenticate(username, 'secret'))
+
+                log.debug('statements= {statements}'.format(statements=statements))
+
+                self.assertEqual(len(statements), 1)
+                self.assertTrue(statements[0].startswith('SELECT'))
+
+            self.assertIsNone(authenticate('station1', 'wrong'))
+            db.session.remove()
+            self.assertEqual(User.query.filter(User.last_login_date.isnot(None)).count(), 0)
+
+            statements = self.statements(flush_last_login_dates)
+
+            log.debug('statements= {statements}'.format(statements=statements))
+
+            self.assertEqual(len(statements), 1)
+            self.assertTrue(statements[0].startswith('UPDATE'))
+            self.assertEqual(User.query.filter(User.last_login_date.isnot(None)).count(), 2)
+
+        log.info('End')
+
+    def test_step_01_outdated_hash_is_replaced_at_login(self):
+        '''A hash with an outdated scheme or cost is replaced at the next successful login.'''
+        log = logging.getLogger('TestCase.test_step_01_outdated_hash_is_replaced_at_login')
+        log.info('Start')
+
+        with self.app.app_context():
+            self.app.config['PASSWORD_HASH_SETTINGS'] = {'sha512_crypt__default_rounds': 2000,
+                                                         'sha512_crypt__min_rounds': 2000}
+
+            self.assertIsNotNone(authenticate('station1', 'secret'))
+            password = User.query.filter(User.username == 'station1').one().password
+
+            log.debug('password= {password}'.format(password=password))
+
+            self.assertTrue(password.startswith('$6$rounds=2000$'))
+
+            self.app.config['PASSWORD_HASH_SCHEMES'] = ['pbkdf2_sha256', 'sha512_crypt']
+            self.app.config['PASSWORD_HASH_SETTINGS'] = {'pbkdf2_sha256__default_rounds': 1000}
+
+            self.assertIsNotNone(authenticate('station1', 'secret'))
+            self.assertTrue(User.query.filter(User.username == 'station1').one().password.startswith('$pbkdf2-sha256$'))
+            self.assertIsNotNone(authenticate('station1', 'secret'))
+
+        log.info('End')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_login_is_a_single_query').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_outdated_hash_is_replaced_at_login').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,165 @@
+'''
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+'''
+
+import logging
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask_restplus import fields, marshal
+
+from api.weather_data_flaskapi.business.latest import snapshot
+from api.weather_data_flaskapi.business.projection import project_rows, select_fields
+from api.weather_data_flaskapi.business.weather_data import create_humidity_batch, create_pressure_batch, \
+    create_temperature_batch, get_readings
+from api.weather_data_flaskapi.serializers import compile_serializer, fast_serializer, marshal_columns, humidity, \
+    pressure, temperature, public_humidity, public_pressure, public_temperature, aggregate, location_readings
+from database import db, create_database
+from database.models import Humidity, Pressure, Temperature
+
+
+class TestCaseSerializerCompiled(unittest.TestCase):
+    partitioned = False
+
+    def setUp(self):
+        '''
+        The compiled serializers are checked against marshal() on a scratch SQLite database.
+        '''
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.app.config['PARTITION_READINGS'] = self.partitioned
+        db.init_app(self.app)
+        create_database(app=self.app)
+
+        self.measurements = ((Humidity, create_humidity_batch, humidity, public_humidity),
+                             (Pressure, create_pressure_batch, pressure, public_pressure),
+                             (Temperature, create_temperature_batch, temperature, public_temperature))
+
+        random.seed(3)
+        start = datetime(2017, 1, 1)
+
+        with self.app.app_context():
+            for _, create_batch, _, _ in self.measurements:
+                create_batch([{'value': random.uniform(-40.0, 40.0), 'value_units': 'C',
+                               'value_error_range': random.uniform(0.0, 1.0),
+                               'latitude': random.uniform(-90.0, 90.0), 'longitude': random.uniform(-180.0, 180.0),
+                               'city': random.choice(('Edmonton', 'Calgary')), 'province': 'AB', 'country': 'CA',
+                               'elevation': random.uniform(0.0, 1000.0), 'elevation_units': 'm',
+                               'timestamp': (start + timedelta(days=index * 7, seconds=index)).isoformat()}
+                              for index in range(20)])
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def readings(self, model):
+        return get_readings(model, datetime(2000, 1, 1), datetime(2100, 1, 1)).order_by(model.timestamp, model.id)
+
+    def test_step_00_compiled_matches_marshal(self):
+        '''Model instances, result rows and latest snapshots marshal to the same data both ways.'''
+        log = logging.getLogger('TestCase.test_step_00_compiled_matches_marshal')
+        log.info('Start')
+
+        with self.app.app_context():
+            for model, _, serializer, public_serializer in self.measurements:
+                instances = self.readings(model).all()
+
+                log.debug('{table}: {count} readings'.format(table=model.__tablename__, count=len(instances)))
+
+                for selected in (serializer, public_serializer, select_fields(serializer, ['timestamp', 'value']),
+                                 select_fields(public_serializer, ['country', 'id'])):
+                    expected = marshal(instances, selected)
+
+                    self.assertEqual([fast_serializer(selected)(instance) for instance in instances], expected)
+
+                    rows = project_rows(self.readings(model), model, selected, 'timestamp', 'id').all()
+
+                    self.assertEqual([fast_serializer(selected)(row) for row in rows], expected)
+
+                snapshots = [snapshot(instance) for instance in instances]
+
+                self.assertEqual([fast_serializer(public_serializer, mapping=True)(values) for values in snapshots],
+                                 marshal(snapshots, public_serializer))
+
+        log.info('End')
+
+    def test_step_01_compiled_edge_cases(self):
+        '''Missing values stay None, compiled serializers are reused, and nested models are refused.'''
+        log = logging.getLogger('TestCase.test_step_01_compiled_edge_cases')
+        log.info('Start')
+
+        values = {'timestamp': None, 'count': None, 'min': 1, 'max': 2.5, 'avg': None, 'stddev': None}
+
+        self.assertEqual(compile_serializer(aggregate, mapping=True)(values), marshal(values, aggregate))
+
+        self.assertIs(fast_serializer(public_humidity), fast_serializer(public_humidity))
+        self.assertIs(fast_serializer(select_fields(public_humidity, ['value'])),
+                      fast_serializer(select_fields(public_humidity, ['value'])))
+
+        for serializer in (location_readings, {'value': fields.Float(default=0.0)},
+                           {'timestamp': fields.DateTime(dt_format='rfc822')}):
+            with self.assertRaises(TypeError):
+                compile_serializer(serializer)
+
+        log.info('End')
+
+    def test_step_02_columns_match_marshal(self):
+        '''Columns hold the marshalled values, and only fields constant over every row are hoisted.'''
+        log = logging.getLogger('TestCase.test_step_02_columns_match_marshal')
+        log.info('Start')
+
+        hoisted = ('value_units', 'city', 'province', 'country')
+
+        with self.app.app_context():
+            for model, _, serializer, public_serializer in self.measurements:
+                for selected in (serializer, public_serializer, select_fields(public_serializer, ['value', 'city'])):
+                    rows = project_rows(self.readings(model), model, selected, 'timestamp', 'id').all()
+                    records = marshal(self.readings(model).all(), selected)
+
+                    columns = marshal_columns(rows, selected, hoisted)
+
+                    log.debug('{table}: {columns}'.format(table=model.__tablename__,
+                                                          columns=sorted(name for name in columns
+                                                                         if not isinstance(columns[name], list))))
+
+                    self.assertEqual(list(columns), list(selected))
+
+                    for name in selected:
+                        values = [record[name] for record in records]
+
+                        if name in hoisted and len(set(values)) == 1:
+                            self.assertEqual(columns[name], values[0])
+                        else:
+                            self.assertEqual(columns[name], values)
+
+                    # Readings were recorded in two cities
+                    self.assertIsInstance(columns['city'], list)
+
+                self.assertEqual(marshal_columns([], public_serializer, hoisted),
+                                 {name: [] for name in public_serializer})
+
+        log.info('End')
+
+
+class TestCaseSerializerCompiledPartitioned(TestCaseSerializerCompiled):
+    partitioned = True
+
+
+if __name__ == '__main__':
+    logging.basicConfig(stream=sys.stderr)
+    logging.getLogger('TestCase.test_step_00_compiled_matches_marshal').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_01_compiled_edge_cases').setLevel(logging.DEBUG)
+    logging.getLogger('TestCase.test_step_02_columns_match_marshal').setLevel(logging.DEBUG)
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from api.weather_data_flaskapi.business.aggregation import AGGREGATES, BUCKETS
+from api.weather_data_flaskapi.date_range_arguments import date_range_arguments
+
+
+def aggregate_list(value: str) -> list:
+    """
+    Parse a comma separated list of aggregate names.
+
+    :param value: The agg argument (e.g. min,max,avg).
+    :type value: str
+    :return: list
+    """
+    aggregates = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in aggregates if name not in AGGREGATES]
+
+    if not aggregates or unknown:
+        raise ValueError('expected a comma separated list of {aggregates}'.format(aggregates=', '.join(AGGREGATES)))
+
+    return aggregates
+
+
+aggregate_arguments = date_range_arguments.copy()
+
+aggregate_arguments.add_argument('bucket',
+                                 type=str,
+                                 required=True,
+                                 choices=list(BUCKETS.keys()),
+                                 help='The width of each aggregation bucket')
+
+aggregate_arguments.add_argument('agg',
+                                 type=aggregate_list,
+                                 required=False,
+                                 default=list(AGGREGATES),
+                                 help='The aggregates to return (comma separated: min,max,avg,count,stddev)')
@@ -0,0 +1,191 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import math
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func
+
+from api.weather_data_flaskapi.business.rollups import EPOCH, bucket_start, rollup_for
+from api.weather_data_flaskapi.business.weather_data import get_readings
+from database import db
+from database.functions import BUCKET_EPOCH_DIALECTS, bucket_epoch
+from database.locations import find_location_id
+from database.types import real_value
+
+BUCKETS = OrderedDict([('1m', 60),
+                       ('5m', 5 * 60),
+                       ('1h', 60 * 60),
+                       ('1d', 24 * 60 * 60)])
+
+AGGREGATES = ('min', 'max', 'avg', 'count', 'stddev')
+
+
+def sql_bucket_sums(query, model, seconds: int) -> list:
+    """
+    Compute (bucket, count, min, max, sum, sum of squares) per bucket with SQL GROUP BY.
+    """
+    bucket = bucket_epoch(model.timestamp, seconds).label('bucket')
+    value = real_value(model.value)
+
+    rows = query.with_entities(bucket,
+                               func.count(model.value),
+                               func.min(value),
+                               func.max(value),
+                               func.sum(value),
+                               func.sum(value * value)) \
+        .group_by(bucket) \
+        .order_by(bucket) \
+        .all()
+
+    return [(EPOCH + timedelta(seconds=int(row[0])),) + tuple(row[1:]) for row in rows]
+
+
+def python_bucket_sums(query, model, seconds: int) -> list:
+    """
+    Compute (bucket, count, min, max, sum, sum of squares) per bucket by streaming the raw values.
+
+    Used for database backends without a bucket_epoch compilation.
+    """
+    sums = OrderedDict()
+
+    for timestamp, value in query.with_entities(model.timestamp, model.value).order_by(model.timestamp).yield_per(
+            10000):
+        value = float(value)
+        key = bucket_start(timestamp, seconds)
+        current = sums.get(key)
+        if current is None:
+            sums[key] = [1, value, value, value, value * value]
+        else:
+            current[0] += 1
+            current[1] = min(current[1], value)
+            current[2] = max(current[2], value)
+            current[3] += value
+            current[4] += value * value
+
+    return [(key,) + tuple(values) for key, values in sums.items()]
+
+
+def raw_bucket_sums(query, model, seconds: int) -> list:
+    """
+    Compute (bucket, count, min, max, sum, sum of squares) per bucket from the raw readings.
+    """
+    if db.session.get_bind().dialect.name in BUCKET_EPOCH_DIALECTS:
+        return sql_bucket_sums(query, model, seconds)
+
+    return python_bucket_sums(query, model, seconds)
+
+
+def rollup_bucket_sums(rollup, start: datetime, end: datetime, location_id: int) -> list:
+    """
+    Read (bucket, count, min, max, sum, sum of squares) per bucket from a rollup for buckets in [start, end).
+    """
+    return db.session.query(rollup.bucket,
+                            func.sum(rollup.value_count),
+                            func.min(rollup.value_min),
+                            func.max(rollup.value_max),
+                            func.sum(rollup.value_sum),
+                            func.sum(rollup.value_sum_squares)) \
+        .filter(and_(rollup.location_id == location_id,
+                     rollup.bucket >= start,
+                     rollup.bucket < end)) \
+        .group_by(rollup.bucket) \
+        .order_by(rollup.bucket) \
+        .all()
+
+
+def summarize(bucket_sums, aggregates) -> list:
+    """
+    Turn (bucket, count, min, max, sum, sum of squares) rows into the requested aggregates.
+
+    :param bucket_sums: The per bucket sums, ordered by bucket.
+    :param aggregates: The names of the aggregates to return.
+    :return: A list of dicts, one per bucket.
+    """
+    results = []
+
+    for timestamp, count, minimum, maximum, total, total_squares in bucket_sums:
+        count = int(count)
+        average = float(total) / count
+        variance = max(float(total_squares) / count - average * average, 0.0)
+
+        values = {
+            'count': count,
+            'min': float(minimum),
+            'max': float(maximum),
+            'avg': average,
+            'stddev': math.sqrt(variance),
+        }
+
+        result = {'timestamp': timestamp}
+        for name in aggregates:
+            result[name] = values[name]
+        results.append(result)
+
+    return results
+
+
+def aggregate_readings(model,
+                       start: datetime,
+                       end: datetime,
+                       city: str,
+                       province: str,
+                       country: str,
+                       bucket: str,
+                       aggregates) -> list:
+    """
+    Aggregate the readings at a location into fixed-width time buckets.
+
+    Whole 1h and 1d buckets are read from the rollup tables when AGGREGATE_FROM_ROLLUPS is set.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param start: The start of the date range (inclusive).
+    :param end: The end of the date range (inclusive).
+    :param city: The location's city.
+    :param province: The location's province.
+    :param country: The location's country.
+    :param bucket: The bucket width, one of BUCKETS.
+    :param aggregates: The names of the aggregates to return, from AGGREGATES.
+    :return: A list of dicts, one per non-empty bucket, ordered by time.
+    """
+    seconds = BUCKETS[bucket]
+    rollup = rollup_for(model, seconds)
+
+    if rollup is None or not current_app.config.get('AGGREGATE_FROM_ROLLUPS', True):
+        query = get_readings(model, start, end, city, province, country)
+        return summarize(raw_bucket_sums(query, model, seconds), aggregates)
+
+    # Whole buckets come from the rollup; the partial buckets at either end of the range
+    # only cover part of their readings, so they are aggregated from the raw table.
+    first_whole_bucket = bucket_start(start, seconds)
+    if first_whole_bucket < start:
+        first_whole_bucket += timedelta(seconds=seconds)
+    last_bucket = bucket_start(end, seconds)
+
+    if first_whole_bucket >= last_bucket:
+        query = get_readings(model, start, end, city, province, country)
+        return summarize(raw_bucket_sums(query, model, seconds), aggregates)
+
+    bucket_sums = []
+
+    if start < first_whole_bucket:
+        head = get_readings(model, start, end, city, province, country).filter(model.timestamp < first_whole_bucket)
+        bucket_sums.extend(raw_bucket_sums(head, model, seconds))
+
+    location_id = find_location_id(city, province, country)
+    bucket_sums.extend(rollup_bucket_sums(rollup, first_whole_bucket, last_bucket, location_id))
+
+    tail = get_readings(model, last_bucket, end, city, province, country)
+    bucket_sums.extend(raw_bucket_sums(tail, model, seconds))
+
+    return summarize(bucket_sums, aggregates)
@@ -0,0 +1,254 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from api.weather_data_flaskapi.business.weather_data import commit_readings, reading_mapping, readings_committed
+from database import db
+
+log = logging.getLogger(__name__)
+
+# Readings accepted in write-behind mode (INGEST_QUEUE_SIZE > 0), as (model, mapping) pairs, wait in
+# a bounded queue for a writer thread. The writer commits them in groups of up to INGEST_FLUSH_ROWS
+# readings, at most INGEST_FLUSH_INTERVAL seconds after the first reading of a group was taken, so
+# many readings share one transaction (and one fsync). Readings arriving while the queue is full are
+# rejected rather than waited for, and the queue is written out at exit. When a group fails, its
+# readings are retried one at a time, so only the readings that fail on their own are dropped (and
+# logged with their data).
+_ingest = {'queue': None, 'writer': None}
+_ingest_lock = threading.Lock()
+_ingest_counters = {'accepted': 0, 'rejected': 0, 'written': 0, 'retried': 0, 'failed': 0, 'commits': 0,
+                    'last_batch_size': 0, 'max_batch_size': 0}
+
+# Queued after the last reading to stop the writer
+_STOP = None
+
+
+class IngestQueueFull(Exception):
+    """
+    Exception when the write-behind ingest queue is full
+    """
+
+    def __init__(self, message):
+        """
+        Constructor.
+
+        :param message: The error message.
+        :type message: str
+        """
+        self.message = message
+
+
+def write_behind_enabled() -> bool:
+    """
+    Return True if single readings are queued for the writer thread (INGEST_QUEUE_SIZE > 0).
+
+    :return: bool
+    """
+    return current_app.config.get('INGEST_QUEUE_SIZE', 0) > 0
+
+
+def _ingest_queue() -> queue.Queue:
+    # Called with _ingest_lock held
+    if _ingest['queue'] is None:
+        config = current_app.config
+        readings = queue.Queue(maxsize=config.get('INGEST_QUEUE_SIZE', 0))
+
+        writer = threading.Thread(target=_write_behind,
+                                  name='ingest-writer',
+                                  args=(current_app._get_current_object(),
+                                        readings,
+                                        config.get('INGEST_FLUSH_ROWS', 500),
+                                        config.get('INGEST_FLUSH_INTERVAL', 0.05)))
+        writer.daemon = True
+        writer.start()
+
+        _ingest['queue'] = readings
+        _ingest['writer'] = writer
+
+    return _ingest['queue']
+
+
+def enqueue_reading(model, data) -> dict:
+    """
+    Validate a new reading and queue it for the writer thread.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param data: JSON data for the new reading.
+    :return: The reading's column mapping (without an id, which is assigned when it is written).
+    :raises ValueError: if the reading is invalid.
+    :raises IngestQueueFull: if INGEST_QUEUE_SIZE readings are already queued.
+    """
+    mapping = reading_mapping(data)
+
+    with _ingest_lock:
+        try:
+            _ingest_queue().put_nowait((model, mapping))
+        except queue.Full:
+            _ingest_counters['rejected'] += 1
+            raise IngestQueueFull(message='the ingest queue is full, retry later')
+
+        _ingest_counters['accepted'] += 1
+
+    return mapping
+
+
+def group_readings(batch: list) -> OrderedDict:
+    """
+    Group (model, mapping) pairs by model, as insert_readings takes them.
+
+    :param batch: The (model, mapping) pairs of the readings.
+    :return: OrderedDict
+    """
+    readings = OrderedDict()
+    for model, mapping in batch:
+        readings.setdefault(model, []).append(mapping)
+
+    return readings
+
+
+def write_readings(batch: list) -> bool:
+    """
+    Write a group of queued readings with one commit.
+
+    Must be called within an application context. When the group fails it is rolled back and its
+    readings are written one at a time, each with its own commit; the readings that still fail
+    are logged with their data and counted as failed.
+
+    :param batch: The (model, mapping) pairs of the readings.
+    :return: True if every reading was written, else False.
+    """
+    written = []
+
+    try:
+        commit_readings(group_readings(batch))
+        written = batch
+    except Exception:
+        db.session.rollback()
+        log.exception('Writing {count} queued readings failed, retrying them one at a time'.format(count=len(batch)))
+
+        for model, mapping in batch:
+            try:
+                commit_readings({model: [mapping]})
+                written.append((model, mapping))
+            except Exception:
+                db.session.rollback()
+                log.exception('Dropped a queued {table} reading: {mapping}'.format(table=model.__tablename__,
+                                                                                   mapping=mapping))
+
+    failed = len(batch) - len(written)
+
+    with _ingest_lock:
+        _ingest_counters['written'] += len(written)
+        _ingest_counters['failed'] += failed
+
+        if written is batch:
+            _ingest_counters['commits'] += 1
+            _ingest_counters['last_batch_size'] = len(batch)
+            _ingest_counters['max_batch_size'] = max(_ingest_counters['max_batch_size'], len(batch))
+        else:
+            _ingest_counters['retried'] += len(batch)
+            _ingest_counters['commits'] += len(written)
+
+    if written:
+        try:
+            readings_committed(group_readings(written))
+        except Exception:
+            # The readings are stored; cached responses expire and latest readings refresh with later writes
+            db.session.rollback()
+            log.exception('Refreshing the caches after {count} queued readings failed'.format(count=len(written)))
+
+    return not failed
+
+
+def _write_behind(app, readings: queue.Queue, max_rows: int, interval: float) -> None:
+    stopping = False
+
+    while not stopping:
+        reading = readings.get()
+        if reading is _STOP:
+            break
+
+        batch = [reading]
+        deadline = time.monotonic() + interval
+
+        while len(batch) < max_rows:
+            try:
+                reading = readings.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+
+            if reading is _STOP:
+                stopping = True
+                break
+
+            batch.append(reading)
+
+        with app.app_context():
+            write_readings(batch)
+
+
+def flush_ingest_queue(timeout: float = None) -> int:
+    """
+    Write the queued readings and stop the writer thread (at exit, and in tests).
+
+    Readings queued afterwards start a new writer.
+
+    :param timeout: The seconds to wait for the writer, or None to wait until it is done.
+    :return: The number of readings that were waiting.
+    """
+    with _ingest_lock:
+        readings = _ingest['queue']
+        writer = _ingest['writer']
+        _ingest['queue'] = None
+        _ingest['writer'] = None
+
+    if readings is None:
+        return 0
+
+    pending = readings.qsize()
+    readings.put(_STOP)
+    writer.join(timeout)
+
+    return pending
+
+
+atexit.register(flush_ingest_queue)
+
+
+def ingest_queue_stats() -> dict:
+    """
+    Return the write-behind ingest queue's depth, counters and commit batch sizes.
+
+    :return: dict
+    """
+    with _ingest_lock:
+        readings = _ingest['queue']
+        commits = _ingest_counters['commits']
+
+        return {'depth': readings.qsize() if readings is not None else 0,
+                'capacity': current_app.config.get('INGEST_QUEUE_SIZE', 0),
+                'accepted': _ingest_counters['accepted'],
+                'rejected': _ingest_counters['rejected'],
+                'written': _ingest_counters['written'],
+                'retried': _ingest_counters['retried'],
+                'failed': _ingest_counters['failed'],
+                'commits': commits,
+                'last_batch_size': _ingest_counters['last_batch_size'],
+                'max_batch_size': _ingest_counters['max_batch_size'],
+                'mean_batch_size': _ingest_counters['written'] / commits if commits else 0.0}
@@ -0,0 +1,186 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import and_, func
+
+from database.locations import get_location
+from database.models import Humidity, Pressure, Temperature
+from database.partitions import query_readings
+
+# The last reading of every location, per reading table, kept in this process.
+#
+# The map is loaded with one grouped query per table when the application starts and is then
+# maintained by the create/update/delete functions in business/weather_data.py, so lookups never
+# query the database. Only a change to the current last reading of a location (an update moving
+# it back in time or to another location, or its deletion) re-reads that location. Writes handled
+# by other processes are not seen until the table is read again, which a lookup does once the
+# table was loaded more than LATEST_READINGS_TTL seconds before.
+
+LATEST_FIELDS = ('id', 'value', 'value_units', 'value_error_range', 'latitude_public', 'longitude_public',
+                 'timestamp')
+
+_latest = {}
+_loaded = {}
+_latest_lock = threading.Lock()
+
+
+def snapshot(reading) -> dict:
+    """
+    Capture the public values of a reading.
+
+    :param reading: A Humidity, Pressure or Temperature object.
+    :return: dict
+    """
+    values = {name: getattr(reading, name) for name in LATEST_FIELDS}
+    values['city'], values['province'], values['country'] = get_location(reading.location_id)
+
+    return values
+
+
+def is_newer(values: dict, current: dict) -> bool:
+    return current is None or (values['timestamp'], values['id']) >= (current['timestamp'], current['id'])
+
+
+def refresh_latest(model, location_ids=None) -> int:
+    """
+    Read the last readings of locations (or of every location) with one grouped query.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param location_ids: The ids of the locations to refresh, or None for all of them.
+    :return: The number of locations with a last reading.
+    """
+    if location_ids is not None and model.__tablename__ not in _latest:
+        # Not loaded yet; the first lookup reads every location
+        return 0
+
+    last = query_readings(model).with_entities(model.location_id.label('location_id'),
+                                               func.max(model.timestamp).label('timestamp'))
+
+    if location_ids is not None:
+        last = last.filter(model.location_id.in_(list(location_ids)))
+
+    last = last.group_by(model.location_id).subquery()
+
+    readings = {}
+    for reading in query_readings(model).join(last, and_(model.location_id == last.c.location_id,
+                                                         model.timestamp == last.c.timestamp)):
+        values = snapshot(reading)
+        location = (values['city'], values['province'], values['country'])
+
+        # Readings sharing a location's last timestamp are ordered by id
+        if is_newer(values, readings.get(location)):
+            readings[location] = values
+
+    with _latest_lock:
+        if location_ids is None:
+            _latest[model.__tablename__] = readings
+            _loaded[model.__tablename__] = time.monotonic()
+        else:
+            table = _latest.setdefault(model.__tablename__, {})
+
+            for location_id in location_ids:
+                table.pop(get_location(location_id), None)
+
+            table.update(readings)
+
+    return len(readings)
+
+
+def load_latest_readings(app) -> None:
+    """
+    Load the last reading of every location of every reading table.
+
+    :param app: The Flask application.
+    """
+    with app.app_context():
+        for model in (Humidity, Pressure, Temperature):
+            refresh_latest(model)
+
+
+def clear_latest_readings() -> None:
+    """
+    Forget the last readings (the next lookup loads them again).
+    """
+    with _latest_lock:
+        _latest.clear()
+        _loaded.clear()
+
+
+def record_latest(model, reading, previous_values: dict = None) -> None:
+    """
+    Record a created or updated reading if it is the last reading of its location.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param reading: The committed reading.
+    :param previous_values: The rollup_values() of an updated reading before the update.
+    """
+    if model.__tablename__ not in _latest:
+        return
+
+    if previous_values is not None and (previous_values['location_id'] != reading.location_id or
+                                        reading.timestamp < previous_values['timestamp']):
+        remove_latest(model, reading.id, previous_values['location_id'])
+
+    values = snapshot(reading)
+    location = (values['city'], values['province'], values['country'])
+
+    with _latest_lock:
+        table = _latest.get(model.__tablename__)
+        current = table.get(location) if table is not None else None
+
+        if table is not None and (is_newer(values, current) or current['id'] == values['id']):
+            table[location] = values
+
+
+def remove_latest(model, reading_id: int, location_id: int) -> None:
+    """
+    Re-read the last reading of a location if a reading that was its last reading changed or was deleted.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param reading_id: The id of the changed or deleted reading.
+    :param location_id: The id of the location the reading was at.
+    """
+    current = _latest.get(model.__tablename__, {}).get(get_location(location_id))
+
+    if current is not None and current['id'] == reading_id:
+        refresh_latest(model, [location_id])
+
+
+def latest_readings(model, city: str = None, province: str = None, country: str = None) -> list:
+    """
+    Return the last reading of every location matching the given city, province and country.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param city: The city, or None for any city.
+    :param province: The province, or None for any province.
+    :param country: The country, or None for any country.
+    :return: A list of reading values ordered by location.
+    """
+    loaded = _loaded.get(model.__tablename__)
+
+    if loaded is None or time.monotonic() - loaded > current_app.config.get('LATEST_READINGS_TTL', 5):
+        refresh_latest(model)
+
+    with _latest_lock:
+        table = dict(_latest.get(model.__tablename__, {}))
+
+    if city is not None and province is not None and country is not None:
+        values = table.get((city, province, country))
+        return [values] if values is not None else []
+
+    return [table[location] for location in sorted(table)
+            if (city is None or location[0] == city) and
+            (province is None or location[1] == province) and
+            (country is None or location[2] == country)]
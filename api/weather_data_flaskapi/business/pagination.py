@@ -0,0 +1,96 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+CURSOR_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def encode_cursor(timestamp: datetime, record_id: int) -> str:
+    """
+    Encode the (timestamp, id) key of the last record on a page as an opaque cursor.
+
+    :param timestamp: The timestamp of the last record returned.
+    :type timestamp: datetime
+    :param record_id: The identifier of the last record returned.
+    :type record_id: int
+    :return: str
+    """
+    key = json.dumps([timestamp.strftime(CURSOR_TIMESTAMP_FORMAT), int(record_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode an opaque cursor back into its (timestamp, id) key.
+
+    :param cursor: A cursor produced by encode_cursor.
+    :type cursor: str
+    :return: A (datetime, int) tuple.
+    :raises ValueError: When the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, record_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return datetime.strptime(timestamp, CURSOR_TIMESTAMP_FORMAT), int(record_id)
+    except (binascii.Error, UnicodeError, TypeError, ValueError):
+        raise ValueError('invalid cursor')
+
+
+def keyset_query(query, model, cursor: str, limit: int):
+    """
+    Narrow a reading query to the rows of one keyset page, ordered on (timestamp, id).
+
+    :param query: The filtered reading query.
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str
+    :param limit: The maximum number of rows to return.
+    :type limit: int
+    :return: The ordered, limited query.
+    """
+    if cursor is not None:
+        timestamp, record_id = decode_cursor(cursor)
+        query = query.filter(or_(model.timestamp > timestamp,
+                                 and_(model.timestamp == timestamp,
+                                      model.id > record_id)))
+
+    return query.order_by(model.timestamp, model.id).limit(limit)
+
+
+def keyset_page(query, model, cursor: str, limit: int) -> tuple:
+    """
+    Return one page of a reading query using keyset pagination on (timestamp, id).
+
+    The page is located by seeking past the cursor's key rather than with OFFSET, so every
+    page costs the same regardless of how deep it is.
+
+    :param query: The filtered reading query.
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str
+    :param limit: The maximum number of records on the page.
+    :type limit: int
+    :return: A (records, next_cursor) tuple; next_cursor is None on the last page.
+    """
+    records = keyset_query(query, model, cursor, limit + 1).all()
+
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(records[-1].timestamp, records[-1].id)
+
+    return records, next_cursor
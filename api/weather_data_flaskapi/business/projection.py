@@ -0,0 +1,84 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from collections import OrderedDict
+
+from sqlalchemy.orm import load_only
+
+from database.locations import LOCATION_FIELDS
+
+
+def select_fields(serializer, names: list):
+    """
+    Return the part of a serializer with only the requested fields, in the serializer's order.
+
+    :param serializer: The api.model the records are marshalled with.
+    :param names: The requested field names, or None for every field.
+    :return: The serializer, or a dict with the requested fields.
+    :raises ValueError: When a name is not a field of the serializer.
+    """
+    if names is None:
+        return serializer
+
+    unknown = [name for name in names if name not in serializer]
+    if unknown:
+        raise ValueError('unknown field(s) {unknown}; expected any of {known}'.format(unknown=','.join(unknown),
+                                                                                      known=','.join(serializer)))
+
+    return OrderedDict((name, field) for name, field in serializer.items() if name in names)
+
+
+def projected_columns(model, names, *required: str) -> list:
+    """
+    Return the columns of the marshalled fields and of the fields the caller reads.
+
+    City, province and country are read through the location id.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param names: The names of the fields the records are marshalled with (e.g. a selected serializer).
+    :param required: Other columns the caller reads (e.g. timestamp for the page cursor).
+    :return: A list of columns, each once.
+    """
+    names = ['location_id' if name in LOCATION_FIELDS else name for name in list(names) + list(required)]
+
+    return [getattr(model, name) for name in dict.fromkeys(names)]
+
+
+def project_query(query, model, names, *required: str):
+    """
+    Load only the columns of the marshalled fields and of the fields the caller reads.
+
+    The primary key is always loaded.
+
+    :param query: The reading query.
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param names: The names of the fields the records are marshalled with (e.g. a selected serializer).
+    :param required: Other columns the caller reads (e.g. timestamp for the page cursor).
+    :return: The query.
+    """
+    return query.options(load_only(*projected_columns(model, names, *required)))
+
+
+def project_rows(query, model, names, *required: str):
+    """
+    Select only the columns of the marshalled fields and of the fields the caller reads, as rows.
+
+    The rows are plain result tuples rather than model instances, so they skip the ORM's identity
+    map and object construction. They are marshalled with a compiled serializer, which resolves
+    city, province and country from the location id.
+
+    :param query: The reading query.
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param names: The names of the fields the records are marshalled with (e.g. a selected serializer).
+    :param required: Other columns the caller reads (e.g. timestamp and id for the page cursor).
+    :return: The query.
+    """
+    return query.with_entities(*projected_columns(model, names, *required))
@@ -0,0 +1,448 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app
+
+from database.locations import get_location
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+# Serialized public collection responses, keyed by their normalized query parameters.
+#
+# Every entry is also listed in an index per (measurement, location) together with its time range,
+# so a write evicts only the entries of its measurement and location whose range contains one of
+# the written timestamps. An entry leaves its index when it is evicted or expires. Backends
+# (RESPONSE_CACHE_BACKEND):
+#   memory      -- an LRU in this process, bounded by RESPONSE_CACHE_MAX_ENTRIES / _MAX_BYTES. Writes
+#                  handled by another process do not evict its entries, which may then be served
+#                  for up to RESPONSE_CACHE_TTL seconds; use it with a single process only.
+#   redis       -- a Redis server shared by all processes (RESPONSE_CACHE_REDIS_URL, needs redis)
+#   local-redis -- LocalRedis, an in-process stand-in for a Redis server for tests and development
+#   None        -- no caching (the default)
+
+KEY_PREFIX = 'weather:response:'
+INDEX_PREFIX = 'weather:index:'
+GENERATION_KEY = 'weather:generation'
+
+
+class MemoryCacheBackend(object):
+    """
+    An in-process LRU of entries and indexes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.indexes = {}
+        # The (index, member) listing each entry, removed from its index with the entry
+        self.memberships = {}
+        self.size = 0
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        with self.lock:
+            self._remove(key)
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.size += len(value)
+
+            while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+
+    def delete(self, keys: list) -> None:
+        with self.lock:
+            for key in keys:
+                self._remove(key)
+
+    def add_to_index(self, index: str, member: str, key: str, ttl: int) -> None:
+        with self.lock:
+            # Already evicted, e.g. larger than max_bytes
+            if key not in self.entries:
+                return
+
+            self.indexes.setdefault(index, set()).add(member)
+            self.memberships[key] = (index, member)
+
+    def index_members(self, index: str) -> list:
+        with self.lock:
+            now = time.monotonic()
+
+            for key in [key for key, (expires, _) in self.entries.items() if expires <= now]:
+                self._remove(key)
+
+            return list(self.indexes.get(index, ()))
+
+    def remove_from_index(self, index: str, members: list) -> None:
+        with self.lock:
+            self._remove_from_index(index, members)
+
+    def current_generation(self) -> int:
+        with self.lock:
+            return self.generation
+
+    def next_generation(self) -> None:
+        with self.lock:
+            self.generation += 1
+
+    def _remove_from_index(self, index: str, members) -> None:
+        remaining = self.indexes.get(index, set()).difference(members)
+
+        if remaining:
+            self.indexes[index] = remaining
+        else:
+            self.indexes.pop(index, None)
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+
+        if entry is not None:
+            self.size -= len(entry[1])
+
+        membership = self.memberships.pop(key, None)
+
+        if membership is not None:
+            self._remove_from_index(membership[0], (membership[1],))
+
+
+class RedisCacheBackend(object):
+    """
+    Entries and indexes kept in a Redis server (or LocalRedis), shared by every process.
+
+    An index is a sorted set scored by the expiry time of each member's entry. Members of expired
+    entries are dropped whenever one is added, and the index itself expires with its newest entry.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key: str):
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, keys: list) -> None:
+        if keys:
+            self.client.delete(*keys)
+
+    def add_to_index(self, index: str, member: str, key: str, ttl: int) -> None:
+        now = time.time()
+
+        self.client.zadd(index, {member: now + ttl})
+        self.client.zremrangebyscore(index, '-inf', now)
+        self.client.expire(index, ttl)
+
+    def index_members(self, index: str) -> list:
+        return [member.decode('utf-8') if isinstance(member, bytes) else member
+                for member in self.client.zrangebyscore(index, time.time(), '+inf')]
+
+    def remove_from_index(self, index: str, members: list) -> None:
+        if members:
+            self.client.zrem(index, *members)
+
+    def current_generation(self) -> int:
+        return int(self.client.get(GENERATION_KEY) or 0)
+
+    def next_generation(self) -> None:
+        self.client.incr(GENERATION_KEY)
+
+
+class LocalRedis(object):
+    """
+    An in-process stand-in for the few Redis commands RedisCacheBackend uses.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.sorted_sets = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            value = self.values.get(key)
+
+            if value is None or value[0] <= time.monotonic():
+                self.values.pop(key, None)
+                return None
+
+            return value[1]
+
+    def set(self, key: str, value: bytes, ex: int = None):
+        with self.lock:
+            self.values[key] = (time.monotonic() + ex if ex else float('inf'), bytes(value))
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(1 for key in keys if self.values.pop(key, None) is not None)
+
+    def incr(self, key: str):
+        with self.lock:
+            value = int(self.values.get(key, (float('inf'), b'0'))[1]) + 1
+            self.values[key] = (float('inf'), str(value).encode('utf-8'))
+            return value
+
+    def zadd(self, key: str, mapping: dict):
+        with self.lock:
+            self._sorted_set(key).update((member.encode('utf-8'), score) for member, score in mapping.items())
+
+    def zrangebyscore(self, key: str, minimum, maximum) -> list:
+        with self.lock:
+            return [member for member, score in sorted(self._sorted_set(key).items(), key=lambda item: item[1])
+                    if float(minimum) <= score <= float(maximum)]
+
+    def zremrangebyscore(self, key: str, minimum, maximum):
+        with self.lock:
+            scores = self._sorted_set(key)
+            members = [member for member, score in scores.items() if float(minimum) <= score <= float(maximum)]
+
+            for member in members:
+                del scores[member]
+
+            return len(members)
+
+    def zrem(self, key: str, *members):
+        with self.lock:
+            scores = self._sorted_set(key)
+            return sum(1 for member in members if scores.pop(member.encode('utf-8'), None) is not None)
+
+    def expire(self, key: str, seconds: int):
+        with self.lock:
+            if key in self.sorted_sets:
+                self.sorted_sets[key] = (time.monotonic() + seconds, self.sorted_sets[key][1])
+
+    def _sorted_set(self, key: str) -> dict:
+        # Called with the lock held
+        expires, scores = self.sorted_sets.get(key, (float('inf'), None))
+
+        if scores is None or expires <= time.monotonic():
+            expires, scores = float('inf'), {}
+            self.sorted_sets[key] = (expires, scores)
+
+        return scores
+
+
+class ResponseCache(object):
+    """
+    Serialized responses with targeted invalidation by measurement, location and time range.
+    """
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.counters = {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'invalidated': 0}
+        self.lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """
+        The number of invalidations, kept by the backend so that every process sharing it sees
+        the same number; a response read before a write is not cached after it.
+        """
+        return self.backend.current_generation()
+
+    @staticmethod
+    def index_name(measurement: str, city: str, province: str, country: str) -> str:
+        return INDEX_PREFIX + json.dumps([measurement, country, province, city])
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        with self.lock:
+            self.counters[counter] += amount
+
+    def get(self, key: str):
+        """
+        Return a cached entry as (body bytes, headers dict), or None.
+        """
+        value = self.backend.get(key)
+
+        if value is None:
+            self.count('misses')
+            return None
+
+        header_length = int.from_bytes(value[:4], 'big')
+        headers = json.loads(value[4:4 + header_length].decode('utf-8'))
+        body = value[4 + header_length:]
+
+        self.count('hits')
+        self.count('bytes_saved', len(body))
+
+        return body, headers
+
+    def set(self, key: str, body: bytes, headers: dict, measurement: str, city: str, province: str, country: str,
+            start: datetime, end: datetime, generation: int) -> None:
+        """
+        Cache a response body and its headers for a query over [start, end].
+
+        The response is dropped if readings were invalidated since generation was read.
+        """
+        if generation != self.generation:
+            return
+
+        encoded_headers = json.dumps(headers).encode('utf-8')
+
+        self.backend.set(key, len(encoded_headers).to_bytes(4, 'big') + encoded_headers + body, self.ttl)
+        self.backend.add_to_index(self.index_name(measurement, city, province, country),
+                                  '{start}|{end}|{key}'.format(start=start.isoformat(), end=end.isoformat(), key=key),
+                                  key,
+                                  self.ttl)
+
+    def invalidate(self, measurement: str, city: str, province: str, country: str, start: datetime,
+                   end: datetime) -> int:
+        """
+        Evict the entries of a measurement and location whose range overlaps [start, end].
+
+        :return: The number of entries evicted.
+        """
+        # Bumped first, so that a response read before the write is not cached while entries are evicted
+        self.backend.next_generation()
+
+        index = self.index_name(measurement, city, province, country)
+        members = [member for member in self.backend.index_members(index)
+                   if member.split('|', 2)[0] <= end.isoformat() and member.split('|', 2)[1] >= start.isoformat()]
+
+        self.backend.delete([member.split('|', 2)[2] for member in members])
+        self.backend.remove_from_index(index, members)
+
+        self.count('invalidated', len(members))
+
+        return len(members)
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+
+        lookups = counters['hits'] + counters['misses']
+        counters['hit_ratio'] = counters['hits'] / lookups if lookups else 0.0
+
+        return counters
+
+
+_response_cache = {'instance': None, 'settings': None}
+_response_cache_lock = threading.Lock()
+
+
+def create_backend(config):
+    backend = config.get('RESPONSE_CACHE_BACKEND')
+
+    if backend == 'memory':
+        return MemoryCacheBackend(config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024),
+                                  config.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    if backend == 'redis':
+        if redis is None:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND = redis needs the redis package (pip install redis)')
+
+        return RedisCacheBackend(redis.Redis.from_url(config['RESPONSE_CACHE_REDIS_URL']))
+
+    if backend == 'local-redis':
+        return RedisCacheBackend(LocalRedis())
+
+    raise ValueError('invalid response cache backend: {backend}'.format(backend=backend))
+
+
+def get_response_cache():
+    """
+    Return the response cache configured by RESPONSE_CACHE_BACKEND, or None if caching is off.
+
+    :return: ResponseCache or None
+    """
+    config = current_app.config
+    settings = (config.get('RESPONSE_CACHE_BACKEND'),
+                config.get('RESPONSE_CACHE_REDIS_URL'),
+                config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024),
+                config.get('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024),
+                config.get('RESPONSE_CACHE_TTL', 300))
+
+    if settings[0] is None:
+        return None
+
+    with _response_cache_lock:
+        if _response_cache['settings'] != settings:
+            _response_cache['instance'] = ResponseCache(create_backend(config), settings[4])
+            _response_cache['settings'] = settings
+
+        return _response_cache['instance']
+
+
+def clear_response_cache() -> None:
+    """
+    Drop the response cache, its entries and its counters (the next request builds a new one).
+    """
+    with _response_cache_lock:
+        _response_cache['instance'] = None
+        _response_cache['settings'] = None
+
+
+def response_cache_stats() -> dict:
+    """
+    Return the response cache hit ratio, bytes saved and invalidations.
+
+    :return: dict
+    """
+    cache = get_response_cache()
+
+    return cache.stats() if cache is not None else {}
+
+
+def response_cache_key(*parts) -> str:
+    """
+    Return the cache key of the normalized query parameters of a request.
+
+    :param parts: The normalized parameters (measurement, location, range, page, media type, mask,
+                  content coding).
+    :return: str
+    """
+    return KEY_PREFIX + hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def invalidate_responses(model, readings) -> int:
+    """
+    Evict the cached responses that a write of readings may have changed.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param readings: The rollup_values() of the readings written or deleted.
+    :return: The number of entries evicted.
+    """
+    cache = get_response_cache()
+
+    if cache is None:
+        return 0
+
+    timestamps = {}
+    for reading in readings:
+        timestamps.setdefault(reading['location_id'], []).append(reading['timestamp'])
+
+    return sum(cache.invalidate(model.__tablename__, *get_location(location_id), min(values), max(values))
+               for location_id, values in timestamps.items())
@@ -0,0 +1,128 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from api.weather_data_flaskapi.business.response_cache import invalidate_responses
+from api.weather_data_flaskapi.business.rollups import rebuild_rollups
+from database import db
+from database.models import RetentionCheckpoint
+from database.partitions import delete_reading_ids, query_readings
+
+# Raw readings are compacted one day at a time:
+#   1. the day's hourly and daily rollups are rebuilt from its raw readings (the downsampled copy),
+#   2. the checkpoint moves past the day,
+#   3. the raw readings before the checkpoint are deleted in batches of batch_size, one
+#      transaction per batch.
+# An interrupted run resumes from the checkpoint: days behind it are only deleted, never rebuilt
+# from a partly deleted set of readings.
+
+
+def day_start(timestamp: datetime) -> datetime:
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+def get_checkpoint(model):
+    """
+    Return the time before which the readings of a table are compacted, or None.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    """
+    checkpoint = RetentionCheckpoint.query.get(model.__tablename__)
+
+    return checkpoint.compacted_until if checkpoint is not None else None
+
+
+def set_checkpoint(model, compacted_until: datetime) -> None:
+    checkpoint = RetentionCheckpoint.query.get(model.__tablename__)
+
+    if checkpoint is None:
+        db.session.add(RetentionCheckpoint(table_name=model.__tablename__, compacted_until=compacted_until))
+    else:
+        checkpoint.compacted_until = compacted_until
+
+    db.session.commit()
+
+
+def delete_compacted_readings(model, compacted_until: datetime, batch_size: int) -> int:
+    """
+    Delete the raw readings before a checkpoint in batches.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param compacted_until: The checkpoint.
+    :param batch_size: The number of readings deleted per transaction.
+    :return: The number of readings deleted.
+    """
+    deleted = 0
+
+    while True:
+        readings = query_readings(model, end=compacted_until) \
+            .with_entities(model.id, model.timestamp, model.location_id) \
+            .filter(model.timestamp < compacted_until) \
+            .order_by(model.timestamp) \
+            .limit(batch_size) \
+            .all()
+
+        if not readings:
+            return deleted
+
+        delete_reading_ids(model, [(reading.id, reading.timestamp) for reading in readings])
+        db.session.commit()
+        deleted += len(readings)
+
+        invalidate_responses(model, [{'location_id': reading.location_id, 'timestamp': reading.timestamp}
+                                     for reading in readings])
+
+
+def compact_readings(model, older_than: datetime, batch_size: int) -> dict:
+    """
+    Fold the raw readings before a day into the rollups and delete them.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param older_than: The cut-off; readings from the days before it are compacted.
+    :type older_than: datetime
+    :param batch_size: The number of readings deleted per transaction.
+    :type batch_size: int
+    :return: A dict with the days compacted, rollup rows written, rows deleted, seconds and rows per second.
+    """
+    started = time.time()
+    cutoff = day_start(older_than)
+    days = 0
+    written = 0
+
+    # Finish the deletes of an interrupted run
+    compacted_until = get_checkpoint(model)
+    deleted = 0
+    if compacted_until is not None:
+        deleted = delete_compacted_readings(model, min(compacted_until, cutoff), batch_size)
+
+    while True:
+        oldest = query_readings(model, end=cutoff).with_entities(func.min(model.timestamp)).scalar()
+
+        if oldest is None or oldest >= cutoff:
+            break
+
+        day = day_start(oldest)
+        written += rebuild_rollups(model, day, day + timedelta(days=1))
+        set_checkpoint(model, day + timedelta(days=1))
+        deleted += delete_compacted_readings(model, day + timedelta(days=1), batch_size)
+        days += 1
+
+    seconds = time.time() - started
+
+    return {'days': days,
+            'rollup_rows': written,
+            'deleted': deleted,
+            'seconds': seconds,
+            'rows_per_second': deleted / seconds if seconds > 0 else 0.0}
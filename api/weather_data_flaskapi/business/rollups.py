@@ -0,0 +1,288 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+
+from database import db
+from database.functions import BUCKET_EPOCH_DIALECTS, bucket_epoch
+from database.models import Humidity, Pressure, Temperature
+from database.models import HumidityHourly, HumidityDaily, PressureHourly, PressureDaily, TemperatureHourly, \
+    TemperatureDaily
+from database.partitions import query_readings
+from database.types import real_value
+
+EPOCH = datetime(1970, 1, 1)
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+ROLLUP_MODELS = {
+    Humidity: ((HumidityHourly, HOUR), (HumidityDaily, DAY)),
+    Pressure: ((PressureHourly, HOUR), (PressureDaily, DAY)),
+    Temperature: ((TemperatureHourly, HOUR), (TemperatureDaily, DAY)),
+}
+
+
+def bucket_start(timestamp: datetime, seconds: int) -> datetime:
+    """
+    Truncate a timestamp to the start of its bucket.
+
+    :param timestamp: The timestamp to truncate.
+    :type timestamp: datetime
+    :param seconds: The bucket width in seconds.
+    :type seconds: int
+    :return: datetime
+    """
+    elapsed = int((timestamp - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=elapsed - elapsed % seconds)
+
+
+def rollup_for(model, seconds: int):
+    """
+    Return the rollup model of a reading model for a bucket width, or None if there is none.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param seconds: The bucket width in seconds.
+    :type seconds: int
+    """
+    for rollup, rollup_seconds in ROLLUP_MODELS.get(model, ()):
+        if rollup_seconds == seconds:
+            return rollup
+    return None
+
+
+def rollup_values(reading) -> dict:
+    """
+    Capture the values of a reading that its rollups depend on.
+
+    :param reading: A Humidity, Pressure or Temperature object.
+    :return: dict
+    """
+    return {
+        'location_id': reading.location_id,
+        'timestamp': reading.timestamp,
+        'value': reading.value,
+    }
+
+
+def accumulate(readings, seconds: int) -> dict:
+    """
+    Sum readings per location and bucket.
+
+    :param readings: An iterable of dicts with location_id, timestamp and value.
+    :param seconds: The bucket width in seconds.
+    :type seconds: int
+    :return: A dict of (location_id, bucket) to [count, min, max, sum, sum of squares].
+    """
+    sums = {}
+
+    for reading in readings:
+        value = float(reading['value'])
+        key = (reading['location_id'], bucket_start(reading['timestamp'], seconds))
+        current = sums.get(key)
+        if current is None:
+            sums[key] = [1, value, value, value, value * value]
+        else:
+            current[0] += 1
+            current[1] = min(current[1], value)
+            current[2] = max(current[2], value)
+            current[3] += value
+            current[4] += value * value
+
+    return sums
+
+
+def location_bucket_filter(rollup, location_id: int, bucket: datetime):
+    return and_(rollup.location_id == location_id,
+                rollup.bucket == bucket)
+
+
+def merged_sums(table, added) -> dict:
+    """
+    Return the SET clause that adds sums to a rollup row in SQL, so that concurrent writers
+    accumulate rather than overwrite each other's sums.
+
+    :param table: The rollup table.
+    :param added: The sums to add, by column name (the row being inserted, or values).
+    :return: dict
+    """
+    return {'value_count': table.c.value_count + added['value_count'],
+            'value_sum': table.c.value_sum + added['value_sum'],
+            'value_sum_squares': table.c.value_sum_squares + added['value_sum_squares'],
+            'value_min': case([(table.c.value_min <= added['value_min'], table.c.value_min)],
+                              else_=added['value_min']),
+            'value_max': case([(table.c.value_max >= added['value_max'], table.c.value_max)],
+                              else_=added['value_max'])}
+
+
+def add_to_rollup(rollup, key: tuple, count: int, minimum: float, maximum: float, total: float, squares: float):
+    """
+    Add the sums of one location and bucket to a rollup row, creating the row if needed.
+    """
+    location_id, bucket = key
+    table = rollup.__table__
+    dialect = db.session.get_bind().dialect.name
+    values = {'location_id': location_id,
+              'bucket': bucket,
+              'value_count': count,
+              'value_sum': total,
+              'value_sum_squares': squares,
+              'value_min': minimum,
+              'value_max': maximum}
+
+    if dialect == 'mysql':
+        statement = mysql_insert(table).values(**values)
+        db.session.execute(statement.on_duplicate_key_update(**merged_sums(table, statement.inserted)))
+        return
+
+    if dialect == 'postgresql':
+        statement = postgresql_insert(table).values(**values)
+        db.session.execute(statement.on_conflict_do_update(index_elements=[table.c.location_id, table.c.bucket],
+                                                           set_=merged_sums(table, statement.excluded)))
+        return
+
+    # Elsewhere (SQLite, which has a single writer at a time) the row is updated in place, and
+    # inserted when there is none
+    updated = db.session.execute(table.update()
+                                 .where(location_bucket_filter(rollup, location_id, bucket))
+                                 .values(**merged_sums(table, values)))
+
+    if updated.rowcount == 0:
+        db.session.execute(table.insert().values(**values))
+
+
+def add_readings_to_rollups(model, readings) -> None:
+    """
+    Add new readings to the hourly and daily rollups of their reading table.
+
+    The rollup rows are changed in the current transaction; the caller commits.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param readings: An iterable of dicts with location_id, timestamp and value.
+    """
+    readings = list(readings)
+
+    for rollup, seconds in ROLLUP_MODELS[model]:
+        for key, sums in accumulate(readings, seconds).items():
+            add_to_rollup(rollup, key, *sums)
+
+
+def remove_reading_from_rollups(model, reading: dict) -> None:
+    """
+    Remove a reading that was deleted or changed from the hourly and daily rollups.
+
+    Count, sum and sum of squares are decremented in SQL rather than read, changed and written
+    back, so concurrent writers do not lose each other's changes. When the removed value was the
+    bucket's minimum or maximum, both are recomputed from the bucket's remaining raw readings, so
+    the raw change must already be pending in the session.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param reading: The reading's values before the change, from rollup_values().
+    :type reading: dict
+    """
+    value = float(reading['value'])
+
+    for rollup, seconds in ROLLUP_MODELS[model]:
+        table = rollup.__table__
+        bucket = bucket_start(reading['timestamp'], seconds)
+        match = location_bucket_filter(rollup, reading['location_id'], bucket)
+
+        # Decremented in SQL, which also locks the row until the caller commits
+        removed = db.session.execute(table.update()
+                                     .where(match)
+                                     .values(value_count=table.c.value_count - 1,
+                                             value_sum=table.c.value_sum - value,
+                                             value_sum_squares=table.c.value_sum_squares - value * value))
+
+        if removed.rowcount == 0:
+            continue
+
+        count, row_minimum, row_maximum = db.session.execute(
+            select([table.c.value_count, table.c.value_min, table.c.value_max]).where(match)).first()
+
+        if count <= 0:
+            db.session.execute(table.delete().where(match))
+        elif value <= row_minimum or value >= row_maximum:
+            bucket_end = bucket + timedelta(seconds=seconds)
+            minimum, maximum = query_readings(model, bucket, bucket_end).with_entities(
+                func.min(model.value), func.max(model.value)).filter(
+                and_(model.location_id == reading['location_id'],
+                     model.timestamp >= bucket,
+                     model.timestamp < bucket_end)).one()
+
+            if minimum is None:
+                db.session.execute(table.delete().where(match))
+            else:
+                db.session.execute(table.update()
+                                   .where(match)
+                                   .values(value_min=float(minimum), value_max=float(maximum)))
+
+
+def rebuild_rollups(model, start: datetime, end: datetime) -> int:
+    """
+    Recompute the rollup rows of a reading table for the buckets within [start, end).
+
+    start and end must fall on day boundaries so that no bucket is only partly rebuilt.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param start: The start of the range (inclusive).
+    :type start: datetime
+    :param end: The end of the range (exclusive).
+    :type end: datetime
+    :return: The number of rollup rows written.
+    """
+    written = 0
+    in_range = and_(model.timestamp >= start, model.timestamp < end)
+
+    for rollup, seconds in ROLLUP_MODELS[model]:
+        rollup.query.filter(and_(rollup.bucket >= start, rollup.bucket < end)).delete(synchronize_session=False)
+
+        if db.session.get_bind().dialect.name in BUCKET_EPOCH_DIALECTS:
+            bucket = bucket_epoch(model.timestamp, seconds).label('bucket')
+            value = real_value(model.value)
+            rows = query_readings(model, start, end) \
+                .with_entities(model.location_id,
+                               bucket,
+                               func.count(model.value),
+                               func.min(value),
+                               func.max(value),
+                               func.sum(value),
+                               func.sum(value * value)) \
+                .filter(in_range) \
+                .group_by(model.location_id, bucket) \
+                .all()
+            sums = {(location_id, EPOCH + timedelta(seconds=int(epoch))): values
+                    for location_id, epoch, *values in rows}
+        else:
+            readings = query_readings(model, start, end) \
+                .with_entities(model.location_id, model.timestamp, model.value) \
+                .filter(in_range) \
+                .yield_per(10000)
+            sums = accumulate((reading._asdict() for reading in readings), seconds)
+
+        db.session.bulk_insert_mappings(rollup, [{'location_id': location_id,
+                                                  'bucket': bucket,
+                                                  'value_count': int(count),
+                                                  'value_min': float(minimum),
+                                                  'value_max': float(maximum),
+                                                  'value_sum': float(total),
+                                                  'value_sum_squares': float(squares)}
+                                                 for (location_id, bucket), (count, minimum, maximum, total, squares)
+                                                 in sums.items()])
+        written += len(sums)
+
+    db.session.commit()
+
+    return written
@@ -9,16 +9,51 @@
 @deffield    updated: 2017-06-14
 """
 
+import atexit
+import logging
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from functools import lru_cache
 
+from flask import current_app
 from flask_jwt import JWTError
-from passlib.hash import sha512_crypt
-from sqlalchemy import and_
+from passlib.context import CryptContext
+from sqlalchemy import and_, bindparam
+from sqlalchemy.orm.exc import NoResultFound
 
 from database import db
 from database.models import User
 
+log = logging.getLogger(__name__)
+
+# Users resolved from JWT payloads, by user id, least recently used first. Each entry is
+# (expiry time, detached User). Entries are dropped when the user changes in this process and
+# expire after IDENTITY_CACHE_TTL seconds, which bounds how long other processes serve a stale user.
+_identities = OrderedDict()
+_identities_lock = threading.Lock()
+_identity_counters = {'hits': 0, 'misses': 0}
+
+# Last login dates waiting to be written, by user id. They are written together with one batched
+# UPDATE LAST_LOGIN_FLUSH_INTERVAL seconds after the first pending login, and at exit.
+_pending_logins = {}
+_pending_logins_lock = threading.Lock()
+_login_flush = {'timer': None, 'app': None}
+
+# Password hashing runs in a pool of PASSWORD_HASH_WORKERS processes (passlib holds the GIL while
+# hashing). At most PASSWORD_HASH_MAX_PENDING jobs are queued or running; more are rejected so a
+# login storm cannot tie up every request worker. A job not done within PASSWORD_HASH_TIMEOUT
+# seconds is abandoned by its caller, but counts as pending until its worker is done with it. A
+# pool whose worker died is replaced, and the job that found it broken runs in the calling thread.
+# The pool is shut down, waiting for its jobs, at exit.
+_hash_pool = {'executor': None, 'workers': 0, 'started': time.monotonic()}
+_hash_pool_lock = threading.Lock()
+_hash_counters = {'pending': 0, 'completed': 0, 'rejected': 0, 'timeouts': 0, 'restarts': 0, 'busy_seconds': 0.0}
+
 
 class PasswordException(Exception):
     """
@@ -35,14 +70,217 @@ class PasswordException(Exception):
         self.message = message
 
 
+class PasswordHashingUnavailable(Exception):
+    """
+    Exception when the password hashing pool is saturated
+    """
+
+    def __init__(self, message):
+        """
+        Constructor.
+
+        :param message: The error message.
+        :type message: str
+        """
+        self.message = message
+
+
 def salt_password(password, salt):
     return '%s%s' % (password, salt)
 
 
+@lru_cache(maxsize=8)
+def build_password_context(schemes: tuple, settings: tuple) -> CryptContext:
+    """
+    Build the passlib context that hashes and verifies passwords.
+
+    The first scheme hashes new passwords; hashes of the other schemes, or with rounds outside
+    the configured bounds, are replaced at the next successful login.
+
+    :param schemes: The passlib scheme names, preferred first (e.g. ('bcrypt', 'sha512_crypt')).
+    :type schemes: tuple
+    :param settings: The CryptContext keyword settings as (name, value) pairs
+                     (e.g. (('sha512_crypt__default_rounds', 100000),)).
+    :type settings: tuple
+    :return: CryptContext
+    """
+    return CryptContext(schemes=list(schemes), deprecated='auto', **dict(settings))
+
+
+def password_settings(config=None) -> tuple:
+    """
+    Return the (schemes, settings) arguments of build_password_context() configured by
+    PASSWORD_HASH_SCHEMES and PASSWORD_HASH_SETTINGS.
+
+    :param config: The configuration mapping (default: the current application's).
+    :return: tuple
+    """
+    config = current_app.config if config is None else config
+
+    return (tuple(config.get('PASSWORD_HASH_SCHEMES', ('sha512_crypt',))),
+            tuple(sorted(config.get('PASSWORD_HASH_SETTINGS', {}).items())))
+
+
+def password_context(config=None) -> CryptContext:
+    """
+    Return the passlib context configured by PASSWORD_HASH_SCHEMES and PASSWORD_HASH_SETTINGS.
+
+    :param config: The configuration mapping (default: the current application's).
+    :return: CryptContext
+    """
+    return build_password_context(*password_settings(config))
+
+
+def _hash_password(schemes: tuple, settings: tuple, secret: str) -> tuple:
+    started = time.perf_counter()
+    hashed = build_password_context(schemes, settings).hash(secret)
+    return hashed, time.perf_counter() - started
+
+
+def _verify_password(schemes: tuple, settings: tuple, secret: str, hashed: str) -> tuple:
+    started = time.perf_counter()
+    result = build_password_context(schemes, settings).verify_and_update(secret, hashed)
+    return result, time.perf_counter() - started
+
+
+def _hash_executor(workers: int) -> ProcessPoolExecutor:
+    if _hash_pool['executor'] is None or _hash_pool['workers'] != workers:
+        if _hash_pool['executor'] is not None:
+            _hash_pool['executor'].shutdown(wait=False)
+
+        _hash_pool['executor'] = ProcessPoolExecutor(max_workers=workers)
+        _hash_pool['workers'] = workers
+        _hash_pool['started'] = time.monotonic()
+        _hash_counters['busy_seconds'] = 0.0
+
+    return _hash_pool['executor']
+
+
+def _replace_broken_executor(executor: ProcessPoolExecutor) -> None:
+    with _hash_pool_lock:
+        # Another thread may have replaced it already
+        if _hash_pool['executor'] is executor:
+            _hash_pool['executor'] = None
+            _hash_counters['restarts'] += 1
+
+    executor.shutdown(wait=False)
+
+
+def _hash_job_done(future) -> None:
+    # Called when a pool job finishes, is cancelled or fails
+    elapsed = future.result()[1] if not future.cancelled() and future.exception() is None else 0.0
+
+    with _hash_pool_lock:
+        _hash_counters['pending'] -= 1
+        _hash_counters['busy_seconds'] += elapsed
+
+
+def shutdown_password_hashing() -> None:
+    """
+    Shut the password hashing pool down, waiting for its jobs (at exit, and in tests).
+
+    Jobs submitted afterwards start a new pool.
+    """
+    with _hash_pool_lock:
+        executor = _hash_pool['executor']
+        _hash_pool['executor'] = None
+
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+atexit.register(shutdown_password_hashing)
+
+
+def run_password_hashing(function, *args):
+    """
+    Run _hash_password or _verify_password in the password hashing pool and wait for the result.
+
+    With PASSWORD_HASH_WORKERS = 0 the function runs in the calling thread, as it does when a
+    pool worker died: the broken pool is replaced for the next job.
+
+    :param function: _hash_password or _verify_password.
+    :param args: The function's arguments.
+    :raises PasswordHashingUnavailable: if PASSWORD_HASH_MAX_PENDING jobs are already queued or running,
+                                        or the job is not done within PASSWORD_HASH_TIMEOUT seconds.
+    """
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 2)
+    timeout = current_app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+
+    with _hash_pool_lock:
+        if workers > 0 and _hash_counters['pending'] >= current_app.config.get('PASSWORD_HASH_MAX_PENDING', 16):
+            _hash_counters['rejected'] += 1
+            raise PasswordHashingUnavailable(message='Password hashing is saturated, retry later.')
+
+        _hash_counters['pending'] += 1
+        executor = _hash_executor(workers) if workers > 0 else None
+
+    # A submitted job leaves the pending count when it finishes (see _hash_job_done), even if
+    # its caller stopped waiting for it; other jobs leave it here
+    future = None
+    elapsed = 0.0
+    try:
+        if executor is None:
+            result, elapsed = function(*args)
+        else:
+            try:
+                future = executor.submit(function, *args)
+                future.add_done_callback(_hash_job_done)
+                result, _ = future.result(timeout=timeout)
+            except BrokenProcessPool:
+                log.exception('A password hashing worker died; replacing the pool and hashing in this thread')
+                _replace_broken_executor(executor)
+                result, elapsed = function(*args)
+            except FutureTimeoutError:
+                # Only a job still queued is cancelled; a running one keeps its worker busy
+                future.cancel()
+                log.error('Password hashing took more than {timeout} seconds'.format(timeout=timeout))
+
+                with _hash_pool_lock:
+                    _hash_counters['timeouts'] += 1
+
+                raise PasswordHashingUnavailable(message='Password hashing timed out, retry later.')
+    finally:
+        with _hash_pool_lock:
+            if future is None:
+                _hash_counters['pending'] -= 1
+            _hash_counters['busy_seconds'] += elapsed
+
+    with _hash_pool_lock:
+        _hash_counters['completed'] += 1
+
+    return result
+
+
+def password_hashing_stats() -> dict:
+    """
+    Return the password hashing pool's size, queue depth and utilization.
+
+    utilization is the share of the pool's worker time spent hashing since the pool started.
+
+    :return: dict
+    """
+    with _hash_pool_lock:
+        workers = _hash_pool['workers']
+        uptime = time.monotonic() - _hash_pool['started']
+
+        return {'workers': workers,
+                'pending': _hash_counters['pending'],
+                'busy': min(_hash_counters['pending'], workers),
+                'completed': _hash_counters['completed'],
+                'rejected': _hash_counters['rejected'],
+                'timeouts': _hash_counters['timeouts'],
+                'restarts': _hash_counters['restarts'],
+                'utilization': _hash_counters['busy_seconds'] / (workers * uptime) if workers and uptime else 0.0}
+
+
 def authenticate(username: str, password: str):
     """
     Authenticate a user using their username and a supplied password.
 
+    The user is loaded with a single query. A password hash using an outdated scheme or cost is
+    replaced with a current one, and the last login date is recorded with record_login().
+
     :param username: The user's username.
     :type username: str
     :param password: The user's candidate password provided at login.
@@ -52,17 +290,103 @@ def authenticate(username: str, password: str):
     try:
         user = User.query.filter(and_(User.username == username, User.enabled == 1)).one()
 
-        if user.enabled and sha512_crypt.verify(
-                salt_password(password, user.salt),
-                user.password):
-            update_last_login_date(username=username)
-            return user
-        else:
+        valid, new_hash = run_password_hashing(_verify_password,
+                                               *password_settings(),
+                                               salt_password(password, user.salt),
+                                               user.password)
+
+        if not valid:
             return None
-    except Exception as exception:
+
+        if new_hash is not None:
+            user.password = new_hash
+            db.session.commit()
+
+        record_login(user)
+
+        return user
+    except PasswordHashingUnavailable as exception:
+        raise JWTError(error='Service unavailable',
+                       description=exception.message,
+                       status_code=503,
+                       headers={'Retry-After': '1'})
+    except (NoResultFound, ValueError):
+        # No enabled user of that name, or a stored hash passlib cannot identify; other failures
+        # (the database, the hashing pool) are server errors rather than bad credentials
         raise JWTError(error='Invalid credential', description='Stop hacking', status_code=401)
 
 
+def record_login(user: User) -> None:
+    """
+    Record a user's login date.
+
+    With LAST_LOGIN_FLUSH_INTERVAL > 0 the date is queued for the next batched flush instead of
+    being written by the login request.
+
+    :param user: The user that logged in.
+    :type user: User
+    """
+    interval = current_app.config.get('LAST_LOGIN_FLUSH_INTERVAL', 10)
+
+    if interval <= 0:
+        user.last_login_date = datetime.utcnow()
+        db.session.commit()
+        return
+
+    with _pending_logins_lock:
+        _pending_logins[user.id] = datetime.utcnow()
+        _login_flush['app'] = current_app._get_current_object()
+
+        if _login_flush['timer'] is None:
+            timer = threading.Timer(interval, flush_pending_logins)
+            timer.daemon = True
+            timer.start()
+            _login_flush['timer'] = timer
+
+
+def flush_last_login_dates() -> int:
+    """
+    Write the queued last login dates with one batched UPDATE.
+
+    Must be called within an application context.
+
+    :return: The number of users updated.
+    """
+    with _pending_logins_lock:
+        pending = list(_pending_logins.items())
+        _pending_logins.clear()
+        timer = _login_flush['timer']
+        _login_flush['timer'] = None
+
+    if timer is not None:
+        timer.cancel()
+
+    if pending:
+        table = User.__table__
+
+        with db.engine.begin() as connection:
+            connection.execute(table.update()
+                               .where(table.c.id == bindparam('user_id'))
+                               .values(last_login_date=bindparam('login_date')),
+                               [{'user_id': user_id, 'login_date': login_date} for user_id, login_date in pending])
+
+    return len(pending)
+
+
+def flush_pending_logins() -> None:
+    """
+    Write the queued last login dates outside of a request (flush timer and exit).
+    """
+    app = _login_flush['app']
+
+    if app is not None:
+        with app.app_context():
+            flush_last_login_dates()
+
+
+atexit.register(flush_pending_logins)
+
+
 def username_is_available(username: str) -> bool:
     """
     Checks if the username is available.
@@ -91,7 +415,7 @@ def create_user(data):
 
     if username_is_available(username):
         salt = str(uuid.uuid4())
-        encrypted_password = sha512_crypt.hash(salt_password(password, salt))
+        encrypted_password = run_password_hashing(_hash_password, *password_settings(), salt_password(password, salt))
 
         user = User(username=username,
                     password=encrypted_password,
@@ -112,8 +436,10 @@ def delete_user(username: str):
     :return: None
     """
     user = User.query.filter(User.username == username).one()
+    user_id = user.id
     db.session.delete(user)
     db.session.commit()
+    invalidate_identity(user_id)
 
 
 def disable_user(username: str) -> User:
@@ -128,6 +454,7 @@ def disable_user(username: str) -> User:
 
     db.session.add(user)
     db.session.commit()
+    invalidate_identity(user.id)
 
     return user
 
@@ -144,6 +471,7 @@ def enable_user(username: str) -> User:
 
     db.session.add(user)
     db.session.commit()
+    invalidate_identity(user.id)
 
     return user
 
@@ -181,17 +509,89 @@ def update_password(username: str, password: str, new_password: str, salt: str)
     """
     user = User.query.filter(User.username == username).one()
 
-    if sha512_crypt.verify(salt_password(password, salt), user.password):
-        user.password = sha512_crypt.hash(salt_password(new_password, salt))
+    valid, new_hash = run_password_hashing(_verify_password, *password_settings(), salt_password(password, salt),
+                                           user.password)
+
+    if valid:
+        user.password = run_password_hashing(_hash_password, *password_settings(), salt_password(new_password, salt))
         db.session.add(user)
         db.session.commit()
+        invalidate_identity(user.id)
 
         return user
     else:
         raise PasswordException(message='Current password is not correct.')
 
 
+def invalidate_identity(user_id: int) -> None:
+    """
+    Drop a user from the identity cache.
+
+    :param user_id: The user's id.
+    :type user_id: int
+    """
+    with _identities_lock:
+        _identities.pop(user_id, None)
+
+
+def clear_identities() -> None:
+    """
+    Empty the identity cache and reset its counters.
+    """
+    with _identities_lock:
+        _identities.clear()
+        _identity_counters['hits'] = 0
+        _identity_counters['misses'] = 0
+
+
+def identity_cache_stats() -> dict:
+    """
+    Return the identity cache hit and miss counters and size.
+
+    :return: dict
+    """
+    with _identities_lock:
+        hits = _identity_counters['hits']
+        misses = _identity_counters['misses']
+
+        return {'hits': hits,
+                'misses': misses,
+                'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+                'size': len(_identities)}
+
+
 def identity(payload):
+    """
+    Resolve the user of a JWT payload, from the identity cache when possible.
+
+    :param payload: The decoded JWT payload.
+    :return: User
+    """
     user_id = payload['identity']
+    max_size = current_app.config.get('IDENTITY_CACHE_SIZE', 1024)
+    now = time.monotonic()
+
+    with _identities_lock:
+        cached = _identities.get(user_id)
+
+        if cached is not None and cached[0] > now:
+            _identities.move_to_end(user_id)
+            _identity_counters['hits'] += 1
+            return cached[1]
+
+        _identity_counters['misses'] += 1
+
     user = User.query.filter(User.id == user_id).one()
+
+    if max_size > 0:
+        # Detached so that later commits in the request do not expire the cached copy
+        db.session.expunge(user)
+
+        with _identities_lock:
+            _identities[user_id] = (now + current_app.config.get('IDENTITY_CACHE_TTL', 300), user)
+            _identities.move_to_end(user_id)
+
+            while len(_identities) > max_size:
+                _identities.popitem(last=False)
+
     return user
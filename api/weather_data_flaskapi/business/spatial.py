@@ -0,0 +1,85 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import math
+
+from sqlalchemy import and_, case, or_
+
+from database.geohash import END, KM_PER_DEGREE, cover, distance_box
+from database.types import real_value
+
+# Public positions are truncated towards zero to 0.001 degrees, and geohashes are computed from
+# them, so a search on exact positions widens its geohash cells by that much.
+PUBLIC_POSITION_MARGIN = 0.001
+
+
+def spatial_area(model, bbox: tuple = None, near: tuple = None, radius_km: float = None, public: bool = True):
+    """
+    Return the criterion testing reading positions against a bounding box or circle, and its bounding box.
+
+    Distances use an equirectangular approximation, which is accurate to well under 1% for radii
+    up to a few hundred kilometres. Longitude differences are taken the short way round, so
+    circles and boxes (with west > east) may cross the antimeridian.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param bbox: The (west, south, east, north) bounding box, or None.
+    :param near: The (latitude, longitude) of the centre of a circle, or None.
+    :param radius_km: The radius of the circle in kilometres.
+    :param public: True to test the public positions, False to test the exact positions.
+    :return: A (SQL criterion, (south, west, north, east)) tuple; east is more than 180, or west
+             less than -180, when the area crosses the antimeridian.
+    """
+    latitude = model.latitude_public if public else model.latitude
+    longitude = model.longitude_public if public else model.longitude
+
+    if bbox is not None:
+        west, south, east, north = bbox
+
+        if west > east:
+            return and_(latitude >= south, latitude <= north, or_(longitude >= west, longitude <= east)), \
+                (south, west, north, east + 360.0)
+
+        return and_(latitude >= south, latitude <= north, longitude >= west, longitude <= east), \
+            (south, west, north, east)
+
+    difference = real_value(longitude) - near[1]
+    difference = case([(difference > 180.0, difference - 360.0), (difference < -180.0, difference + 360.0)],
+                      else_=difference)
+
+    latitude_distance = real_value(latitude) - near[0]
+    longitude_distance = difference * math.cos(math.radians(near[0]))
+
+    return latitude_distance * latitude_distance + longitude_distance * longitude_distance <= \
+        (radius_km / KM_PER_DEGREE) ** 2, distance_box(near[0], near[1], radius_km)
+
+
+def spatial_filter(model, bbox: tuple = None, near: tuple = None, radius_km: float = None, public: bool = True,
+                   max_cells: int = 32):
+    """
+    Return the criterion selecting readings inside a bounding box or within a distance of a point.
+
+    The readings are first narrowed to the index ranges of the geohash cells covering the area,
+    then tested against the area itself.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param bbox: The (west, south, east, north) bounding box, or None.
+    :param near: The (latitude, longitude) of the centre of a circle, or None.
+    :param radius_km: The radius of the circle in kilometres.
+    :param public: True to test the public positions, False to test the exact positions.
+    :param max_cells: The maximum number of geohash cells covering the area.
+    :return: A SQL criterion.
+    """
+    area, (south, west, north, east) = spatial_area(model, bbox, near, radius_km, public)
+
+    margin = 0.0 if public else PUBLIC_POSITION_MARGIN
+    prefixes = cover(south - margin, west - margin, north + margin, east + margin, max_cells=max_cells)
+
+    return and_(or_(*[and_(model.geohash >= prefix, model.geohash < prefix + END) for prefix in prefixes]), area)
@@ -9,8 +9,267 @@
 @deffield    updated: 2017-06-14
 """
 
+import logging
+from datetime import datetime
+from math import isfinite
+
+import pytz
+from dateutil import parser as date_parser
+from sqlalchemy import and_
+from sqlalchemy.exc import SQLAlchemyError
+
+from api.weather_data_flaskapi.business.rollups import add_readings_to_rollups, remove_reading_from_rollups, \
+    rollup_values
+from api.weather_data_flaskapi.business.latest import record_latest, refresh_latest, remove_latest
+from api.weather_data_flaskapi.business.projection import project_query
+from api.weather_data_flaskapi.business.response_cache import invalidate_responses
 from database import db
-from database.models import Humidity, Pressure, Temperature
+from database.geohash import encode as encode_geohash
+from database.locations import find_location_id, get_location_id
+from database.model_exceptions import LatitudeValueError, LongitudeValueError
+from database.partitions import add_reading, bulk_insert_readings, delete_reading, get_reading, query_readings, \
+    save_reading
+from database.models import Humidity, Location, Pressure, Temperature
+
+log = logging.getLogger(__name__)
+
+REQUIRED_READING_FIELDS = ('value',
+                           'value_units',
+                           'latitude',
+                           'longitude',
+                           'city',
+                           'province',
+                           'country',
+                           'elevation',
+                           'elevation_units',
+                           'timestamp')
+
+NUMERIC_READING_FIELDS = ('value', 'value_error_range', 'latitude', 'longitude', 'elevation')
+
+# The most characters each text field's column holds (the same in every reading table)
+TEXT_READING_FIELD_LENGTHS = {'value_units': Humidity.__table__.c.value_units.type.length,
+                              'elevation_units': Humidity.__table__.c.elevation_units.type.length,
+                              'city': Location.__table__.c.city.type.length,
+                              'province': Location.__table__.c.province.type.length,
+                              'country': Location.__table__.c.country.type.length}
+
+
+def parse_timestamp(value) -> datetime:
+    """
+    Parse a reading timestamp into a naive UTC datetime.
+
+    :param value: An ISO 8601 string or a datetime.
+    :return: datetime
+    """
+    if value is None or isinstance(value, datetime):
+        timestamp = value
+    else:
+        timestamp = date_parser.parse(value)
+
+    if timestamp is not None and timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(pytz.utc).replace(tzinfo=None)
+
+    return timestamp
+
+
+def reading_mapping(data) -> dict:
+    """
+    Validate JSON data for a reading and convert it to a column mapping.
+
+    :param data: JSON data for a new reading.
+    :return: dict
+    """
+    if not isinstance(data, dict):
+        raise ValueError('record must be a JSON object')
+
+    missing = [name for name in REQUIRED_READING_FIELDS if data.get(name) is None]
+    if missing:
+        raise ValueError('missing required field(s): {fields}'.format(fields=', '.join(missing)))
+
+    for name in NUMERIC_READING_FIELDS:
+        value = data.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or
+                                  not isfinite(value)):
+            raise ValueError('{name} must be a finite number'.format(name=name))
+
+    for name, length in TEXT_READING_FIELD_LENGTHS.items():
+        if not isinstance(data[name], str):
+            raise ValueError('{name} must be a string'.format(name=name))
+
+        if len(data[name]) > length:
+            raise ValueError('{name} longer than {length} characters'.format(name=name, length=length))
+
+    try:
+        timestamp = parse_timestamp(data.get('timestamp'))
+    except (ValueError, TypeError, OverflowError):
+        raise ValueError('timestamp must be an ISO 8601 date and time')
+
+    latitude = float(data.get('latitude'))
+    longitude = float(data.get('longitude'))
+
+    if latitude < -90.0 or latitude > 90.0:
+        raise LatitudeValueError('latitude out of range (-90 to 90)')
+
+    if longitude < -180.0 or longitude > 180.0:
+        raise LongitudeValueError('longitude out of range (-180 to 180)')
+
+    mapping = {
+        'value': float(data.get('value')),
+        'value_units': data.get('value_units'),
+        'value_error_range': float(data.get('value_error_range') or 0.0),
+        'latitude': latitude,
+        'latitude_public': float(int(latitude * 1000)) / 1000,
+        'longitude': longitude,
+        'longitude_public': float(int(longitude * 1000)) / 1000,
+        'elevation': float(data.get('elevation')),
+        'elevation_units': data.get('elevation_units'),
+        'timestamp': timestamp,
+    }
+    mapping['geohash'] = encode_geohash(mapping['latitude_public'], mapping['longitude_public'])
+
+    # Resolved last so that rows failing validation do not add locations
+    mapping['location_id'] = get_location_id(data.get('city'), data.get('province'), data.get('country'))
+
+    return mapping
+
+
+def get_readings(model, start: datetime, end: datetime, city: str = None, province: str = None,
+                 country: str = None):
+    """
+    Build the query for the readings recorded at a location (or anywhere) within a date range.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param start: The start of the date range (inclusive).
+    :param end: The end of the date range (inclusive).
+    :param city: The location's city, or None with province and country for every location.
+    :param province: The location's province.
+    :param country: The location's country.
+    :return: The unordered query.
+    """
+    query = query_readings(model, start, end).filter(
+        and_(model.timestamp >= start,
+             model.timestamp <= end))
+
+    if city is None and province is None and country is None:
+        return query
+
+    # An unknown location has no id and matches no readings, as location_id is never NULL
+    return query.filter(model.location_id == find_location_id(city, province, country))
+
+
+def get_location_readings(model, locations: list, start: datetime, end: datetime, fields: list = None) -> dict:
+    """
+    Return the readings recorded at several locations within a date range, with one query.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param locations: A list of (city, province, country) tuples.
+    :param start: The start of the date range (inclusive).
+    :param end: The end of the date range (inclusive).
+    :param fields: The names of the fields the readings are marshalled with, or None to load every column.
+    :return: A dict of each location to its readings, ordered by timestamp.
+    """
+    readings = {location: [] for location in locations}
+
+    # Unknown locations have no readings and are left out of the query
+    location_ids = {}
+    for location in locations:
+        location_id = find_location_id(*location)
+        if location_id is not None:
+            location_ids[location_id] = location
+
+    if not location_ids:
+        return readings
+
+    query = query_readings(model, start, end).filter(
+        and_(model.location_id.in_(list(location_ids)),
+             model.timestamp >= start,
+             model.timestamp <= end)).order_by(model.location_id, model.timestamp, model.id)
+
+    if fields is not None:
+        query = project_query(query, model, fields, 'location_id')
+
+    for reading in query:
+        readings[location_ids[reading.location_id]].append(reading)
+
+    return readings
+
+
+def create_readings(model, rows) -> list:
+    """
+    Creates reading records in bulk.
+
+    Each row is validated on its own by reading_mapping() (types, ranges and text lengths), so a
+    bad row fails only itself; the valid rows are then inserted with one multi-row INSERT in a
+    single transaction. When the transaction fails it is rolled back and every valid row gets a
+    500 status instead of 201.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param rows: A list of JSON reading objects.
+    :return: A list with one status entry per submitted row.
+    """
+    mappings = []
+    statuses = []
+
+    for index, data in enumerate(rows):
+        try:
+            mappings.append(reading_mapping(data))
+            statuses.append({'index': index, 'status': 201, 'message': 'Created'})
+        except (ValueError, TypeError) as error:
+            statuses.append({'index': index, 'status': 400, 'message': 'Bad request: {error}'.format(error=error)})
+
+    if not mappings:
+        return statuses
+
+    try:
+        commit_readings({model: mappings})
+    except SQLAlchemyError:
+        db.session.rollback()
+        log.exception('Writing a batch of {count} {table} readings failed'.format(count=len(mappings),
+                                                                                  table=model.__tablename__))
+
+        for status in statuses:
+            if status['status'] == 201:
+                status.update(status=500, message='Internal server error: the batch could not be written')
+
+        return statuses
+
+    readings_committed({model: mappings})
+
+    return statuses
+
+
+def insert_readings(readings: dict) -> None:
+    """
+    Insert validated readings of one or more measurements in a single transaction.
+
+    :param readings: A dict of each reading model to the reading_mapping() mappings of its new readings.
+    """
+    commit_readings(readings)
+    readings_committed(readings)
+
+
+def commit_readings(readings: dict) -> None:
+    """
+    Insert validated readings and their rollups, and commit.
+
+    :param readings: A dict of each reading model to the reading_mapping() mappings of its new readings.
+    """
+    for model, mappings in readings.items():
+        bulk_insert_readings(model, mappings)
+        add_readings_to_rollups(model, mappings)
+
+    db.session.commit()
+
+
+def readings_committed(readings: dict) -> None:
+    """
+    Evict the cached responses and refresh the latest readings that committed readings changed.
+
+    :param readings: A dict of each reading model to the reading_mapping() mappings of its new readings.
+    """
+    for model, mappings in readings.items():
+        invalidate_responses(model, mappings)
+        refresh_latest(model, {mapping['location_id'] for mapping in mappings})
 
 
 def create_humidity(data) -> Humidity:
@@ -30,7 +289,7 @@ def create_humidity(data) -> Humidity:
     country = data.get('country')
     elevation = data.get('elevation')
     elevation_units = data.get('elevation_units')
-    timestamp = data.get('timestamp')
+    timestamp = parse_timestamp(data.get('timestamp'))
 
     humidity = Humidity(value=value,
                         value_units=value_units,
@@ -44,12 +303,25 @@ def create_humidity(data) -> Humidity:
                         elevation_units=elevation_units,
                         timestamp=timestamp)
 
-    db.session.add(humidity)
+    add_reading(Humidity, humidity)
+    add_readings_to_rollups(Humidity, [rollup_values(humidity)])
     db.session.commit()
+    invalidate_responses(Humidity, [rollup_values(humidity)])
+    record_latest(Humidity, humidity)
 
     return humidity
 
 
+def create_humidity_batch(rows) -> list:
+    """
+    Creates humidity records in bulk.
+
+    :param rows: A list of JSON data for new Humidity objects.
+    :return: A list with one status entry per submitted row.
+    """
+    return create_readings(Humidity, rows)
+
+
 def update_humidity(humidity_id: int, data) -> Humidity:
     """
     Update a humidity record in the database.
@@ -58,23 +330,29 @@ def update_humidity(humidity_id: int, data) -> Humidity:
     :param data: Updated JSON data for an existing Humidity object.
     :return: Humidity
     """
-    humidity = Humidity.query.filter(Humidity.id == humidity_id).one()
+    humidity = get_reading(Humidity, humidity_id)
+    previous_values = rollup_values(humidity)
+
     humidity.value = data.get('value')
     humidity.value_units = data.get('value_units')
     humidity.value_error_range = data.get('value_error_range')
     humidity.latitude = data.get('latitude')
-    humidity.latitude_public_public = float(int(humidity.latitude * 1000)) / 1000
+    humidity.latitude_public = float(int(humidity.latitude * 1000)) / 1000
     humidity.longitude = data.get('longitude')
     humidity.longitude_public = float(int(humidity.longitude * 1000)) / 1000
-    humidity.city = data.get('city')
-    humidity.province = data.get('province')
-    humidity.country = data.get('country')
+    humidity.geohash = encode_geohash(humidity.latitude_public, humidity.longitude_public)
+    humidity.location_id = get_location_id(data.get('city'), data.get('province'), data.get('country'))
     humidity.elevation = data.get('elevation')
     humidity.elevation_units = data.get('elevation_units')
-    humidity.timestamp = data.get('timestamp')
+    humidity.timestamp = parse_timestamp(data.get('timestamp'))
+    humidity.revision += 1
 
-    db.session.add(humidity)
+    save_reading(Humidity, humidity, previous_values['timestamp'])
+    remove_reading_from_rollups(Humidity, previous_values)
+    add_readings_to_rollups(Humidity, [rollup_values(humidity)])
     db.session.commit()
+    invalidate_responses(Humidity, [previous_values, rollup_values(humidity)])
+    record_latest(Humidity, humidity, previous_values)
 
     return humidity
 
@@ -86,9 +364,14 @@ def delete_humidity(humidity_id: int):
     :param humidity_id: The humidity record identifier.
     :return: None
     """
-    humidity = Humidity.query.filter(Humidity.id == humidity_id).one()
-    db.session.delete(humidity)
+    humidity = get_reading(Humidity, humidity_id)
+    previous_values = rollup_values(humidity)
+
+    delete_reading(Humidity, humidity)
+    remove_reading_from_rollups(Humidity, previous_values)
     db.session.commit()
+    invalidate_responses(Humidity, [previous_values])
+    remove_latest(Humidity, humidity_id, previous_values['location_id'])
 
 
 def create_pressure(data) -> Pressure:
@@ -108,7 +391,7 @@ def create_pressure(data) -> Pressure:
     country = data.get('country')
     elevation = data.get('elevation')
     elevation_units = data.get('elevation_units')
-    timestamp = data.get('timestamp')
+    timestamp = parse_timestamp(data.get('timestamp'))
 
     pressure = Pressure(value=value,
                         value_units=value_units,
@@ -122,12 +405,25 @@ def create_pressure(data) -> Pressure:
                         elevation_units=elevation_units,
                         timestamp=timestamp)
 
-    db.session.add(pressure)
+    add_reading(Pressure, pressure)
+    add_readings_to_rollups(Pressure, [rollup_values(pressure)])
     db.session.commit()
+    invalidate_responses(Pressure, [rollup_values(pressure)])
+    record_latest(Pressure, pressure)
 
     return pressure
 
 
+def create_pressure_batch(rows) -> list:
+    """
+    Creates pressure records in bulk.
+
+    :param rows: A list of JSON data for new Pressure objects.
+    :return: A list with one status entry per submitted row.
+    """
+    return create_readings(Pressure, rows)
+
+
 def update_pressure(pressure_id: int, data) -> Pressure:
     """
     Update a pressure record in the database.
@@ -136,23 +432,29 @@ def update_pressure(pressure_id: int, data) -> Pressure:
     :param data: Updated JSON data for an existing Pressure object.
     :return: Pressure
     """
-    pressure = Pressure.query.filter(Pressure.id == pressure_id).one()
+    pressure = get_reading(Pressure, pressure_id)
+    previous_values = rollup_values(pressure)
+
     pressure.value = data.get('value')
     pressure.value_units = data.get('value_units')
     pressure.value_error_range = data.get('value_error_range')
     pressure.latitude = data.get('latitude')
-    pressure.latitude_public_public = float(int(pressure.latitude * 1000)) / 1000
+    pressure.latitude_public = float(int(pressure.latitude * 1000)) / 1000
     pressure.longitude = data.get('longitude')
     pressure.longitude_public = float(int(pressure.longitude * 1000)) / 1000
-    pressure.city = data.get('city')
-    pressure.province = data.get('province')
-    pressure.country = data.get('country')
+    pressure.geohash = encode_geohash(pressure.latitude_public, pressure.longitude_public)
+    pressure.location_id = get_location_id(data.get('city'), data.get('province'), data.get('country'))
     pressure.elevation = data.get('elevation')
     pressure.elevation_units = data.get('elevation_units')
-    pressure.timestamp = data.get('timestamp')
+    pressure.timestamp = parse_timestamp(data.get('timestamp'))
+    pressure.revision += 1
 
-    db.session.add(pressure)
+    save_reading(Pressure, pressure, previous_values['timestamp'])
+    remove_reading_from_rollups(Pressure, previous_values)
+    add_readings_to_rollups(Pressure, [rollup_values(pressure)])
     db.session.commit()
+    invalidate_responses(Pressure, [previous_values, rollup_values(pressure)])
+    record_latest(Pressure, pressure, previous_values)
 
     return pressure
 
@@ -164,9 +466,14 @@ def delete_pressure(pressure_id: int):
     :param pressure_id: The pressure record identifier.
     :return: None
     """
-    pressure = Pressure.query.filter(Pressure.id == pressure_id).one()
-    db.session.delete(pressure)
+    pressure = get_reading(Pressure, pressure_id)
+    previous_values = rollup_values(pressure)
+
+    delete_reading(Pressure, pressure)
+    remove_reading_from_rollups(Pressure, previous_values)
     db.session.commit()
+    invalidate_responses(Pressure, [previous_values])
+    remove_latest(Pressure, pressure_id, previous_values['location_id'])
 
 
 def create_temperature(data) -> Temperature:
@@ -186,7 +493,7 @@ def create_temperature(data) -> Temperature:
     country = data.get('country')
     elevation = data.get('elevation')
     elevation_units = data.get('elevation_units')
-    timestamp = data.get('timestamp')
+    timestamp = parse_timestamp(data.get('timestamp'))
 
     temperature = Temperature(value=value,
                               value_units=value_units,
@@ -200,12 +507,25 @@ def create_temperature(data) -> Temperature:
                               elevation_units=elevation_units,
                               timestamp=timestamp)
 
-    db.session.add(temperature)
+    add_reading(Temperature, temperature)
+    add_readings_to_rollups(Temperature, [rollup_values(temperature)])
     db.session.commit()
+    invalidate_responses(Temperature, [rollup_values(temperature)])
+    record_latest(Temperature, temperature)
 
     return temperature
 
 
+def create_temperature_batch(rows) -> list:
+    """
+    Creates temperature records in bulk.
+
+    :param rows: A list of JSON data for new Temperature objects.
+    :return: A list with one status entry per submitted row.
+    """
+    return create_readings(Temperature, rows)
+
+
 def update_temperature(temperature_id: int, data) -> Temperature:
     """
     Update a temperature record in the database.
@@ -214,23 +534,29 @@ def update_temperature(temperature_id: int, data) -> Temperature:
     :param data: Updated JSON data for an existing Temperature object.
     :return: Temperature
     """
-    temperature = Temperature.query.filter(Temperature.id == temperature_id).one()
+    temperature = get_reading(Temperature, temperature_id)
+    previous_values = rollup_values(temperature)
+
     temperature.value = data.get('value')
     temperature.value_units = data.get('value_units')
     temperature.value_error_range = data.get('value_error_range')
     temperature.latitude = data.get('latitude')
-    temperature.latitude_public_public = float(int(temperature.latitude * 1000)) / 1000
+    temperature.latitude_public = float(int(temperature.latitude * 1000)) / 1000
     temperature.longitude = data.get('longitude')
     temperature.longitude_public = float(int(temperature.longitude * 1000)) / 1000
-    temperature.city = data.get('city')
-    temperature.province = data.get('province')
-    temperature.country = data.get('country')
-    temperature.timestamp = data.get('timestamp')
+    temperature.geohash = encode_geohash(temperature.latitude_public, temperature.longitude_public)
+    temperature.location_id = get_location_id(data.get('city'), data.get('province'), data.get('country'))
+    temperature.timestamp = parse_timestamp(data.get('timestamp'))
     temperature.elevation = data.get('elevation')
     temperature.elevation_units = data.get('elevation_units')
+    temperature.revision += 1
 
-    db.session.add(temperature)
+    save_reading(Temperature, temperature, previous_values['timestamp'])
+    remove_reading_from_rollups(Temperature, previous_values)
+    add_readings_to_rollups(Temperature, [rollup_values(temperature)])
     db.session.commit()
+    invalidate_responses(Temperature, [previous_values, rollup_values(temperature)])
+    record_latest(Temperature, temperature, previous_values)
 
     return temperature
 
@@ -242,6 +568,11 @@ def delete_temperature(temperature_id: int):
     :param temperature_id: The temperature record identifier.
     :return: None
     """
-    temperature = Temperature.query.filter(Temperature.id == temperature_id).one()
-    db.session.delete(temperature)
+    temperature = get_reading(Temperature, temperature_id)
+    previous_values = rollup_values(temperature)
+
+    delete_reading(Temperature, temperature)
+    remove_reading_from_rollups(Temperature, previous_values)
     db.session.commit()
+    invalidate_responses(Temperature, [previous_values])
+    remove_latest(Temperature, temperature_id, previous_values['location_id'])
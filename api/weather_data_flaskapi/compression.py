@@ -0,0 +1,180 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+GZIP_ENCODING = 'gzip'
+DEFLATE_ENCODING = 'deflate'
+BROTLI_ENCODING = 'br'
+ZSTD_ENCODING = 'zstd'
+
+# The content codings that can be produced; br and zstd only when their (optional) package is installed
+AVAILABLE_ENCODINGS = tuple(coding for coding, module in ((BROTLI_ENCODING, brotli),
+                                                          (ZSTD_ENCODING, zstandard),
+                                                          (GZIP_ENCODING, zlib),
+                                                          (DEFLATE_ENCODING, zlib))
+                            if module is not None)
+
+DEFAULT_LEVELS = {BROTLI_ENCODING: 4, ZSTD_ENCODING: 3, GZIP_ENCODING: 6, DEFLATE_ENCODING: 6}
+
+
+def compressor(coding: str, level: int) -> tuple:
+    """
+    Start a compression stream.
+
+    :param coding: The content coding (one of AVAILABLE_ENCODINGS).
+    :type coding: str
+    :param level: The compression level (quality for br).
+    :type level: int
+    :return: The stream's (compress, flush, finish) functions. flush() ends the output so far at a
+             point the client can decompress up to; finish() ends the stream.
+    """
+    if coding == BROTLI_ENCODING:
+        stream = brotli.Compressor(quality=level)
+        return stream.process, stream.flush, stream.finish
+
+    if coding == ZSTD_ENCODING:
+        stream = zstandard.ZstdCompressor(level=level).compressobj()
+        return stream.compress, lambda: stream.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), stream.flush
+
+    # gzip has a gzip header and trailer; HTTP deflate is the zlib format
+    stream = zlib.compressobj(level,
+                              zlib.DEFLATED,
+                              zlib.MAX_WBITS | 16 if coding == GZIP_ENCODING else zlib.MAX_WBITS)
+    return stream.compress, lambda: stream.flush(zlib.Z_SYNC_FLUSH), stream.flush
+
+
+def compress(data: bytes, coding: str, level: int) -> bytes:
+    """
+    Compress a whole body.
+
+    :param data: The body.
+    :type data: bytes
+    :param coding: The content coding (one of AVAILABLE_ENCODINGS).
+    :type coding: str
+    :param level: The compression level (quality for br).
+    :type level: int
+    :return: bytes
+    """
+    compress_data, _, finish = compressor(coding, level)
+    return compress_data(data) + finish()
+
+
+def compress_stream(chunks, coding: str, level: int):
+    """
+    Compress a streamed body chunk by chunk, flushing after each so the client receives every
+    chunk as soon as it is written.
+
+    :param chunks: The body's chunks (str or bytes).
+    :param coding: The content coding (one of AVAILABLE_ENCODINGS).
+    :type coding: str
+    :param level: The compression level (quality for br).
+    :type level: int
+    """
+    compress_data, flush, finish = compressor(coding, level)
+
+    try:
+        for chunk in chunks:
+            data = compress_data(chunk.encode('utf-8') if isinstance(chunk, str) else chunk) + flush()
+            if data:
+                yield data
+
+        yield finish()
+    finally:
+        # Releases the database cursor when the client disconnects part way
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def negotiate_encoding():
+    """
+    Pick the response's content coding from the request's Accept-Encoding header.
+
+    Of the codings the client accepts with the highest quality, the first of COMPRESSION_ENCODINGS
+    is used.
+
+    :return: The content coding, or None to send the response uncompressed.
+    """
+    encodings = [coding for coding in current_app.config.get('COMPRESSION_ENCODINGS', ())
+                 if coding in AVAILABLE_ENCODINGS]
+
+    return request.accept_encodings.best_match(encodings) if encodings else None
+
+
+def compression_level(coding: str) -> int:
+    """
+    Return the configured COMPRESSION_LEVELS level of a content coding.
+
+    :param coding: The content coding.
+    :type coding: str
+    :return: int
+    """
+    return current_app.config.get('COMPRESSION_LEVELS', {}).get(coding, DEFAULT_LEVELS[coding])
+
+
+def compress_response(response):
+    """
+    Compress a response with the content coding the client prefers (an after_request function).
+
+    Bodies shorter than COMPRESSION_MIN_SIZE are sent as they are. Streamed bodies are compressed
+    as they are written. When a content coding is negotiated the ETag is made weak, as compressed
+    bytes differ from the uncompressed ones the tag was computed for; 304 responses get the same
+    weak tag as the 200 response they stand for.
+
+    :param response: The response.
+    :return: The response.
+    """
+    if not current_app.config.get('COMPRESSION_ENCODINGS') or response.status_code not in (200, 304) or \
+            response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    coding = negotiate_encoding()
+    if coding is None:
+        return response
+
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+
+    if response.status_code != 200:
+        return response
+
+    level = compression_level(coding)
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, coding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+
+        if len(data) < current_app.config.get('COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        response.set_data(compress(data, coding, level))
+
+    response.headers['Content-Encoding'] = coding
+
+    return response
@@ -10,18 +10,32 @@
 """
 
 from flask_restplus import reqparse
-from datetime import date, timedelta
 
-date_range_arguments = reqparse.RequestParser()
+from api.weather_data_flaskapi.business.weather_data import parse_timestamp
 
-date_range_arguments.add_argument('start-date',
+date_range_arguments = reqparse.RequestParser(bundle_errors=True)
+
+date_range_arguments.add_argument('start',
+                                  type=parse_timestamp,
+                                  required=True,
+                                  help='The required start date (e.g. 2017-01-30) for the returned records.')
+
+date_range_arguments.add_argument('end',
+                                  type=parse_timestamp,
+                                  required=True,
+                                  help='The required end date (e.g. 2017-01-30) for the returned records.')
+
+date_range_arguments.add_argument('city',
+                                  type=str,
+                                  required=True,
+                                  help='The required city for the returned records.')
+
+date_range_arguments.add_argument('province',
                                   type=str,
-                                  required=False,
-                                  default=str(date.today() - timedelta(days=7)),
-                                  help='Start date')
+                                  required=True,
+                                  help='The required province for the returned records.')
 
-date_range_arguments.add_argument('end-date',
+date_range_arguments.add_argument('country',
                                   type=str,
-                                  required=False,
-                                  default=str(date.today()),
-                                  help='End date')
+                                  required=True,
+                                  help='The required country for the returned records.')
@@ -9,38 +9,22 @@
 @deffield    updated: 2017-06-14
 """
 
-from flask_restplus import reqparse
-from datetime import date, timedelta
-
-date_range_pagination_arguments = reqparse.RequestParser()
-
-date_range_pagination_arguments.add_argument('start-date',
-                                             type=str,
-                                             required=False,
-                                             default=str(date.today() - timedelta(days=7)),
-                                             help='Start date')
-
-date_range_pagination_arguments.add_argument('end-date',
-                                             type=str,
-                                             required=False,
-                                             default=str(date.today()),
-                                             help='End date')
-
-date_range_pagination_arguments.add_argument('page',
-                                             type=int,
-                                             required=False,
-                                             default=1,
-                                             help='Page number')
-
-date_range_pagination_arguments.add_argument('bool',
-                                             type=bool,
-                                             required=False,
-                                             default=1,
-                                             help='Page number')
-
-date_range_pagination_arguments.add_argument('per_page',
-                                             type=int,
-                                             required=False,
-                                             choices=[2, 10, 20, 30, 40, 50],
-                                             default=10,
-                                             help='Results per page {error_msg}')
+from api.weather_data_flaskapi.date_range_arguments import date_range_arguments
+from api.weather_data_flaskapi.fields_arguments import fields_arguments
+from api.weather_data_flaskapi.format_arguments import format_arguments
+from api.weather_data_flaskapi.pagination_arguments import pagination_arguments
+from api.weather_data_flaskapi.spatial_arguments import spatial_arguments
+
+date_range_pagination_arguments = date_range_arguments.copy()
+
+# Collections select readings by location, by area (bbox or near), or both
+for name in ('city', 'province', 'country'):
+    date_range_pagination_arguments.replace_argument(name,
+                                                     type=str,
+                                                     required=False,
+                                                     help='The {name} of the returned records (required unless '
+                                                          'bbox or near is given).'.format(name=name))
+
+for argument in pagination_arguments.args + spatial_arguments.args + fields_arguments.args + \
+        format_arguments.args:
+    date_range_pagination_arguments.add_argument(argument)
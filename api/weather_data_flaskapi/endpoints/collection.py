@@ -0,0 +1,283 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from urllib.parse import urlencode
+
+from flask import Response, current_app, request
+from flask_restplus import abort
+from werkzeug.http import unquote_etag
+
+from api.weather_data_flaskapi.business.pagination import keyset_page
+from api.weather_data_flaskapi.business.projection import project_rows, select_fields
+from api.weather_data_flaskapi.business.response_cache import get_response_cache, response_cache_key
+from api.weather_data_flaskapi.business.spatial import spatial_filter
+from api.weather_data_flaskapi.business.weather_data import get_readings
+from api.weather_data_flaskapi.compression import compress_response, negotiate_encoding
+from api.weather_data_flaskapi.date_range_pagination_arguments import date_range_pagination_arguments
+from api.weather_data_flaskapi.fields_arguments import fields_arguments
+from api.weather_data_flaskapi.format_arguments import COLUMNAR_FORMAT
+from api.weather_data_flaskapi.endpoints.conditional import cache_headers, collection_validator, is_not_modified, \
+    make_etag, not_modified_response, rows_validator
+from api.weather_data_flaskapi.representations import JSON_MEDIATYPE, json_response, negotiate_mediatype, \
+    marshal_columnar, marshal_records, stream_response
+
+
+def next_page_url(cursor: str) -> str:
+    """
+    Build the URL of the next page by replacing the cursor in the current request's query string.
+
+    :param cursor: The cursor of the next page.
+    :type cursor: str
+    :return: str
+    """
+    args = [(key, value) for key, value in request.args.items(multi=True) if key != 'cursor']
+    args.append(('cursor', cursor))
+
+    return '{base_url}?{query}'.format(base_url=request.base_url, query=urlencode(args))
+
+
+def cached_response(cache, key: str):
+    """
+    Return the cached response of a collection request, 304 if the client's copy is current, or None.
+
+    Entries are stored already compressed with the content coding that is part of their key.
+
+    :param cache: The ResponseCache.
+    :param key: The request's cache key.
+    :return: A Response or None.
+    """
+    entry = cache.get(key)
+
+    if entry is None:
+        return None
+
+    body, headers = entry
+
+    if 'ETag' in headers and is_not_modified(unquote_etag(headers['ETag'])[0]):
+        return not_modified_response({name: value for name, value in headers.items() if name != 'Content-Encoding'})
+
+    return Response(body, status=200, headers=headers, mimetype=JSON_MEDIATYPE)
+
+
+def collection_etag(model, mediatype: str, validator: tuple, next_cursor: str = None) -> str:
+    """
+    Return the entity tag of a collection response.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param mediatype: The media type of the response.
+    :param validator: The table version, or the rows_validator() of the records sent.
+    :param next_cursor: The cursor of the next page, or None.
+    :return: str
+    """
+    return make_etag(model.__tablename__,
+                     validator,
+                     next_cursor,
+                     mediatype,
+                     request.headers.get(current_app.config.get('RESTPLUS_MASK_HEADER', 'X-Fields')),
+                     sorted(request.args.items(multi=True)))
+
+
+def selected_fields(serializer, names: list):
+    """
+    Return the fields of a serializer that a request selected with the fields argument.
+
+    :param serializer: The api.model the records are marshalled with.
+    :param names: The parsed fields argument, or None for every field.
+    :return: The serializer, or a dict with the selected fields.
+    """
+    try:
+        return select_fields(serializer, names)
+    except ValueError as e:
+        abort(400, 'Bad request: {error}'.format(error=e))
+
+
+def requested_fields(serializer):
+    """
+    Return the fields of a serializer that an item request selected with the fields argument.
+
+    :param serializer: The api.model the record is marshalled with.
+    :return: The serializer, or a dict with the selected fields.
+    """
+    return selected_fields(serializer, fields_arguments.parse_args()['fields'])
+
+
+def collection_area(args) -> bool:
+    """
+    Validate the location and area arguments of a collection request.
+
+    :param args: The parsed date_range_pagination_arguments.
+    :return: True if the request selects readings by area (bbox or near), else False.
+    """
+    located = [args[name] is not None for name in ('city', 'province', 'country')]
+
+    if args['bbox'] is not None and args['near'] is not None:
+        abort(400, 'Bad request: use either bbox or near')
+
+    if (args['near'] is None) != (args['radius_km'] is None):
+        abort(400, 'Bad request: near and radius_km must be used together')
+
+    area = args['bbox'] is not None or args['near'] is not None
+
+    # A location is given in full, or not at all when an area is given
+    if not all(located) and (any(located) or not area):
+        abort(400, 'Bad request: city, province and country are required unless bbox or near is given')
+
+    return area
+
+
+def get_collection(model, serializer, conditional: bool = False, cached: bool = False, public: bool = False):
+    """
+    Return the readings for a collection GET request.
+
+    Without a limit or cursor (and no PAGINATION_DEFAULT_LIMIT configured) every matching
+    record is returned. Otherwise one page is returned and, when more records follow, the
+    cursor of the next page is sent in the X-Next-Cursor and Link headers.
+
+    Readings are selected by location, by area (bbox or near and radius_km), or both. With fields
+    (e.g. timestamp,value) only those keys are returned. Only the marshalled columns are selected,
+    as rows rather than model instances, and marshalled with the serializer's compiled function.
+
+    Clients that accept application/x-ndjson or text/csv (and not application/json) get a
+    streaming response that is written as rows are fetched through a server-side cursor.
+    With format=columnar the JSON response has one array per field instead of one object per
+    record, and gives units and location fields that are the same for every record once.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param serializer: The api.model the records are marshalled with.
+    :param conditional: True to send ETag and Cache-Control headers and answer requests whose
+                        If-None-Match matches with 304. Pages are validated from the rows of the
+                        page; whole ranges from the version of the reading table, without fetching
+                        the rows, and also get Last-Modified and answer If-Modified-Since.
+    :param cached: True to serve JSON responses from the response cache (RESPONSE_CACHE_BACKEND),
+                   keyed by the normalized query parameters and content coding (requests by location only).
+    :param public: True to select readings by area on their public positions, False on their exact positions.
+    :return: A JSON or streaming Response.
+    """
+    args = date_range_pagination_arguments.parse_args()
+    columnar = args['format'] == COLUMNAR_FORMAT
+    # The columnar layout is JSON, whatever the Accept header prefers
+    mediatype = JSON_MEDIATYPE if columnar else negotiate_mediatype()
+    area = collection_area(args)
+    serializer = selected_fields(serializer, args['fields'])
+
+    limit = args['limit'] or current_app.config.get('PAGINATION_DEFAULT_LIMIT')
+    cursor = args['cursor']
+
+    cache = get_response_cache() if cached and not area and mediatype == JSON_MEDIATYPE else None
+    if cache is not None:
+        generation = cache.generation
+        key = response_cache_key(model.__tablename__,
+                                 args['city'],
+                                 args['province'],
+                                 args['country'],
+                                 args['start'],
+                                 args['end'],
+                                 limit,
+                                 cursor,
+                                 args['fields'],
+                                 args['format'],
+                                 request.headers.get(current_app.config.get('RESTPLUS_MASK_HEADER', 'X-Fields')),
+                                 negotiate_encoding())
+
+        response = cached_response(cache, key)
+        if response is not None:
+            return response
+
+    query = get_readings(model,
+                         start=args['start'],
+                         end=args['end'],
+                         city=args['city'],
+                         province=args['province'],
+                         country=args['country'])
+
+    if area:
+        query = query.filter(spatial_filter(model,
+                                            bbox=args['bbox'],
+                                            near=args['near'],
+                                            radius_km=args['radius_km'],
+                                            public=public))
+
+    headers = {}
+
+    # Rows of only the marshalled columns; the page cursor is built from the last row's timestamp and
+    # id, and the validator from the ids and revisions
+    rows = project_rows(query, model, serializer, 'timestamp', 'id', 'revision')
+
+    if limit is None and cursor is None:
+        rows = rows.order_by(model.timestamp, model.id)
+
+        if conditional:
+            # Read before the rows, so the validator is never newer than the data sent, and
+            # revalidation is answered without fetching the rows
+            version, modified = collection_validator(model)
+            etag = collection_etag(model, mediatype, version)
+            headers = cache_headers(etag, modified)
+
+            if is_not_modified(etag, modified):
+                return not_modified_response(headers)
+
+        if mediatype != JSON_MEDIATYPE:
+            return stream_response(rows.yield_per(current_app.config.get('STREAMING_CHUNK_SIZE', 1000)),
+                                   serializer,
+                                   mediatype,
+                                   headers)
+
+        records = rows.all()
+        next_cursor = None
+    else:
+        max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 1000)
+        limit = min(limit or max_limit, max_limit)
+
+        try:
+            records, next_cursor = keyset_page(rows, model, cursor, limit)
+        except ValueError:
+            abort(400, 'Bad request: invalid cursor')
+
+        if conditional:
+            # The tag covers only the rows sent (and whether more follow), so a page costs the same to
+            # validate however many readings the range holds
+            etag = collection_etag(model, mediatype, rows_validator(records), next_cursor)
+            headers = cache_headers(etag)
+
+            if is_not_modified(etag):
+                return not_modified_response(headers)
+
+    if next_cursor is not None:
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = '<{url}>; rel="next"'.format(url=next_page_url(next_cursor))
+
+    if mediatype != JSON_MEDIATYPE:
+        return stream_response(records, serializer, mediatype, headers)
+
+    if columnar:
+        response = json_response(marshal_columnar(records, serializer), 200, headers)
+    else:
+        response = json_response(marshal_records(records, serializer), 200, headers)
+
+    if cache is None:
+        return response
+
+    # Compressed once here rather than on every hit
+    response = compress_response(response)
+
+    cache.set(key,
+              response.get_data(),
+              {name: value for name, value in response.headers.items()
+               if name not in ('Content-Type', 'Content-Length')},
+              model.__tablename__,
+              args['city'],
+              args['province'],
+              args['country'],
+              args['start'],
+              args['end'],
+              generation)
+
+    return response
@@ -0,0 +1,118 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import hashlib
+import json
+
+from flask import Response, current_app, request
+from werkzeug.http import http_date
+
+from api.weather_data_flaskapi.representations import marshal_records
+from database.versions import get_table_version
+
+
+def make_etag(*parts) -> str:
+    """
+    Return a strong entity tag for the values that determine a representation.
+
+    :param parts: The values, e.g. the validator of the records and the requested media type.
+    :return: str
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def cache_headers(etag: str, last_modified=None) -> dict:
+    """
+    Return the ETag, Last-Modified, Cache-Control and Vary headers of a public response.
+
+    The same URL is served as JSON, NDJSON, CSV, MessagePack or Arrow depending on the Accept
+    header, so shared caches must key on it too.
+
+    :param etag: The entity tag (unquoted).
+    :param last_modified: The datetime the data last changed, or None.
+    :return: dict
+    """
+    headers = {'ETag': '"{etag}"'.format(etag=etag),
+               'Cache-Control': 'public, max-age={max_age}'.format(
+                   max_age=current_app.config.get('PUBLIC_CACHE_MAX_AGE', 5)),
+               'Vary': 'Accept'}
+
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    return headers
+
+
+def is_not_modified(etag: str, last_modified=None) -> bool:
+    """
+    Return True if the request's If-None-Match (or, without it, If-Modified-Since) matches.
+
+    :param etag: The entity tag (unquoted).
+    :param last_modified: The datetime the data last changed, or None.
+    :return: bool
+    """
+    # If-None-Match uses the weak comparison: compressed responses carry the weak form of the tag
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have a resolution of one second
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+
+    return False
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status=304, headers=headers)
+
+
+def collection_validator(model) -> tuple:
+    """
+    Return the (version, modified datetime) of the reading table a whole range is read from.
+
+    Every write to the table changes its version, so a range is validated with one primary key
+    lookup rather than an aggregate over its rows. Writes outside the range change it too, which
+    only costs clients a refetch.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :return: tuple
+    """
+    return get_table_version(model)
+
+
+def rows_validator(rows) -> tuple:
+    """
+    Return (row count, max id, sum of revisions) of rows that were already fetched.
+
+    Adding or deleting a reading changes the count, and updating one changes its revision.
+
+    :param rows: The rows, with id and revision columns (see project_rows).
+    :return: tuple
+    """
+    return len(rows), max((row.id for row in rows), default=None), sum(row.revision for row in rows)
+
+
+def conditional_item(record, serializer):
+    """
+    Return a marshalled record with cache headers, or 304 if the client's copy is current.
+
+    :param record: The record.
+    :param serializer: The api.model the record is marshalled with.
+    :return: A (data, status code, headers) tuple or a 304 Response.
+    """
+    data = marshal_records(record, serializer)
+    etag = make_etag(json.dumps(data, sort_keys=True))
+    headers = cache_headers(etag)
+
+    if is_not_modified(etag):
+        return not_modified_response(headers)
+
+    return data, 200, headers
@@ -11,18 +11,28 @@
 
 import logging
 
-from flask import request
+from flask import current_app, request
 from flask_jwt import jwt_required
-from flask_restplus import Resource, reqparse, abort
-from sqlalchemy import and_
+from flask_restplus import Resource, abort
 
 from api.restplus import api
+from api.weather_data_flaskapi.business.ingest import IngestQueueFull, enqueue_reading, ingest_queue_stats, \
+    write_behind_enabled
+from api.weather_data_flaskapi.business.response_cache import response_cache_stats
+from api.weather_data_flaskapi.business.security import identity_cache_stats, password_hashing_stats
 from api.weather_data_flaskapi.business.weather_data import create_humidity, delete_humidity, update_humidity
 from api.weather_data_flaskapi.business.weather_data import create_pressure, delete_pressure, update_pressure
 from api.weather_data_flaskapi.business.weather_data import create_temperature, delete_temperature, update_temperature
-from api.weather_data_flaskapi.serializers import humidity, pressure, temperature
+from api.weather_data_flaskapi.business.weather_data import create_humidity_batch, create_pressure_batch, \
+    create_temperature_batch
+from api.weather_data_flaskapi.date_range_pagination_arguments import date_range_pagination_arguments
+from api.weather_data_flaskapi.endpoints.collection import get_collection, requested_fields
+from api.weather_data_flaskapi.fields_arguments import fields_arguments
+from api.weather_data_flaskapi.representations import marshal_records
+from api.weather_data_flaskapi.serializers import humidity, pressure, temperature, batch_result
 from database.model_exceptions import LatitudeValueError, LongitudeValueError
 from database.models import Humidity, Pressure, Temperature
+from database.partitions import get_reading
 
 log = logging.getLogger(__name__)
 
@@ -30,64 +40,122 @@ ns = api.namespace('protected',
                    description='Methods protected by JSON Web Token (JWT) based authentication')
 
 
+@api.errorhandler(IngestQueueFull)
+def ingest_queue_full_error_handler(exception):
+    return {'message': 'Too many requests: {message}'.format(message=exception.message)}, 429, {'Retry-After': '1'}
+
+
+def post_reading(model, create_reading):
+    """
+    Validates a record from the request body and creates it.
+
+    In write-behind mode (INGEST_QUEUE_SIZE > 0) the record is queued and committed with others by
+    the ingest writer; it is answered with 202 and without an id.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param create_reading: The business function that creates the record.
+    :return: The record and the HTTP status code.
+    """
+    data = request.json
+
+    try:
+        if write_behind_enabled():
+            reading = enqueue_reading(model, data)
+            return dict(reading, city=data['city'], province=data['province'], country=data['country']), 202
+
+        return create_reading(data), 201
+    except LatitudeValueError:
+        abort(400, 'Bad request: latitude out of range (-90 to 90)')
+    except LongitudeValueError:
+        abort(400, 'Bad request: longitude out of range (-180 to 180)')
+    except (ValueError, TypeError) as error:
+        abort(400, 'Bad request: {error}'.format(error=error))
+
+
+def post_batch(create_batch):
+    """
+    Validates a JSON array of records from the request body and creates them in bulk.
+
+    :param create_batch: The business function that creates the records.
+    :return: The batch result and the HTTP status code (500 if the valid records could not be written).
+    """
+    rows = request.json
+
+    if not isinstance(rows, list):
+        abort(400, 'Bad request: expected a JSON array of records')
+
+    max_rows = current_app.config.get('BATCH_INGEST_MAX_ROWS', 10000)
+    if len(rows) > max_rows:
+        abort(413, 'Request entity too large: at most {max_rows} records per batch'.format(max_rows=max_rows))
+
+    statuses = create_batch(rows)
+    created = sum(1 for status in statuses if status['status'] == 201)
+    failed = any(status['status'] == 500 for status in statuses)
+
+    return {'created': created, 'rejected': len(statuses) - created, 'rows': statuses}, 500 if failed else 201
+
+
 @ns.route('/humidity/')
 class HumidityCollection(Resource):
-    @api.marshal_list_with(humidity)
-    @api.doc(params={'start': 'The required start date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'end': 'The required end date (e.g. 2017-01-30) for the returned records.'})
+    @api.response(200, 'Success', [humidity])
+    @api.produces(['application/json', 'application/x-ndjson', 'text/csv', 'application/msgpack',
+                   'application/vnd.apache.arrow.stream'])
+    @api.expect(date_range_pagination_arguments)
+    @api.response(400, 'Bad request: invalid arguments or cursor.')
     @jwt_required()
     def get(self):
         """
         Returns list of humidity records.
         :return:
         """
-        parser = reqparse.RequestParser(bundle_errors=True)
-        parser.add_argument('start', type=str, required=True)
-        parser.add_argument('end', type=str, required=True)
-        parser.add_argument('city', type=str, required=True)
-        parser.add_argument('province', type=str, required=True)
-        parser.add_argument('country', type=str, required=True)
-        args = parser.parse_args()
-        start = args['start']
-        end = args['end']
-        city = args['city']
-        province = args['province']
-        country = args['country']
-
-        records = Humidity.query.filter(
-            and_(Humidity.timestamp >= start,
-                 Humidity.timestamp <= end)).filter(
-            and_(Humidity.city == city,
-                 Humidity.province == province,
-                 Humidity.country == country)).order_by(Humidity.timestamp).all()
-
-        return records
+        return get_collection(Humidity, humidity)
 
     @api.response(201, 'Humidity successfully created.')
+    @api.response(202, 'Humidity accepted for writing.')
+    @api.response(400, 'Bad request: invalid humidity record.')
+    @api.response(429, 'Too many records waiting to be written.')
     @api.expect(humidity)
     @api.marshal_with(humidity)
     @jwt_required()
     def post(self):
         """
         Creates a new humidity record.
+
+        In write-behind mode the record is queued for writing and answered with 202.
         :return:
         """
-        data = request.json
+        return post_reading(Humidity, create_humidity)
 
-        try:
-            data = create_humidity(data)
-        except LatitudeValueError:
-            abort(400, 'Bad request: latitude out of range (-90 to 90)')
-        except LongitudeValueError:
-            abort(400, 'Bad request: longitude out of range (-180 to 180)')
 
-        return data, 201
+@ns.route('/humidity/batch')
+class HumidityBatch(Resource):
+    @api.response(201, 'Humidity batch processed.')
+    @api.response(400, 'Bad request: expected a JSON array of records.')
+    @api.response(413, 'Too many records in the batch.')
+    @api.response(500, 'The batch could not be written.')
+    @api.expect([humidity], validate=False)
+    @api.marshal_with(batch_result, code=201)
+    @jwt_required()
+    def post(self):
+        """
+        Creates humidity records in bulk.
+
+        * Send a JSON array of humidity objects in the request body.
+
+        Each record is validated on its own. The valid records are inserted in a single
+        transaction and the response reports the status of every submitted record; when the
+        transaction fails, none is created and the response status is 500.
+        :return:
+        """
+        return post_batch(create_humidity_batch)
 
 
 @ns.route('/humidity/<int:humidity_id>')
 @api.response(404, 'Humidity not found.')
 class HumidityItem(Resource):
-    @api.marshal_with(humidity)
+    @api.response(200, 'Success', humidity)
+    @api.response(400, 'Bad request: unknown field.')
+    @api.expect(fields_arguments)
     @jwt_required()
     def get(self, humidity_id: int):
         """
@@ -96,7 +164,7 @@ class HumidityItem(Resource):
         :type humidity_id: int
         :return:
         """
-        return Humidity.query.filter(Humidity.id == humidity_id).one()
+        return marshal_records(get_reading(Humidity, humidity_id), requested_fields(humidity))
 
     @api.expect(humidity)
     @api.marshal_with(humidity)
@@ -157,62 +225,65 @@ class HumidityItem(Resource):
 
 @ns.route('/pressure/')
 class PressureCollection(Resource):
-    @api.marshal_list_with(pressure)
-    @api.doc(params={'start': 'The required start date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'end': 'The required end date (e.g. 2017-01-30) for the returned records.'})
+    @api.response(200, 'Success', [pressure])
+    @api.produces(['application/json', 'application/x-ndjson', 'text/csv', 'application/msgpack',
+                   'application/vnd.apache.arrow.stream'])
+    @api.expect(date_range_pagination_arguments)
+    @api.response(400, 'Bad request: invalid arguments or cursor.')
     @jwt_required()
     def get(self):
         """
         Returns list of pressure records.
         :return:
         """
-        parser = reqparse.RequestParser(bundle_errors=True)
-        parser.add_argument('start', type=str, required=True)
-        parser.add_argument('end', type=str, required=True)
-        parser.add_argument('city', type=str, required=True)
-        parser.add_argument('province', type=str, required=True)
-        parser.add_argument('country', type=str, required=True)
-        args = parser.parse_args()
-        start = args['start']
-        end = args['end']
-        city = args['city']
-        province = args['province']
-        country = args['country']
-
-        records = Pressure.query.filter(
-            and_(Pressure.timestamp >= start,
-                 Pressure.timestamp <= end)).filter(
-            and_(Pressure.city == city,
-                 Pressure.province == province,
-                 Pressure.country == country)).order_by(Pressure.timestamp).all()
-
-        return records
+        return get_collection(Pressure, pressure)
 
     @api.response(201, 'Pressure successfully created.')
+    @api.response(202, 'Pressure accepted for writing.')
+    @api.response(400, 'Bad request: invalid pressure record.')
+    @api.response(429, 'Too many records waiting to be written.')
     @api.expect(pressure)
     @api.marshal_with(pressure)
     @jwt_required()
     def post(self):
         """
         Creates a new pressure record.
+
+        In write-behind mode the record is queued for writing and answered with 202.
         :return:
         """
-        data = request.json
+        return post_reading(Pressure, create_pressure)
 
-        try:
-            data = create_pressure(data)
-        except LatitudeValueError:
-            abort(400, 'Bad request: latitude out of range (-90 to 90)')
-        except LongitudeValueError:
-            abort(400, 'Bad request: longitude out of range (-180 to 180)')
 
-        return data, 201
+@ns.route('/pressure/batch')
+class PressureBatch(Resource):
+    @api.response(201, 'Pressure batch processed.')
+    @api.response(400, 'Bad request: expected a JSON array of records.')
+    @api.response(413, 'Too many records in the batch.')
+    @api.response(500, 'The batch could not be written.')
+    @api.expect([pressure], validate=False)
+    @api.marshal_with(batch_result, code=201)
+    @jwt_required()
+    def post(self):
+        """
+        Creates pressure records in bulk.
+
+        * Send a JSON array of pressure objects in the request body.
+
+        Each record is validated on its own. The valid records are inserted in a single
+        transaction and the response reports the status of every submitted record; when the
+        transaction fails, none is created and the response status is 500.
+        :return:
+        """
+        return post_batch(create_pressure_batch)
 
 
 @ns.route('/pressure/<int:pressure_id>')
 @api.response(404, 'Pressure not found.')
 class PressureItem(Resource):
-    @api.marshal_with(pressure)
+    @api.response(200, 'Success', pressure)
+    @api.response(400, 'Bad request: unknown field.')
+    @api.expect(fields_arguments)
     @jwt_required()
     def get(self, pressure_id: int):
         """
@@ -221,7 +292,7 @@ class PressureItem(Resource):
         :type pressure_id: int
         :return:
         """
-        return Pressure.query.filter(Pressure.id == pressure_id).one()
+        return marshal_records(get_reading(Pressure, pressure_id), requested_fields(pressure))
 
     @api.expect(pressure)
     @api.response(204, 'Pressure successfully updated.')
@@ -283,61 +354,65 @@ class PressureItem(Resource):
 
 @ns.route('/temperature/')
 class TemperatureCollection(Resource):
-    @api.marshal_list_with(temperature)
-    @api.doc(params={'start': 'The required start date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'end': 'The required end date (e.g. 2017-01-30) for the returned records.'})
+    @api.response(200, 'Success', [temperature])
+    @api.produces(['application/json', 'application/x-ndjson', 'text/csv', 'application/msgpack',
+                   'application/vnd.apache.arrow.stream'])
+    @api.expect(date_range_pagination_arguments)
+    @api.response(400, 'Bad request: invalid arguments or cursor.')
     @jwt_required()
     def get(self):
         """
         Returns list of temperature records.
         :return:
         """
-        parser = reqparse.RequestParser(bundle_errors=True)
-        parser.add_argument('start', type=str, required=True)
-        parser.add_argument('end', type=str, required=True)
-        parser.add_argument('city', type=str, required=True)
-        parser.add_argument('province', type=str, required=True)
-        parser.add_argument('country', type=str, required=True)
-        args = parser.parse_args()
-        start = args['start']
-        end = args['end']
-        city = args['city']
-        province = args['province']
-        country = args['country']
-
-        records = Temperature.query.filter(
-            and_(Temperature.timestamp >= start,
-                 Temperature.timestamp <= end)).filter(
-            and_(Temperature.city == city,
-                 Temperature.province == province,
-                 Temperature.country == country)).order_by(Temperature.timestamp).all()
-
-        return records
+        return get_collection(Temperature, temperature)
 
     @api.response(201, 'Temperature successfully created.')
+    @api.response(202, 'Temperature accepted for writing.')
+    @api.response(400, 'Bad request: invalid temperature record.')
+    @api.response(429, 'Too many records waiting to be written.')
     @api.expect(temperature)
     @api.marshal_with(temperature)
     @jwt_required()
     def post(self):
         """
         Creates a new temperature record.
+
+        In write-behind mode the record is queued for writing and answered with 202.
         :return:
         """
-        data = request.json
-        try:
-            data = create_temperature(data)
-        except LatitudeValueError:
-            abort(400, 'Bad request: latitude out of range (-90 to 90)')
-        except LongitudeValueError:
-            abort(400, 'Bad request: longitude out of range (-180 to 180)')
+        return post_reading(Temperature, create_temperature)
+
+
+@ns.route('/temperature/batch')
+class TemperatureBatch(Resource):
+    @api.response(201, 'Temperature batch processed.')
+    @api.response(400, 'Bad request: expected a JSON array of records.')
+    @api.response(413, 'Too many records in the batch.')
+    @api.response(500, 'The batch could not be written.')
+    @api.expect([temperature], validate=False)
+    @api.marshal_with(batch_result, code=201)
+    @jwt_required()
+    def post(self):
+        """
+        Creates temperature records in bulk.
 
-        return data, 201
+        * Send a JSON array of temperature objects in the request body.
+
+        Each record is validated on its own. The valid records are inserted in a single
+        transaction and the response reports the status of every submitted record; when the
+        transaction fails, none is created and the response status is 500.
+        :return:
+        """
+        return post_batch(create_temperature_batch)
 
 
 @ns.route('/temperature/<int:temperature_id>')
 @api.response(404, 'Temperature not found.')
 class TemperatureItem(Resource):
-    @api.marshal_with(temperature)
+    @api.response(200, 'Success', temperature)
+    @api.response(400, 'Bad request: unknown field.')
+    @api.expect(fields_arguments)
     @jwt_required()
     def get(self, temperature_id: int):
         """
@@ -346,7 +421,7 @@ class TemperatureItem(Resource):
         :type temperature_id: int
         :return:
         """
-        return Temperature.query.filter(Temperature.id == temperature_id).one()
+        return marshal_records(get_reading(Temperature, temperature_id), requested_fields(temperature))
 
     @api.expect(temperature)
     @api.response(204, 'Temperature successfully updated.')
@@ -404,3 +479,17 @@ class TemperatureItem(Resource):
         """
         delete_temperature(temperature_id)
         return None, 204
+
+
+@ns.route('/metrics')
+class Metrics(Resource):
+    @api.response(200, 'Success')
+    @jwt_required()
+    def get(self):
+        """
+        Returns the cache, password hashing pool and ingest queue counters of this API process.
+        """
+        return {'identity_cache': identity_cache_stats(),
+                'ingest_queue': ingest_queue_stats(),
+                'password_hashing': password_hashing_stats(),
+                'response_cache': response_cache_stats()}
@@ -11,57 +11,165 @@
 
 import logging
 
-from flask_restplus import Resource, reqparse
-from sqlalchemy import and_
+from flask import current_app
+from flask_restplus import Resource, abort
 
 from api.restplus import api
-from api.weather_data_flaskapi.serializers import public_humidity, public_pressure, public_temperature
+from api.weather_data_flaskapi.aggregate_arguments import aggregate_arguments
+from api.weather_data_flaskapi.business.aggregation import aggregate_readings
+from api.weather_data_flaskapi.business.latest import latest_readings
+from api.weather_data_flaskapi.business.weather_data import get_location_readings
+from api.weather_data_flaskapi.date_range_pagination_arguments import date_range_pagination_arguments
+from api.weather_data_flaskapi.endpoints.collection import get_collection, requested_fields, selected_fields
+from api.weather_data_flaskapi.endpoints.conditional import conditional_item
+from api.weather_data_flaskapi.fields_arguments import fields_arguments
+from api.weather_data_flaskapi.location_arguments import location_arguments
+from api.weather_data_flaskapi.query_arguments import MEASUREMENTS, query_arguments
+from api.weather_data_flaskapi.representations import json_response, marshal_records
+from api.weather_data_flaskapi.serializers import public_humidity, public_pressure, public_temperature, aggregate, \
+    location_readings
 from database.models import Humidity, Pressure, Temperature
+from database.partitions import get_reading
 
 log = logging.getLogger(__name__)
 
 ns = api.namespace('public',
                    description='Public methods')
 
+PUBLIC_MEASUREMENTS = {'humidity': (Humidity, public_humidity),
+                       'pressure': (Pressure, public_pressure),
+                       'temperature': (Temperature, public_temperature)}
+
+
+def get_aggregates(model):
+    """
+    Return the bucketed aggregates for an aggregate GET request.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :return: A list of aggregate dicts.
+    """
+    args = aggregate_arguments.parse_args()
+
+    return aggregate_readings(model,
+                              start=args['start'],
+                              end=args['end'],
+                              city=args['city'],
+                              province=args['province'],
+                              country=args['country'],
+                              bucket=args['bucket'],
+                              aggregates=args['agg'])
+
+
+def get_latest(model, serializer):
+    """
+    Return the last reading of a location, or of every matching location, for a latest GET request.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param serializer: The api.model the readings are marshalled with.
+    :return: The marshalled reading (city, province and country given) or list of readings.
+    """
+    args = location_arguments.parse_args()
+    serializer = selected_fields(serializer, args['fields'])
+    readings = latest_readings(model, city=args['city'], province=args['province'], country=args['country'])
+
+    if args['city'] is None or args['province'] is None or args['country'] is None:
+        return marshal_records(readings, serializer)
+
+    if not readings:
+        abort(404, 'No reading at the location.')
+
+    return marshal_records(readings[0], serializer)
+
+
+def get_query():
+    """
+    Return the readings of several locations and measurements for a query GET request.
+
+    :return: A list with the readings of each location, grouped by measurement.
+    """
+    args = query_arguments.parse_args()
+
+    # Repeated locations and measurements are returned once, in the order first requested
+    locations = list(dict.fromkeys(args['location']))
+    measurements = list(dict.fromkeys(args['measurement'] or MEASUREMENTS))
+
+    max_locations = current_app.config.get('QUERY_MAX_LOCATIONS', 100)
+    if len(locations) > max_locations:
+        abort(400, 'Bad request: at most {max_locations} locations per query'.format(max_locations=max_locations))
+
+    results = [{'city': city, 'province': province, 'country': country} for city, province, country in locations]
+
+    for measurement in measurements:
+        model, serializer = PUBLIC_MEASUREMENTS[measurement]
+        serializer = selected_fields(serializer, args['fields'])
+        readings = get_location_readings(model,
+                                         locations,
+                                         start=args['start'],
+                                         end=args['end'],
+                                         fields=args['fields'] and list(serializer))
+
+        for location, result in zip(locations, results):
+            result[measurement] = marshal_records(readings[location], serializer)
+
+    return results
+
 
 @ns.route('/humidity/')
 class PublicHumidityCollection(Resource):
-    @api.marshal_list_with(public_humidity)
-    @api.doc(params={'start': 'The required start date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'end': 'The required end date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'city': 'The required city for the returned records.'})
+    @api.response(200, 'Success', [public_humidity])
+    @api.produces(['application/json', 'application/x-ndjson', 'text/csv', 'application/msgpack',
+                   'application/vnd.apache.arrow.stream'])
+    @api.expect(date_range_pagination_arguments)
+    @api.response(400, 'Bad request: invalid arguments or cursor.')
     def get(self):
         """
         Returns list of public humidity records.
         :return:
         """
-        parser = reqparse.RequestParser(bundle_errors=True)
-        parser.add_argument('start', type=str, required=True)
-        parser.add_argument('end', type=str, required=True)
-        parser.add_argument('city', type=str, required=True)
-        parser.add_argument('province', type=str, required=True)
-        parser.add_argument('country', type=str, required=True)
-        args = parser.parse_args()
-        start = args['start']
-        end = args['end']
-        city = args['city']
-        province = args['province']
-        country = args['country']
-
-        records = Humidity.query.filter(
-            and_(Humidity.timestamp >= start,
-                 Humidity.timestamp <= end)).filter(
-            and_(Humidity.city == city,
-                 Humidity.province == province,
-                 Humidity.country == country)).order_by(Humidity.timestamp).all()
-
-        return records
+        return get_collection(Humidity, public_humidity, conditional=True, cached=True, public=True)
+
+
+@ns.route('/humidity/aggregate')
+class PublicHumidityAggregate(Resource):
+    @api.marshal_list_with(aggregate, skip_none=True)
+    @api.expect(aggregate_arguments)
+    @api.response(400, 'Bad request: invalid arguments.')
+    def get(self):
+        """
+        Returns humidity aggregates per time bucket.
+
+        * Use bucket (1m, 5m, 1h or 1d) to choose the bucket width.
+        * Use agg (e.g. min,max,avg,count,stddev) to choose the aggregates returned.
+
+        Only buckets containing readings are returned.
+        :return:
+        """
+        return get_aggregates(Humidity)
+
+
+@ns.route('/humidity/latest')
+class PublicHumidityLatest(Resource):
+    @api.response(200, 'Success', [public_humidity])
+    @api.expect(location_arguments)
+    @api.response(404, 'No reading at the location.')
+    def get(self):
+        """
+        Returns the last public humidity record of a location, or of every location.
+
+        * With city, province and country, the location's last record is returned.
+        * Otherwise the last record of every location matching the given arguments is returned.
+        :return:
+        """
+        return get_latest(Humidity, public_humidity)
 
 
 @ns.route('/humidity/<int:humidity_id>')
 @api.response(404, 'PublicHumidity not found.')
 class PublicHumidityItem(Resource):
-    @api.marshal_with(public_humidity)
+    @api.response(200, 'Success', public_humidity)
+    @api.response(304, 'Not modified.')
+    @api.response(400, 'Bad request: unknown field.')
+    @api.expect(fields_arguments)
     def get(self, humidity_id: int):
         """
         Returns a public humidity record.
@@ -69,47 +177,65 @@ class PublicHumidityItem(Resource):
         :type humidity_id: int
         :return:
         """
-        return Humidity.query.filter(Humidity.id == humidity_id).one()
+        return conditional_item(get_reading(Humidity, humidity_id), requested_fields(public_humidity))
 
 
 @ns.route('/pressure/')
 class PublicPressureCollection(Resource):
-    @api.marshal_list_with(public_pressure)
-    @api.doc(params={'start': 'The required start date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'end': 'The required end date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'city': 'The required city for the returned records.'})
+    @api.response(200, 'Success', [public_pressure])
+    @api.produces(['application/json', 'application/x-ndjson', 'text/csv', 'application/msgpack',
+                   'application/vnd.apache.arrow.stream'])
+    @api.expect(date_range_pagination_arguments)
+    @api.response(400, 'Bad request: invalid arguments or cursor.')
     def get(self):
         """
         Returns list of public pressure records.
         :return:
         """
-        parser = reqparse.RequestParser(bundle_errors=True)
-        parser.add_argument('start', type=str, required=True)
-        parser.add_argument('end', type=str, required=True)
-        parser.add_argument('city', type=str, required=True)
-        parser.add_argument('province', type=str, required=True)
-        parser.add_argument('country', type=str, required=True)
-        args = parser.parse_args()
-        start = args['start']
-        end = args['end']
-        city = args['city']
-        province = args['province']
-        country = args['country']
-
-        records = Pressure.query.filter(
-            and_(Pressure.timestamp >= start,
-                 Pressure.timestamp <= end)).filter(
-            and_(Pressure.city == city,
-                 Pressure.province == province,
-                 Pressure.country == country)).order_by(Pressure.timestamp).all()
-
-        return records
+        return get_collection(Pressure, public_pressure, conditional=True, cached=True, public=True)
+
+
+@ns.route('/pressure/aggregate')
+class PublicPressureAggregate(Resource):
+    @api.marshal_list_with(aggregate, skip_none=True)
+    @api.expect(aggregate_arguments)
+    @api.response(400, 'Bad request: invalid arguments.')
+    def get(self):
+        """
+        Returns pressure aggregates per time bucket.
+
+        * Use bucket (1m, 5m, 1h or 1d) to choose the bucket width.
+        * Use agg (e.g. min,max,avg,count,stddev) to choose the aggregates returned.
+
+        Only buckets containing readings are returned.
+        :return:
+        """
+        return get_aggregates(Pressure)
+
+
+@ns.route('/pressure/latest')
+class PublicPressureLatest(Resource):
+    @api.response(200, 'Success', [public_pressure])
+    @api.expect(location_arguments)
+    @api.response(404, 'No reading at the location.')
+    def get(self):
+        """
+        Returns the last public pressure record of a location, or of every location.
+
+        * With city, province and country, the location's last record is returned.
+        * Otherwise the last record of every location matching the given arguments is returned.
+        :return:
+        """
+        return get_latest(Pressure, public_pressure)
 
 
 @ns.route('/pressure/<int:pressure_id>')
 @api.response(404, 'PublicPressure not found.')
 class PublicPressureItem(Resource):
-    @api.marshal_with(public_pressure)
+    @api.response(200, 'Success', public_pressure)
+    @api.response(304, 'Not modified.')
+    @api.response(400, 'Bad request: unknown field.')
+    @api.expect(fields_arguments)
     def get(self, pressure_id: int):
         """
         Returns a public pressure record.
@@ -117,47 +243,65 @@ class PublicPressureItem(Resource):
         :type pressure_id: int
         :return:
         """
-        return Pressure.query.filter(Pressure.id == pressure_id).one()
+        return conditional_item(get_reading(Pressure, pressure_id), requested_fields(public_pressure))
 
 
 @ns.route('/temperature/')
 class PublicTemperatureCollection(Resource):
-    @api.marshal_list_with(public_temperature)
-    @api.doc(params={'start': 'The required start date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'end': 'The required end date (e.g. 2017-01-30) for the returned records.'})
-    @api.doc(params={'city': 'The required city for the returned records.'})
+    @api.response(200, 'Success', [public_temperature])
+    @api.produces(['application/json', 'application/x-ndjson', 'text/csv', 'application/msgpack',
+                   'application/vnd.apache.arrow.stream'])
+    @api.expect(date_range_pagination_arguments)
+    @api.response(400, 'Bad request: invalid arguments or cursor.')
     def get(self):
         """
         Returns list of public temperature records.
         :return:
         """
-        parser = reqparse.RequestParser(bundle_errors=True)
-        parser.add_argument('start', type=str, required=True)
-        parser.add_argument('end', type=str, required=True)
-        parser.add_argument('city', type=str, required=True)
-        parser.add_argument('province', type=str, required=True)
-        parser.add_argument('country', type=str, required=True)
-        args = parser.parse_args()
-        start = args['start']
-        end = args['end']
-        city = args['city']
-        province = args['province']
-        country = args['country']
-
-        records = Temperature.query.filter(
-            and_(Temperature.timestamp >= start,
-                 Temperature.timestamp <= end)).filter(
-            and_(Temperature.city == city,
-                 Temperature.province == province,
-                 Temperature.country == country)).order_by(Temperature.timestamp).all()
-
-        return records
+        return get_collection(Temperature, public_temperature, conditional=True, cached=True, public=True)
+
+
+@ns.route('/temperature/aggregate')
+class PublicTemperatureAggregate(Resource):
+    @api.marshal_list_with(aggregate, skip_none=True)
+    @api.expect(aggregate_arguments)
+    @api.response(400, 'Bad request: invalid arguments.')
+    def get(self):
+        """
+        Returns temperature aggregates per time bucket.
+
+        * Use bucket (1m, 5m, 1h or 1d) to choose the bucket width.
+        * Use agg (e.g. min,max,avg,count,stddev) to choose the aggregates returned.
+
+        Only buckets containing readings are returned.
+        :return:
+        """
+        return get_aggregates(Temperature)
+
+
+@ns.route('/temperature/latest')
+class PublicTemperatureLatest(Resource):
+    @api.response(200, 'Success', [public_temperature])
+    @api.expect(location_arguments)
+    @api.response(404, 'No reading at the location.')
+    def get(self):
+        """
+        Returns the last public temperature record of a location, or of every location.
+
+        * With city, province and country, the location's last record is returned.
+        * Otherwise the last record of every location matching the given arguments is returned.
+        :return:
+        """
+        return get_latest(Temperature, public_temperature)
 
 
 @ns.route('/temperature/<int:temperature_id>')
 @api.response(404, 'PublicTemperature not found.')
 class PublicTemperatureItem(Resource):
-    @api.marshal_with(public_temperature)
+    @api.response(200, 'Success', public_temperature)
+    @api.response(304, 'Not modified.')
+    @api.response(400, 'Bad request: unknown field.')
+    @api.expect(fields_arguments)
     def get(self, temperature_id: int):
         """
         Returns a public temperature record.
@@ -165,4 +309,22 @@ class PublicTemperatureItem(Resource):
         :type temperature_id: int
         :return:
         """
-        return Temperature.query.filter(Temperature.id == temperature_id).one()
+        return conditional_item(get_reading(Temperature, temperature_id), requested_fields(public_temperature))
+
+
+@ns.route('/query')
+class PublicQuery(Resource):
+    @api.response(200, 'Success', [location_readings])
+    @api.expect(query_arguments)
+    @api.response(400, 'Bad request: invalid arguments or too many locations.')
+    def get(self):
+        """
+        Returns the public records of several locations and measurements in one date range.
+
+        * Use location (city,province,country) once per location.
+        * Use measurement (humidity, pressure or temperature) once per measurement; all by default.
+
+        One query is run per measurement and the records are grouped by location.
+        :return:
+        """
+        return json_response(get_query())
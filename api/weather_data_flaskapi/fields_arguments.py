@@ -0,0 +1,37 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from flask_restplus import reqparse
+
+
+def field_names(value: str) -> list:
+    """
+    Parse a comma separated list of field names.
+
+    :param value: The fields argument (e.g. timestamp,value).
+    :type value: str
+    :return: The names, each once, in the order given.
+    """
+    names = [name.strip() for name in value.split(',') if name.strip()]
+
+    if not names:
+        raise ValueError('expected a comma separated list of field names')
+
+    return list(dict.fromkeys(names))
+
+
+fields_arguments = reqparse.RequestParser(bundle_errors=True)
+
+fields_arguments.add_argument('fields',
+                              type=field_names,
+                              required=False,
+                              help='Only the listed fields of the returned records (e.g. timestamp,value; '
+                                   'default: every field).')
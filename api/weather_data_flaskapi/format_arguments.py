@@ -0,0 +1,25 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from flask_restplus import reqparse
+
+ROWS_FORMAT = 'rows'
+COLUMNAR_FORMAT = 'columnar'
+
+format_arguments = reqparse.RequestParser(bundle_errors=True)
+
+format_arguments.add_argument('format',
+                              type=str,
+                              required=False,
+                              default=ROWS_FORMAT,
+                              choices=(ROWS_FORMAT, COLUMNAR_FORMAT),
+                              help='The JSON layout: rows (a list of records) or columnar (one array per field, '
+                                   'with fields that are the same for every record given once).')
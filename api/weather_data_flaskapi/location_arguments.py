@@ -0,0 +1,34 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from flask_restplus import reqparse
+
+from api.weather_data_flaskapi.fields_arguments import fields_arguments
+
+location_arguments = reqparse.RequestParser(bundle_errors=True)
+
+location_arguments.add_argument('city',
+                                type=str,
+                                required=False,
+                                help='The city of the returned records (default: any city).')
+
+location_arguments.add_argument('province',
+                                type=str,
+                                required=False,
+                                help='The province of the returned records (default: any province).')
+
+location_arguments.add_argument('country',
+                                type=str,
+                                required=False,
+                                help='The country of the returned records (default: any country).')
+
+for argument in fields_arguments.args:
+    location_arguments.add_argument(argument)
@@ -9,25 +9,16 @@
 @deffield    updated: 2017-06-14
 """
 
-from flask_restplus import reqparse
+from flask_restplus import reqparse, inputs
 
-pagination_arguments = reqparse.RequestParser()
+pagination_arguments = reqparse.RequestParser(bundle_errors=True)
 
-pagination_arguments.add_argument('page',
-                                  type=int,
+pagination_arguments.add_argument('cursor',
+                                  type=str,
                                   required=False,
-                                  default=1,
-                                  help='Page number')
+                                  help='The opaque cursor returned in the X-Next-Cursor header of the previous page')
 
-pagination_arguments.add_argument('bool',
-                                  type=bool,
+pagination_arguments.add_argument('limit',
+                                  type=inputs.positive,
                                   required=False,
-                                  default=1,
-                                  help='Page number')
-
-pagination_arguments.add_argument('per_page',
-                                  type=int,
-                                  required=False,
-                                  choices=[2, 10, 20, 30, 40, 50],
-                                  default=10,
-                                  help='Results per page {error_msg}')
+                                  help='Results per page (capped at PAGINATION_MAX_LIMIT)')
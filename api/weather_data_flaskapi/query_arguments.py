@@ -0,0 +1,65 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from flask_restplus import reqparse
+
+from api.weather_data_flaskapi.business.weather_data import parse_timestamp
+from api.weather_data_flaskapi.fields_arguments import fields_arguments
+
+MEASUREMENTS = ('humidity', 'pressure', 'temperature')
+
+
+def location(value: str) -> tuple:
+    """
+    Parse a city,province,country location argument.
+
+    :param value: The location argument (e.g. Edmonton,AB,CA).
+    :type value: str
+    :return: tuple
+    """
+    # Split from the right, so that a city name may contain commas
+    parts = tuple(part.strip() for part in value.rsplit(',', 2))
+
+    if len(parts) != 3 or not all(parts):
+        raise ValueError('expected city,province,country')
+
+    return parts
+
+
+query_arguments = reqparse.RequestParser(bundle_errors=True)
+
+query_arguments.add_argument('start',
+                             type=parse_timestamp,
+                             required=True,
+                             help='The required start date (e.g. 2017-01-30) for the returned records.')
+
+query_arguments.add_argument('end',
+                             type=parse_timestamp,
+                             required=True,
+                             help='The required end date (e.g. 2017-01-30) for the returned records.')
+
+query_arguments.add_argument('location',
+                             type=location,
+                             action='append',
+                             required=True,
+                             help='A location (city,province,country) of the returned records; repeat for '
+                                  'more locations.')
+
+query_arguments.add_argument('measurement',
+                             type=str,
+                             action='append',
+                             required=False,
+                             choices=MEASUREMENTS,
+                             help='A measurement of the returned records; repeat for more measurements '
+                                  '(default: all measurements).')
+
+for argument in fields_arguments.args:
+    query_arguments.add_argument(argument)
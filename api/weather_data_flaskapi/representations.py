@@ -0,0 +1,309 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+from flask import Response, current_app, request, stream_with_context
+from flask_restplus import fields
+from flask_restplus.mask import apply as apply_mask
+from flask_restplus.representations import output_json
+
+from api.weather_data_flaskapi.serializers import COLUMN_CONVERSIONS, convert_column, fast_serializer, \
+    field_attribute, marshal_columns
+from database.locations import LOCATION_FIELDS, get_location
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+JSON_MEDIATYPE = 'application/json'
+NDJSON_MEDIATYPE = 'application/x-ndjson'
+CSV_MEDIATYPE = 'text/csv'
+MSGPACK_MEDIATYPE = 'application/msgpack'
+ARROW_MEDIATYPE = 'application/vnd.apache.arrow.stream'
+
+# The binary formats are offered only when their (optional) package is installed
+BINARY_MEDIATYPES = tuple(mediatype for mediatype, module in ((MSGPACK_MEDIATYPE, msgpack),
+                                                              (ARROW_MEDIATYPE, pyarrow))
+                          if module is not None)
+
+STREAMING_MEDIATYPES = (NDJSON_MEDIATYPE, CSV_MEDIATYPE) + BINARY_MEDIATYPES
+
+# Fields a columnar response gives once when every record has the same value
+HOISTED_FIELDS = ('value_units', 'elevation_units', 'city', 'province', 'country')
+
+_json_encoder = json.JSONEncoder(separators=(',', ':'), check_circular=False)
+
+
+def negotiate_mediatype() -> str:
+    """
+    Pick the response media type from the request's Accept header.
+
+    JSON is preferred whenever the client accepts it equally, so existing clients are unaffected.
+
+    :return: str
+    """
+    return request.accept_mimetypes.best_match((JSON_MEDIATYPE,) + STREAMING_MEDIATYPES,
+                                               default=JSON_MEDIATYPE)
+
+
+def masked_fields(serializer):
+    """
+    Return the fields of a serializer that the request's X-Fields mask header selects.
+
+    :param serializer: The api.model (or selected fields).
+    :return: The serializer, or a dict with the masked fields.
+    """
+    mask = request.headers.get(current_app.config.get('RESTPLUS_MASK_HEADER', 'X-Fields'))
+
+    return apply_mask(serializer, mask, skip=True) if mask else serializer
+
+
+def marshal_records(records, serializer):
+    """
+    Marshal records with a serializer, honouring the X-Fields mask header like marshal_with does.
+
+    The records are converted by the serializer's compiled function (see fast_serializer), which
+    returns the same data as marshal() at a fraction of the cost.
+
+    :param records: A record or list of records (model instances, result rows or dicts).
+    :param serializer: The api.model (or selected fields) to marshal with.
+    :return: The marshalled data.
+    """
+    serializer = masked_fields(serializer)
+
+    if isinstance(records, (list, tuple)):
+        serialize = fast_serializer(serializer, mapping=bool(records) and isinstance(records[0], dict))
+        return [serialize(record) for record in records]
+
+    return fast_serializer(serializer, mapping=isinstance(records, dict))(records)
+
+
+def marshal_columnar(rows: list, serializer) -> dict:
+    """
+    Marshal result rows as one array per field, honouring the X-Fields mask header.
+
+    Units and location fields that are the same for every row are given once, as a value.
+
+    :param rows: The result rows, with a column per field.
+    :param serializer: The api.model (or selected fields) to marshal with.
+    :return: The marshalled data.
+    """
+    return marshal_columns(rows, masked_fields(serializer), HOISTED_FIELDS)
+
+
+def dumps(data) -> bytes:
+    """
+    Encode marshalled data as compact JSON, with orjson when it is installed.
+
+    :param data: The marshalled data.
+    :return: bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+
+    return _json_encoder.encode(data).encode('utf-8')
+
+
+def json_response(data, code: int = 200, headers: dict = None) -> Response:
+    """
+    Build a JSON response from marshalled data.
+
+    The data is encoded with dumps(), unless RESTPLUS_JSON settings are configured or the app
+    is in debug mode, when flask-restplus' own (indented) encoding is used.
+
+    :param data: The marshalled data.
+    :param code: The HTTP status code.
+    :type code: int
+    :param headers: Extra response headers.
+    :type headers: dict
+    :return: Response
+    """
+    if current_app.debug or current_app.config.get('RESTPLUS_JSON'):
+        return output_json(data, code, headers)
+
+    return Response(dumps(data) + b'\n', status=code, headers=headers, mimetype=JSON_MEDIATYPE)
+
+
+def generate_ndjson(records, serializer, chunk_size: int):
+    """
+    Yield newline delimited JSON, one record per line, in chunks of chunk_size records.
+    """
+    serialize = fast_serializer(serializer)
+    lines = []
+    for record in records:
+        lines.append(dumps(serialize(record)).decode('utf-8'))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def generate_csv(records, serializer, chunk_size: int):
+    """
+    Yield CSV with a header row, in chunks of chunk_size records.
+    """
+    serialize = fast_serializer(serializer)
+    names = list(serializer.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+
+    count = 0
+    for record in records:
+        data = serialize(record)
+        writer.writerow([data[name] for name in names])
+        count += 1
+        if count >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            count = 0
+
+    yield buffer.getvalue()
+
+
+def chunks(records, chunk_size: int):
+    """
+    Yield lists of up to chunk_size records, fetching them as they are needed.
+    """
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def generate_msgpack(records, serializer, chunk_size: int):
+    """
+    Yield a MessagePack stream of maps, one per record, in chunks of chunk_size records.
+
+    The maps are written one after another without an enclosing array (whose header would need the
+    number of records before the first one is fetched), so clients read them with msgpack.Unpacker,
+    as they read NDJSON line by line.
+    """
+    serialize = fast_serializer(serializer)
+    packer = msgpack.Packer()
+
+    for chunk in chunks(records, chunk_size):
+        yield b''.join([packer.pack(serialize(record)) for record in chunk])
+
+
+def arrow_schema(serializer):
+    """
+    Return the Arrow schema of a serializer's fields.
+
+    :param serializer: The api.model (or selected fields).
+    :return: pyarrow.Schema
+    """
+    types = {fields.Integer: pyarrow.int64(),
+             fields.Float: pyarrow.float64(),
+             fields.String: pyarrow.string(),
+             fields.DateTime: pyarrow.timestamp('us')}
+
+    return pyarrow.schema([(name, types[type(field)]) for name, field in serializer.items()])
+
+
+def arrow_batch(rows: list, serializer, schema):
+    """
+    Build an Arrow record batch from result rows, converting each column as a whole.
+
+    :param rows: The result rows, with a column per field (see project_rows).
+    :param serializer: The api.model (or selected fields).
+    :param schema: The serializer's arrow_schema.
+    :return: pyarrow.RecordBatch
+    """
+    columns = dict(zip(rows[0].keys(), zip(*rows)))
+
+    if any(name in LOCATION_FIELDS for name in serializer):
+        locations = {location_id: get_location(location_id) for location_id in set(columns['location_id'])}
+
+    arrays = []
+    for (name, field), arrow_field in zip(serializer.items(), schema):
+        if name in LOCATION_FIELDS:
+            position = LOCATION_FIELDS.index(name)
+            values = [locations[location_id][position] for location_id in columns['location_id']]
+        else:
+            values = columns[field_attribute(name, field)]
+
+        try:
+            arrays.append(pyarrow.array(values, type=arrow_field.type))
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+            # Decimal storage returns Decimal values, which Arrow only takes as decimals
+            arrays.append(pyarrow.array(convert_column(values, COLUMN_CONVERSIONS[type(field)]),
+                                        type=arrow_field.type))
+
+    return pyarrow.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def generate_arrow(records, serializer, chunk_size: int):
+    """
+    Yield an Arrow IPC stream, one record batch per chunk of chunk_size result rows.
+    """
+    schema = arrow_schema(serializer)
+    sink = io.BytesIO()
+
+    def written() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunks(records, chunk_size):
+            writer.write_batch(arrow_batch(chunk, serializer, schema))
+            yield written()
+
+    # The schema, when there were no rows, and the end of stream marker
+    yield written()
+
+
+GENERATORS = {NDJSON_MEDIATYPE: generate_ndjson,
+              CSV_MEDIATYPE: generate_csv,
+              MSGPACK_MEDIATYPE: generate_msgpack,
+              ARROW_MEDIATYPE: generate_arrow}
+
+
+def stream_response(records, serializer, mediatype: str, headers: dict = None) -> Response:
+    """
+    Build a streaming response that serializes records as they are fetched.
+
+    :param records: An iterable of records, typically a query using yield_per. Arrow needs
+                    result rows with a column per field (see project_rows).
+    :param serializer: The api.model to marshal each record with. The X-Fields mask header is
+                       honoured as marshal_records does.
+    :param mediatype: One of STREAMING_MEDIATYPES.
+    :type mediatype: str
+    :param headers: Extra response headers.
+    :type headers: dict
+    :return: Response
+    """
+    chunk_size = current_app.config.get('STREAMING_CHUNK_SIZE', 1000)
+    generator = GENERATORS[mediatype](records, masked_fields(serializer), chunk_size)
+
+    return Response(stream_with_context(generator), mimetype=mediatype, headers=headers)
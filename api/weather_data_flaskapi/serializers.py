@@ -9,9 +9,29 @@
 @deffield    updated: 2017-06-14
 """
 
+import keyword
+from datetime import datetime
+
 from flask_restplus import fields
 
 from api.restplus import api
+from database.locations import LOCATION_FIELDS, get_location
+
+# The conversion marshal() applies to a value of each field type
+FIELD_CONVERSIONS = {fields.Integer: 'int({value})',
+                     fields.Float: 'float({value})',
+                     fields.String: 'str({value})',
+                     fields.DateTime: '{value}.isoformat()'}
+
+# The same conversions, applied to a whole column at once
+COLUMN_CONVERSIONS = {fields.Integer: int,
+                      fields.Float: float,
+                      fields.String: str,
+                      fields.DateTime: datetime.isoformat}
+
+COMPILED_SERIALIZERS_MAX = 256
+
+_compiled = {}
 
 humidity = api.model(
     'Humidity',
@@ -333,3 +353,240 @@ public_temperature = api.model(
             readOnly=True,
             description='The date and time the reading was recorded'),
     })
+
+batch_status = api.model(
+    'BatchStatus',
+    {
+        'index': fields.Integer(
+            readOnly=True,
+            description='The position of the record in the submitted array'),
+        'status': fields.Integer(
+            readOnly=True,
+            description='The HTTP status for the record (201 created, 400 rejected, 500 not written)'),
+        'message': fields.String(
+            readOnly=True,
+            description="A description of the record's status"),
+    })
+
+batch_result = api.model(
+    'BatchResult',
+    {
+        'created': fields.Integer(
+            readOnly=True,
+            description='The number of records created'),
+        'rejected': fields.Integer(
+            readOnly=True,
+            description='The number of records rejected'),
+        'rows': fields.List(
+            fields.Nested(batch_status),
+            readOnly=True,
+            description='The status of each submitted record'),
+    })
+
+aggregate = api.model(
+    'Aggregate',
+    {
+        'timestamp': fields.DateTime(
+            required=True,
+            readOnly=True,
+            description='The start of the bucket'),
+        'count': fields.Integer(
+            readOnly=True,
+            description='The number of readings in the bucket'),
+        'min': fields.Float(
+            readOnly=True,
+            description='The minimum reading value in the bucket'),
+        'max': fields.Float(
+            readOnly=True,
+            description='The maximum reading value in the bucket'),
+        'avg': fields.Float(
+            readOnly=True,
+            description='The mean reading value in the bucket'),
+        'stddev': fields.Float(
+            readOnly=True,
+            description='The population standard deviation of the reading values in the bucket'),
+    })
+
+location_readings = api.model(
+    'LocationReadings',
+    {
+        'city': fields.String(
+            required=True,
+            readOnly=True,
+            description="The location's city."),
+        'province': fields.String(
+            required=True,
+            readOnly=True,
+            description="The location's province."),
+        'country': fields.String(
+            required=True,
+            readOnly=True,
+            description="The location's country."),
+        'humidity': fields.List(
+            fields.Nested(public_humidity),
+            readOnly=True,
+            description="The location's humidity records (if requested)"),
+        'pressure': fields.List(
+            fields.Nested(public_pressure),
+            readOnly=True,
+            description="The location's pressure records (if requested)"),
+        'temperature': fields.List(
+            fields.Nested(public_temperature),
+            readOnly=True,
+            description="The location's temperature records (if requested)"),
+    })
+
+
+def field_attribute(name: str, field) -> str:
+    """
+    Return the attribute a field reads, if the field can be compiled.
+
+    :param name: The field's name.
+    :type name: str
+    :param field: The field.
+    :return: str
+    :raises TypeError: When the field cannot be compiled (e.g. nested fields).
+    """
+    attribute = field.attribute or name
+
+    if type(field) not in FIELD_CONVERSIONS or field.default is not None or \
+            (isinstance(field, fields.DateTime) and field.dt_format != 'iso8601'):
+        raise TypeError('cannot compile the {name} field'.format(name=name))
+
+    if not isinstance(attribute, str) or not attribute.isidentifier() or keyword.iskeyword(attribute):
+        raise TypeError('cannot compile the {name} field'.format(name=name))
+
+    return attribute
+
+
+def compile_serializer(serializer, mapping: bool = False):
+    """
+    Generate a function that converts one record to the dict marshal() would return for it.
+
+    The function is generated once from the api.model definition, so each record costs one
+    attribute read and one conversion per field, without the per-field output() calls and
+    OrderedDict of marshal(). The api.model itself is unchanged and still documents the schema.
+
+    :param serializer: The api.model (or selected fields) to compile.
+    :param mapping: True for records that are dicts, False for model instances and result rows.
+                    Model instances and result rows have city, province and country read through
+                    their location id.
+    :return: A function of one record.
+    :raises TypeError: When a field cannot be compiled (e.g. nested fields).
+    """
+    lines = ['def serialize(record):']
+    values = []
+
+    if not mapping and any(name in LOCATION_FIELDS for name in serializer):
+        lines.append('    location = get_location(record.location_id)')
+
+    for index, (name, field) in enumerate(serializer.items()):
+        attribute = field_attribute(name, field)
+        conversion = FIELD_CONVERSIONS[type(field)]
+
+        if mapping:
+            source = 'record[{attribute!r}]'.format(attribute=attribute)
+        elif name in LOCATION_FIELDS:
+            source = 'location[{position}]'.format(position=LOCATION_FIELDS.index(name))
+        else:
+            source = 'record.{attribute}'.format(attribute=attribute)
+
+        value = 'v{index}'.format(index=index)
+        lines.append('    {value} = {source}'.format(value=value, source=source))
+        values.append('{name!r}: None if {value} is None else {conversion}'.format(
+            name=name,
+            value=value,
+            conversion=conversion.format(value=value)))
+
+    lines.append('    return {{{values}}}'.format(values=', '.join(values)))
+
+    namespace = {'get_location': get_location}
+    exec('\n'.join(lines), namespace)
+
+    return namespace['serialize']
+
+
+def fast_serializer(serializer, mapping: bool = False):
+    """
+    Return the compiled serializer of an api.model (or selected fields), compiling it on first use.
+
+    :param serializer: The api.model (or selected fields).
+    :param mapping: True for records that are dicts, False for model instances and result rows.
+    :return: A function of one record.
+    """
+    key = (mapping,) + tuple((name, id(field)) for name, field in serializer.items())
+
+    compiled = _compiled.get(key)
+    if compiled is None:
+        # Selected fields compile to a serializer each; start over rather than grow without bound
+        if len(_compiled) >= COMPILED_SERIALIZERS_MAX:
+            _compiled.clear()
+
+        compiled = _compiled[key] = compile_serializer(serializer, mapping)
+
+    return compiled
+
+
+def convert_column(column, convert) -> list:
+    """
+    Apply a conversion to every value of a column, leaving None values as they are.
+
+    :param column: The column's values.
+    :param convert: The conversion (see COLUMN_CONVERSIONS).
+    :return: list
+    """
+    # Numbers and timestamps refuse None, so the whole column is converted in one pass unless
+    # one is found; str would turn None into 'None'
+    if convert is not str:
+        try:
+            return list(map(convert, column))
+        except TypeError:
+            pass
+
+    return [None if value is None else convert(value) for value in column]
+
+
+def marshal_columns(rows: list, serializer, hoisted: tuple = ()) -> dict:
+    """
+    Convert result rows to one list per field, the columnar counterpart of the compiled serializers.
+
+    The rows are transposed once and each column is converted as a whole, so no dict is built
+    per row. City, province and country are resolved once per distinct location id.
+
+    :param rows: The result rows, with a column per field (see project_rows).
+    :param serializer: The api.model (or selected fields).
+    :param hoisted: The names of fields given once, as a value rather than a list, when every
+                    row has the same value (e.g. units and location).
+    :return: A dict of each field name to its list of values (or hoisted value).
+    :raises TypeError: When a field cannot be compiled (e.g. nested fields).
+    """
+    attributes = [field_attribute(name, field) for name, field in serializer.items()]
+
+    if not rows:
+        return {name: [] for name in serializer}
+
+    columns = dict(zip(rows[0].keys(), zip(*rows)))
+
+    if any(name in LOCATION_FIELDS for name in serializer):
+        locations = {location_id: get_location(location_id) for location_id in set(columns['location_id'])}
+
+    data = {}
+    for (name, field), attribute in zip(serializer.items(), attributes):
+        if name in LOCATION_FIELDS:
+            position = LOCATION_FIELDS.index(name)
+            if name in hoisted and len(locations) == 1:
+                # A single location needs no column to find its value is the same for every row
+                column = (next(iter(locations.values()))[position],)
+            else:
+                column = [locations[location_id][position] for location_id in columns['location_id']]
+        else:
+            column = columns[attribute]
+
+        convert = COLUMN_CONVERSIONS[type(field)]
+
+        if name in hoisted and len(set(column)) == 1:
+            data[name] = None if column[0] is None else convert(column[0])
+        else:
+            data[name] = convert_column(column, convert)
+
+    return data
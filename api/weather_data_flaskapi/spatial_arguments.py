@@ -0,0 +1,98 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import math
+
+from flask_restplus import reqparse
+
+
+def coordinates(value: str, count: int) -> tuple:
+    try:
+        numbers = tuple(float(part) for part in value.split(','))
+    except ValueError:
+        numbers = ()
+
+    if len(numbers) != count:
+        raise ValueError('expected {count} comma separated numbers'.format(count=count))
+
+    return numbers
+
+
+def bounding_box(value: str) -> tuple:
+    """
+    Parse a west,south,east,north bounding box argument.
+
+    A box with west > east crosses the antimeridian.
+
+    :param value: The bbox argument (e.g. -114.0,53.3,-113.2,53.7, or 179.5,-17.5,-179.5,-16.5).
+    :type value: str
+    :return: tuple
+    """
+    west, south, east, north = coordinates(value, 4)
+
+    if not (-90.0 <= south <= north <= 90.0):
+        raise ValueError('expected -90 <= south <= north <= 90')
+
+    if not (-180.0 <= west <= 180.0 and -180.0 <= east <= 180.0):
+        raise ValueError('expected -180 <= west, east <= 180')
+
+    return west, south, east, north
+
+
+def position(value: str) -> tuple:
+    """
+    Parse a latitude,longitude argument.
+
+    :param value: The near argument (e.g. 53.55,-113.49).
+    :type value: str
+    :return: tuple
+    """
+    latitude, longitude = coordinates(value, 2)
+
+    if not (-90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0):
+        raise ValueError('expected a latitude (-90 to 90) and a longitude (-180 to 180)')
+
+    return latitude, longitude
+
+
+def distance(value: str) -> float:
+    """
+    Parse a positive, finite distance argument.
+
+    :param value: The radius_km argument (e.g. 25).
+    :type value: str
+    :return: float
+    """
+    number = float(value)
+
+    if not (math.isfinite(number) and number > 0.0):
+        raise ValueError('expected a positive number')
+
+    return number
+
+
+spatial_arguments = reqparse.RequestParser(bundle_errors=True)
+
+spatial_arguments.add_argument('bbox',
+                               type=bounding_box,
+                               required=False,
+                               help='Only records inside the bounding box west,south,east,north (in degrees; '
+                                    'west > east crosses the antimeridian)')
+
+spatial_arguments.add_argument('near',
+                               type=position,
+                               required=False,
+                               help='Only records within radius_km of the position latitude,longitude')
+
+spatial_arguments.add_argument('radius_km',
+                               type=distance,
+                               required=False,
+                               help='The radius in kilometres of the near argument')
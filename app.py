@@ -17,10 +17,13 @@ from flask import Flask, Blueprint
 from api.restplus import api
 from flask_jwt import JWT, jwt_required, current_identity
 
+from api.weather_data_flaskapi.business.latest import load_latest_readings
 from api.weather_data_flaskapi.business.security import authenticate, identity
+from api.weather_data_flaskapi.compression import compress_response
 from api.weather_data_flaskapi.endpoints.protected_endpoint import ns as protected_namespace
 from api.weather_data_flaskapi.endpoints.public_endpoint import ns as public_namespace
-from database import db
+from database import check_schema_version, db
+from database.types import set_numeric_storage
 
 
 def create_app():
@@ -33,12 +36,15 @@ def initialize_app(flask_app):
     api.init_app(blueprint)
     api.add_namespace(protected_namespace)
     api.add_namespace(public_namespace)
+    blueprint.after_request(compress_response)
     flask_app.register_blueprint(blueprint)
 
+    set_numeric_storage(flask_app.config['NUMERIC_STORAGE'])
     db.init_app(flask_app)
 
-    from database import create_database
-    create_database(app=flask_app)
+    # The schema is created by create_weather_data_database.py, not by every worker at startup
+    if check_schema_version(flask_app):
+        load_latest_readings(flask_app)
 
 
 log_file_path = path.join(path.dirname(path.abspath(__file__)), 'logging.conf')
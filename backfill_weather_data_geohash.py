@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+
+"""
+backfill_weather_data_geohash -- compute the geohash of readings stored without one
+
+backfill_weather_data_geohash is a command line utility to fill in the geohash column of the
+humidity, pressure and temperature readings stored before the column was added, so that the
+bbox and near filters of the collection endpoints find them.
+
+Run create_weather_data_database.py first to add the column. Each batch is its own transaction.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+
+__all__ = []
+__version__ = 1.1
+__date__ = '2017-06-14'
+__updated__ = '2017-06-14'
+
+DEBUG = False
+
+MEASUREMENTS = ('humidity', 'pressure', 'temperature')
+
+
+class CLIError(Exception):
+    """Generic exception to raise and log different fatal errors."""
+
+    def __init__(self, message):
+        super(CLIError).__init__(type(self))
+        self.message = 'E: {message}'.format(message=message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+
+def backfill_table(table, batch_size: int) -> int:
+    """
+    Compute the geohash of the rows of a reading table (or month table) that have none.
+
+    :param table: The reading table.
+    :param batch_size: The number of rows updated per transaction.
+    :return: The number of rows updated.
+    """
+    from sqlalchemy import bindparam, select
+
+    from database import db
+    from database.geohash import encode
+
+    update = table.update().where(table.c.id == bindparam('reading_id')).values(geohash=bindparam('reading_geohash'))
+    updated = 0
+
+    while True:
+        rows = db.session.execute(select([table.c.id, table.c.latitude_public, table.c.longitude_public])
+                                  .where(table.c.geohash.is_(None))
+                                  .limit(batch_size)).fetchall()
+
+        if not rows:
+            return updated
+
+        db.session.execute(update, [{'reading_id': reading_id,
+                                     'reading_geohash': encode(float(latitude), float(longitude))}
+                                    for reading_id, latitude, longitude in rows])
+        db.session.commit()
+
+        updated += len(rows)
+        sys.stdout.write('{table}: {updated} readings\n'.format(table=table.name, updated=updated))
+
+
+def backfill(model, batch_size: int) -> int:
+    """
+    Compute the geohash of the readings of a model that have none, including its month tables.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param batch_size: The number of rows updated per transaction.
+    :return: The number of readings updated.
+    """
+    from database.partitions import list_partitions, partition_table, routes_partitions
+
+    tables = [model.__table__]
+
+    if routes_partitions():
+        tables.extend(partition_table(model, month) for month in list_partitions(model))
+
+    return sum(backfill_table(table, batch_size) for table in tables)
+
+
+def main(argv=None):
+    """Command line options."""
+
+    program_name = os.path.basename(sys.argv[0])
+
+    try:
+        parser = ArgumentParser(description=__import__('__main__').__doc__.split("\n")[1],
+                                formatter_class=RawDescriptionHelpFormatter)
+        parser.add_argument('-m',
+                            '--measurement',
+                            dest='measurements',
+                            action='append',
+                            choices=MEASUREMENTS,
+                            help='the measurement to backfill (repeatable, default: all)')
+        parser.add_argument('-b',
+                            '--batch-size',
+                            dest='batch_size',
+                            type=int,
+                            default=10000,
+                            help='the number of readings updated per transaction (default: 10000)')
+
+        args = parser.parse_args(argv)
+
+        if args.batch_size < 1:
+            raise CLIError('batch size must be positive')
+
+        from app import app
+        from database.models import Humidity, Pressure, Temperature
+
+        models = {'humidity': Humidity, 'pressure': Pressure, 'temperature': Temperature}
+
+        with app.app_context():
+            for measurement in args.measurements or MEASUREMENTS:
+                backfill(models[measurement], args.batch_size)
+
+        return 0
+    except KeyboardInterrupt:
+        # handle keyboard interrupt ###
+        return 0
+    except Exception as e:
+        if DEBUG:
+            raise e
+        indent = len(program_name) * " "
+        sys.stderr.write(program_name + ": " + repr(e) + "\n")
+        sys.stderr.write(indent + "  for help use --help")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+
+"""
+backfill_weather_data_rollups -- rebuild the hourly and daily rollups from the raw readings
+
+backfill_weather_data_rollups is a command line utility to rebuild the rollup tables of the
+humidity, pressure and temperature readings.
+
+It recomputes the rollups one month at a time so each transaction stays small.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+from datetime import datetime
+
+__all__ = []
+__version__ = 1.1
+__date__ = '2017-06-14'
+__updated__ = '2017-06-14'
+
+DEBUG = False
+
+MEASUREMENTS = ('humidity', 'pressure', 'temperature')
+
+
+class CLIError(Exception):
+    """Generic exception to raise and log different fatal errors."""
+
+    def __init__(self, message):
+        super(CLIError).__init__(type(self))
+        self.message = 'E: {message}'.format(message=message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+
+def parse_month(value: str) -> datetime:
+    """
+    Parse a YYYY-MM argument into the first instant of that month.
+
+    :param value: The month (e.g. 2017-01).
+    :type value: str
+    :return: datetime
+    """
+    return datetime.strptime(value, '%Y-%m')
+
+
+def next_month(month: datetime) -> datetime:
+    if month.month == 12:
+        return month.replace(year=month.year + 1, month=1)
+    return month.replace(month=month.month + 1)
+
+
+def backfill(model, start: datetime, end: datetime) -> int:
+    """
+    Rebuild the rollups of a reading table month by month.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param start: The first month to rebuild, or None for the month of the oldest reading.
+    :param end: The month after the last month to rebuild, or None for the month after the newest reading.
+    :return: The number of rollup rows written.
+    """
+    from sqlalchemy import func
+
+    from api.weather_data_flaskapi.business.rollups import rebuild_rollups
+    from database.partitions import query_readings
+
+    oldest, newest = query_readings(model).with_entities(func.min(model.timestamp), func.max(model.timestamp)).one()
+
+    if oldest is None:
+        return 0
+
+    month = start or datetime(oldest.year, oldest.month, 1)
+    end = end or next_month(datetime(newest.year, newest.month, 1))
+
+    written = 0
+    while month < end:
+        written += rebuild_rollups(model, month, next_month(month))
+        sys.stdout.write('{table} {month:%Y-%m}: {written} rollup rows\n'.format(table=model.__tablename__,
+                                                                                 month=month,
+                                                                                 written=written))
+        month = next_month(month)
+
+    return written
+
+
+def main(argv=None):
+    """Command line options."""
+
+    program_name = os.path.basename(sys.argv[0])
+
+    try:
+        parser = ArgumentParser(description=__import__('__main__').__doc__.split("\n")[1],
+                                formatter_class=RawDescriptionHelpFormatter)
+        parser.add_argument('-m',
+                            '--measurement',
+                            dest='measurements',
+                            action='append',
+                            choices=MEASUREMENTS,
+                            help='the measurement to rebuild (repeatable, default: all)')
+        parser.add_argument('-s',
+                            '--start',
+                            dest='start',
+                            type=parse_month,
+                            required=False,
+                            help='the first month to rebuild (YYYY-MM, default: the oldest reading)')
+        parser.add_argument('-e',
+                            '--end',
+                            dest='end',
+                            type=parse_month,
+                            required=False,
+                            help='the month after the last month to rebuild '
+                                 '(YYYY-MM, default: after the newest reading)')
+
+        args = parser.parse_args(argv)
+
+        if args.start is not None and args.end is not None and args.start >= args.end:
+            raise CLIError('start must be before end')
+
+        from app import app
+        from database.models import Humidity, Pressure, Temperature
+
+        models = {'humidity': Humidity, 'pressure': Pressure, 'temperature': Temperature}
+
+        with app.app_context():
+            for measurement in args.measurements or MEASUREMENTS:
+                backfill(models[measurement], args.start, args.end)
+
+        return 0
+    except KeyboardInterrupt:
+        # handle keyboard interrupt ###
+        return 0
+    except Exception as e:
+        if DEBUG:
+            raise e
+        indent = len(program_name) * " "
+        sys.stderr.write(program_name + ": " + repr(e) + "\n")
+        sys.stderr.write(indent + "  for help use --help")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
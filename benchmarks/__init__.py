@@ -0,0 +1,109 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import json
+import random
+from datetime import datetime, timedelta
+
+from flask import Flask, Blueprint
+from flask_jwt import JWT
+
+BENCHMARK_USERNAME = 'benchmark'
+BENCHMARK_PASSWORD = 'benchmark'
+
+
+def create_benchmark_app(database_uri: str = 'sqlite://', **config) -> Flask:
+    """
+    Create an application wired like app.py against a scratch database.
+
+    :param database_uri: The SQLAlchemy database URI (defaults to an in-memory SQLite database).
+    :type database_uri: str
+    :param config: Settings overriding config.TestingConfig (e.g. NUMERIC_STORAGE='scaled').
+    :return: Flask
+    """
+    from api.restplus import api
+    from api.weather_data_flaskapi.business.latest import load_latest_readings
+    from api.weather_data_flaskapi.business.security import authenticate, identity, create_user
+    from api.weather_data_flaskapi.compression import compress_response
+    from api.weather_data_flaskapi.endpoints.protected_endpoint import ns as protected_namespace
+    from api.weather_data_flaskapi.endpoints.public_endpoint import ns as public_namespace
+    from database import db, create_database
+    from database.types import set_numeric_storage
+
+    flask_app = Flask(__name__)
+    flask_app.config.from_object('config.TestingConfig')
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    flask_app.config.update(config)
+
+    blueprint = Blueprint('weather', __name__, url_prefix='/weather')
+    api.init_app(blueprint)
+    api.add_namespace(protected_namespace)
+    api.add_namespace(public_namespace)
+    blueprint.after_request(compress_response)
+    flask_app.register_blueprint(blueprint)
+
+    set_numeric_storage(flask_app.config['NUMERIC_STORAGE'])
+    db.init_app(flask_app)
+    JWT(flask_app, authenticate, identity)
+
+    create_database(app=flask_app)
+    load_latest_readings(flask_app)
+
+    with flask_app.app_context():
+        create_user({'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD, 'enabled': True})
+
+    return flask_app
+
+
+def get_token(client) -> str:
+    """
+    Log the benchmark user in and return a JWT access token.
+
+    :param client: A Flask test client.
+    :return: str
+    """
+    response = client.post('/auth',
+                           data=json.dumps({'username': BENCHMARK_USERNAME, 'password': BENCHMARK_PASSWORD}),
+                           content_type='application/json')
+    return json.loads(response.data.decode('utf-8'))['access_token']
+
+
+def get_random_record_data(timestamp: datetime = None,
+                           city: str = 'Edmonton',
+                           province: str = 'AB',
+                           country: str = 'CA') -> dict:
+    """
+    Generate a random reading as the JSON data a weather station would submit.
+
+    :return: dict
+    """
+    if timestamp is None:
+        timestamp = datetime(2017, 1, 1) + timedelta(seconds=random.randint(0, 365 * 24 * 3600))
+
+    latitude = float('{:.6f}'.format(random.uniform(-90.0, 90.0)))
+    longitude = float('{:.6f}'.format(random.uniform(-180.0, 180.0)))
+
+    return {
+        'value': float('{:.4f}'.format(random.uniform(0, 100.0))),
+        'value_units': 'RH',
+        'value_error_range': float('{:.6f}'.format(random.uniform(0.0, 1.0))),
+        'latitude': latitude,
+        'latitude_public': float(int(latitude * 1000)) / 1000,
+        'longitude': longitude,
+        'longitude_public': float(int(longitude * 1000)) / 1000,
+        'elevation': float('{:.4f}'.format(random.uniform(-90.0, 999.0))),
+        'elevation_units': 'm',
+        'timestamp': timestamp.strftime('%Y-%m-%dT%H:%M:%S'),
+        'city': city,
+        'province': province,
+        'country': country
+    }
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+
+"""
+batch_ingest_benchmark -- compare single-row, write-behind and batch ingest throughput
+
+Posts the same readings through POST /weather/protected/humidity/ one row at a time, again
+in write-behind mode (INGEST_QUEUE_SIZE > 0, timed until the queue is written), and through
+POST /weather/protected/humidity/batch in batches, and reports rows per second. Use a file
+or server database for realistic commit costs.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+
+from benchmarks import create_benchmark_app, get_token, get_random_record_data
+
+
+def benchmark_single_row(client, token: str, rows: list) -> float:
+    headers = {'authorization': 'JWT {token}'.format(token=token)}
+
+    started = time.perf_counter()
+    for row in rows:
+        response = client.post('/weather/protected/humidity/',
+                               data=json.dumps(row),
+                               content_type='application/json',
+                               headers=headers)
+        assert response.status_code == 201, response.data
+    elapsed = time.perf_counter() - started
+
+    return len(rows) / elapsed
+
+
+def benchmark_write_behind(app, client, token: str, rows: list) -> float:
+    from api.weather_data_flaskapi.business.ingest import flush_ingest_queue
+
+    headers = {'authorization': 'JWT {token}'.format(token=token)}
+
+    started = time.perf_counter()
+    for row in rows:
+        response = client.post('/weather/protected/humidity/',
+                               data=json.dumps(row),
+                               content_type='application/json',
+                               headers=headers)
+        assert response.status_code == 202, response.data
+
+    with app.app_context():
+        flush_ingest_queue()
+    elapsed = time.perf_counter() - started
+
+    return len(rows) / elapsed
+
+
+def benchmark_batch(client, token: str, rows: list, batch_size: int) -> float:
+    headers = {'authorization': 'JWT {token}'.format(token=token)}
+
+    started = time.perf_counter()
+    for offset in range(0, len(rows), batch_size):
+        response = client.post('/weather/protected/humidity/batch',
+                               data=json.dumps(rows[offset:offset + batch_size]),
+                               content_type='application/json',
+                               headers=headers)
+        assert response.status_code == 201, response.data
+    elapsed = time.perf_counter() - started
+
+    return len(rows) / elapsed
+
+
+def main(argv=None):
+    from api.weather_data_flaskapi.business.ingest import ingest_queue_stats
+
+    parser = ArgumentParser(description='Compare single-row, write-behind and batch ingest throughput.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--rows', dest='rows', type=int, default=2000,
+                        help='the number of readings to ingest on each path')
+    parser.add_argument('--batch-size', dest='batch_size', type=int, default=1000,
+                        help='the number of readings per batch request')
+    parser.add_argument('--queue-size', dest='queue_size', type=int, default=10000,
+                        help='INGEST_QUEUE_SIZE of the write-behind run')
+    args = parser.parse_args(argv)
+
+    app = create_benchmark_app(args.database_uri)
+    client = app.test_client()
+    token = get_token(client)
+
+    rows = [get_random_record_data() for _ in range(args.rows)]
+
+    single_rate = benchmark_single_row(client, token, rows)
+
+    app.config['INGEST_QUEUE_SIZE'] = args.queue_size
+    write_behind_rate = benchmark_write_behind(app, client, token, rows)
+    app.config['INGEST_QUEUE_SIZE'] = 0
+
+    with app.app_context():
+        stats = ingest_queue_stats()
+
+    batch_rate = benchmark_batch(client, token, rows, args.batch_size)
+
+    print('single-row ingest:   {rate:10.1f} rows/sec'.format(rate=single_rate))
+    print('write-behind ingest: {rate:10.1f} rows/sec ({commits} commits, mean {mean:.1f} rows)'.format(
+        rate=write_behind_rate,
+        commits=stats['commits'],
+        mean=stats['mean_batch_size']))
+    print('batch ingest:        {rate:10.1f} rows/sec (batch size {size})'.format(rate=batch_rate,
+                                                                                  size=args.batch_size))
+    print('speedup:             {speedup:10.1f}x write-behind, {batch:.1f}x batch'.format(
+        speedup=write_behind_rate / single_rate,
+        batch=batch_rate / single_rate))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+
+"""
+binary_formats_benchmark -- compare the size, encode and decode time of the collection formats
+
+Loads readings, then encodes them as a collection response body in each format the server
+offers (JSON, NDJSON, MessagePack and Arrow IPC) and decodes each body the way a client would.
+MessagePack and Arrow are skipped when msgpack or pyarrow is not installed.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime
+
+from benchmarks import create_benchmark_app, get_random_record_data
+
+
+def load_readings(app, count: int) -> None:
+    from api.weather_data_flaskapi.business.weather_data import create_humidity_batch
+
+    with app.app_context():
+        for offset in range(0, count, 10000):
+            create_humidity_batch([get_random_record_data() for _ in range(offset, min(offset + 10000, count))])
+
+
+def decode_msgpack(body: bytes) -> list:
+    import msgpack
+
+    unpacker = msgpack.Unpacker(raw=False)
+    unpacker.feed(body)
+
+    return list(unpacker)
+
+
+def decode_arrow(body: bytes):
+    import pyarrow
+
+    return pyarrow.ipc.open_stream(body).read_all()
+
+
+def main(argv=None):
+    from api.weather_data_flaskapi.business.projection import project_rows
+    from api.weather_data_flaskapi.business.weather_data import get_readings
+    from api.weather_data_flaskapi.representations import ARROW_MEDIATYPE, GENERATORS, MSGPACK_MEDIATYPE, \
+        NDJSON_MEDIATYPE, STREAMING_MEDIATYPES, dumps, marshal_records
+    from api.weather_data_flaskapi.serializers import public_humidity
+    from database.models import Humidity
+
+    parser = ArgumentParser(description='Compare the size, encode and decode time of the collection formats.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--readings', dest='readings', type=int, default=100000,
+                        help='the number of readings encoded')
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=10000,
+                        help='the number of readings per streamed chunk (Arrow record batch)')
+    args = parser.parse_args(argv)
+
+    app = create_benchmark_app(args.database_uri)
+    load_readings(app, args.readings)
+
+    decoders = {NDJSON_MEDIATYPE: lambda body: [json.loads(line) for line in body.splitlines()],
+                MSGPACK_MEDIATYPE: decode_msgpack,
+                ARROW_MEDIATYPE: decode_arrow}
+
+    with app.test_request_context(), app.app_context():
+        rows = project_rows(get_readings(Humidity, datetime(2000, 1, 1), datetime(2100, 1, 1)),
+                            Humidity,
+                            public_humidity,
+                            'timestamp',
+                            'id').order_by(Humidity.timestamp, Humidity.id).all()
+
+        started = time.perf_counter()
+        body = dumps(marshal_records(rows, public_humidity))
+        encoded = time.perf_counter() - started
+
+        started = time.perf_counter()
+        records = json.loads(body)
+        decoded = time.perf_counter() - started
+
+        results = [('application/json', len(body), encoded, decoded)]
+
+        for mediatype in STREAMING_MEDIATYPES:
+            if mediatype not in decoders:
+                continue
+
+            started = time.perf_counter()
+            body = b''.join(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')
+                            for chunk in GENERATORS[mediatype](rows, public_humidity, args.chunk_size))
+            encoded = time.perf_counter() - started
+
+            started = time.perf_counter()
+            decoded_body = decoders[mediatype](body)
+            decoded = time.perf_counter() - started
+
+            count = decoded_body.num_rows if mediatype == ARROW_MEDIATYPE else len(decoded_body)
+            assert count == len(records), (mediatype, count)
+
+            results.append((mediatype, len(body), encoded, decoded))
+
+    print('{readings} readings'.format(readings=args.readings))
+    for mediatype, size, encoded, decoded in results:
+        print('{mediatype:37} {size:8.0f} kB   encode {encoded:8.1f} ms   decode {decoded:8.1f} ms'.format(
+            mediatype=mediatype,
+            size=size / 1024,
+            encoded=encoded * 1000,
+            decoded=decoded * 1000))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
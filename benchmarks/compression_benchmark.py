@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+"""
+compression_benchmark -- compare the CPU cost and bytes saved of the content codings and levels
+
+Loads readings, then compresses their JSON collection body whole (as a cached or buffered
+response is) and their NDJSON body chunk by chunk (as a streamed response is) with each
+content coding the server can produce, at several levels. br and zstd are skipped when
+brotli or zstandard is not installed.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime
+
+from benchmarks import create_benchmark_app, get_random_record_data
+
+# The levels compared for each coding (quality for br); the configured default is among them
+LEVELS = {'br': (1, 4, 6, 11), 'zstd': (1, 3, 9, 19), 'gzip': (1, 6, 9), 'deflate': (1, 6, 9)}
+
+
+def load_readings(app, count: int) -> None:
+    from api.weather_data_flaskapi.business.weather_data import create_humidity_batch
+
+    with app.app_context():
+        for offset in range(0, count, 10000):
+            create_humidity_batch([get_random_record_data() for _ in range(offset, min(offset + 10000, count))])
+
+
+def timed(function) -> tuple:
+    """
+    Return the seconds a call takes and its result.
+    """
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def main(argv=None):
+    from api.weather_data_flaskapi.business.projection import project_rows
+    from api.weather_data_flaskapi.business.weather_data import get_readings
+    from api.weather_data_flaskapi.compression import AVAILABLE_ENCODINGS, compress, compress_stream
+    from api.weather_data_flaskapi.representations import GENERATORS, NDJSON_MEDIATYPE, dumps, marshal_records
+    from api.weather_data_flaskapi.serializers import public_humidity
+    from database.models import Humidity
+
+    parser = ArgumentParser(description='Compare the CPU cost and bytes saved of the content codings and levels.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--readings', dest='readings', type=int, default=100000,
+                        help='the number of readings in the bodies')
+    parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=1000,
+                        help='the number of readings per streamed chunk')
+    args = parser.parse_args(argv)
+
+    app = create_benchmark_app(args.database_uri)
+    load_readings(app, args.readings)
+
+    with app.test_request_context(), app.app_context():
+        rows = project_rows(get_readings(Humidity, datetime(2000, 1, 1), datetime(2100, 1, 1)),
+                            Humidity,
+                            public_humidity,
+                            'timestamp',
+                            'id').order_by(Humidity.timestamp, Humidity.id).all()
+
+        body = dumps(marshal_records(rows, public_humidity))
+        chunks = [chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+                  for chunk in GENERATORS[NDJSON_MEDIATYPE](rows, public_humidity, args.chunk_size)]
+
+    print('{readings} readings: JSON {json:.0f} kB, NDJSON {ndjson:.0f} kB in {count} chunks'.format(
+        readings=args.readings,
+        json=len(body) / 1024,
+        ndjson=sum(len(chunk) for chunk in chunks) / 1024,
+        count=len(chunks)))
+
+    for coding in AVAILABLE_ENCODINGS:
+        for level in LEVELS[coding]:
+            whole_seconds, whole = timed(lambda: compress(body, coding, level))
+            streamed_seconds, streamed = timed(lambda: b''.join(compress_stream(chunks, coding, level)))
+
+            print('{coding:8} level {level:2}   '
+                  'JSON {whole_size:7.0f} kB ({whole_saved:4.1f}% saved) {whole_ms:8.1f} ms   '
+                  'NDJSON stream {streamed_size:7.0f} kB ({streamed_saved:4.1f}% saved) {streamed_ms:8.1f} ms'.format(
+                      coding=coding,
+                      level=level,
+                      whole_size=len(whole) / 1024,
+                      whole_saved=100 - 100 * len(whole) / len(body),
+                      whole_ms=whole_seconds * 1000,
+                      streamed_size=len(streamed) / 1024,
+                      streamed_saved=100 - 100 * len(streamed) / sum(len(chunk) for chunk in chunks),
+                      streamed_ms=streamed_seconds * 1000))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+
+"""
+login_benchmark -- compare login throughput of password hash settings
+
+Logs the benchmark user in repeatedly through POST /auth with the default sha512_crypt cost, a
+tuned cost and, when installed, bcrypt and argon2, and reports logins per second and SQL
+statements per login.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import sys
+import time
+from argparse import ArgumentParser
+
+from passlib.exc import MissingBackendError
+from passlib.registry import get_crypt_handler
+from sqlalchemy import event
+
+from benchmarks import create_benchmark_app, get_token
+
+SETTINGS = (
+    ('sha512_crypt default', ['sha512_crypt'], {}),
+    ('sha512_crypt 50000', ['sha512_crypt'], {'sha512_crypt__default_rounds': 50000}),
+    ('bcrypt 10', ['bcrypt'], {'bcrypt__default_rounds': 10}),
+    ('argon2', ['argon2'], {}),
+)
+
+
+def available(schemes: list) -> bool:
+    try:
+        get_crypt_handler(schemes[0]).get_backend()
+    except (MissingBackendError, KeyError):
+        return False
+
+    return True
+
+
+def benchmark_logins(app, logins: int) -> tuple:
+    from database import db
+
+    client = app.test_client()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    started = time.perf_counter()
+    for _ in range(logins):
+        get_token(client)
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return logins / elapsed, len(statements) / logins
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Compare login throughput of password hash settings.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--logins', dest='logins', type=int, default=20,
+                        help='the number of logins per setting')
+    args = parser.parse_args(argv)
+
+    for label, schemes, settings in SETTINGS:
+        if not available(schemes):
+            print('{label:22} (not installed)'.format(label=label))
+            continue
+
+        app = create_benchmark_app(args.database_uri,
+                                   PASSWORD_HASH_SCHEMES=schemes,
+                                   PASSWORD_HASH_SETTINGS=settings,
+                                   LAST_LOGIN_FLUSH_INTERVAL=3600)
+        rate, statements = benchmark_logins(app, args.logins)
+
+        with app.app_context():
+            from api.weather_data_flaskapi.business.security import flush_last_login_dates
+            from database import db
+            flush_last_login_dates()
+            db.drop_all()
+
+        print('{label:22} {rate:10.1f} logins/sec {statements:5.1f} SQL statements/login'.format(
+            label=label, rate=rate, statements=statements))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
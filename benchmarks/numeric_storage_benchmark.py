@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+
+"""
+numeric_storage_benchmark -- compare fetch and marshal throughput of the numeric storage modes
+
+Loads the same readings into a database per NUMERIC_STORAGE mode (decimal, scaled, float),
+then fetches them with the ORM and marshals them with the humidity serializer, and reports
+rows per second.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import sys
+import time
+from argparse import ArgumentParser
+
+from flask_restplus import marshal
+
+from benchmarks import create_benchmark_app, get_random_record_data
+
+
+def benchmark_fetch_and_marshal(app, rows: list, repeat: int) -> float:
+    from api.weather_data_flaskapi.business.weather_data import create_readings
+    from api.weather_data_flaskapi.serializers import humidity
+    from database.models import Humidity
+
+    with app.app_context():
+        create_readings(Humidity, rows)
+
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            records = Humidity.query.all()
+            marshal(records, humidity)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+    return len(rows) / best
+
+
+def main(argv=None):
+    from database.types import NUMERIC_STORAGE_MODES
+
+    parser = ArgumentParser(description='Compare fetch and marshal throughput of the numeric storage modes.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--rows', dest='rows', type=int, default=20000,
+                        help='the number of readings to fetch')
+    parser.add_argument('--repeat', dest='repeat', type=int, default=3,
+                        help='the number of timed runs per mode (the best is reported)')
+    args = parser.parse_args(argv)
+
+    rows = [get_random_record_data() for _ in range(args.rows)]
+
+    rates = {}
+    for mode in NUMERIC_STORAGE_MODES:
+        app = create_benchmark_app(args.database_uri, NUMERIC_STORAGE=mode)
+        rates[mode] = benchmark_fetch_and_marshal(app, rows, args.repeat)
+
+        with app.app_context():
+            from database import db
+            db.drop_all()
+
+    for mode in NUMERIC_STORAGE_MODES:
+        print('{mode:8} {rate:10.1f} rows/sec ({speedup:.2f}x decimal)'.format(mode=mode,
+                                                                               rate=rates[mode],
+                                                                               speedup=rates[mode] / rates['decimal']))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
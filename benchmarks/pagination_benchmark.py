@@ -0,0 +1,133 @@
+#!/usr/bin/python3
+
+"""
+pagination_benchmark -- compare keyset and OFFSET pagination latency by page depth
+
+Loads a single location with enough readings for the deepest page, then times fetching
+pages at increasing depths through the test client: from GET /weather/public/humidity/ with
+a cursor, and from a benchmark-only route that selects the same page with OFFSET and
+marshals it as the collection endpoint does. The response cache is disabled and responses
+are uncompressed, so both timings cover the query, marshalling and the HTTP round trip.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+
+from benchmarks import create_benchmark_app, get_random_record_data
+
+COLLECTION_URL = '/weather/public/humidity/?start=2000-01-01&end=2100-01-01' \
+                 '&city=Edmonton&province=AB&country=CA&limit={limit}'
+OFFSET_URL = '/benchmark/humidity/offset?limit={limit}&offset={offset}'
+
+HEADERS = {'Accept-Encoding': 'identity'}
+
+
+def load_readings(app, count: int) -> None:
+    from api.weather_data_flaskapi.business.weather_data import create_humidity_batch
+
+    start = datetime(2017, 1, 1)
+    with app.app_context():
+        for offset in range(0, count, 10000):
+            rows = [get_random_record_data(timestamp=start + timedelta(minutes=minute))
+                    for minute in range(offset, min(offset + 10000, count))]
+            create_humidity_batch(rows)
+
+
+def add_offset_route(app) -> None:
+    """
+    Add a route returning a page of humidity readings selected with OFFSET, marshalled like the
+    JSON responses of the collection endpoint.
+    """
+    from flask import request
+
+    from api.weather_data_flaskapi.business.projection import project_rows
+    from api.weather_data_flaskapi.business.weather_data import get_readings
+    from api.weather_data_flaskapi.representations import json_response, marshal_records
+    from api.weather_data_flaskapi.serializers import public_humidity
+    from database.models import Humidity
+
+    def offset_page():
+        query = get_readings(Humidity, datetime(2000, 1, 1), datetime(2100, 1, 1), 'Edmonton', 'AB', 'CA')
+        records = project_rows(query, Humidity, public_humidity, 'timestamp', 'id', 'revision') \
+            .order_by(Humidity.timestamp, Humidity.id) \
+            .offset(int(request.args['offset'])) \
+            .limit(int(request.args['limit'])) \
+            .all()
+
+        return json_response(marshal_records(records, public_humidity))
+
+    app.add_url_rule('/benchmark/humidity/offset', 'benchmark_offset_page', offset_page)
+
+
+def time_get(client, url: str, repeat: int) -> tuple:
+    """
+    Return the mean seconds a GET takes and the response body.
+    """
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url, headers=HEADERS)
+        assert response.status_code == 200, response.data
+    return (time.perf_counter() - started) / repeat, response.data
+
+
+def time_keyset_page(app, client, page: int, limit: int, repeat: int) -> tuple:
+    from api.weather_data_flaskapi.business.pagination import encode_cursor
+    from database.models import Humidity
+
+    url = COLLECTION_URL.format(limit=limit)
+    if page > 1:
+        with app.app_context():
+            last = Humidity.query.order_by(Humidity.timestamp, Humidity.id).offset((page - 1) * limit - 1).first()
+            url += '&cursor=' + encode_cursor(last.timestamp, last.id)
+
+    return time_get(client, url, repeat)
+
+
+def time_offset_page(client, page: int, limit: int, repeat: int) -> tuple:
+    return time_get(client, OFFSET_URL.format(limit=limit, offset=(page - 1) * limit), repeat)
+
+
+def main(argv=None):
+    parser = ArgumentParser(description='Compare keyset and OFFSET pagination latency by page depth.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--limit', dest='limit', type=int, default=10,
+                        help='the number of records per page')
+    parser.add_argument('--pages', dest='pages', type=int, default=10000,
+                        help='the deepest page to fetch')
+    parser.add_argument('--repeat', dest='repeat', type=int, default=20,
+                        help='the number of times each page is fetched')
+    args = parser.parse_args(argv)
+
+    app = create_benchmark_app(args.database_uri, RESPONSE_CACHE_BACKEND=None)
+    add_offset_route(app)
+    client = app.test_client()
+    load_readings(app, args.pages * args.limit)
+
+    print('{page:>8} {keyset:>14} {offset:>14}'.format(page='page', keyset='keyset (ms)', offset='offset (ms)'))
+
+    page = 1
+    while page <= args.pages:
+        keyset, keyset_body = time_keyset_page(app, client, page, args.limit, args.repeat)
+        offset, offset_body = time_offset_page(client, page, args.limit, args.repeat)
+        assert json.loads(keyset_body) == json.loads(offset_body), 'the pages differ'
+        print('{page:>8} {keyset:>14.2f} {offset:>14.2f}'.format(page=page, keyset=keyset * 1000, offset=offset * 1000))
+        page *= 10
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+"""
+serializer_benchmark -- compare marshal() with the compiled serializers on a large collection
+
+Loads readings, then times turning them into a JSON body the way a collection request did
+before (model instances, flask-restplus marshal() and json.dumps) and the way it does now
+(result rows of the marshalled columns, the compiled serializer and the fast encoder), and
+the rows as a format=columnar body.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import json
+import sys
+import time
+from argparse import ArgumentParser
+from datetime import datetime
+
+from benchmarks import create_benchmark_app, get_random_record_data
+
+
+def load_readings(app, count: int) -> None:
+    from api.weather_data_flaskapi.business.weather_data import create_humidity_batch
+
+    with app.app_context():
+        for offset in range(0, count, 10000):
+            create_humidity_batch([get_random_record_data() for _ in range(offset, min(offset + 10000, count))])
+
+
+def timed(function) -> tuple:
+    """
+    Return the seconds a call takes and its result.
+    """
+    started = time.perf_counter()
+    result = function()
+    return time.perf_counter() - started, result
+
+
+def main(argv=None):
+    from flask_restplus import marshal
+
+    from api.weather_data_flaskapi.business.projection import project_rows
+    from api.weather_data_flaskapi.business.weather_data import get_readings
+    from api.weather_data_flaskapi.representations import HOISTED_FIELDS, dumps
+    from api.weather_data_flaskapi.serializers import fast_serializer, marshal_columns, public_humidity
+    from database import db
+    from database.models import Humidity
+
+    parser = ArgumentParser(description='Compare marshal() with the compiled serializers on a large collection.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--readings', dest='readings', type=int, default=100000,
+                        help='the number of readings marshalled')
+    args = parser.parse_args(argv)
+
+    app = create_benchmark_app(args.database_uri)
+    load_readings(app, args.readings)
+
+    with app.app_context():
+        query = get_readings(Humidity, datetime(2000, 1, 1), datetime(2100, 1, 1)).order_by(Humidity.timestamp,
+                                                                                            Humidity.id)
+
+        db.session.expunge_all()
+        fetch_instances, instances = timed(lambda: query.all())
+        marshal_seconds, marshalled = timed(lambda: marshal(instances, public_humidity))
+        encode_seconds, body = timed(lambda: json.dumps(marshalled).encode('utf-8'))
+
+        fetch_rows, rows = timed(lambda: project_rows(query, Humidity, public_humidity, 'timestamp', 'id').all())
+        serialize = fast_serializer(public_humidity)
+        compiled_seconds, compiled = timed(lambda: [serialize(row) for row in rows])
+        fast_encode_seconds, fast_body = timed(lambda: dumps(compiled))
+
+        columns_seconds, columns = timed(lambda: marshal_columns(rows, public_humidity, HOISTED_FIELDS))
+        columns_encode_seconds, columns_body = timed(lambda: dumps(columns))
+
+        assert compiled == marshalled
+        assert json.loads(fast_body) == json.loads(body)
+
+    print('{readings} readings'.format(readings=args.readings))
+    for name, before, after in (('fetch', fetch_instances, fetch_rows),
+                                ('marshal', marshal_seconds, compiled_seconds),
+                                ('encode', encode_seconds, fast_encode_seconds),
+                                ('total', fetch_instances + marshal_seconds + encode_seconds,
+                                 fetch_rows + compiled_seconds + fast_encode_seconds)):
+        print('{name:8} marshal() {before:8.1f} ms   compiled {after:8.1f} ms   speedup {speedup:5.1f}x'.format(
+            name=name,
+            before=before * 1000,
+            after=after * 1000,
+            speedup=before / after))
+
+    print('columnar marshal {marshal:8.1f} ms   encode {encode:8.1f} ms'.format(
+        marshal=columns_seconds * 1000,
+        encode=columns_encode_seconds * 1000))
+    print('body     marshal() {before:8.0f} kB   compiled {after:8.0f} kB   columnar {columnar:8.0f} kB'.format(
+        before=len(body) / 1024,
+        after=len(fast_body) / 1024,
+        columnar=len(columns_body) / 1024))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
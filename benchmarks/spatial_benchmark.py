@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+
+"""
+spatial_benchmark -- compare geohash-indexed area queries with a scan of every reading
+
+Loads readings at random positions, then times bounding box and radius queries answered
+through the geohash index against the same area test applied to every reading.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+from benchmarks import create_benchmark_app, get_random_record_data
+
+
+def load_readings(app, count: int) -> None:
+    from api.weather_data_flaskapi.business.weather_data import create_humidity_batch
+
+    with app.app_context():
+        for offset in range(0, count, 10000):
+            create_humidity_batch([get_random_record_data() for _ in range(offset, min(offset + 10000, count))])
+
+
+def time_queries(app, criteria: list) -> tuple:
+    """
+    Return the mean seconds per query and the total rows matched by a list of criteria.
+    """
+    from sqlalchemy import func
+
+    from database.models import Humidity
+
+    with app.app_context():
+        matched = 0
+        started = time.perf_counter()
+        for criterion in criteria:
+            matched += Humidity.query.with_entities(func.count(Humidity.id)).filter(criterion).scalar()
+        return (time.perf_counter() - started) / len(criteria), matched
+
+
+def main(argv=None):
+    from api.weather_data_flaskapi.business.spatial import spatial_area, spatial_filter
+    from database.models import Humidity
+
+    parser = ArgumentParser(description='Compare geohash-indexed area queries with a scan of every reading.')
+    parser.add_argument('--database-uri', dest='database_uri', default='sqlite://',
+                        help='the database to benchmark against (default: in-memory SQLite)')
+    parser.add_argument('--readings', dest='readings', type=int, default=200000,
+                        help='the number of readings loaded')
+    parser.add_argument('--queries', dest='queries', type=int, default=50,
+                        help='the number of queries per area kind')
+    parser.add_argument('--box-degrees', dest='box_degrees', type=float, default=2.0,
+                        help='the width and height of the bounding boxes')
+    parser.add_argument('--radius-km', dest='radius_km', type=float, default=100.0,
+                        help='the radius of the radius queries')
+    args = parser.parse_args(argv)
+
+    app = create_benchmark_app(args.database_uri)
+    load_readings(app, args.readings)
+
+    random.seed(1)
+    areas = {'bbox': [], 'near': []}
+    for _ in range(args.queries):
+        west, south = random.uniform(-180.0, 180.0 - args.box_degrees), random.uniform(-80.0, 80.0 - args.box_degrees)
+        areas['bbox'].append({'bbox': (west, south, west + args.box_degrees, south + args.box_degrees)})
+        areas['near'].append({'near': (random.uniform(-80.0, 80.0), random.uniform(-180.0, 180.0)),
+                              'radius_km': args.radius_km})
+
+    print('{readings} readings'.format(readings=args.readings))
+    for kind, arguments in areas.items():
+        with app.app_context():
+            indexed = [spatial_filter(Humidity, **area) for area in arguments]
+            scanned = [spatial_area(Humidity, **area)[0] for area in arguments]
+
+        indexed_seconds, indexed_rows = time_queries(app, indexed)
+        scanned_seconds, scanned_rows = time_queries(app, scanned)
+
+        assert indexed_rows == scanned_rows, (indexed_rows, scanned_rows)
+
+        print('{kind:5} geohash index {indexed:8.2f} ms/query   scan {scanned:8.2f} ms/query   '
+              'speedup {speedup:6.1f}x   {rows} rows'.format(kind=kind,
+                                                             indexed=indexed_seconds * 1000,
+                                                             scanned=scanned_seconds * 1000,
+                                                             speedup=scanned_seconds / indexed_seconds,
+                                                             rows=indexed_rows))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
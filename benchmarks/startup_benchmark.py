@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+
+"""
+startup_benchmark -- compare worker startup time with and without schema creation
+
+Boots a fresh application against an existing database repeatedly, once running
+create_database() as workers used to, and once running only the schema version check, and
+reports milliseconds per boot.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from flask import Flask
+
+
+def boot(database_uri: str, bootstrap) -> float:
+    from database import db
+
+    started = time.perf_counter()
+
+    flask_app = Flask(__name__)
+    flask_app.config.from_object('config.TestingConfig')
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(flask_app)
+    bootstrap(flask_app)
+
+    elapsed = time.perf_counter() - started
+
+    with flask_app.app_context():
+        db.get_engine().dispose()
+
+    return elapsed
+
+
+def main(argv=None):
+    from database import check_schema_version, create_database
+
+    parser = ArgumentParser(description='Compare worker startup time with and without schema creation.')
+    parser.add_argument('--database-uri', dest='database_uri', default=None,
+                        help='the database to benchmark against (default: a temporary SQLite file)')
+    parser.add_argument('--boots', dest='boots', type=int, default=50,
+                        help='the number of application boots per startup path')
+    args = parser.parse_args(argv)
+
+    database_file = None
+    database_uri = args.database_uri
+    if database_uri is None:
+        handle, database_file = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        database_uri = 'sqlite:///' + database_file
+
+    try:
+        boot(database_uri, create_database)
+
+        rates = {}
+        for label, bootstrap in (('create_database', create_database), ('schema version check', check_schema_version)):
+            rates[label] = sum(boot(database_uri, bootstrap) for _ in range(args.boots)) / args.boots
+
+        for label, seconds in rates.items():
+            print('{label:22} {ms:8.2f} ms/boot'.format(label=label, ms=seconds * 1000))
+        print('speedup:               {speedup:8.1f}x'.format(
+            speedup=rates['create_database'] / rates['schema version check']))
+    finally:
+        if database_file is not None:
+            os.remove(database_file)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
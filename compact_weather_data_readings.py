@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+
+"""
+compact_weather_data_readings -- age out raw readings into the hourly and daily rollups
+
+compact_weather_data_readings is a command line utility to delete the humidity, pressure and
+temperature readings older than their retention period (see RETENTION_DAYS in config.py).
+
+The readings of each day are folded into the rollups before they are deleted, in batches of
+RETENTION_BATCH_SIZE rows per transaction. An interrupted run resumes where it stopped.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+from datetime import datetime, timedelta
+
+__all__ = []
+__version__ = 1.1
+__date__ = '2017-06-14'
+__updated__ = '2017-06-14'
+
+DEBUG = False
+
+MEASUREMENTS = ('humidity', 'pressure', 'temperature')
+
+
+class CLIError(Exception):
+    """Generic exception to raise and log different fatal errors."""
+
+    def __init__(self, message):
+        super(CLIError).__init__(type(self))
+        self.message = 'E: {message}'.format(message=message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+
+def main(argv=None):
+    """Command line options."""
+
+    program_name = os.path.basename(sys.argv[0])
+
+    try:
+        parser = ArgumentParser(description=__import__('__main__').__doc__.split("\n")[1],
+                                formatter_class=RawDescriptionHelpFormatter)
+        parser.add_argument('-m',
+                            '--measurement',
+                            dest='measurements',
+                            action='append',
+                            choices=MEASUREMENTS,
+                            help='the measurement to compact (repeatable, default: all with a retention period)')
+        parser.add_argument('-d',
+                            '--days',
+                            dest='days',
+                            type=int,
+                            required=False,
+                            help='the number of days of raw readings to keep (default: RETENTION_DAYS)')
+        parser.add_argument('-b',
+                            '--batch-size',
+                            dest='batch_size',
+                            type=int,
+                            required=False,
+                            help='the number of readings deleted per transaction (default: RETENTION_BATCH_SIZE)')
+
+        args = parser.parse_args(argv)
+
+        if args.days is not None and args.days < 1:
+            raise CLIError('days must be at least 1')
+
+        if args.batch_size is not None and args.batch_size < 1:
+            raise CLIError('batch size must be at least 1')
+
+        from app import app
+        from api.weather_data_flaskapi.business.retention import compact_readings
+        from database.models import Humidity, Pressure, Temperature
+
+        models = {'humidity': Humidity, 'pressure': Pressure, 'temperature': Temperature}
+
+        with app.app_context():
+            batch_size = args.batch_size or app.config['RETENTION_BATCH_SIZE']
+
+            for measurement in args.measurements or MEASUREMENTS:
+                days = args.days or app.config['RETENTION_DAYS'].get(measurement)
+
+                if days is None:
+                    sys.stdout.write('{measurement}: no retention period\n'.format(measurement=measurement))
+                    continue
+
+                stats = compact_readings(models[measurement],
+                                         datetime.utcnow() - timedelta(days=days),
+                                         batch_size)
+
+                sys.stdout.write('{measurement}: {days} days compacted, {rollup_rows} rollup rows, '
+                                 '{deleted} readings deleted in {seconds:.1f} s '
+                                 '({rows_per_second:.0f} rows/s)\n'.format(measurement=measurement, **stats))
+
+        return 0
+    except KeyboardInterrupt:
+        # handle keyboard interrupt ###
+        return 0
+    except Exception as e:
+        if DEBUG:
+            raise e
+        indent = len(program_name) * " "
+        sys.stderr.write(program_name + ": " + repr(e) + "\n")
+        sys.stderr.write(indent + "  for help use --help")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,89 @@ class Config(object):
     RESTPLUS_MASK_SWAGGER = False
     RESTPLUS_ERROR_404_HELP = False
 
+    # Bulk ingest settings
+    BATCH_INGEST_MAX_ROWS = 10000
+
+    # Write-behind ingest settings (INGEST_QUEUE_SIZE = 0 writes single readings during the POST request).
+    # Otherwise POSTs are queued and answered with 202, and a writer thread commits the queued readings
+    # every INGEST_FLUSH_ROWS readings or INGEST_FLUSH_INTERVAL seconds. POSTs finding INGEST_QUEUE_SIZE
+    # readings queued are answered with 429. Queued readings are lost if the process is killed.
+    INGEST_QUEUE_SIZE = 0
+    INGEST_FLUSH_ROWS = 500
+    INGEST_FLUSH_INTERVAL = 0.05
+
+    # Pagination settings (PAGINATION_DEFAULT_LIMIT = None returns whole collections unless a limit is requested)
+    PAGINATION_DEFAULT_LIMIT = None
+    PAGINATION_MAX_LIMIT = 1000
+
+    # Streaming (application/x-ndjson, text/csv) settings
+    STREAMING_CHUNK_SIZE = 1000
+
+    # Multi-location query settings (locations per /public/query request)
+    QUERY_MAX_LOCATIONS = 100
+
+    # HTTP caching settings (Cache-Control max-age of public responses, in seconds)
+    PUBLIC_CACHE_MAX_AGE = 5
+
+    # Seconds the last reading of each location is served from memory before it is read again, so
+    # writes handled by other worker processes show up in /latest within this delay
+    LATEST_READINGS_TTL = 5
+
+    # Response cache of public collection queries ('memory', 'redis', 'local-redis' or None to disable).
+    # 'memory' is per process: a write only evicts the entries of the process that handled it, so
+    # other processes (including compact_weather_data_readings.py and manage_weather_data_partitions.py)
+    # may leave stale responses for up to RESPONSE_CACHE_TTL seconds. Use it with a single process
+    # only; deployments running several worker processes should use 'redis'.
+    RESPONSE_CACHE_BACKEND = None
+    RESPONSE_CACHE_REDIS_URL = 'redis://localhost:6379/0'
+    RESPONSE_CACHE_MAX_ENTRIES = 1024
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    RESPONSE_CACHE_TTL = 300
+
+    # Response compression settings (content codings in order of preference; br and zstd need the brotli and
+    # zstandard packages, an empty list disables compression, and smaller bodies are sent uncompressed)
+    COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip', 'deflate']
+    COMPRESSION_LEVELS = {'br': 4, 'zstd': 3, 'gzip': 6, 'deflate': 6}
+    COMPRESSION_MIN_SIZE = 1024
+
+    # Aggregation settings (run backfill_weather_data_rollups.py before enabling on existing data)
+    AGGREGATE_FROM_ROLLUPS = True
+
+    # Reading number storage: 'decimal', 'scaled' or 'float' (run migrate_weather_data_numeric_storage.py to change)
+    NUMERIC_STORAGE = 'decimal'
+
+    # Partitioning settings (monthly partitions on timestamp, managed with manage_weather_data_partitions.py)
+    PARTITION_READINGS = False
+    PARTITION_MONTHS_AHEAD = 3
+
+    # Retention settings (compact_weather_data_readings.py deletes raw readings older than the given
+    # number of days once they are folded into the hourly and daily rollups; None keeps them forever)
+    RETENTION_DAYS = {
+        'humidity': None,
+        'pressure': None,
+        'temperature': None,
+    }
+    RETENTION_BATCH_SIZE = 5000
+
+    # JWT identity cache settings (IDENTITY_CACHE_SIZE = 0 disables the cache)
+    IDENTITY_CACHE_SIZE = 1024
+    IDENTITY_CACHE_TTL = 300
+
+    # Password hashing settings (passlib CryptContext). New passwords use the first scheme; other
+    # schemes, and rounds outside the <scheme>__min_rounds / __max_rounds bounds, are rehashed at login.
+    PASSWORD_HASH_SCHEMES = ['sha512_crypt']
+    PASSWORD_HASH_SETTINGS = {}
+
+    # Password hashing pool settings (PASSWORD_HASH_WORKERS = 0 hashes in the request worker). Logins
+    # beyond PASSWORD_HASH_MAX_PENDING queued or running hashes are answered with 503.
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_MAX_PENDING = 16
+    # Seconds a login or password change waits for its hash before it is answered with 503
+    PASSWORD_HASH_TIMEOUT = 10
+
+    # Seconds between batched last login date writes (0 writes the date during the login request)
+    LAST_LOGIN_FLUSH_INTERVAL = 10
+
 
 class ProductionConfig(Config):
     pass
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+
+"""
+create_weather_data_database -- create or upgrade the weather data api database schema
+
+create_weather_data_database is a command line utility to create the missing tables and indexes
+of the application's database and record its schema version.
+
+Run it once per deployment, before starting the application; the application itself only checks
+the schema version at startup.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+
+__all__ = []
+__version__ = 1.1
+__date__ = '2017-06-14'
+__updated__ = '2017-06-14'
+
+DEBUG = False
+
+
+class CLIError(Exception):
+    """Generic exception to raise and log different fatal errors."""
+
+    def __init__(self, message):
+        super(CLIError).__init__(type(self))
+        self.message = 'E: {message}'.format(message=message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+
+def main(argv=None):
+    """Command line options."""
+
+    program_name = os.path.basename(sys.argv[0])
+
+    try:
+        parser = ArgumentParser(description=__import__('__main__').__doc__.split("\n")[1],
+                                formatter_class=RawDescriptionHelpFormatter)
+        parser.add_argument('-r',
+                            '--reset',
+                            dest='reset',
+                            default=False,
+                            action='store_true',
+                            help='drop every table first (deletes all data)')
+        parser.add_argument('-c',
+                            '--check',
+                            dest='check',
+                            default=False,
+                            action='store_true',
+                            help='only check the schema version (exit status 1 if it is not current)')
+
+        args = parser.parse_args(argv)
+
+        if args.reset and args.check:
+            raise CLIError('reset and check are mutually exclusive')
+
+        from app import app
+        from database import SCHEMA_VERSION, check_schema_version, create_database, get_schema_version, \
+            reset_database
+
+        if args.check:
+            return 0 if check_schema_version(app) else 1
+
+        if args.reset:
+            reset_database(app)
+        else:
+            create_database(app)
+
+        sys.stdout.write('schema version {version} (expected {expected})\n'.format(version=get_schema_version(app),
+                                                                                   expected=SCHEMA_VERSION))
+
+        return 0
+    except KeyboardInterrupt:
+        # handle keyboard interrupt ###
+        return 0
+    except Exception as e:
+        if DEBUG:
+            raise e
+        indent = len(program_name) * " "
+        sys.stderr.write(program_name + ": " + repr(e) + "\n")
+        sys.stderr.write(indent + "  for help use --help")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
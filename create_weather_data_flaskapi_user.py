@@ -24,11 +24,11 @@ import uuid
 from argparse import ArgumentParser
 from argparse import RawDescriptionHelpFormatter
 
-from passlib.hash import sha512_crypt
 from sqlalchemy import create_engine, MetaData, Table, Column, Integer, NVARCHAR, BOOLEAN, DATETIME, select
 
 from settings import SQLALCHEMY_DATABASE_URI
-from api.weather_data_flaskapi.business.security import salt_password
+from api.weather_data_flaskapi.business.security import password_context, salt_password
+from config import Config
 
 __all__ = []
 __version__ = 1.1
@@ -166,7 +166,9 @@ USAGE
         if len(password) < 1 or len(password) > 256:
             raise CLIError('password must be between 1 to 256 characters')
 
-        hashed_password = sha512_crypt.hash(salt_password(password, salt))
+        hashed_password = password_context({'PASSWORD_HASH_SCHEMES': Config.PASSWORD_HASH_SCHEMES,
+                                            'PASSWORD_HASH_SETTINGS': Config.PASSWORD_HASH_SETTINGS}) \
+            .hash(salt_password(password, salt))
 
         engine = create_engine(SQLALCHEMY_DATABASE_URI, echo=True)
 
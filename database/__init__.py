@@ -9,169 +9,165 @@
 @deffield    updated: 2017-06-14
 """
 
+import logging
+
 from flask_sqlalchemy import SQLAlchemy
 
+log = logging.getLogger(__name__)
+
 db = SQLAlchemy()
 
+# The version of the schema created by create_database(); increase it whenever the models change
+# in a way that needs create_weather_data_database.py (or a migration script) to be run
+SCHEMA_VERSION = 4
+
+
+# Indexes created by earlier releases that the declared index set replaces
+LEGACY_INDEXES = {
+    'humidity': ('humidity_city_index', 'humidity_country_index'),
+    'pressure': ('pressure_city_index', 'pressure_country_index'),
+    'temperature': ('temperature_city_index', 'temperature_country_index'),
+}
+
 
-def create_humidity_indexes(app):
+def create_indexes(app):
+    """
+    Bring the indexes of existing tables in line with the indexes declared on the models.
+
+    create_all only creates indexes together with their table, so databases created by an
+    earlier release need the missing declared indexes added and the legacy ones dropped.
+
+    :param app: The Flask application.
+    """
     with app.app_context():
-        from sqlalchemy import text
-        from sqlalchemy.exc import OperationalError
+        from sqlalchemy import MetaData, Table, inspect
+        from sqlalchemy.schema import DropIndex, Index
 
-        # Create humidity table indices
-        try:
-            sql = text(
-                'CREATE UNIQUE INDEX humidity_city_subdivision_country_index ON humidity (city, subdivision, country);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+        inspector = inspect(db.engine)
+        existing_tables = inspector.get_table_names()
 
-        try:
-            sql = text('CREATE INDEX humidity_city_index ON humidity (city);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+        legacy_metadata = MetaData()
 
-        try:
-            sql = text('CREATE INDEX humidity_subdivision_index ON humidity (subdivision);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+        for table in db.Model.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
 
-        try:
-            sql = text('CREATE INDEX humidity_country_index ON humidity (country);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
 
-        try:
-            sql = text('CREATE INDEX humidity_latitude_longitude_index ON humidity (latitude, longitude);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=db.engine)
+
+            for index_name in LEGACY_INDEXES.get(table.name, ()):
+                if index_name in existing_indexes:
+                    db.engine.execute(DropIndex(Index(index_name, _table=Table(table.name, legacy_metadata))))
 
-        try:
-            sql = text('CREATE INDEX humidity_timestamp_index ON humidity (timestamp);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
 
+def create_columns(app):
+    """
+    Add the columns declared on the models that existing tables lack.
 
-def create_pressure_indexes(app):
+    create_all only creates columns together with their table. Existing rows take the server default
+    of a column that has one; a NOT NULL column without one (such as location_id) is added nullable,
+    to be filled in for existing rows and tightened by its migration script
+    (migrate_weather_data_locations.py).
+
+    :param app: The Flask application.
+    """
     with app.app_context():
-        from sqlalchemy import text
-        from sqlalchemy.exc import OperationalError
+        from sqlalchemy import Column, MetaData, Table, inspect, text
+        from sqlalchemy.schema import CreateColumn
 
-        # Create pressure table indices
-        try:
-            sql = text(
-                'CREATE UNIQUE INDEX pressure_city_subdivision_country_index ON pressure (city, subdivision, country);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+        inspector = inspect(db.engine)
+        existing_tables = inspector.get_table_names()
 
-        try:
-            sql = text('CREATE INDEX pressure_city_index ON pressure (city);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+        for table in db.Model.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
 
-        try:
-            sql = text('CREATE INDEX pressure_subdivision_index ON pressure (subdivision);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
 
-        try:
-            sql = text('CREATE INDEX pressure_country_index ON pressure (country);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    if not column.nullable and column.server_default is None:
+                        column = Column(column.name, column.type, nullable=True)
+                        Table(table.name, MetaData(), column)
 
-        try:
-            sql = text('CREATE INDEX pressure_latitude_longitude_index ON pressure (latitude, longitude);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+                    db.engine.execute(text('ALTER TABLE {table} ADD COLUMN {column}'.format(
+                        table=table.name, column=CreateColumn(column).compile(dialect=db.engine.dialect))))
 
-        try:
-            sql = text('CREATE INDEX pressure_timestamp_index ON pressure (timestamp);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
 
+def create_database(app):
+    """
+    Create the missing tables and indexes and record the schema version.
+
+    Safe to run against an existing database. Run it from create_weather_data_database.py
+    rather than at application startup.
+
+    :param app: The Flask application.
+    """
+    from database.locations import clear_locations
+    from database.models import Humidity, Pressure, SchemaVersion, Temperature
+    from database.partitions import update_partition_tables
+    from database.versions import add_table_versions
+
+    clear_locations()
+    db.create_all(app=app)
+    create_columns(app)
+    create_indexes(app)
 
-def create_temperature_indexes(app):
     with app.app_context():
-        from sqlalchemy import text
-        from sqlalchemy.exc import OperationalError
+        for model in (Humidity, Pressure, Temperature):
+            update_partition_tables(model)
 
-        # Create temperature table indices
-        try:
-            sql = text(
-                'CREATE UNIQUE INDEX temperature_city_subdivision_country_index ON temperature (city, subdivision, country);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+        add_table_versions((Humidity, Pressure, Temperature))
+        SchemaVersion.query.delete()
+        db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+        db.session.commit()
 
-        try:
-            sql = text('CREATE INDEX temperature_city_index ON temperature (city);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
 
-        try:
-            sql = text('CREATE INDEX temperature_subdivision_index ON temperature (subdivision);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+def reset_database(app):
+    """
+    Drop every table and create the schema again.
 
-        try:
-            sql = text('CREATE INDEX temperature_country_index ON temperature (country);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+    :param app: The Flask application.
+    """
+    db.drop_all(app=app)
+    create_database(app)
 
-        try:
-            sql = text('CREATE INDEX temperature_latitude_longitude_index ON temperature (latitude, longitude);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
 
-        try:
-            sql = text('CREATE INDEX temperature_timestamp_index ON temperature (timestamp);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+def get_schema_version(app):
+    """
+    Return the schema version recorded in the database, or None if there is none.
 
+    :param app: The Flask application.
+    """
+    from sqlalchemy import func
+    from sqlalchemy.exc import DBAPIError
 
-def create_user_indexes(app):
-    with app.app_context():
-        from sqlalchemy import text
-        from sqlalchemy.exc import OperationalError
+    from database.models import SchemaVersion
 
-        # Create user table indices
+    with app.app_context():
         try:
-            sql = text('CREATE INDEX user_username_index ON user (username);')
-            db.engine.execute(sql)
-        except OperationalError as oe:
-            pass
+            return db.session.query(func.max(SchemaVersion.version)).scalar()
+        except DBAPIError:
+            return None
+        finally:
+            db.session.remove()
 
 
-def create_indexes(app):
-    create_humidity_indexes(app)
-    create_pressure_indexes(app)
-    create_temperature_indexes(app)
-    create_user_indexes(app)
-
+def check_schema_version(app) -> bool:
+    """
+    Check with a single query that the database schema matches this release.
 
-def create_database(app=None):
-    db.create_all(app=app)
-    create_indexes(app)
+    :param app: The Flask application.
+    :return: True if the schema is current, else False (the mismatch is logged).
+    """
+    version = get_schema_version(app)
 
+    if version != SCHEMA_VERSION:
+        log.error('Database schema version is {version}, expected {expected}: '
+                  'run create_weather_data_database.py'.format(version=version, expected=SCHEMA_VERSION))
+        return False
 
-def reset_database():
-    from database.models import ProtectedHumidity, ProtectedPressure, ProtectedTemperature, User
-    db.drop_all()
-    db.create_all()
+    return True
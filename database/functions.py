@@ -0,0 +1,53 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+BUCKET_EPOCH_DIALECTS = ('mysql', 'sqlite', 'postgresql')
+
+
+class bucket_epoch(FunctionElement):
+    """
+    The start of the fixed-width time bucket containing a timestamp, in seconds since 1970-01-01.
+
+    Usage: bucket_epoch(Temperature.timestamp, 3600)
+    """
+    type = BigInteger()
+    name = 'bucket_epoch'
+
+    def __init__(self, timestamp, seconds: int):
+        self.seconds = int(seconds)
+        super().__init__(timestamp)
+
+
+@compiles(bucket_epoch, 'mysql')
+def compile_bucket_epoch_mysql(element, compiler, **kw):
+    # TIMESTAMPDIFF ignores the session time zone, unlike UNIX_TIMESTAMP.
+    return "FLOOR(TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', {timestamp}) / {seconds}) * {seconds}".format(
+        timestamp=compiler.process(element.clauses, **kw),
+        seconds=element.seconds)
+
+
+@compiles(bucket_epoch, 'sqlite')
+def compile_bucket_epoch_sqlite(element, compiler, **kw):
+    # SQLite's % truncates towards zero, so fold negative (pre-1970) remainders back into range.
+    epoch = "CAST(strftime('%s', {timestamp}) AS INTEGER)".format(timestamp=compiler.process(element.clauses, **kw))
+    return '({epoch} - ((({epoch}) % {seconds}) + {seconds}) % {seconds})'.format(epoch=epoch,
+                                                                                  seconds=element.seconds)
+
+
+@compiles(bucket_epoch, 'postgresql')
+def compile_bucket_epoch_postgresql(element, compiler, **kw):
+    return 'FLOOR(EXTRACT(EPOCH FROM {timestamp}) / {seconds}) * {seconds}'.format(
+        timestamp=compiler.process(element.clauses, **kw),
+        seconds=element.seconds)
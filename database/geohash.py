@@ -0,0 +1,157 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import math
+
+# Geohashes of reading positions, stored in the indexed geohash column of the reading tables.
+#
+# A geohash interleaves the bits of the longitude and latitude, so all positions in a cell share
+# the cell's geohash as a prefix. An area is searched by covering it with a few cells and reading
+# the index range of each cell's prefix, instead of scanning every reading.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+GEOHASH_PRECISION = 12
+
+# The character after the last BASE32 character, so prefix <= geohash < prefix + END is the range of a prefix
+END = '{'
+
+# The length of a degree of latitude (and of longitude at the equator) on a spherical earth
+KM_PER_DEGREE = 111.195
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """
+    Return the geohash of a position.
+
+    :param latitude: The latitude (-90 to 90).
+    :param longitude: The longitude (-180 to 180).
+    :param precision: The number of characters.
+    :return: str
+    """
+    south, north = -90.0, 90.0
+    west, east = -180.0, 180.0
+    characters = []
+    bits = 0
+    value = 0
+    even = True
+
+    while len(characters) < precision:
+        if even:
+            middle = (west + east) / 2
+            if longitude >= middle:
+                value = value * 2 + 1
+                west = middle
+            else:
+                value *= 2
+                east = middle
+        else:
+            middle = (south + north) / 2
+            if latitude >= middle:
+                value = value * 2 + 1
+                south = middle
+            else:
+                value *= 2
+                north = middle
+
+        even = not even
+        bits += 1
+
+        if bits == 5:
+            characters.append(BASE32[value])
+            bits = 0
+            value = 0
+
+    return ''.join(characters)
+
+
+def cell_size(precision: int) -> tuple:
+    """
+    Return the (height, width) in degrees of the cells of a geohash precision.
+    """
+    longitude_bits = (5 * precision + 1) // 2
+    latitude_bits = 5 * precision // 2
+
+    return 180.0 / 2 ** latitude_bits, 360.0 / 2 ** longitude_bits
+
+
+def cell_indexes(low: float, high: float, origin: float, size: float, count: int) -> range:
+    return range(int((low - origin) // size), min(int((high - origin) // size), count - 1) + 1)
+
+
+def cover(south: float, west: float, north: float, east: float, max_cells: int = 32) -> list:
+    """
+    Return the geohash prefixes of the cells covering a bounding box.
+
+    A box whose longitudes run past -180 or 180 crosses the antimeridian, and is covered as the
+    two boxes on either side of it. The finest precision that covers each box with at most its
+    share of max_cells cells is used.
+
+    :param south: The minimum latitude.
+    :param west: The minimum longitude (less than -180 when the box crosses the antimeridian).
+    :param north: The maximum latitude.
+    :param east: The maximum longitude (more than 180 when the box crosses the antimeridian).
+    :param max_cells: The maximum number of cells.
+    :return: A sorted list of prefixes.
+    """
+    south, north = max(south, -90.0), min(north, 90.0)
+
+    if east - west >= 360.0:
+        boxes = [(-180.0, 180.0)]
+    elif west < -180.0:
+        boxes = [(west + 360.0, 180.0), (-180.0, east)]
+    elif east > 180.0:
+        boxes = [(west, 180.0), (-180.0, east - 360.0)]
+    else:
+        boxes = [(west, east)]
+
+    prefixes = set()
+    for box_west, box_east in boxes:
+        prefixes.update(cover_box(south, box_west, north, box_east, max(max_cells // len(boxes), 1)))
+
+    return sorted(prefixes)
+
+
+def cover_box(south: float, west: float, north: float, east: float, max_cells: int) -> list:
+    """
+    Return the geohash prefixes of the cells covering a bounding box within -180 to 180 longitude.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = cell_indexes(south, north, -90.0, height, int(round(180.0 / height)))
+        columns = cell_indexes(west, east, -180.0, width, int(round(360.0 / width)))
+
+        if len(rows) * len(columns) <= max_cells or precision == 1:
+            return sorted({encode(-90.0 + (row + 0.5) * height, -180.0 + (column + 0.5) * width, precision)
+                           for row in rows for column in columns})
+
+
+def distance_box(latitude: float, longitude: float, radius_km: float) -> tuple:
+    """
+    Return the (south, west, north, east) bounding box of a circle.
+
+    west is less than -180, or east more than 180, when the circle crosses the antimeridian; a
+    circle containing a pole spans every longitude.
+
+    :param latitude: The latitude of the centre.
+    :param longitude: The longitude of the centre.
+    :param radius_km: The radius in kilometres.
+    :return: tuple
+    """
+    height = radius_km / KM_PER_DEGREE
+    south, north = latitude - height, latitude + height
+
+    if south <= -90.0 or north >= 90.0:
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+
+    width = min(height / math.cos(math.radians(latitude)), 180.0)
+
+    return south, longitude - width, north, longitude + width
@@ -0,0 +1,139 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from sqlalchemy import and_, select
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+
+# The reading fields resolved through a location id, in the order get_location returns them
+LOCATION_FIELDS = ('city', 'province', 'country')
+
+# In-process cache of the location table. Locations are never updated or deleted, so the
+# cached entries never go stale.
+_locations = {}
+_location_ids = {}
+
+
+def _remember(location_id: int, city: str, province: str, country: str) -> int:
+    _locations[location_id] = (city, province, country)
+    _location_ids[(city, province, country)] = location_id
+    return location_id
+
+
+def _select_location_id(connection, city: str, province: str, country: str):
+    from database.models import Location
+
+    table = Location.__table__
+
+    return connection.execute(select([table.c.id]).where(
+        and_(table.c.country == country,
+             table.c.province == province,
+             table.c.city == city))).scalar()
+
+
+def find_location_id(city: str, province: str, country: str):
+    """
+    Return the id of a location, or None if no reading was ever recorded there.
+
+    :param city: The location's city.
+    :type city: str
+    :param province: The location's province.
+    :type province: str
+    :param country: The location's country.
+    :type country: str
+    :return: int or None
+    """
+    location_id = _location_ids.get((city, province, country))
+
+    if location_id is None:
+        with db.engine.connect() as connection:
+            location_id = _select_location_id(connection, city, province, country)
+
+        if location_id is not None:
+            _remember(location_id, city, province, country)
+
+    return location_id
+
+
+def get_location_id(city: str, province: str, country: str) -> int:
+    """
+    Return the id of a location, adding the location if it is new.
+
+    New locations are committed on their own connection so that concurrent writers of the same
+    location agree on its id whatever happens to their reading transactions. Resolve locations
+    before writing readings so the separate commit never waits on the caller's own locks.
+
+    :param city: The location's city.
+    :type city: str
+    :param province: The location's province.
+    :type province: str
+    :param country: The location's country.
+    :type country: str
+    :return: int
+    """
+    location_id = find_location_id(city, province, country)
+
+    if location_id is None:
+        from database.models import Location
+
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(Location.__table__.insert().values(city=city,
+                                                                      province=province,
+                                                                      country=country))
+        except IntegrityError:
+            # Another writer added the location first
+            pass
+
+        with db.engine.connect() as connection:
+            location_id = _select_location_id(connection, city, province, country)
+
+        if location_id is None:
+            raise ValueError('invalid location: {city}, {province} {country}'.format(city=city,
+                                                                                     province=province,
+                                                                                     country=country))
+
+        _remember(location_id, city, province, country)
+
+    return location_id
+
+
+def get_location(location_id: int) -> tuple:
+    """
+    Return the (city, province, country) of a location id.
+
+    :param location_id: The location's id.
+    :type location_id: int
+    :return: tuple
+    """
+    cached = _locations.get(location_id)
+
+    if cached is None:
+        from database.models import Location
+
+        table = Location.__table__
+
+        with db.engine.connect() as connection:
+            city, province, country = connection.execute(
+                select([table.c.city, table.c.province, table.c.country]).where(table.c.id == location_id)).first()
+
+        cached = _locations[_remember(location_id, city, province, country)]
+
+    return cached
+
+
+def clear_locations() -> None:
+    """
+    Empty the location cache, e.g. after the database was reset.
+    """
+    _locations.clear()
+    _location_ids.clear()
@@ -12,29 +12,109 @@
 import decimal
 from datetime import datetime
 
+from sqlalchemy import text
+from sqlalchemy.ext.declarative import declared_attr
+
 from database import db
+from database.geohash import encode as encode_geohash
+from database.locations import get_location, get_location_id
 from database.model_exceptions import LatitudeValueError, LongitudeValueError
+from database.types import ReadingNumber
 
 
-class Humidity(db.Model):
+class Location(db.Model):
     """
-    A class that represents the ORM for a humidity reading.
+    A class that represents the ORM for a location readings are recorded at.
     """
-    __tablename__ = 'humidity'
-    id = db.Column(db.BIGINT(), primary_key=True, autoincrement=True)
-    value = db.Column(db.DECIMAL(precision=8, scale=4), nullable=False)
-    value_units = db.Column(db.NVARCHAR(16), nullable=False)
-    value_error_range = db.Column(db.DECIMAL(precision=7, scale=6), nullable=False, default=0.0)
-    latitude = db.Column(db.DECIMAL(precision=8, scale=6), nullable=False)
-    latitude_public = db.Column(db.DECIMAL(precision=8, scale=6), nullable=False)
-    longitude = db.Column(db.DECIMAL(precision=9, scale=6), nullable=False)
-    longitude_public = db.Column(db.DECIMAL(precision=9, scale=6), nullable=False)
+    __tablename__ = 'location'
+    __table_args__ = (db.UniqueConstraint('country', 'province', 'city', name='location_country_province_city_index'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     city = db.Column(db.NVARCHAR(64), nullable=False)
     province = db.Column(db.NVARCHAR(2), nullable=False)
     country = db.Column(db.NVARCHAR(2), nullable=False)
-    elevation = db.Column(db.DECIMAL(precision=8, scale=4), nullable=False)
+
+    def __init__(self, city: str, province: str, country: str, id=None):
+        """
+        Location constructor.
+
+        :rtype: Location
+        :type city: str
+        :type province: str
+        :type country: str
+        """
+        super().__init__()
+
+        if id is not None:
+            self.id = id
+
+        self.city = city
+        self.province = province
+        self.country = country
+
+    def __repr__(self):
+        """
+        Return a string representation of the Location object.
+
+        :return: A string representation of the Location object.
+        """
+        return '<Location: id: {id} {city}, {province} {country}>'.format(id=str(self.id),
+                                                                          city=self.city,
+                                                                          province=self.province,
+                                                                          country=self.country)
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class LocatedReading(object):
+    """
+    The location of a reading, stored as a location id.
+
+    city, province and country are resolved through the in-process location cache, so reading
+    them does not query the location table.
+    """
+
+    @declared_attr
+    def location_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('location.id'), nullable=False)
+
+    @property
+    def city(self) -> str:
+        return get_location(self.location_id)[0]
+
+    @property
+    def province(self) -> str:
+        return get_location(self.location_id)[1]
+
+    @property
+    def country(self) -> str:
+        return get_location(self.location_id)[2]
+
+
+class Humidity(LocatedReading, db.Model):
+    """
+    A class that represents the ORM for a humidity reading.
+    """
+    __tablename__ = 'humidity'
+    __table_args__ = (db.Index('humidity_location_timestamp_index', 'location_id', 'timestamp'),
+                      db.Index('humidity_latitude_longitude_index', 'latitude', 'longitude'),
+                      db.Index('humidity_timestamp_index', 'timestamp'),
+                      db.Index('humidity_geohash_timestamp_index', 'geohash', 'timestamp'))
+    id = db.Column(db.BIGINT().with_variant(db.Integer(), 'sqlite'), primary_key=True, autoincrement=True)
+    value = db.Column(ReadingNumber(precision=8, scale=4), nullable=False)
+    value_units = db.Column(db.NVARCHAR(16), nullable=False)
+    value_error_range = db.Column(ReadingNumber(precision=7, scale=6), nullable=False, default=0.0)
+    latitude = db.Column(ReadingNumber(precision=8, scale=6), nullable=False)
+    latitude_public = db.Column(ReadingNumber(precision=8, scale=6), nullable=False)
+    longitude = db.Column(ReadingNumber(precision=9, scale=6), nullable=False)
+    longitude_public = db.Column(ReadingNumber(precision=9, scale=6), nullable=False)
+    # Geohash of the public position (backfill_weather_data_geohash.py fills it in for older readings)
+    geohash = db.Column(db.String(12), nullable=True)
+    elevation = db.Column(ReadingNumber(precision=8, scale=4), nullable=False)
     elevation_units = db.Column(db.NVARCHAR(16), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False)
+    # Increased by every update, so that collection validators (ETags) change with the values
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
 
     def __init__(self,
                  value: decimal,
@@ -86,9 +166,8 @@ class Humidity(db.Model):
         self.latitude_public = float(int(latitude * 1000)) / 1000
         self.longitude = longitude
         self.longitude_public = float(int(longitude * 1000)) / 1000
-        self.city = city
-        self.province = province
-        self.country = country
+        self.geohash = encode_geohash(self.latitude_public, self.longitude_public)
+        self.location_id = get_location_id(city, province, country)
         self.elevation = elevation
         self.elevation_units = elevation_units
         self.timestamp = timestamp
@@ -152,25 +231,30 @@ class Humidity(db.Model):
         return self.__repr__()
 
 
-class Pressure(db.Model):
+class Pressure(LocatedReading, db.Model):
     """
     A class that represents the ORM for a pressure reading.
     """
     __tablename__ = 'pressure'
-    id = db.Column(db.BIGINT(), primary_key=True, autoincrement=True)
-    value = db.Column(db.DECIMAL(precision=8, scale=4), nullable=False)
+    __table_args__ = (db.Index('pressure_location_timestamp_index', 'location_id', 'timestamp'),
+                      db.Index('pressure_latitude_longitude_index', 'latitude', 'longitude'),
+                      db.Index('pressure_timestamp_index', 'timestamp'),
+                      db.Index('pressure_geohash_timestamp_index', 'geohash', 'timestamp'))
+    id = db.Column(db.BIGINT().with_variant(db.Integer(), 'sqlite'), primary_key=True, autoincrement=True)
+    value = db.Column(ReadingNumber(precision=8, scale=4), nullable=False)
     value_units = db.Column(db.NVARCHAR(16), nullable=False)
-    value_error_range = db.Column(db.DECIMAL(precision=7, scale=6), nullable=False, default=0.0)
-    latitude = db.Column(db.DECIMAL(precision=8, scale=6), nullable=False)
-    latitude_public = db.Column(db.DECIMAL(precision=9, scale=6), nullable=False)
-    longitude = db.Column(db.DECIMAL(precision=9, scale=6), nullable=False)
-    longitude_public = db.Column(db.DECIMAL(precision=9, scale=6), nullable=False)
-    city = db.Column(db.NVARCHAR(64), nullable=False)
-    province = db.Column(db.NVARCHAR(2), nullable=False)
-    country = db.Column(db.NVARCHAR(2), nullable=False)
-    elevation = db.Column(db.DECIMAL(precision=8, scale=4), nullable=False)
+    value_error_range = db.Column(ReadingNumber(precision=7, scale=6), nullable=False, default=0.0)
+    latitude = db.Column(ReadingNumber(precision=8, scale=6), nullable=False)
+    latitude_public = db.Column(ReadingNumber(precision=9, scale=6), nullable=False)
+    longitude = db.Column(ReadingNumber(precision=9, scale=6), nullable=False)
+    longitude_public = db.Column(ReadingNumber(precision=9, scale=6), nullable=False)
+    # Geohash of the public position (backfill_weather_data_geohash.py fills it in for older readings)
+    geohash = db.Column(db.String(12), nullable=True)
+    elevation = db.Column(ReadingNumber(precision=8, scale=4), nullable=False)
     elevation_units = db.Column(db.NVARCHAR(16), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False)
+    # Increased by every update, so that collection validators (ETags) change with the values
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
 
     def __init__(self,
                  value: decimal,
@@ -222,9 +306,8 @@ class Pressure(db.Model):
         self.latitude_public = float(int(latitude * 1000)) / 1000
         self.longitude = longitude
         self.longitude_public = float(int(longitude * 1000)) / 1000
-        self.city = city
-        self.province = province
-        self.country = country
+        self.geohash = encode_geohash(self.latitude_public, self.longitude_public)
+        self.location_id = get_location_id(city, province, country)
         self.elevation = elevation
         self.elevation_units = elevation_units
         self.timestamp = timestamp
@@ -288,25 +371,30 @@ class Pressure(db.Model):
         return self.__repr__()
 
 
-class Temperature(db.Model):
+class Temperature(LocatedReading, db.Model):
     """
     A class that represents the ORM for a temperature reading.
     """
     __tablename__ = 'temperature'
-    id = db.Column(db.BIGINT(), primary_key=True, autoincrement=True)
-    value = db.Column(db.DECIMAL(precision=8, scale=4), nullable=False)
+    __table_args__ = (db.Index('temperature_location_timestamp_index', 'location_id', 'timestamp'),
+                      db.Index('temperature_latitude_longitude_index', 'latitude', 'longitude'),
+                      db.Index('temperature_timestamp_index', 'timestamp'),
+                      db.Index('temperature_geohash_timestamp_index', 'geohash', 'timestamp'))
+    id = db.Column(db.BIGINT().with_variant(db.Integer(), 'sqlite'), primary_key=True, autoincrement=True)
+    value = db.Column(ReadingNumber(precision=8, scale=4), nullable=False)
     value_units = db.Column(db.NVARCHAR(16), nullable=False)
-    value_error_range = db.Column(db.DECIMAL(precision=7, scale=6), nullable=False, default=0.0)
-    latitude = db.Column(db.DECIMAL(precision=8, scale=6), nullable=False)
-    latitude_public = db.Column(db.DECIMAL(precision=8, scale=6), nullable=False)
-    longitude = db.Column(db.DECIMAL(precision=9, scale=6), nullable=False)
-    longitude_public = db.Column(db.DECIMAL(precision=9, scale=6), nullable=False)
-    city = db.Column(db.NVARCHAR(64), nullable=False)
-    province = db.Column(db.NVARCHAR(2), nullable=False)
-    country = db.Column(db.NVARCHAR(2), nullable=False)
-    elevation = db.Column(db.DECIMAL(precision=8, scale=4), nullable=False)
+    value_error_range = db.Column(ReadingNumber(precision=7, scale=6), nullable=False, default=0.0)
+    latitude = db.Column(ReadingNumber(precision=8, scale=6), nullable=False)
+    latitude_public = db.Column(ReadingNumber(precision=8, scale=6), nullable=False)
+    longitude = db.Column(ReadingNumber(precision=9, scale=6), nullable=False)
+    longitude_public = db.Column(ReadingNumber(precision=9, scale=6), nullable=False)
+    # Geohash of the public position (backfill_weather_data_geohash.py fills it in for older readings)
+    geohash = db.Column(db.String(12), nullable=True)
+    elevation = db.Column(ReadingNumber(precision=8, scale=4), nullable=False)
     elevation_units = db.Column(db.NVARCHAR(16), nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False)
+    # Increased by every update, so that collection validators (ETags) change with the values
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default=text('0'))
 
     def __init__(self,
                  value: decimal,
@@ -359,9 +447,8 @@ class Temperature(db.Model):
         self.latitude_public = float(int(latitude * 1000)) / 1000
         self.longitude = longitude
         self.longitude_public = float(int(longitude * 1000)) / 1000
-        self.city = city
-        self.province = province
-        self.country = country
+        self.geohash = encode_geohash(self.latitude_public, self.longitude_public)
+        self.location_id = get_location_id(city, province, country)
         self.elevation = elevation
         self.elevation_units = elevation_units
         self.timestamp = timestamp
@@ -430,6 +517,7 @@ class User(db.Model):
     A class that represents the ORM for a user account.
     """
     __tablename__ = 'user'
+    __table_args__ = (db.Index('user_username_index', 'username'),)
     id = db.Column(db.Integer(), primary_key=True, autoincrement=True)
     username = db.Column(db.NVARCHAR(64), nullable=False)
     password = db.Column(db.NVARCHAR(120), nullable=False)
@@ -490,3 +578,154 @@ class User(db.Model):
     def __str__(self):
         result = self.__repr__()
         return result
+
+
+class ReadingRollup(object):
+    """
+    The columns shared by the hourly and daily rollups of a reading table.
+
+    Each row holds the count, sum, sum of squares, minimum and maximum of the readings at a
+    location within one bucket, which is enough to derive min, max, avg, count and stddev.
+    """
+    id = db.Column(db.BIGINT().with_variant(db.Integer(), 'sqlite'), primary_key=True, autoincrement=True)
+    bucket = db.Column(db.DateTime, nullable=False)
+    value_count = db.Column(db.BIGINT(), nullable=False, default=0)
+    value_sum = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    value_sum_squares = db.Column(db.Float(precision=53), nullable=False, default=0.0)
+    value_min = db.Column(db.Float(precision=53), nullable=False)
+    value_max = db.Column(db.Float(precision=53), nullable=False)
+
+    @declared_attr
+    def location_id(cls):
+        return db.Column(db.Integer, db.ForeignKey('location.id'), nullable=False)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the rollup object.
+
+        :return: A string representation of the rollup object.
+        """
+        return '<{name}: location: {location_id} {bucket:%Y-%m-%d %H:%M:%S} count: {count}>'.format(
+            name=type(self).__name__,
+            location_id=self.location_id,
+            bucket=self.bucket,
+            count=self.value_count)
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class HumidityHourly(ReadingRollup, db.Model):
+    """
+    A class that represents the ORM for the hourly humidity rollup.
+    """
+    __tablename__ = 'humidity_hourly'
+    __table_args__ = (db.UniqueConstraint('location_id', 'bucket', name='humidity_hourly_location_bucket_index'),)
+
+
+class HumidityDaily(ReadingRollup, db.Model):
+    """
+    A class that represents the ORM for the daily humidity rollup.
+    """
+    __tablename__ = 'humidity_daily'
+    __table_args__ = (db.UniqueConstraint('location_id', 'bucket', name='humidity_daily_location_bucket_index'),)
+
+
+class PressureHourly(ReadingRollup, db.Model):
+    """
+    A class that represents the ORM for the hourly pressure rollup.
+    """
+    __tablename__ = 'pressure_hourly'
+    __table_args__ = (db.UniqueConstraint('location_id', 'bucket', name='pressure_hourly_location_bucket_index'),)
+
+
+class PressureDaily(ReadingRollup, db.Model):
+    """
+    A class that represents the ORM for the daily pressure rollup.
+    """
+    __tablename__ = 'pressure_daily'
+    __table_args__ = (db.UniqueConstraint('location_id', 'bucket', name='pressure_daily_location_bucket_index'),)
+
+
+class TemperatureHourly(ReadingRollup, db.Model):
+    """
+    A class that represents the ORM for the hourly temperature rollup.
+    """
+    __tablename__ = 'temperature_hourly'
+    __table_args__ = (db.UniqueConstraint('location_id', 'bucket', name='temperature_hourly_location_bucket_index'),)
+
+
+class TemperatureDaily(ReadingRollup, db.Model):
+    """
+    A class that represents the ORM for the daily temperature rollup.
+    """
+    __tablename__ = 'temperature_daily'
+    __table_args__ = (db.UniqueConstraint('location_id', 'bucket', name='temperature_daily_location_bucket_index'),)
+
+
+class RetentionCheckpoint(db.Model):
+    """
+    A class that represents the ORM for the progress of the retention job on a reading table.
+
+    The rollups of the readings before compacted_until are final, so those raw readings can be
+    deleted in any number of batches and runs.
+    """
+    __tablename__ = 'retention_checkpoint'
+    table_name = db.Column(db.String(64), primary_key=True)
+    compacted_until = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the RetentionCheckpoint object.
+
+        :return: A string representation of the RetentionCheckpoint object.
+        """
+        return '<RetentionCheckpoint: {table_name} {compacted_until:%Y-%m-%d %H:%M:%S}>'.format(
+            table_name=self.table_name,
+            compacted_until=self.compacted_until)
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class TableVersion(db.Model):
+    """
+    A class that represents the ORM for the version of a reading table.
+
+    Every write to the table increases version and sets modified in the same transaction, so
+    responses over a whole range are validated without reading the rows.
+    """
+    __tablename__ = 'table_version'
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BIGINT().with_variant(db.Integer(), 'sqlite'), nullable=False, default=0)
+    modified = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the TableVersion object.
+
+        :return: A string representation of the TableVersion object.
+        """
+        return '<TableVersion: {table_name} {version}>'.format(table_name=self.table_name, version=self.version)
+
+    def __str__(self):
+        return self.__repr__()
+
+
+class SchemaVersion(db.Model):
+    """
+    A class that represents the ORM for the version of the schema created by create_database().
+    """
+    __tablename__ = 'schema_version'
+    version = db.Column(db.Integer(), primary_key=True, autoincrement=False)
+
+    def __repr__(self) -> str:
+        """
+        Return a string representation of the SchemaVersion object.
+
+        :return: A string representation of the SchemaVersion object.
+        """
+        return '<SchemaVersion: {version}>'.format(version=self.version)
+
+    def __str__(self):
+        return self.__repr__()
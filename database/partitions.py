@@ -0,0 +1,585 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import re
+import weakref
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import Column, Index, MetaData, Table, event, func, inspect, select, text, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import CreateColumn, DropIndex
+
+from database import db
+from database.versions import bump_table_version
+
+# Reading tables can be split into one partition per month of timestamp (PARTITION_READINGS).
+#
+# MySQL uses native RANGE COLUMNS partitions (p201701, ..., p_future); the server prunes the
+# partitions outside a query's timestamp range by itself.
+#
+# Other databases (SQLite test runs) use a table per month (humidity_201701, ...) as a stand-in.
+# The functions below route reads to the month tables overlapping a query's range and route
+# writes to the month table of each reading. The model's own table stays empty.
+
+FUTURE_PARTITION = 'p_future'
+
+_partition_metadata = MetaData()
+
+# The months with a partition, per engine and reading table, so that routed reads and writes do
+# not query the catalog. create_partition(), create_mysql_partitions(), drop_partition() and
+# detach_partition() forget a table's months, as does a rollback after a partition was created.
+# Partitions created or dropped by another process are seen once this one forgets them; the
+# month table stand-in is meant for a single SQLite process. The id sequence table is kept
+# under its own name once it is known to exist.
+_partition_months = weakref.WeakKeyDictionary()
+
+_sequence = Table('partition_sequence', _partition_metadata,
+                  Column('table_name', db.String(64), primary_key=True),
+                  Column('next_id', db.BIGINT(), nullable=False))
+
+
+def partitioning_enabled() -> bool:
+    return bool(current_app.config.get('PARTITION_READINGS', False))
+
+
+def routes_partitions() -> bool:
+    """
+    Return True when reading tables are split into month tables routed by this module.
+    """
+    return partitioning_enabled() and db.engine.dialect.name != 'mysql'
+
+
+def month_start(timestamp: datetime) -> datetime:
+    return datetime(timestamp.year, timestamp.month, 1)
+
+
+def next_month(month: datetime) -> datetime:
+    if month.month == 12:
+        return datetime(month.year + 1, 1, 1)
+    return datetime(month.year, month.month + 1, 1)
+
+
+def months_between(start: datetime, end: datetime) -> list:
+    """
+    Return the first day of every month overlapping [start, end].
+
+    :param start: The start of the range (inclusive).
+    :param end: The end of the range (inclusive).
+    :return: list
+    """
+    months = []
+    month = month_start(start)
+
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+
+    return months
+
+
+def partition_table_name(model, month: datetime) -> str:
+    return '{table}_{month:%Y%m}'.format(table=model.__tablename__, month=month)
+
+
+def partition_table(model, month: datetime) -> Table:
+    """
+    Return the month table of a reading model (SQLite stand-in).
+
+    The month table has the model's columns and indexes, without foreign keys.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param month: The first day of the month.
+    :return: Table
+    """
+    name = partition_table_name(model, month)
+    table = _partition_metadata.tables.get(name)
+
+    if table is None:
+        base = model.__table__
+        table = Table(name, _partition_metadata,
+                      *[Column(column.name,
+                               column.type,
+                               primary_key=column.primary_key,
+                               nullable=column.nullable,
+                               server_default=column.server_default.arg if column.server_default else None,
+                               autoincrement=False)
+                        for column in base.columns])
+
+        for index in base.indexes:
+            Index(index.name.replace(base.name, name, 1), *[table.c[column.name] for column in index.columns])
+
+    return table
+
+
+def list_partitions(model) -> list:
+    """
+    Return the first day of every month that has a partition, oldest first.
+
+    The months are read from the catalog once, then kept until a partition is created or dropped.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :return: list
+    """
+    tables = _partition_months.setdefault(db.engine, {})
+    months = tables.get(model.__tablename__)
+
+    if months is None:
+        months = read_partitions(model)
+        tables[model.__tablename__] = months
+
+    return list(months)
+
+
+def forget_partitions(model=None) -> None:
+    """
+    Forget the months with a partition of a reading table (or of every table), so the next
+    list_partitions() reads them from the catalog.
+
+    :param model: The reading model (Humidity, Pressure or Temperature), or None for every table.
+    """
+    tables = _partition_months.get(db.engine)
+
+    if tables is not None:
+        if model is None:
+            tables.clear()
+        else:
+            tables.pop(model.__tablename__, None)
+
+
+def read_partitions(model) -> list:
+    """
+    Read the first day of every month that has a partition from the catalog, oldest first.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :return: list
+    """
+    if db.engine.dialect.name == 'mysql':
+        names = db.session.execute(text('SELECT PARTITION_NAME FROM information_schema.PARTITIONS '
+                                        'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name'),
+                                   {'table_name': model.__tablename__}).fetchall()
+        pattern = re.compile(r'^p(\d{6})$')
+        names = [name for name, in names if name]
+    else:
+        names = inspect(db.session.connection()).get_table_names()
+        pattern = re.compile(r'^{table}_(\d{{6}})$'.format(table=re.escape(model.__tablename__)))
+
+    return sorted(datetime.strptime(match.group(1), '%Y%m')
+                  for match in (pattern.match(name) for name in names) if match)
+
+
+def partition_source(model, start: datetime = None, end: datetime = None):
+    """
+    Return an entity reading the month tables that overlap [start, end], or None if there are none.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param start: The start of the range (inclusive), or None for the oldest partition.
+    :param end: The end of the range (inclusive), or None for the newest partition.
+    """
+    tables = [partition_table(model, month) for month in list_partitions(model)
+              if (start is None or next_month(month) > start) and (end is None or month <= end)]
+
+    if not tables:
+        return None
+
+    return aliased(model,
+                   union_all(*[select([table]) for table in tables]).alias(model.__tablename__ + '_partitions'),
+                   adapt_on_names=True)
+
+
+def query_readings(model, start: datetime = None, end: datetime = None):
+    """
+    Return a query on a reading model that reads only the partitions overlapping [start, end].
+
+    Criteria and entities added to the query with the model's columns are adapted to the
+    partitions, so callers build the query as if it read the model's table.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param start: The start of the range (inclusive), or None for the oldest partition.
+    :param end: The end of the range (inclusive), or None for the newest partition.
+    """
+    query = model.query
+
+    if routes_partitions():
+        source = partition_source(model, start, end)
+        if source is not None:
+            query = query.select_entity_from(source)
+
+    return query
+
+
+def reading_month(model, reading_id: int):
+    """
+    Return the month of the month table holding a reading, or None if there is none.
+    """
+    for month in reversed(list_partitions(model)):
+        table = partition_table(model, month)
+        if db.session.execute(select([table.c.id]).where(table.c.id == reading_id)).first() is not None:
+            return month
+
+    return None
+
+
+def get_reading(model, reading_id: int):
+    """
+    Load a reading by id.
+
+    Month table readings are returned detached, as they are written through this module rather
+    than the session.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param reading_id: The reading identifier.
+    :raises NoResultFound: if there is no such reading.
+    """
+    if not routes_partitions():
+        return model.query.filter(model.id == reading_id).one()
+
+    month = reading_month(model, reading_id)
+
+    if month is None:
+        return model.query.filter(model.id == reading_id).one()
+
+    reading = query_readings(model, month, month).filter(model.id == reading_id).one()
+    db.session.expunge(reading)
+
+    return reading
+
+
+def create_partition(model, month: datetime) -> bool:
+    """
+    Create the partition of a month.
+
+    On MySQL the table is converted to a partitioned table first if needed.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param month: The first day of the month.
+    :return: True if the partition was created, False if it already existed.
+    """
+    if month in list_partitions(model):
+        return False
+
+    if db.engine.dialect.name == 'mysql':
+        return create_mysql_partitions(model, [month]) > 0
+
+    table = partition_table(model, month)
+    connection = db.session.connection()
+
+    if table.exists(bind=connection):
+        forget_partitions(model)
+        return False
+
+    table.create(bind=connection)
+    forget_partitions(model)
+    forget_partitions_on_rollback()
+
+    return True
+
+
+def forget_partitions_on_rollback() -> None:
+    """
+    Forget every cached partition list of the engine if the current transaction rolls back, since
+    the tables it created are gone again.
+    """
+    engine = db.engine
+    event.listen(db.session(), 'after_rollback', lambda session: _partition_months.get(engine, {}).clear(),
+                 once=True)
+
+
+def update_partition_tables(model) -> None:
+    """
+    Add the columns and indexes declared on a model that its existing month tables lack.
+
+    MySQL partitions share the table's definition, so this only applies to the SQLite stand-in.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    """
+    if db.engine.dialect.name == 'mysql':
+        return
+
+    connection = db.session.connection()
+    inspector = inspect(connection)
+
+    for month in list_partitions(model):
+        table = partition_table(model, month)
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+
+        for column in table.columns:
+            if column.name not in existing_columns:
+                connection.execute(text('ALTER TABLE {table} ADD COLUMN {column}'.format(
+                    table=table.name, column=CreateColumn(column).compile(dialect=db.engine.dialect))))
+
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=connection)
+
+    db.session.commit()
+
+
+def create_mysql_partitions(model, months: list) -> int:
+    """
+    Add monthly RANGE partitions to a MySQL reading table, converting it on first use.
+
+    A table is converted with one partition per month from its oldest reading, so that old
+    months can later be dropped one at a time.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param months: The first day of each month to partition.
+    :return: The number of partitions added.
+    """
+    table = model.__tablename__
+    existing = list_partitions(model)
+
+    if not existing:
+        oldest = db.session.query(func.min(model.timestamp)).scalar()
+        if oldest is not None:
+            months = months + months_between(month_start(oldest), max(months))
+
+        # Partitioned tables need the partitioning column in every unique key and cannot have
+        # foreign keys
+        for foreign_key in inspect(db.engine).get_foreign_keys(table):
+            db.engine.execute(text('ALTER TABLE {table} DROP FOREIGN KEY {name}'.format(
+                table=table, name=foreign_key['name'])))
+
+        db.engine.execute(text('ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, timestamp)'.format(
+            table=table)))
+
+    months = sorted(set(month for month in months if month not in existing))
+
+    if not months:
+        return 0
+
+    forget_partitions(model)
+
+    if existing and months[0] < existing[-1]:
+        raise ValueError('cannot add partitions before {month:%Y-%m}'.format(month=existing[-1]))
+
+    definitions = ', '.join("PARTITION p{month:%Y%m} VALUES LESS THAN ('{end:%Y-%m-%d}')".format(
+        month=month, end=next_month(month)) for month in months)
+    definitions += ', PARTITION {future} VALUES LESS THAN (MAXVALUE)'.format(future=FUTURE_PARTITION)
+
+    if existing:
+        db.engine.execute(text('ALTER TABLE {table} REORGANIZE PARTITION {future} INTO ({definitions})'.format(
+            table=table, future=FUTURE_PARTITION, definitions=definitions)))
+    else:
+        db.engine.execute(text('ALTER TABLE {table} PARTITION BY RANGE COLUMNS(timestamp) ({definitions})'.format(
+            table=table, definitions=definitions)))
+
+    return len(months)
+
+
+def drop_partition(model, month: datetime) -> None:
+    """
+    Drop the partition of a month and its readings.
+
+    The rollups of the month are kept, so aggregates over dropped months remain available.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param month: The first day of the month.
+    """
+    if db.engine.dialect.name == 'mysql':
+        db.engine.execute(text('ALTER TABLE {table} DROP PARTITION p{month:%Y%m}'.format(
+            table=model.__tablename__, month=month)))
+    else:
+        partition_table(model, month).drop(bind=db.engine)
+
+    forget_partitions(model)
+
+    with db.engine.begin() as connection:
+        bump_table_version(model, connection)
+
+
+def detach_partition(model, month: datetime) -> str:
+    """
+    Move the readings of a month out of the reading table into an archive table.
+
+    On MySQL the partition is exchanged with an empty table, which only swaps metadata. The
+    month table stand-in is renamed and its indexes dropped.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param month: The first day of the month.
+    :return: The name of the archive table.
+    """
+    table = model.__tablename__
+    archive = '{name}_archive'.format(name=partition_table_name(model, month))
+
+    if db.engine.dialect.name == 'mysql':
+        db.engine.execute(text('CREATE TABLE {archive} LIKE {table}'.format(archive=archive, table=table)))
+        db.engine.execute(text('ALTER TABLE {archive} REMOVE PARTITIONING'.format(archive=archive)))
+        db.engine.execute(text('ALTER TABLE {table} EXCHANGE PARTITION p{month:%Y%m} WITH TABLE {archive}'.format(
+            table=table, month=month, archive=archive)))
+        db.engine.execute(text('ALTER TABLE {table} DROP PARTITION p{month:%Y%m}'.format(table=table, month=month)))
+    else:
+        partition = partition_table(model, month)
+        for index in partition.indexes:
+            db.engine.execute(DropIndex(index))
+        db.engine.execute(text('ALTER TABLE {partition} RENAME TO {archive}'.format(partition=partition.name,
+                                                                                    archive=archive)))
+
+    forget_partitions(model)
+
+    with db.engine.begin() as connection:
+        bump_table_version(model, connection)
+
+    return archive
+
+
+def allocate_reading_ids(model, count: int) -> int:
+    """
+    Reserve a block of reading ids shared by all month tables of a model.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param count: The number of ids to reserve.
+    :return: The first reserved id.
+    """
+    tables = _partition_months.setdefault(db.engine, {})
+
+    if _sequence.name not in tables:
+        _sequence.create(bind=db.session.connection(), checkfirst=True)
+        tables[_sequence.name] = True
+        forget_partitions_on_rollback()
+
+    table_name = model.__tablename__
+    updated = db.session.execute(_sequence.update()
+                                 .where(_sequence.c.table_name == table_name)
+                                 .values(next_id=_sequence.c.next_id + count))
+
+    if updated.rowcount == 0:
+        last_id = 0
+        for month in list_partitions(model):
+            partition = partition_table(model, month)
+            last_id = max(last_id, db.session.execute(select([func.max(partition.c.id)])).scalar() or 0)
+
+        db.session.execute(_sequence.insert().values(table_name=table_name, next_id=last_id + 1 + count))
+
+    return db.session.execute(select([_sequence.c.next_id])
+                              .where(_sequence.c.table_name == table_name)).scalar() - count
+
+
+def insert_reading_rows(model, mappings: list) -> None:
+    """
+    Insert readings, routing each to the month table of its timestamp.
+
+    Readings without an id are given one; month tables are created as needed.
+    """
+    missing_ids = [mapping for mapping in mappings if mapping.get('id') is None]
+
+    if missing_ids:
+        first_id = allocate_reading_ids(model, len(missing_ids))
+        for offset, mapping in enumerate(missing_ids):
+            mapping['id'] = first_id + offset
+
+    by_month = {}
+    for mapping in mappings:
+        by_month.setdefault(month_start(mapping['timestamp']), []).append(mapping)
+
+    for month, rows in by_month.items():
+        create_partition(model, month)
+        db.session.execute(partition_table(model, month).insert(), rows)
+
+
+def reading_row(model, reading) -> dict:
+    row = {column.name: getattr(reading, column.key) for column in model.__mapper__.columns}
+
+    # Columns left unset on a new reading take their default, as they would when the ORM inserts it
+    for column in model.__table__.columns:
+        if row[column.name] is None and column.default is not None and column.default.is_scalar:
+            row[column.name] = column.default.arg
+
+    return row
+
+
+def bulk_insert_readings(model, mappings: list) -> None:
+    """
+    Insert column mappings of new readings in the current transaction.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param mappings: The column mappings of the readings.
+    """
+    if routes_partitions():
+        insert_reading_rows(model, mappings)
+    else:
+        db.session.bulk_insert_mappings(model, mappings)
+
+    bump_table_version(model)
+
+
+def add_reading(model, reading) -> None:
+    """
+    Add a new reading in the current transaction.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param reading: A new Humidity, Pressure or Temperature object.
+    """
+    if routes_partitions():
+        row = reading_row(model, reading)
+        insert_reading_rows(model, [row])
+        reading.id = row['id']
+    else:
+        db.session.add(reading)
+
+    bump_table_version(model)
+
+
+def save_reading(model, reading, previous_timestamp: datetime) -> None:
+    """
+    Write the changes to a reading loaded with get_reading() in the current transaction.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param reading: The changed reading.
+    :param previous_timestamp: The reading's timestamp before the change.
+    """
+    if routes_partitions():
+        partition = partition_table(model, month_start(previous_timestamp))
+        db.session.execute(partition.delete().where(partition.c.id == reading.id))
+        insert_reading_rows(model, [reading_row(model, reading)])
+    else:
+        db.session.add(reading)
+
+    bump_table_version(model)
+
+
+def delete_reading(model, reading) -> None:
+    """
+    Delete a reading loaded with get_reading() in the current transaction.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param reading: The reading to delete.
+    """
+    if routes_partitions():
+        partition = partition_table(model, month_start(reading.timestamp))
+        db.session.execute(partition.delete().where(partition.c.id == reading.id))
+    else:
+        db.session.delete(reading)
+
+    bump_table_version(model)
+
+
+def delete_reading_ids(model, readings: list) -> None:
+    """
+    Delete readings by id in the current transaction.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param readings: The (id, timestamp) of each reading to delete.
+    """
+    if routes_partitions():
+        by_month = {}
+        for reading_id, timestamp in readings:
+            by_month.setdefault(month_start(timestamp), []).append(reading_id)
+
+        for month, ids in by_month.items():
+            partition = partition_table(model, month)
+            db.session.execute(partition.delete().where(partition.c.id.in_(ids)))
+    else:
+        db.session.execute(model.__table__.delete().where(model.__table__.c.id.in_(
+            [reading_id for reading_id, timestamp in readings])))
+
+    bump_table_version(model)
@@ -0,0 +1,124 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from sqlalchemy import BigInteger, DECIMAL, Float
+from sqlalchemy.sql.expression import type_coerce
+from sqlalchemy.types import TypeDecorator
+
+# How reading numbers are stored:
+#   decimal -- DECIMAL(precision, scale), loaded as decimal.Decimal
+#   scaled  -- BIGINT holding value * 10 ** scale, loaded as float
+#   float   -- DOUBLE / REAL, loaded as float
+NUMERIC_STORAGE_MODES = ('decimal', 'scaled', 'float')
+
+_numeric_storage = {'mode': 'decimal'}
+
+
+def set_numeric_storage(mode: str) -> None:
+    """
+    Select how reading numbers are stored.
+
+    The mode is read when an engine first compiles a reading column, so it must be set before the
+    application first uses the database, and it must match the schema (see
+    migrate_weather_data_numeric_storage.py).
+
+    :param mode: One of NUMERIC_STORAGE_MODES.
+    :type mode: str
+    """
+    if mode not in NUMERIC_STORAGE_MODES:
+        raise ValueError('invalid numeric storage mode: {mode}'.format(mode=mode))
+
+    _numeric_storage['mode'] = mode
+
+
+def get_numeric_storage() -> str:
+    return _numeric_storage['mode']
+
+
+def storage_type(mode: str, precision: int, scale: int):
+    """
+    Return the column type a reading number is stored as in a storage mode.
+
+    :param mode: One of NUMERIC_STORAGE_MODES.
+    :param precision: The number of significant digits.
+    :param scale: The number of digits after the decimal point.
+    """
+    if mode == 'scaled':
+        return BigInteger()
+    if mode == 'float':
+        return Float(precision=53)
+    return DECIMAL(precision=precision, scale=scale)
+
+
+class ReadingNumber(TypeDecorator):
+    """
+    A fixed-point reading number stored as DECIMAL, a scaled BIGINT or a DOUBLE.
+
+    Usage: value = db.Column(ReadingNumber(precision=8, scale=4), nullable=False)
+    """
+    impl = DECIMAL
+
+    def __init__(self, precision: int, scale: int):
+        super().__init__(precision=precision, scale=scale)
+        self.precision = precision
+        self.scale = scale
+        self.factor = 10 ** scale
+
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(storage_type(get_numeric_storage(), self.precision, self.scale))
+
+    def bind_processor(self, dialect):
+        mode = get_numeric_storage()
+        impl_processor = self.load_dialect_impl(dialect).bind_processor(dialect)
+
+        if mode != 'scaled':
+            return impl_processor
+
+        factor = self.factor
+
+        def process(value):
+            if value is None:
+                return None
+            return int(round(float(value) * factor))
+
+        return process
+
+    def result_processor(self, dialect, coltype):
+        mode = get_numeric_storage()
+        impl_processor = self.load_dialect_impl(dialect).result_processor(dialect, coltype)
+
+        if mode != 'scaled':
+            # DECIMAL loads as decimal.Decimal and DOUBLE / REAL as float, as the drivers return them
+            return impl_processor
+
+        factor = self.factor
+
+        def process(value):
+            if value is None:
+                return None
+            return value / factor
+
+        return process
+
+
+def real_value(column):
+    """
+    Return a SQL expression for a reading number column in its real units.
+
+    Use this inside SQL arithmetic and aggregates (e.g. SUM(value * value)), where the stored
+    representation is combined before the ORM can convert it back.
+
+    :param column: A ReadingNumber column.
+    """
+    if get_numeric_storage() == 'scaled':
+        return type_coerce(column, Float(precision=53)) / float(column.type.factor)
+
+    return column
@@ -0,0 +1,67 @@
+"""
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from database import db
+
+# The version of each reading table (see TableVersion) is increased by the write functions in
+# database/partitions.py, in the transaction of the write, so a reader sees a version no newer
+# than the rows it reads. create_database() adds the row of every reading table.
+
+
+def add_table_versions(models) -> None:
+    """
+    Add the missing version rows of reading tables in the current transaction.
+
+    :param models: The reading models (Humidity, Pressure and Temperature).
+    """
+    from database.models import TableVersion
+
+    for model in models:
+        if TableVersion.query.get(model.__tablename__) is None:
+            db.session.add(TableVersion(table_name=model.__tablename__, version=0, modified=datetime.utcnow()))
+
+
+def bump_table_version(model, connection=None) -> None:
+    """
+    Increase the version of a reading table after a write to it.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param connection: The connection of a write made outside the session, or None for the
+                       current session transaction.
+    """
+    from database.models import TableVersion
+
+    table = TableVersion.__table__
+    values = {'version': table.c.version + 1, 'modified': datetime.utcnow()}
+    execute = (connection or db.session).execute
+
+    if execute(table.update().where(table.c.table_name == model.__tablename__).values(values)).rowcount == 0:
+        execute(table.insert().values(table_name=model.__tablename__, version=1, modified=values['modified']))
+
+
+def get_table_version(model) -> tuple:
+    """
+    Return the (version, modified datetime) of a reading table, or (0, None) before its first write.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :return: tuple
+    """
+    from database.models import TableVersion
+
+    table = TableVersion.__table__
+    row = db.session.execute(select([table.c.version, table.c.modified])
+                             .where(table.c.table_name == model.__tablename__)).first()
+
+    return (row.version, row.modified) if row is not None else (0, None)
@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+
+"""
+manage_weather_data_partitions -- create, drop and detach the monthly reading partitions
+
+manage_weather_data_partitions is a command line utility to maintain the monthly partitions of
+the humidity, pressure and temperature readings (see PARTITION_READINGS in config.py).
+
+Run "create" ahead of time (e.g. from a monthly cron job) so readings never land in the catch-all
+partition, and "drop" or "detach" to expire old months without a row-by-row DELETE.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+from datetime import datetime
+
+__all__ = []
+__version__ = 1.1
+__date__ = '2017-06-14'
+__updated__ = '2017-06-14'
+
+DEBUG = False
+
+MEASUREMENTS = ('humidity', 'pressure', 'temperature')
+
+
+class CLIError(Exception):
+    """Generic exception to raise and log different fatal errors."""
+
+    def __init__(self, message):
+        super(CLIError).__init__(type(self))
+        self.message = 'E: {message}'.format(message=message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+
+def parse_month(value: str) -> datetime:
+    """
+    Parse a YYYY-MM argument into the first instant of that month.
+
+    :param value: The month (e.g. 2017-01).
+    :type value: str
+    :return: datetime
+    """
+    return datetime.strptime(value, '%Y-%m')
+
+
+def list_command(model) -> None:
+    from database.partitions import list_partitions
+
+    for month in list_partitions(model):
+        sys.stdout.write('{table} {month:%Y-%m}\n'.format(table=model.__tablename__, month=month))
+
+
+def create_command(model, months_ahead: int, now: datetime = None) -> int:
+    """
+    Create the partitions of the current month and the following months.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param months_ahead: The number of months after the current month to create.
+    :param now: The current time (default: now).
+    :return: The number of partitions created.
+    """
+    from database import db
+    from database.partitions import create_mysql_partitions, create_partition, month_start, next_month
+
+    months = [month_start(now or datetime.utcnow())]
+    for _ in range(months_ahead):
+        months.append(next_month(months[-1]))
+
+    if db.engine.dialect.name == 'mysql':
+        created = create_mysql_partitions(model, months)
+    else:
+        created = sum(1 for month in months if create_partition(model, month))
+        db.session.commit()
+
+    sys.stdout.write('{table}: {created} partitions created\n'.format(table=model.__tablename__, created=created))
+
+    return created
+
+
+def expire_command(model, before: datetime, detach: bool) -> int:
+    """
+    Drop or detach the partitions of the months before a month.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param before: The first month to keep.
+    :param detach: True to move the readings to archive tables, False to drop them.
+    :return: The number of partitions expired.
+    """
+    from sqlalchemy import func
+
+    from api.weather_data_flaskapi.business.response_cache import invalidate_responses
+    from database import db
+    from database.partitions import detach_partition, drop_partition, list_partitions, next_month, query_readings
+
+    months = [month for month in list_partitions(model) if month < before]
+    db.session.commit()
+
+    for month in months:
+        # The first and last reading of each location bound the cached responses to evict
+        bounds = [{'location_id': location_id, 'timestamp': timestamp}
+                  for location_id, first, last in query_readings(model, month, next_month(month))
+                  .with_entities(model.location_id, func.min(model.timestamp), func.max(model.timestamp))
+                  .filter(model.timestamp >= month, model.timestamp < next_month(month))
+                  .group_by(model.location_id)
+                  for timestamp in (first, last)]
+        db.session.commit()
+
+        if detach:
+            archive = detach_partition(model, month)
+            sys.stdout.write('{table} {month:%Y-%m}: detached to {archive}\n'.format(table=model.__tablename__,
+                                                                                     month=month,
+                                                                                     archive=archive))
+        else:
+            drop_partition(model, month)
+            sys.stdout.write('{table} {month:%Y-%m}: dropped\n'.format(table=model.__tablename__, month=month))
+
+        invalidate_responses(model, bounds)
+
+    return len(months)
+
+
+def main(argv=None):
+    """Command line options."""
+
+    program_name = os.path.basename(sys.argv[0])
+
+    try:
+        parser = ArgumentParser(description=__import__('__main__').__doc__.split("\n")[1],
+                                formatter_class=RawDescriptionHelpFormatter)
+        parser.add_argument('command',
+                            choices=('list', 'create', 'drop', 'detach'),
+                            help='list the partitions, create future partitions, or drop / detach old partitions')
+        parser.add_argument('-m',
+                            '--measurement',
+                            dest='measurements',
+                            action='append',
+                            choices=MEASUREMENTS,
+                            help='the measurement to manage (repeatable, default: all)')
+        parser.add_argument('-a',
+                            '--months-ahead',
+                            dest='months_ahead',
+                            type=int,
+                            required=False,
+                            help='create: the number of months after the current month '
+                                 '(default: PARTITION_MONTHS_AHEAD)')
+        parser.add_argument('-b',
+                            '--before',
+                            dest='before',
+                            type=parse_month,
+                            required=False,
+                            help='drop / detach: the first month to keep (YYYY-MM)')
+
+        args = parser.parse_args(argv)
+
+        if args.command in ('drop', 'detach') and args.before is None:
+            raise CLIError('{command} requires --before'.format(command=args.command))
+
+        if args.months_ahead is not None and args.months_ahead < 0:
+            raise CLIError('months-ahead must not be negative')
+
+        from app import app
+        from database.models import Humidity, Pressure, Temperature
+
+        models = {'humidity': Humidity, 'pressure': Pressure, 'temperature': Temperature}
+
+        with app.app_context():
+            if not app.config['PARTITION_READINGS']:
+                raise CLIError('PARTITION_READINGS is not enabled in config.py')
+
+            months_ahead = args.months_ahead
+            if months_ahead is None:
+                months_ahead = app.config['PARTITION_MONTHS_AHEAD']
+
+            for measurement in args.measurements or MEASUREMENTS:
+                model = models[measurement]
+
+                if args.command == 'list':
+                    list_command(model)
+                elif args.command == 'create':
+                    create_command(model, months_ahead)
+                else:
+                    expire_command(model, args.before, args.command == 'detach')
+
+        return 0
+    except KeyboardInterrupt:
+        # handle keyboard interrupt ###
+        return 0
+    except Exception as e:
+        if DEBUG:
+            raise e
+        indent = len(program_name) * " "
+        sys.stderr.write(program_name + ": " + repr(e) + "\n")
+        sys.stderr.write(indent + "  for help use --help")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+"""
+migrate_weather_data_locations -- move the reading locations into the location table
+
+migrate_weather_data_locations is a command line utility to migrate a database created by an
+earlier release, which stored city, province and country on every reading, to the location
+table referenced by a location_id column.
+
+The rollup tables are recreated and rebuilt from the migrated readings.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+
+__all__ = []
+__version__ = 1.1
+__date__ = '2017-06-14'
+__updated__ = '2017-06-14'
+
+DEBUG = False
+
+LOCATION_COLUMNS = ('city', 'province', 'country')
+
+
+class CLIError(Exception):
+    """Generic exception to raise and log different fatal errors."""
+
+    def __init__(self, message):
+        super(CLIError).__init__(type(self))
+        self.message = 'E: {message}'.format(message=message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+
+def migrate_readings(model) -> int:
+    """
+    Replace the city, province and country columns of a reading table with a location_id.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :return: The number of locations found in the table.
+    """
+    from sqlalchemy import MetaData, Table, inspect, text
+    from sqlalchemy.schema import DropIndex, Index
+
+    from database import db
+    from database.locations import get_location_id
+
+    table = model.__tablename__
+    inspector = inspect(db.engine)
+    columns = {column['name'] for column in inspector.get_columns(table)}
+
+    if 'city' not in columns:
+        return 0
+
+    if 'location_id' not in columns:
+        db.engine.execute(text('ALTER TABLE {table} ADD COLUMN location_id INTEGER NULL'.format(table=table)))
+
+    locations = db.engine.execute(
+        text('SELECT DISTINCT city, province, country FROM {table}'.format(table=table))).fetchall()
+
+    for city, province, country in locations:
+        db.engine.execute(text('UPDATE {table} SET location_id = :location_id '
+                               'WHERE city = :city AND province = :province AND country = :country'.format(
+                                   table=table)),
+                          location_id=get_location_id(city, province, country),
+                          city=city,
+                          province=province,
+                          country=country)
+
+    for index in inspector.get_indexes(table):
+        if set(index['column_names']) & set(LOCATION_COLUMNS):
+            db.engine.execute(DropIndex(Index(index['name'], _table=Table(table, MetaData()))))
+
+    for column in LOCATION_COLUMNS:
+        db.engine.execute(text('ALTER TABLE {table} DROP COLUMN {column}'.format(table=table, column=column)))
+
+    # SQLite cannot change a column's constraints in place, so there location_id stays nullable
+    if db.engine.dialect.name == 'mysql':
+        db.engine.execute(text('ALTER TABLE {table} MODIFY location_id INTEGER NOT NULL, '
+                               'ADD CONSTRAINT {table}_location_id_fk FOREIGN KEY (location_id) '
+                               'REFERENCES location (id)'.format(table=table)))
+
+    sys.stdout.write('{table}: {count} locations\n'.format(table=table, count=len(locations)))
+
+    return len(locations)
+
+
+def drop_rollups(rollup) -> None:
+    """
+    Drop a rollup table still keyed on city, province and country.
+
+    :param rollup: The rollup model.
+    """
+    from sqlalchemy import inspect
+
+    from database import db
+
+    inspector = inspect(db.engine)
+
+    if rollup.__tablename__ in inspector.get_table_names():
+        columns = {column['name'] for column in inspector.get_columns(rollup.__tablename__)}
+
+        if 'city' in columns:
+            rollup.__table__.drop(bind=db.engine)
+
+
+def main(argv=None):
+    """Command line options."""
+
+    program_name = os.path.basename(sys.argv[0])
+
+    try:
+        parser = ArgumentParser(description=__import__('__main__').__doc__.split("\n")[1],
+                                formatter_class=RawDescriptionHelpFormatter)
+        parser.add_argument('--skip-rollups',
+                            dest='skip_rollups',
+                            action='store_true',
+                            help='do not rebuild the rollups (run backfill_weather_data_rollups.py later)')
+
+        args = parser.parse_args(argv)
+
+        from app import app
+        from api.weather_data_flaskapi.business.rollups import ROLLUP_MODELS
+        from backfill_weather_data_rollups import backfill
+        from database import db, create_indexes
+
+        with app.app_context():
+            db.create_all()
+
+            for model, rollups in ROLLUP_MODELS.items():
+                migrate_readings(model)
+
+                for rollup, seconds in rollups:
+                    drop_rollups(rollup)
+
+            db.create_all()
+            create_indexes(app)
+
+            if not args.skip_rollups:
+                for model in ROLLUP_MODELS:
+                    backfill(model, None, None)
+
+        return 0
+    except KeyboardInterrupt:
+        # handle keyboard interrupt ###
+        return 0
+    except Exception as e:
+        if DEBUG:
+            raise e
+        indent = len(program_name) * " "
+        sys.stderr.write(program_name + ": " + repr(e) + "\n")
+        sys.stderr.write(indent + "  for help use --help")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
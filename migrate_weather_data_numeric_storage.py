@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+
+"""
+migrate_weather_data_numeric_storage -- convert the reading number columns to another storage mode
+
+migrate_weather_data_numeric_storage is a command line utility to convert the value, latitude,
+longitude, elevation and value_error_range columns of the reading tables between DECIMAL
+('decimal'), scaled BIGINT ('scaled') and DOUBLE ('float') storage.
+
+Set NUMERIC_STORAGE in config.py to the new mode before restarting the service.
+
+@author:     Fyzel@users.noreply.github.com
+
+@copyright:  2017 Englesh.org. All rights reserved.
+
+@license:    https://github.com/Fyzel/weather-data-flaskapi/blob/master/LICENSE
+
+@contact:    Fyzel@users.noreply.github.com
+@deffield    updated: 2017-06-14
+"""
+
+import os
+import sys
+from argparse import ArgumentParser
+from argparse import RawDescriptionHelpFormatter
+
+__all__ = []
+__version__ = 1.1
+__date__ = '2017-06-14'
+__updated__ = '2017-06-14'
+
+DEBUG = False
+
+MODES = ('decimal', 'scaled', 'float')
+
+
+class CLIError(Exception):
+    """Generic exception to raise and log different fatal errors."""
+
+    def __init__(self, message):
+        super(CLIError).__init__(type(self))
+        self.message = 'E: {message}'.format(message=message)
+
+    def __str__(self):
+        return self.message
+
+    def __unicode__(self):
+        return self.message
+
+
+def stored_mode(column_type) -> str:
+    """
+    Return the storage mode of a reflected column type.
+
+    :param column_type: The column type reported by the inspector.
+    :return: str
+    """
+    from sqlalchemy import types
+
+    if isinstance(column_type, types.Integer):
+        return 'scaled'
+    if isinstance(column_type, types.Float):
+        return 'float'
+    return 'decimal'
+
+
+def converted_value(column: str, source: str, target: str, factor: int) -> str:
+    """
+    Return the SQL expression converting a column's stored value between storage modes.
+    """
+    if target == 'scaled':
+        return 'ROUND({column} * {factor})'.format(column=column, factor=factor)
+    if source == 'scaled':
+        return '{column} / {factor}.0'.format(column=column, factor=factor)
+    return column
+
+
+def migrate_column(model, column, target: str, batch_size: int) -> bool:
+    """
+    Convert one reading number column to a storage mode.
+
+    The converted values are written to a new column in batches of ids, which then replaces the
+    original column.
+
+    :param model: The reading model (Humidity, Pressure or Temperature).
+    :param column: The ReadingNumber column.
+    :param target: The storage mode to convert to.
+    :param batch_size: The number of ids converted per UPDATE.
+    :return: True if the column was converted, False if it was already stored that way.
+    """
+    from sqlalchemy import MetaData, Table, func, inspect, text
+    from sqlalchemy.schema import DropIndex, Index
+
+    from database import db
+    from database.types import storage_type
+
+    table = model.__tablename__
+    inspector = inspect(db.engine)
+    source = stored_mode({reflected['name']: reflected['type']
+                          for reflected in inspector.get_columns(table)}[column.name])
+
+    if source == target:
+        return False
+
+    new_type = storage_type(target, column.type.precision, column.type.scale).compile(dialect=db.engine.dialect)
+    new_column = '{column}_{target}'.format(column=column.name, target=target)
+
+    db.engine.execute(text('ALTER TABLE {table} ADD COLUMN {new_column} {new_type} NULL'.format(
+        table=table, new_column=new_column, new_type=new_type)))
+
+    low, high = db.session.query(func.min(model.id), func.max(model.id)).one()
+    db.session.commit()
+
+    for start in range(low or 0, (high or 0) + 1, batch_size):
+        db.engine.execute(text('UPDATE {table} SET {new_column} = {value} '
+                               'WHERE id >= :start AND id < :end'.format(table=table,
+                                                                         new_column=new_column,
+                                                                         value=converted_value(column.name,
+                                                                                               source,
+                                                                                               target,
+                                                                                               column.type.factor))),
+                          start=start,
+                          end=start + batch_size)
+
+    for index in inspector.get_indexes(table):
+        if column.name in index['column_names']:
+            db.engine.execute(DropIndex(Index(index['name'], _table=Table(table, MetaData()))))
+
+    db.engine.execute(text('ALTER TABLE {table} DROP COLUMN {column}'.format(table=table, column=column.name)))
+
+    # SQLite cannot change a column's constraints in place, so there the converted column stays nullable
+    if db.engine.dialect.name == 'mysql':
+        db.engine.execute(text('ALTER TABLE {table} CHANGE {new_column} {column} {new_type} NOT NULL'.format(
+            table=table, new_column=new_column, column=column.name, new_type=new_type)))
+    else:
+        db.engine.execute(text('ALTER TABLE {table} RENAME COLUMN {new_column} TO {column}'.format(
+            table=table, new_column=new_column, column=column.name)))
+
+    sys.stdout.write('{table}.{column}: {source} -> {target}\n'.format(table=table,
+                                                                       column=column.name,
+                                                                       source=source,
+                                                                       target=target))
+
+    return True
+
+
+def main(argv=None):
+    """Command line options."""
+
+    program_name = os.path.basename(sys.argv[0])
+
+    try:
+        parser = ArgumentParser(description=__import__('__main__').__doc__.split("\n")[1],
+                                formatter_class=RawDescriptionHelpFormatter)
+        parser.add_argument('-t',
+                            '--to',
+                            dest='target',
+                            choices=MODES,
+                            required=True,
+                            help='the storage mode to convert to')
+        parser.add_argument('-b',
+                            '--batch-size',
+                            dest='batch_size',
+                            type=int,
+                            default=100000,
+                            help='the number of ids converted per UPDATE (default: 100000)')
+
+        args = parser.parse_args(argv)
+
+        if args.batch_size < 1:
+            raise CLIError('batch size must be positive')
+
+        from app import app
+        from database import create_indexes
+        from database.models import Humidity, Pressure, Temperature
+        from database.types import ReadingNumber
+
+        with app.app_context():
+            for model in (Humidity, Pressure, Temperature):
+                for column in model.__table__.columns:
+                    if isinstance(column.type, ReadingNumber):
+                        migrate_column(model, column, args.target, args.batch_size)
+
+        create_indexes(app)
+
+        if app.config['NUMERIC_STORAGE'] != args.target:
+            sys.stdout.write("Set NUMERIC_STORAGE = '{target}' in config.py\n".format(target=args.target))
+
+        return 0
+    except KeyboardInterrupt:
+        # handle keyboard interrupt ###
+        return 0
+    except Exception as e:
+        if DEBUG:
+            raise e
+        indent = len(program_name) * " "
+        sys.stderr.write(program_name + ": " + repr(e) + "\n")
+        sys.stderr.write(indent + "  for help use --help")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())